@@ -228,6 +228,71 @@ LOGGING = {
     },
 }
 
+# ============================================================
+# TAREAS PROGRAMADAS
+# ============================================================
+# El dashboard ya no genera alertas al cargar: hay que programarlas.
+# Forma recomendada: un proceso aparte con
+# `python manage.py generar_alertas --cada 15` (o un cron con
+# `python manage.py generar_alertas`).
+# Alternativa: ALERTAS_PROGRAMADOR_MINUTOS=N inicia un hilo dentro del
+# servidor (solo en el proceso de wsgi.py/asgi.py, nunca en comandos ni
+# scripts) que las genera cada N minutos. Con varios workers no se
+# duplican (la tarea toma un bloqueo en la tabla estado_tareas).
+# 0 (por defecto) = desactivado
+ALERTAS_PROGRAMADOR_MINUTOS = config('ALERTAS_PROGRAMADOR_MINUTOS', default=0, cast=int)
+
+# ============================================================
+# CACHE
+# ============================================================
+# Por defecto cache en memoria de cada proceso (locmem). Para compartirlo
+# entre varios workers, cambiar el backend en variables de entorno, por ej.:
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# CACHE_LOCATION=redis://127.0.0.1:6379
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='forneria'),
+    }
+}
+
+# Segundos que se reutilizan el rol y los permisos calculados de un usuario
+# (ver ventas/funciones/permisos.py). Al cambiar un rol, un grupo o un
+# superusuario se invalidan (ventas/signals.py), pero con cache locmem
+# solo en el proceso que hizo el cambio: los demás workers siguen usando
+# su copia hasta que vence. Por eso con locmem el valor por defecto es de
+# 30 segundos; con un cache compartido (Redis, Memcached) es de 5 minutos.
+CACHE_COMPARTIDO = 'locmem' not in CACHES['default']['BACKEND'].lower()
+PERMISOS_CACHE_TTL = config('PERMISOS_CACHE_TTL', default=300 if CACHE_COMPARTIDO else 30, cast=int)
+
+# Segundos que se reutiliza el snapshot de métricas del dashboard
+# (/api/dashboard/snapshot/) antes de volver a calcularlo
+DASHBOARD_SNAPSHOT_TTL = config('DASHBOARD_SNAPSHOT_TTL', default=30, cast=int)
+
+# Segundos máximos que se reutilizan los próximos vencimientos y la pérdida
+# potencial (/api/vencimientos/). Antes de eso se recalculan si cambia
+# cualquier lote (ver ventas/funciones/vencimientos.py)
+VENCIMIENTOS_CACHE_TTL = config('VENCIMIENTOS_CACHE_TTL', default=3600, cast=int)
+
+# Comprobantes de venta generados (PDF, HTML, texto). Se guardan una vez
+# por venta y se reutilizan en las reimpresiones (ver ventas/funciones/comprobantes.py).
+# COMPROBANTES_BACKEND permite usar otro almacén (clase con abrir/guardar/existe)
+COMPROBANTES_DIR = config('COMPROBANTES_DIR', default=str(BASE_DIR / 'comprobantes'))
+COMPROBANTES_BACKEND = config('COMPROBANTES_BACKEND', default='ventas.funciones.comprobantes.AlmacenComprobantesLocal')
+
+# Exportaciones de reportes en segundo plano (ver ventas/funciones/exportaciones.py):
+# sobre EXPORTACION_FILAS_SINCRONA filas, las páginas de reportes generan el
+# archivo en un hilo del servidor y lo descargan al terminar
+EXPORTACION_FILAS_SINCRONA = config('EXPORTACION_FILAS_SINCRONA', default=5000, cast=int)
+EXPORTACIONES_DIR = config('EXPORTACIONES_DIR', default=str(BASE_DIR / 'exportaciones'))
+EXPORTACIONES_WORKERS = config('EXPORTACIONES_WORKERS', default=2, cast=int)
+EXPORTACIONES_HORAS_VIGENCIA = config('EXPORTACIONES_HORAS_VIGENCIA', default=24, cast=int)
+
+# Folios de boleta: cada proceso del servidor reserva este bloque de números
+# de una vez (ver ventas/funciones/folios.py). Los números de un bloque que
+# no alcanzan a usarse (reinicio del servidor) quedan como saltos en la numeración
+FOLIOS_TAMANO_BLOQUE = config('FOLIOS_TAMANO_BLOQUE', default=100, cast=int)
+
 # ============================================================
 # CONFIGURACIONES ADICIONALES DE SEGURIDAD (Solo en producción)
 # ============================================================
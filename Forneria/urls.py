@@ -33,7 +33,7 @@ from ventas.views import (
     usuarios_list_view, usuario_crear_view, usuario_editar_view, usuario_eliminar_view,
     
     # Vistas del sistema POS (Punto de Venta)
-    pos_view, agregar_cliente_ajax, validar_producto_ajax, procesar_venta_ajax,
+    pos_view, catalogo_pos_api, buscar_clientes_api, agregar_cliente_ajax, validar_producto_ajax, procesar_venta_ajax,
     
     # Vistas del sistema de Alertas
     alertas_list_view, alerta_crear_view, alerta_editar_view, alerta_eliminar_view,
@@ -51,10 +51,11 @@ from ventas.views import (
     
     # Vistas de Acciones Masivas (NUEVO)
     crear_alertas_masivo, mover_merma_masivo, activar_desactivar_masivo, eliminar_masivo,
+    estado_accion_masiva_api,
     
     # Vistas de Métricas del Dashboard (NUEVO)
     ventas_del_dia_api, stock_bajo_api, alertas_pendientes_api, top_producto_api,
-    ventas_del_dia_lista_api, merma_lista_api,
+    ventas_del_dia_lista_api, merma_lista_api, dashboard_snapshot_api,
     
     # Vistas de Historial de Boletas (NUEVO)
     historial_boletas_list_view, historial_boleta_detalle_view, historial_boleta_regenerar_pdf_view,
@@ -72,6 +73,7 @@ from ventas.views import (
 
 # Vistas de APIs para el dashboard
 from ventas.views.views_vencimientos import (
+    vencimientos_api,
     productos_por_vencer_api,
     productos_por_vencer_14_dias_api,
     productos_por_vencer_30_dias_api
@@ -102,6 +104,13 @@ from ventas.views.view_reportes_inventario import (
     exportar_inventario_pdf
 )
 
+# Exportaciones de reportes en segundo plano
+from ventas.views.view_exportaciones import (
+    crear_exportacion_api,
+    estado_exportacion_api,
+    descargar_exportacion_view
+)
+
 # Vista de comprobante PDF (RF-V3)
 from ventas.views.view_comprobante import (
     comprobante_pdf_view,
@@ -183,6 +192,8 @@ urlpatterns = [
     path('pos/', pos_view, name='pos'),
     
     # APIs del POS (llamadas AJAX desde JavaScript)
+    path('api/pos/catalogo/', catalogo_pos_api, name='api_catalogo_pos'),
+    path('api/clientes/buscar/', buscar_clientes_api, name='api_buscar_clientes'),
     path('api/agregar-cliente/', agregar_cliente_ajax, name='api_agregar_cliente'),
     path('api/validar-producto/<int:producto_id>/', validar_producto_ajax, name='api_validar_producto'),
     path('api/procesar-venta/', procesar_venta_ajax, name='api_procesar_venta'),
@@ -209,6 +220,9 @@ urlpatterns = [
     # ============================================================
     # APIs PARA EL DASHBOARD
     # ============================================================
+    # Snapshot con todas las métricas (usado por dashboard_metrics.js)
+    path('api/dashboard/snapshot/', dashboard_snapshot_api, name='api_dashboard_snapshot'),
+    
     # APIs de métricas principales
     path('api/ventas-del-dia/', ventas_del_dia_api, name='api_ventas_del_dia'),
     path('api/ventas-del-dia/lista/', ventas_del_dia_lista_api, name='api_ventas_del_dia_lista'),
@@ -218,6 +232,7 @@ urlpatterns = [
     path('api/merma/lista/', merma_lista_api, name='api_merma_lista'),
     
     # APIs de productos próximos a vencer
+    path('api/vencimientos/', vencimientos_api, name='api_vencimientos'),
     path('api/proximos-vencimientos/', productos_por_vencer_api, name='api_proximos_vencimientos'),
     path('api/proximos-vencimientos-14/', productos_por_vencer_14_dias_api, name='api_proximos_vencimientos_14'),
     path('api/proximos-vencimientos-30/', productos_por_vencer_30_dias_api, name='api_proximos_vencimientos_30'),
@@ -288,6 +303,11 @@ urlpatterns = [
     path('reportes/inventario/exportar/excel/', exportar_inventario_excel, name='exportar_inventario_excel'),
     path('reportes/inventario/exportar/pdf/', exportar_inventario_pdf, name='exportar_inventario_pdf'),
     
+    # Exportaciones en segundo plano (reportes grandes): crear, consultar estado, descargar
+    path('api/exportaciones/', crear_exportacion_api, name='crear_exportacion_api'),
+    path('api/exportaciones/<int:trabajo_id>/', estado_exportacion_api, name='estado_exportacion_api'),
+    path('exportaciones/<int:trabajo_id>/descargar/', descargar_exportacion_view, name='descargar_exportacion'),
+    
     # ============================================================
     # HISTORIAL DE BOLETAS (NUEVO)
     # ============================================================
@@ -312,6 +332,8 @@ urlpatterns = [
     path('api/acciones-masivas/mover-merma/', mover_merma_masivo, name='api_mover_merma_masivo'),
     path('api/acciones-masivas/activar-desactivar/', activar_desactivar_masivo, name='api_activar_desactivar_masivo'),
     path('api/acciones-masivas/eliminar/', eliminar_masivo, name='api_eliminar_masivo'),
+    # Avance de una acción masiva en segundo plano (la página lo consulta)
+    path('api/acciones-masivas/<int:trabajo_id>/', estado_accion_masiva_api, name='estado_accion_masiva_api'),
     
     # ============================================================
     # GESTIÓN DE PROVEEDORES Y FACTURAS (NUEVO)
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Forneria.settings')
 
 application = get_wsgi_application()
+
+# Programador de alertas en proceso (solo si ALERTAS_PROGRAMADOR_MINUTOS > 0)
+from ventas.funciones.tareas import iniciar_programador_si_habilitado  # noqa: E402
+
+iniciar_programador_si_habilitado()
@@ -0,0 +1,59 @@
+-- ================================================================
+-- Script SQL para agregar la categoría a la tabla alertas
+-- ================================================================
+--
+-- La categoría indica QUÉ vigila cada alerta:
+--   - vencimiento: vencimiento de un producto
+--   - stock_bajo:  stock de un producto bajo el mínimo
+--   - factura:     vencimiento de pago de una factura de proveedor
+--   - manual:      creada por el usuario desde el formulario de alertas
+--                  (el generador automático no la carga ni la sobrescribe)
+--
+-- Antes el generador de alertas distinguía las alertas buscando texto
+-- dentro del mensaje ('vence', 'STOCK BAJO'). Con la categoría, cada
+-- alerta activa se identifica por (producto o factura, categoría) y el
+-- generador puede cargarlas todas de una vez.
+--
+-- Ejecutar este script en la base de datos MySQL:
+-- mysql -u usuario -p nombre_base_datos < sql_agregar_categoria_alertas.sql
+--
+-- ================================================================
+
+USE forneria;
+
+-- Agregar el campo categoria a la tabla alertas
+ALTER TABLE alertas
+ADD COLUMN categoria VARCHAR(20) NOT NULL DEFAULT 'manual'
+COMMENT 'Qué vigila la alerta: vencimiento, stock_bajo, factura o manual'
+AFTER tipo_alerta;
+
+-- Clasificar las alertas existentes según su mensaje y relaciones
+UPDATE alertas
+SET categoria = 'factura'
+WHERE factura_proveedor_id IS NOT NULL;
+
+UPDATE alertas
+SET categoria = 'stock_bajo'
+WHERE factura_proveedor_id IS NULL
+  AND mensaje LIKE '%STOCK BAJO%';
+
+-- Solo los mensajes del generador de vencimientos son 'vencimiento';
+-- el resto de las alertas de productos quedan como 'manual'
+UPDATE alertas
+SET categoria = 'vencimiento'
+WHERE factura_proveedor_id IS NULL
+  AND productos_id IS NOT NULL
+  AND (mensaje LIKE '% vence en % días - URGENTE'
+       OR mensaje LIKE '% vence en % días - PRECAUCIÓN'
+       OR mensaje LIKE '% vence en % días - OK'
+       OR mensaje LIKE '% YA VENCIÓ hace % días');
+
+-- Índice para cargar las alertas activas por categoría
+ALTER TABLE alertas
+ADD INDEX idx_alertas_estado_categoria (estado, categoria);
+
+-- Verificar que el campo se agregó correctamente
+DESCRIBE alertas;
+
+-- Mostrar mensaje de confirmación
+SELECT 'Categoría de alertas agregada exitosamente' AS mensaje;
@@ -0,0 +1,31 @@
+-- ================================================================
+-- Script SQL para retomar las exportaciones detenidas
+-- ================================================================
+--
+-- Agrega a trabajos_exportacion la fecha del último avance guardado:
+--   - actualizado: se guarda cada 500 filas mientras se genera el archivo
+--
+-- Si el servidor se reinicia mientras genera una exportación, el
+-- trabajo deja de avanzar. Cuando la página consulta el estado (o con
+-- `python manage.py procesar_exportaciones`), los trabajos en proceso
+-- sin avance por más de 10 minutos se retoman, igual que las acciones
+-- masivas (ver ventas/funciones/exportaciones.py).
+--
+-- Ejecutar después de sql_crear_trabajos_exportacion.sql:
+-- mysql -u usuario -p nombre_base_datos < sql_avance_trabajos_exportacion.sql
+--
+-- ================================================================
+
+USE forneria;
+
+-- Agregar el campo actualizado a la tabla trabajos_exportacion
+ALTER TABLE trabajos_exportacion
+ADD COLUMN actualizado DATETIME(6) NULL
+COMMENT 'Último avance guardado (detecta trabajos detenidos)'
+AFTER iniciado;
+
+-- Verificar que el campo se agregó correctamente
+DESCRIBE trabajos_exportacion;
+
+-- Mostrar mensaje de confirmación
+SELECT 'Campo actualizado agregado a trabajos_exportacion exitosamente' AS mensaje;
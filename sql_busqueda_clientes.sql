@@ -0,0 +1,43 @@
+-- ================================================================
+-- Script SQL para agregar la búsqueda indexada de clientes
+-- ================================================================
+--
+-- El POS ya no carga todos los clientes en la página: el cajero
+-- escribe parte del nombre o el RUT y se consultan solo las
+-- coincidencias (/api/clientes/buscar/):
+--
+--   - nombre_normalizado: nombre en minúsculas y sin tildes
+--                         (búsqueda por prefijo: LIKE 'jose p%')
+--   - rut_normalizado:    RUT sin puntos ni guion, K mayúscula
+--                         (búsqueda exacta y detección de duplicados)
+--
+-- Los clientes nuevos o editados completan estas columnas al guardarse.
+-- Para completar los clientes que ya existen, después de este script:
+-- python manage.py normalizar_clientes
+--
+-- Ejecutar este script en la base de datos MySQL:
+-- mysql -u usuario -p nombre_base_datos < sql_busqueda_clientes.sql
+--
+-- ================================================================
+
+USE forneria;
+
+-- Agregar las columnas de búsqueda a la tabla clientes
+ALTER TABLE clientes
+ADD COLUMN nombre_normalizado VARCHAR(150) NULL
+COMMENT 'Nombre en minúsculas y sin tildes (buscador del POS)'
+AFTER correo,
+ADD COLUMN rut_normalizado VARCHAR(12) NULL
+COMMENT 'RUT sin puntos ni guion (buscador del POS y duplicados)'
+AFTER nombre_normalizado;
+
+-- Índices para la búsqueda por prefijo de nombre y por RUT
+ALTER TABLE clientes
+ADD INDEX idx_clientes_nombre_norm (nombre_normalizado),
+ADD INDEX idx_clientes_rut_norm (rut_normalizado);
+
+-- Verificar que los campos se agregaron correctamente
+DESCRIBE clientes;
+
+-- Mostrar mensaje de confirmación
+SELECT 'Búsqueda de clientes agregada. Ejecutar: python manage.py normalizar_clientes' AS mensaje;
@@ -0,0 +1,47 @@
+-- ================================================================
+-- Script SQL para agregar la clave de duplicados en productos
+-- ================================================================
+--
+-- El inventario muestra un solo producto por (nombre, marca): oculta
+-- los que tienen un producto anterior (de menor ID) con el mismo
+-- nombre y marca, sin importar mayúsculas ni espacios en los extremos.
+--
+-- Antes la consulta normalizaba LOWER(TRIM(...)) en cada fila, por lo
+-- que no podía usar ningún índice. Ahora compara una columna guardada:
+--
+--   - clave_duplicado: LOWER(TRIM(nombre)) + CHAR(31) + LOWER(TRIM(marca))
+--
+-- Con el índice (clave_duplicado, id) la búsqueda del "gemelo"
+-- anterior de cada producto es una lectura del índice.
+--
+-- Los productos nuevos o editados completan la columna al guardarse
+-- (Productos.save). Este script completa los que ya existen.
+--
+-- Ejecutar este script en la base de datos MySQL:
+-- mysql -u usuario -p nombre_base_datos < sql_clave_duplicado_productos.sql
+--
+-- ================================================================
+
+USE forneria;
+
+-- Agregar la columna a la tabla productos
+ALTER TABLE productos
+ADD COLUMN clave_duplicado VARCHAR(201) NOT NULL DEFAULT ''
+COMMENT 'Nombre y marca normalizados (inventario sin duplicados)'
+AFTER marca;
+
+-- Completar la clave de los productos existentes
+UPDATE productos
+SET clave_duplicado = CONCAT(
+    LOWER(TRIM(nombre)), CHAR(31), LOWER(TRIM(COALESCE(marca, '')))
+);
+
+-- Índice para buscar productos con la misma clave y menor ID
+ALTER TABLE productos
+ADD INDEX idx_productos_clave_dup (clave_duplicado, id);
+
+-- Verificar que el índice se agregó correctamente
+SHOW INDEX FROM productos;
+
+-- Mostrar mensaje de confirmación
+SELECT 'Clave de duplicados de productos agregada exitosamente' AS mensaje;
@@ -0,0 +1,40 @@
+-- ================================================================
+-- Script SQL para crear la tabla de estado de tareas programadas
+-- ================================================================
+--
+-- Esta tabla guarda, por cada tarea en segundo plano (por ejemplo la
+-- generación de alertas):
+--   - marca_agua:      hasta qué momento se procesaron los cambios
+--   - bloqueado_hasta: bloqueo para evitar dos ejecuciones simultáneas
+--
+-- La fila de cada tarea se crea automáticamente en su primera ejecución.
+--
+-- Ejecutar este script en la base de datos MySQL:
+-- mysql -u usuario -p nombre_base_datos < sql_crear_estado_tareas.sql
+--
+-- ================================================================
+
+USE forneria;
+
+CREATE TABLE IF NOT EXISTS `estado_tareas` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `nombre` VARCHAR(50) NOT NULL COMMENT 'Identificador de la tarea (ej: generar_alertas)',
+  `marca_agua` DATETIME(6) NULL COMMENT 'Momento hasta el cual se procesaron los cambios',
+  `bloqueado_hasta` DATETIME(6) NULL COMMENT 'Si es una fecha futura, hay una ejecución en curso',
+  `ultima_ejecucion` DATETIME(6) NULL COMMENT 'Término de la última ejecución exitosa',
+  `ultimo_resultado` JSON NULL COMMENT 'Estadísticas de la última ejecución exitosa',
+
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uk_estado_tareas_nombre` (`nombre`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_spanish_ci;
+
+-- Índice para que el generador de alertas encuentre rápido los
+-- productos modificados desde la última ejecución
+ALTER TABLE `productos`
+ADD INDEX `idx_productos_modificado` (`modificado`);
+
+-- Verificar que la tabla se creó correctamente
+DESCRIBE estado_tareas;
+
+-- Mostrar mensaje de confirmación
+SELECT 'Tabla estado_tareas creada exitosamente' AS mensaje;
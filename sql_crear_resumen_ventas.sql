@@ -0,0 +1,84 @@
+-- ================================================================
+-- Script SQL para crear las tablas de resumen diario de ventas
+-- ================================================================
+--
+-- Estas tablas guardan las ventas ya sumadas por día (fecha local,
+-- America/Santiago), para que los reportes y el dashboard lean unas
+-- pocas filas por día en vez de todo ventas / detalle_venta:
+--
+--   - resumen_ventas_dia:          totales de boletas por
+--                                  (fecha, canal_venta, medio_pago)
+--   - resumen_ventas_producto_dia: unidades y montos por
+--                                  (fecha, producto, canal_venta, medio_pago)
+--
+-- Se actualizan al confirmar cada venta del POS. Si una actualización
+-- falla (por ejemplo por un deadlock que persiste tras los reintentos),
+-- el día queda anotado en resumen_ventas_pendientes y se corrige con:
+-- python manage.py reconstruir_resumen_ventas --pendientes
+--
+-- Después de ejecutar este script, llenar el resumen con las ventas
+-- existentes:
+-- python manage.py reconstruir_resumen_ventas
+--
+-- Ejecutar este script en la base de datos MySQL:
+-- mysql -u usuario -p nombre_base_datos < sql_crear_resumen_ventas.sql
+--
+-- ================================================================
+
+USE forneria;
+
+CREATE TABLE IF NOT EXISTS `resumen_ventas_dia` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `fecha` DATE NOT NULL COMMENT 'Día de las ventas (fecha local)',
+  `canal_venta` VARCHAR(20) NOT NULL,
+  `medio_pago` VARCHAR(20) NOT NULL,
+  `num_ventas` INT UNSIGNED NOT NULL DEFAULT 0 COMMENT 'Número de boletas',
+  `total_sin_iva` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+  `total_iva` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+  `descuento` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+  `total_con_iva` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uk_resumen_ventas_dia` (`fecha`, `canal_venta`, `medio_pago`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_spanish_ci
+COMMENT='Totales de ventas por día, canal y medio de pago';
+
+CREATE TABLE IF NOT EXISTS `resumen_ventas_producto_dia` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `fecha` DATE NOT NULL COMMENT 'Día de las ventas (fecha local)',
+  `productos_id` INT NOT NULL,
+  `canal_venta` VARCHAR(20) NOT NULL,
+  `medio_pago` VARCHAR(20) NOT NULL,
+  `unidades` DECIMAL(14,3) NOT NULL DEFAULT 0.000 COMMENT 'Unidades vendidas',
+  `total_neto` DECIMAL(14,2) NOT NULL DEFAULT 0.00 COMMENT 'Suma de cantidad x precio unitario',
+  `total_iva` DECIMAL(14,2) NOT NULL DEFAULT 0.00 COMMENT 'IVA incluido en las líneas vendidas',
+  `num_ventas` INT UNSIGNED NOT NULL DEFAULT 0 COMMENT 'Boletas que incluyen el producto',
+
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uk_resumen_ventas_producto_dia` (`fecha`, `productos_id`, `canal_venta`, `medio_pago`),
+  KEY `idx_resumen_ventas_producto` (`productos_id`),
+  CONSTRAINT `fk_resumen_ventas_producto`
+    FOREIGN KEY (`productos_id`)
+    REFERENCES `productos` (`id`)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_spanish_ci
+COMMENT='Unidades y montos vendidos por día, producto, canal y medio de pago';
+
+CREATE TABLE IF NOT EXISTS `resumen_ventas_pendientes` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `fecha` DATE NOT NULL COMMENT 'Día cuyo resumen hay que reconstruir',
+  `registrado` DATETIME(6) NOT NULL COMMENT 'Última actualización que falló',
+
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uk_resumen_ventas_pendientes` (`fecha`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_spanish_ci
+COMMENT='Días con una actualización del resumen fallida';
+
+-- Verificar que las tablas se crearon correctamente
+DESCRIBE resumen_ventas_dia;
+DESCRIBE resumen_ventas_producto_dia;
+DESCRIBE resumen_ventas_pendientes;
+
+-- Mostrar mensaje de confirmación
+SELECT 'Tablas de resumen diario de ventas creadas exitosamente' AS mensaje;
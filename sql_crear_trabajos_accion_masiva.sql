@@ -0,0 +1,55 @@
+-- ================================================================
+-- Script SQL para crear la tabla de trabajos de acciones masivas
+-- ================================================================
+--
+-- Esta tabla guarda las acciones masivas del inventario (crear
+-- alertas, mover a merma, activar/desactivar, eliminar) que se
+-- ejecutan en segundo plano por bloques:
+--   - ids:         productos a procesar (en orden ascendente)
+--   - procesados:  avance que consulta la página del inventario
+--   - ultimo_id:   último producto confirmado; si el servidor se
+--                  reinicia, el trabajo se retoma desde aquí
+--   - actualizado: último avance guardado (detecta trabajos detenidos)
+--
+-- Para retomar trabajos detenidos sin esperar a que alguien abra el
+-- inventario, programar:
+-- python manage.py procesar_acciones_masivas
+--
+-- Ejecutar este script en la base de datos MySQL:
+-- mysql -u usuario -p nombre_base_datos < sql_crear_trabajos_accion_masiva.sql
+--
+-- ================================================================
+
+USE forneria;
+
+CREATE TABLE IF NOT EXISTS `trabajos_accion_masiva` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `usuario_id` INT NOT NULL COMMENT 'Usuario que pidió la acción',
+  `accion` VARCHAR(30) NOT NULL COMMENT 'crear_alertas, mover_merma, activar_desactivar, eliminar',
+  `parametros` JSON NOT NULL COMMENT 'Datos de la acción (motivo_merma, etc.)',
+  `ids` JSON NOT NULL COMMENT 'IDs de los productos a procesar',
+  `estado` VARCHAR(20) NOT NULL DEFAULT 'pendiente',
+  `total` INT NOT NULL DEFAULT 0,
+  `procesados` INT NOT NULL DEFAULT 0,
+  `ultimo_id` INT NOT NULL DEFAULT 0 COMMENT 'Último producto confirmado',
+  `resultado` JSON NOT NULL COMMENT 'Contadores acumulados',
+  `mensaje_error` TEXT NULL,
+  `creado` DATETIME(6) NOT NULL,
+  `iniciado` DATETIME(6) NULL,
+  `actualizado` DATETIME(6) NULL COMMENT 'Último avance guardado',
+  `terminado` DATETIME(6) NULL,
+
+  PRIMARY KEY (`id`),
+  KEY `idx_trabajos_accion_masiva_estado` (`estado`),
+  CONSTRAINT `fk_trabajos_accion_masiva_usuario`
+    FOREIGN KEY (`usuario_id`)
+    REFERENCES `auth_user` (`id`)
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_spanish_ci
+COMMENT='Acciones masivas del inventario ejecutadas por bloques';
+
+-- Verificar que la tabla se creó correctamente
+DESCRIBE trabajos_accion_masiva;
+
+-- Mostrar mensaje de confirmación
+SELECT 'Tabla trabajos_accion_masiva creada exitosamente' AS mensaje;
@@ -0,0 +1,54 @@
+-- ================================================================
+-- Script SQL para crear la tabla de trabajos de exportación
+-- ================================================================
+--
+-- Esta tabla guarda las exportaciones de reportes (Excel, PDF, CSV)
+-- que se generan en segundo plano:
+--   - estado:           pendiente / en_proceso / terminado / error
+--   - filas_procesadas: avance que consulta la página del reporte
+--   - archivo:          ruta del archivo generado (en EXPORTACIONES_DIR)
+--   - expira:           después de esta fecha se borran archivo y fila
+--
+-- Para borrar las exportaciones vencidas programar:
+-- python manage.py limpiar_exportaciones
+--
+-- Ejecutar este script en la base de datos MySQL:
+-- mysql -u usuario -p nombre_base_datos < sql_crear_trabajos_exportacion.sql
+--
+-- ================================================================
+
+USE forneria;
+
+CREATE TABLE IF NOT EXISTS `trabajos_exportacion` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `usuario_id` INT NOT NULL COMMENT 'Usuario que pidió la exportación',
+  `tipo` VARCHAR(30) NOT NULL COMMENT 'Reporte: ventas, inventario, top_productos',
+  `formato` VARCHAR(10) NOT NULL COMMENT 'excel, pdf o csv',
+  `parametros` JSON NOT NULL COMMENT 'Filtros del reporte',
+  `estado` VARCHAR(20) NOT NULL DEFAULT 'pendiente',
+  `total_filas` INT NULL,
+  `filas_procesadas` INT NOT NULL DEFAULT 0,
+  `archivo` VARCHAR(255) NULL COMMENT 'Ruta relativa a EXPORTACIONES_DIR',
+  `nombre_archivo` VARCHAR(150) NULL,
+  `content_type` VARCHAR(100) NULL,
+  `mensaje_error` TEXT NULL,
+  `creado` DATETIME(6) NOT NULL,
+  `iniciado` DATETIME(6) NULL,
+  `terminado` DATETIME(6) NULL,
+  `expira` DATETIME(6) NULL COMMENT 'Fecha en que se borra el archivo',
+
+  PRIMARY KEY (`id`),
+  KEY `idx_trabajos_exportacion_estado` (`estado`),
+  KEY `idx_trabajos_exportacion_expira` (`expira`),
+  CONSTRAINT `fk_trabajos_exportacion_usuario`
+    FOREIGN KEY (`usuario_id`)
+    REFERENCES `auth_user` (`id`)
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_spanish_ci
+COMMENT='Exportaciones de reportes generadas en segundo plano';
+
+-- Verificar que la tabla se creó correctamente
+DESCRIBE trabajos_exportacion;
+
+-- Mostrar mensaje de confirmación
+SELECT 'Tabla trabajos_exportacion creada exitosamente' AS mensaje;
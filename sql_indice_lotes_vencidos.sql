@@ -0,0 +1,31 @@
+-- ================================================================
+-- Script SQL para el índice de lotes vencidos
+-- ================================================================
+--
+-- El comando verificar_vencimientos busca cada día los lotes activos
+-- cuya fecha de caducidad ya pasó (ver ventas/funciones/merma.py):
+--
+--   WHERE estado = 'activo' AND fecha_caducidad < hoy AND id > :ultimo
+--   ORDER BY id
+--   LIMIT 500
+--
+-- Con este índice compuesto la base de datos lee solo los lotes
+-- activos ya vencidos, en vez de recorrer toda la tabla lotes (que
+-- crece con cada compra y producción).
+--
+-- Ejecutar este script en la base de datos MySQL:
+-- mysql -u usuario -p nombre_base_datos < sql_indice_lotes_vencidos.sql
+--
+-- ================================================================
+
+USE forneria;
+
+-- Índice para buscar lotes activos por fecha de caducidad
+ALTER TABLE lotes
+ADD INDEX idx_lotes_estado_caducidad (estado, fecha_caducidad);
+
+-- Verificar que el índice se agregó correctamente
+SHOW INDEX FROM lotes;
+
+-- Mostrar mensaje de confirmación
+SELECT 'Índice de lotes vencidos agregado exitosamente' AS mensaje;
@@ -0,0 +1,31 @@
+-- ================================================================
+-- Script SQL para agregar el índice de stock bajo en productos
+-- ================================================================
+--
+-- El dashboard consulta los productos con stock bajo en cada
+-- actualización (/api/stock-bajo/ y /api/dashboard/snapshot/):
+--
+--   WHERE eliminado IS NULL
+--     AND estado_merma = 'activo'
+--     AND cantidad <= COALESCE(stock_minimo, 5)
+--
+-- Con este índice compuesto la base de datos recorre solo los
+-- productos activos, ya ordenados por cantidad, en vez de leer
+-- toda la tabla productos.
+--
+-- Ejecutar este script en la base de datos MySQL:
+-- mysql -u usuario -p nombre_base_datos < sql_indice_stock_bajo.sql
+--
+-- ================================================================
+
+USE forneria;
+
+-- Índice para filtrar productos activos por cantidad
+ALTER TABLE productos
+ADD INDEX idx_productos_stock_bajo (eliminado, estado_merma, cantidad);
+
+-- Verificar que el índice se agregó correctamente
+SHOW INDEX FROM productos;
+
+-- Mostrar mensaje de confirmación
+SELECT 'Índice de stock bajo agregado exitosamente' AS mensaje;
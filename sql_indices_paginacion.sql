@@ -0,0 +1,41 @@
+-- ================================================================
+-- Script SQL para los índices de la paginación por cursor
+-- ================================================================
+--
+-- Los listados grandes se paginan por (fecha, id), más recientes
+-- primero (ver ventas/funciones/paginacion.py):
+--
+--   WHERE fecha <= :f AND (fecha < :f OR (fecha = :f AND id < :id))
+--   ORDER BY fecha DESC, id DESC
+--   LIMIT 51
+--
+-- Con un índice sobre la fecha, MySQL salta directo a la posición
+-- del cursor (en InnoDB cada índice secundario ya incluye el id), así
+-- cualquier página cuesta lo mismo que la primera.
+--
+-- historial_boletas (fecha_emision), factura_proveedor (fecha_factura)
+-- y pago_proveedor (fecha_pago) ya tienen su índice. Faltan:
+--   - ventas (fecha): reporte de ventas
+--   - movimientos_inventario (fecha): historial de movimientos
+--
+-- Ejecutar este script en la base de datos MySQL:
+-- mysql -u usuario -p nombre_base_datos < sql_indices_paginacion.sql
+--
+-- ================================================================
+
+USE forneria;
+
+-- Índice para paginar y filtrar las ventas por fecha
+ALTER TABLE ventas
+ADD INDEX idx_ventas_fecha (fecha);
+
+-- Índice para paginar los movimientos de inventario por fecha
+ALTER TABLE movimientos_inventario
+ADD INDEX idx_movimientos_fecha (fecha);
+
+-- Verificar que los índices se agregaron correctamente
+SHOW INDEX FROM ventas;
+SHOW INDEX FROM movimientos_inventario;
+
+-- Mostrar mensaje de confirmación
+SELECT 'Índices de paginación agregados exitosamente' AS mensaje;
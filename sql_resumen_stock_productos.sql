@@ -0,0 +1,48 @@
+-- ================================================================
+-- Script SQL para agregar el resumen de stock por producto
+-- ================================================================
+--
+-- Agrega la columna lotes_activos a la tabla productos. Junto con
+-- `cantidad` (suma de lotes activos) y `caducidad` (caducidad del
+-- lote activo más antiguo) forma el resumen de stock del producto,
+-- que se actualiza cada vez que se modifica un lote.
+--
+-- Así el inventario lee columnas del producto en vez de sumar los
+-- lotes de cada producto en cada carga de página.
+--
+-- Después de ejecutar este script se puede verificar el resultado con:
+-- python manage.py reconciliar_stock --dry-run
+--
+-- Ejecutar este script en la base de datos MySQL:
+-- mysql -u usuario -p nombre_base_datos < sql_resumen_stock_productos.sql
+--
+-- ================================================================
+
+USE forneria;
+
+-- Agregar el campo lotes_activos a la tabla productos
+ALTER TABLE productos
+ADD COLUMN lotes_activos INT UNSIGNED NOT NULL DEFAULT 0
+COMMENT 'Cantidad de lotes activos con stock (resumen mantenido al modificar lotes)'
+AFTER stock_maximo;
+
+-- Inicializar el resumen de los productos que tienen lotes
+UPDATE productos p
+INNER JOIN (
+    SELECT
+        productos_id,
+        COALESCE(SUM(CASE WHEN estado = 'activo' THEN cantidad ELSE 0 END), 0) AS cantidad_activa,
+        SUM(CASE WHEN estado = 'activo' AND cantidad > 0 THEN 1 ELSE 0 END) AS total_lotes_activos,
+        MIN(CASE WHEN estado = 'activo' AND cantidad > 0 THEN fecha_caducidad END) AS caducidad_proxima
+    FROM lotes
+    GROUP BY productos_id
+) r ON r.productos_id = p.id
+SET p.cantidad = r.cantidad_activa,
+    p.lotes_activos = r.total_lotes_activos,
+    p.caducidad = r.caducidad_proxima;
+
+-- Verificar que el campo se agregó correctamente
+DESCRIBE productos;
+
+-- Mostrar mensaje de confirmación
+SELECT 'Resumen de stock por producto creado exitosamente' AS mensaje;
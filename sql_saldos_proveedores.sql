@@ -0,0 +1,70 @@
+-- ================================================================
+-- Script SQL para los saldos guardados de facturas y proveedores
+-- ================================================================
+--
+-- Agrega a cada factura de proveedor su total pagado y su saldo
+-- pendiente, y a cada proveedor la suma de los saldos de sus facturas.
+--
+-- Se mantienen en la misma transacción en que se registra o elimina un
+-- pago, se agrega o quita un detalle o se edita la factura (ver
+-- ventas/funciones/saldos_proveedores.py). Así las listas de
+-- proveedores y de pagos leen columnas en vez de sumar pagos y
+-- facturas fila por fila.
+--
+-- Una factura eliminada o cancelada no tiene saldo pendiente.
+--
+-- Después de ejecutar este script se puede verificar el resultado con:
+-- python manage.py reconciliar_saldos_proveedores --dry-run
+--
+-- Ejecutar este script en la base de datos MySQL:
+-- mysql -u usuario -p nombre_base_datos < sql_saldos_proveedores.sql
+--
+-- ================================================================
+
+USE forneria;
+
+-- Agregar los saldos a la tabla factura_proveedor
+ALTER TABLE factura_proveedor
+ADD COLUMN total_pagado DECIMAL(10,2) NOT NULL DEFAULT 0.00
+COMMENT 'Suma de los pagos de la factura (mantenido al registrar o eliminar pagos)'
+AFTER total_con_iva,
+ADD COLUMN saldo_pendiente DECIMAL(10,2) NOT NULL DEFAULT 0.00
+COMMENT 'total_con_iva - total_pagado (0 si la factura está eliminada o cancelada)'
+AFTER total_pagado;
+
+-- Agregar el saldo a la tabla proveedor
+ALTER TABLE proveedor
+ADD COLUMN saldo_pendiente DECIMAL(12,2) NOT NULL DEFAULT 0.00
+COMMENT 'Suma del saldo pendiente de las facturas del proveedor';
+
+-- Inicializar el total pagado de cada factura
+UPDATE factura_proveedor f
+LEFT JOIN (
+    SELECT factura_proveedor_id, SUM(monto) AS pagado
+    FROM pago_proveedor
+    GROUP BY factura_proveedor_id
+) p ON p.factura_proveedor_id = f.id
+SET f.total_pagado = COALESCE(p.pagado, 0);
+
+-- Inicializar el saldo pendiente de cada factura
+UPDATE factura_proveedor
+SET saldo_pendiente = CASE
+    WHEN eliminado IS NOT NULL OR estado_pago = 'cancelado' THEN 0
+    ELSE total_con_iva - total_pagado
+END;
+
+-- Inicializar el saldo de cada proveedor
+UPDATE proveedor pr
+LEFT JOIN (
+    SELECT proveedor_id, SUM(saldo_pendiente) AS saldo
+    FROM factura_proveedor
+    GROUP BY proveedor_id
+) f ON f.proveedor_id = pr.id
+SET pr.saldo_pendiente = COALESCE(f.saldo, 0);
+
+-- Verificar que los campos se agregaron correctamente
+DESCRIBE factura_proveedor;
+DESCRIBE proveedor;
+
+-- Mostrar mensaje de confirmación
+SELECT 'Saldos de facturas y proveedores creados exitosamente' AS mensaje;
@@ -0,0 +1,65 @@
+-- ================================================================
+-- Script SQL para crear la secuencia de folios de boleta
+-- ================================================================
+--
+-- Los folios de boleta dejan de ser BOL-<fecha y hora> (dos cajas que
+-- vendían en el mismo segundo repetían folio) y salen de esta tabla:
+-- cada proceso del servidor reserva un bloque de números
+-- (FOLIOS_TAMANO_BLOQUE, por defecto 100) y los entrega en memoria.
+--
+-- La numeración puede tener saltos (bloques sin terminar al reiniciar
+-- el servidor), pero nunca repetidos: además se agregan índices UNIQUE
+-- en ventas.folio e historial_boletas.folio.
+--
+-- ANTES de agregar los UNIQUE, los folios repetidos de ventas antiguas
+-- se renombran a BOL-V<id de la venta> (se conserva el de la primera venta).
+--
+-- Ejecutar este script en la base de datos MySQL:
+-- mysql -u usuario -p nombre_base_datos < sql_secuencias_folio.sql
+--
+-- ================================================================
+
+USE forneria;
+
+CREATE TABLE IF NOT EXISTS `secuencias_folio` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `nombre` VARCHAR(30) NOT NULL COMMENT 'Identificador de la secuencia (ej: boleta)',
+  `siguiente` BIGINT NOT NULL DEFAULT 1 COMMENT 'Primer número que aún no se reservó',
+
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uk_secuencias_folio_nombre` (`nombre`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_spanish_ci;
+
+-- Secuencia de boletas (los folios nuevos son BOL-00000001, BOL-00000002, ...)
+INSERT IGNORE INTO `secuencias_folio` (`nombre`, `siguiente`) VALUES ('boleta', 1);
+
+-- Renombrar los folios repetidos de ventas antiguas (menos el primero)
+UPDATE ventas v
+INNER JOIN (
+    SELECT folio, MIN(id) AS primera_id
+    FROM ventas
+    WHERE folio IS NOT NULL
+    GROUP BY folio
+    HAVING COUNT(*) > 1
+) d ON d.folio = v.folio AND v.id <> d.primera_id
+SET v.folio = CONCAT('BOL-V', v.id);
+
+-- El historial de boletas usa el mismo folio que su venta
+UPDATE historial_boletas h
+INNER JOIN ventas v ON v.id = h.venta_id
+SET h.folio = COALESCE(v.folio, CONCAT('BOL-', v.id))
+WHERE h.folio <> COALESCE(v.folio, CONCAT('BOL-', v.id));
+
+-- Índices UNIQUE: garantizan que nunca se repita un folio
+ALTER TABLE ventas
+ADD UNIQUE KEY `uk_ventas_folio` (`folio`);
+
+ALTER TABLE historial_boletas
+DROP INDEX `historial_boletas_folio_idx`,
+ADD UNIQUE KEY `uk_historial_boletas_folio` (`folio`);
+
+-- Verificar que la tabla se creó correctamente
+DESCRIBE secuencias_folio;
+
+-- Mostrar mensaje de confirmación
+SELECT 'Secuencia de folios creada exitosamente' AS mensaje;
@@ -94,4 +94,26 @@ function initGaugeChart(containerSelector, dataUrl, maxValue, label) {
             // Opcional: Mostrar un mensaje de error en el contenedor
             d3.select(containerSelector).html(`<p style="color: red; text-align: center;">No se pudo cargar el gráfico.</p>`);
         });
-}
\ No newline at end of file
+}
+
+/**
+ * Inicializa un gráfico de pérdida potencial desde los vencimientos del dashboard.
+ *
+ * Usa el resultado compartido de /api/vencimientos/ (ver expiraciones.js):
+ * los tres gráficos y las listas de vencimientos hacen una sola petición.
+ *
+ * @param {string} containerSelector - El selector CSS para el div contenedor.
+ * @param {number} dias - Horizonte en días (7, 14, 30).
+ * @param {number} maxValue - El valor máximo para la escala del gráfico.
+ * @param {string} label - La etiqueta para el gráfico.
+ */
+function initGaugeVencimientos(containerSelector, dias, maxValue, label) {
+    window.obtenerVencimientos()
+        .then(datos => {
+            drawGauge(containerSelector, window.perdidaHastaDias(datos, dias), maxValue, label);
+        })
+        .catch(error => {
+            console.error(`Error al inicializar el gráfico para ${containerSelector}:`, error);
+            d3.select(containerSelector).html(`<p style="color: red; text-align: center;">No se pudo cargar el gráfico.</p>`);
+        });
+}
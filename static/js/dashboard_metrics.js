@@ -6,6 +6,9 @@
 //
 // Este archivo maneja la carga y actualización de las métricas
 // principales del dashboard en tiempo real.
+//
+// Todas las métricas llegan en una sola petición a /api/dashboard/snapshot/
+// (con ETag: si nada cambió, el servidor responde 304 sin datos).
 
 /**
  * Formatea un número como moneda chilena (CLP)
@@ -20,18 +23,12 @@ function formatearMoneda(valor) {
 }
 
 /**
- * Carga las ventas del día desde la API
+ * Carga las ventas del día
+ * @param {Promise<Object>} seccion - Sección correspondiente del snapshot
  */
-function cargarVentasDelDia() {
+function cargarVentasDelDia(seccion) {
     console.log('Cargando ventas del día...');
-    fetch('/api/ventas-del-dia/')
-        .then(response => {
-            console.log('Respuesta ventas del día:', response.status);
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            return response.json();
-        })
+    seccion
         .then(data => {
             console.log('Datos ventas del día:', data);
             // Actualizar el valor de ventas - usar múltiples selectores para mayor robustez
@@ -72,18 +69,12 @@ function cargarVentasDelDia() {
 }
 
 /**
- * Carga los productos con stock bajo desde la API
+ * Carga los productos con stock bajo
+ * @param {Promise<Object>} seccion - Sección correspondiente del snapshot
  */
-function cargarStockBajo() {
+function cargarStockBajo(seccion) {
     console.log('Cargando stock bajo...');
-    fetch('/api/stock-bajo/')
-        .then(response => {
-            console.log('Respuesta stock bajo:', response.status);
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            return response.json();
-        })
+    seccion
         .then(data => {
             console.log('Datos stock bajo:', data);
             // Actualizar el valor de stock bajo - usar múltiples selectores
@@ -155,18 +146,12 @@ function cargarStockBajo() {
 }
 
 /**
- * Carga las alertas pendientes desde la API
+ * Carga las alertas pendientes
+ * @param {Promise<Object>} seccion - Sección correspondiente del snapshot
  */
-function cargarAlertasPendientes() {
+function cargarAlertasPendientes(seccion) {
     console.log('Cargando alertas pendientes...');
-    fetch('/api/alertas-pendientes/')
-        .then(response => {
-            console.log('Respuesta alertas:', response.status);
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            return response.json();
-        })
+    seccion
         .then(data => {
             console.log('Datos alertas:', data);
             // Actualizar el valor de alertas - usar múltiples selectores
@@ -244,18 +229,12 @@ function cargarAlertasPendientes() {
 }
 
 /**
- * Carga el producto más vendido del día desde la API
+ * Carga el producto más vendido del día
+ * @param {Promise<Object>} seccion - Sección correspondiente del snapshot
  */
-function cargarTopProducto() {
+function cargarTopProducto(seccion) {
     console.log('Cargando top producto...');
-    fetch('/api/top-producto/')
-        .then(response => {
-            console.log('Respuesta top producto:', response.status);
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            return response.json();
-        })
+    seccion
         .then(data => {
             console.log('Datos top producto:', data);
             // Actualizar el valor del top producto - usar múltiples selectores
@@ -329,8 +308,9 @@ function cargarTopProducto() {
 
 /**
  * Carga la tabla detallada de productos con stock bajo
+ * @param {Promise<Object>} seccion - Sección correspondiente del snapshot
  */
-function cargarTablaStockBajo() {
+function cargarTablaStockBajo(seccion) {
     console.log('[TABLA] Cargando tabla stock bajo...');
     const container = document.getElementById('tabla-stock-bajo');
     if (!container) {
@@ -344,15 +324,7 @@ function cargarTablaStockBajo() {
         loadingMsg.remove();
     }
     
-    console.log('[TABLA] Contenedor encontrado, haciendo petición a /api/stock-bajo/');
-    fetch('/api/stock-bajo/')
-        .then(response => {
-            console.log('Respuesta stock bajo:', response.status);
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            return response.json();
-        })
+    seccion
         .then(data => {
             console.log('Datos stock bajo recibidos:', data);
             
@@ -389,6 +361,9 @@ function cargarTablaStockBajo() {
             });
             
             html += '</tbody></table>';
+            if (data.num_productos > data.productos.length) {
+                html += `<p class="text-muted small">Mostrando ${data.productos.length} de ${data.num_productos} productos. <a href="/inventario/">Ver inventario</a></p>`;
+            }
             container.innerHTML = html;
             console.log('Tabla stock bajo actualizada correctamente');
         })
@@ -403,8 +378,9 @@ function cargarTablaStockBajo() {
 
 /**
  * Carga la tabla detallada de productos en merma
+ * @param {Promise<Object>} seccion - Sección correspondiente del snapshot
  */
-function cargarTablaMerma() {
+function cargarTablaMerma(seccion) {
     console.log('[TABLA] Cargando tabla merma...');
     const container = document.getElementById('tabla-merma');
     if (!container) {
@@ -418,15 +394,7 @@ function cargarTablaMerma() {
         loadingMsg.remove();
     }
     
-    console.log('[TABLA] Contenedor encontrado, haciendo petición a /api/merma/lista/');
-    fetch('/api/merma/lista/')
-        .then(response => {
-            console.log('Respuesta merma:', response.status);
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            return response.json();
-        })
+    seccion
         .then(data => {
             console.log('Datos merma recibidos:', data);
             
@@ -478,8 +446,9 @@ function cargarTablaMerma() {
 
 /**
  * Carga la tabla detallada de ventas del día
+ * @param {Promise<Object>} seccion - Sección correspondiente del snapshot
  */
-function cargarTablaVentasDia() {
+function cargarTablaVentasDia(seccion) {
     console.log('[TABLA] Cargando tabla ventas del día...');
     const container = document.getElementById('tabla-ventas-dia');
     if (!container) {
@@ -493,15 +462,7 @@ function cargarTablaVentasDia() {
         loadingMsg.remove();
     }
     
-    console.log('[TABLA] Contenedor encontrado, haciendo petición a /api/ventas-del-dia/lista/');
-    fetch('/api/ventas-del-dia/lista/')
-        .then(response => {
-            console.log('Respuesta ventas del día:', response.status);
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            return response.json();
-        })
+    seccion
         .then(data => {
             console.log('Datos ventas del día recibidos:', data);
             
@@ -553,6 +514,64 @@ function cargarTablaVentasDia() {
         });
 }
 
+// ETag del último snapshot recibido (para responder 304 si no hubo cambios)
+let etagSnapshot = null;
+
+/**
+ * Carga todas las métricas del dashboard con UNA sola petición.
+ *
+ * El servidor calcula el snapshot una vez por ventana de tiempo y lo
+ * comparte entre todos los dashboards abiertos. Si nada cambió desde la
+ * última carga, responde 304 y no se vuelve a dibujar nada.
+ */
+function cargarSnapshot() {
+    console.log('Cargando snapshot del dashboard...');
+    const headers = {};
+    if (etagSnapshot) {
+        headers['If-None-Match'] = etagSnapshot;
+    }
+    
+    fetch('/api/dashboard/snapshot/', { headers: headers, cache: 'no-cache' })
+        .then(response => {
+            console.log('Respuesta snapshot:', response.status);
+            if (response.status === 304) {
+                return null;
+            }
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            etagSnapshot = response.headers.get('ETag');
+            return response.json();
+        })
+        .then(data => {
+            if (data === null) {
+                console.log('Snapshot sin cambios (304)');
+                return;
+            }
+            cargarSecciones(Promise.resolve(data));
+        })
+        .catch(error => {
+            console.error('Error al cargar snapshot del dashboard:', error);
+            // Permitir que el próximo intento descargue el snapshot completo
+            etagSnapshot = null;
+            cargarSecciones(Promise.reject(error));
+        });
+}
+
+/**
+ * Reparte el snapshot entre las métricas y tablas del dashboard
+ * @param {Promise<Object>} snapshot - Snapshot completo (o el error de la petición)
+ */
+function cargarSecciones(snapshot) {
+    cargarVentasDelDia(snapshot.then(data => data.ventas_del_dia));
+    cargarStockBajo(snapshot.then(data => data.stock_bajo));
+    cargarAlertasPendientes(snapshot.then(data => data.alertas_pendientes));
+    cargarTopProducto(snapshot.then(data => data.top_producto));
+    cargarTablaStockBajo(snapshot.then(data => data.stock_bajo));
+    cargarTablaMerma(snapshot.then(data => data.merma_lista));
+    cargarTablaVentasDia(snapshot.then(data => data.ventas_del_dia_lista));
+}
+
 /**
  * Inicializa todas las métricas del dashboard
  */
@@ -580,18 +599,7 @@ function inicializarMetricas() {
         ventasDia: !!tablaVentasDia
     });
     
-    cargarVentasDelDia();
-    cargarStockBajo();
-    cargarAlertasPendientes();
-    cargarTopProducto();
-    
-    // Cargar tablas detalladas (con un pequeño delay para asegurar que el DOM esté listo)
-    setTimeout(() => {
-        console.log('Cargando tablas detalladas...');
-        cargarTablaStockBajo();
-        cargarTablaMerma();
-        cargarTablaVentasDia();
-    }, 200);
+    cargarSnapshot();
     
     console.log('=== Métricas inicializadas ===');
 }
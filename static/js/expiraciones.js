@@ -73,13 +73,44 @@
     }
   }
 
-  async function loadVencimientos(url, listId, extraWrapId, extraListId, toggleBtnId, dias){
+  // ================================================================
+  // =  VENCIMIENTOS: UNA SOLA PETICIÓN PARA 7, 14 Y 30 DÍAS        =
+  // ================================================================
+  // /api/vencimientos/ retorna los productos por vencer y la pérdida
+  // por día hasta HORIZONTE_VENCIMIENTOS; las listas y los gráficos de
+  // pérdida potencial (dashboard_charts.js) filtran cada horizonte de
+  // ese mismo resultado.
+  const HORIZONTE_VENCIMIENTOS = 30;
+  let promesaVencimientos = null;
+
+  window.obtenerVencimientos = function(){
+    if (!promesaVencimientos){
+      promesaVencimientos = fetch(`/api/vencimientos/?dias=${HORIZONTE_VENCIMIENTOS}`, {credentials: 'same-origin'})
+        .then(res => {
+          if (!res.ok) throw new Error(`HTTP ${res.status}`);
+          return res.json();
+        });
+    }
+    return promesaVencimientos;
+  };
+
+  // Pérdida potencial de los lotes que vencen en los próximos `dias` días
+  // (los tramos son de un día: el primero es hoy)
+  window.perdidaHastaDias = function(datos, dias){
+    return (datos.tramos || []).slice(0, dias + 1).reduce((total, tramo) => total + tramo.valor, 0);
+  };
+
+  function itemsHastaDias(datos, dias){
+    const limite = new Date(`${datos.desde}T00:00:00`);
+    limite.setDate(limite.getDate() + dias);
+    return (datos.items || []).filter(item => new Date(`${item.caducidad}T00:00:00`) <= limite);
+  }
+
+  async function loadVencimientos(listId, extraWrapId, extraListId, toggleBtnId, dias){
     try {
-      const res = await fetch(url, {credentials: 'same-origin'});
-      if (!res.ok) throw new Error(`HTTP ${res.status}`);
-      const data = await res.json();
+      const datos = await window.obtenerVencimientos();
       renderList(
-        data.items || [], 
+        itemsHastaDias(datos, dias),
         listId, 
         extraWrapId, 
         extraListId, 
@@ -95,7 +126,6 @@
   document.addEventListener('DOMContentLoaded', function(){
     // Cargar vencimientos de 7 días
     loadVencimientos(
-      '/api/proximos-vencimientos/',
       'vencimientos-list',
       'vencimientos-extra',
       'vencimientos-extra-list',
@@ -105,7 +135,6 @@
 
     // Cargar vencimientos de 14 días
     loadVencimientos(
-      '/api/proximos-vencimientos-14/',
       'vencimientos-14-list',
       'vencimientos-14-extra',
       'vencimientos-14-extra-list',
@@ -115,7 +144,6 @@
 
     // Cargar vencimientos de 30 días
     loadVencimientos(
-      '/api/proximos-vencimientos-30/',
       'vencimientos-30-list',
       'vencimientos-30-extra',
       'vencimientos-30-extra-list',
@@ -123,4 +151,4 @@
       30
     );
   });
-})();
\ No newline at end of file
+})();
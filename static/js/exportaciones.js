@@ -0,0 +1,145 @@
+// ================================================================
+// =                                                              =
+// =      JAVASCRIPT PARA EXPORTACIONES EN SEGUNDO PLANO         =
+// =                                                              =
+// ================================================================
+//
+// Las páginas de reportes usan este archivo cuando el reporte es
+// grande: en vez de descargar directamente (la petición tardaría
+// demasiado), se pide al servidor que genere el archivo y se consulta
+// su avance hasta que está listo para descargar.
+//
+// FLUJO:
+// 1. Clic en "Generar Excel/PDF/CSV" -> POST /api/exportaciones/
+// 2. Consultar GET /api/exportaciones/<id>/ cada pocos segundos
+// 3. Al terminar, mostrar el enlace de descarga (y descargar)
+
+const INTERVALO_CONSULTA_EXPORTACION = 2000;  // milisegundos
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('.exportar-segundo-plano').forEach(boton => {
+        boton.addEventListener('click', function() {
+            iniciarExportacion(this.dataset.tipo, this.dataset.formato);
+        });
+    });
+});
+
+
+// ================================================================
+// =        FUNCIÓN: INICIAR EXPORTACIÓN                          =
+// ================================================================
+
+function iniciarExportacion(tipo, formato) {
+    const elementoParametros = document.getElementById('parametros-exportacion');
+    const parametros = elementoParametros ? JSON.parse(elementoParametros.textContent) : {};
+
+    mostrarEstadoExportacion('info', '<i class="bi bi-hourglass-split"></i> Preparando la exportación...');
+    habilitarBotonesExportacion(false);
+
+    fetch('/api/exportaciones/', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCookie('csrftoken')
+        },
+        body: JSON.stringify({ tipo: tipo, formato: formato, parametros: parametros })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            throw new Error(data.message || 'No se pudo iniciar la exportación');
+        }
+        consultarExportacion(data.url_estado);
+    })
+    .catch(error => {
+        mostrarEstadoExportacion('danger', `<i class="bi bi-x-circle"></i> ${error.message}`);
+        habilitarBotonesExportacion(true);
+    });
+}
+
+
+// ================================================================
+// =        FUNCIÓN: CONSULTAR AVANCE                             =
+// ================================================================
+
+function consultarExportacion(urlEstado) {
+    fetch(urlEstado, { headers: { 'Accept': 'application/json' } })
+    .then(response => response.json())
+    .then(data => {
+        if (data.estado === 'terminado') {
+            mostrarEstadoExportacion(
+                'success',
+                `<i class="bi bi-check-circle"></i> Exportación lista. ` +
+                `<a href="${data.url_descarga}" class="alert-link">Descargar archivo</a>`
+            );
+            habilitarBotonesExportacion(true);
+            window.location.href = data.url_descarga;
+            return;
+        }
+
+        if (data.estado === 'error') {
+            mostrarEstadoExportacion(
+                'danger',
+                `<i class="bi bi-x-circle"></i> La exportación falló: ${data.mensaje || 'error desconocido'}`
+            );
+            habilitarBotonesExportacion(true);
+            return;
+        }
+
+        // Pendiente o en proceso: mostrar avance y volver a consultar
+        let avance = 'En cola...';
+        if (data.estado === 'en_proceso') {
+            avance = data.total_filas
+                ? `Generando... ${data.progreso}% (${data.filas_procesadas} de ${data.total_filas} filas)`
+                : 'Generando...';
+        }
+        mostrarEstadoExportacion('info', `<i class="bi bi-hourglass-split"></i> ${avance}`);
+        setTimeout(() => consultarExportacion(urlEstado), INTERVALO_CONSULTA_EXPORTACION);
+    })
+    .catch(error => {
+        mostrarEstadoExportacion('danger', '<i class="bi bi-x-circle"></i> No se pudo consultar el estado de la exportación');
+        habilitarBotonesExportacion(true);
+    });
+}
+
+
+// ================================================================
+// =        FUNCIONES AUXILIARES                                  =
+// ================================================================
+
+function mostrarEstadoExportacion(tipo, html) {
+    const estado = document.getElementById('estado-exportacion');
+    if (!estado) {
+        return;
+    }
+    estado.className = `alert alert-${tipo} mt-3 mb-0`;
+    estado.innerHTML = html;
+}
+
+function habilitarBotonesExportacion(habilitar) {
+    document.querySelectorAll('.exportar-segundo-plano').forEach(boton => {
+        boton.disabled = !habilitar;
+    });
+}
+
+/**
+ * Obtiene una cookie por su nombre.
+ * Necesario para obtener el token CSRF de Django.
+ *
+ * @param {string} name - Nombre de la cookie
+ * @returns {string} - Valor de la cookie
+ */
+function getCookie(name) {
+    let cookieValue = null;
+    if (document.cookie && document.cookie !== '') {
+        const cookies = document.cookie.split(';');
+        for (let i = 0; i < cookies.length; i++) {
+            const cookie = cookies[i].trim();
+            if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                break;
+            }
+        }
+    }
+    return cookieValue;
+}
@@ -12,8 +12,9 @@
 // 2. Cálculo automático de totales (subtotal, IVA, descuentos, vuelto)
 // 3. Validación de productos (stock, disponibilidad)
 // 4. Procesamiento de ventas (envío a Django vía AJAX)
-// 5. Gestión de clientes (crear clientes rápidos)
+// 5. Gestión de clientes (buscar por nombre o RUT, crear clientes rápidos)
 // 6. Búsqueda y filtrado de productos
+//    (catálogo descargado de /api/pos/catalogo/ y sincronizado por cambios)
 // 7. Descuentos individuales por producto
 // 8. Generación de comprobantes de venta
 //
@@ -43,6 +44,21 @@ let tipoVenta = 'presencial';
 // Lo obtenemos del template HTML
 const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]').value;
 
+// Catálogo de productos vendibles: id -> producto (ver cargarCatalogo)
+const catalogoProductos = new Map();
+
+// Versión del catálogo que tiene la caja (para pedir solo los cambios)
+let versionCatalogo = null;
+
+// ETag de la última respuesta de cambios (el servidor responde 304 si no hubo)
+let etagCambiosCatalogo = null;
+
+// Cada cuánto se piden los productos que cambiaron (milisegundos)
+const INTERVALO_SINCRONIZACION_CATALOGO = 30000;
+
+// Espera después de la última tecla antes de buscar clientes (milisegundos)
+const ESPERA_BUSQUEDA_CLIENTE = 250;
+
 
 // ================================================================
 // =              INICIALIZACIÓN AL CARGAR LA PÁGINA              =
@@ -67,6 +83,11 @@ document.addEventListener('DOMContentLoaded', function() {
         seleccionarTipoVenta('delivery');
     });
     
+    // --- Catálogo de productos ---
+    // Descargar el catálogo completo y luego mantenerlo al día
+    cargarCatalogo();
+    setInterval(sincronizarCatalogo, INTERVALO_SINCRONIZACION_CATALOGO);
+    
     // --- Buscar productos ---
     // Evento del campo de búsqueda
     const inputBuscar = document.getElementById('input-buscar-producto');
@@ -84,6 +105,18 @@ document.addEventListener('DOMContentLoaded', function() {
     // Evento para finalizar la venta
     document.getElementById('btn-procesar-venta').addEventListener('click', abrirModalConfirmacion);
     
+    // --- Buscar clientes ---
+    // Los clientes no vienen en la página: se buscan mientras se escribe
+    const inputBuscarCliente = document.getElementById('buscar-cliente');
+    if (inputBuscarCliente) {
+        let temporizadorBusqueda = null;
+        inputBuscarCliente.addEventListener('input', function() {
+            clearTimeout(temporizadorBusqueda);
+            const texto = this.value;
+            temporizadorBusqueda = setTimeout(() => buscarClientes(texto), ESPERA_BUSQUEDA_CLIENTE);
+        });
+    }
+    
     // --- Botón de cliente rápido ---
     // Evento para abrir el modal de agregar cliente
     document.getElementById('btn-agregar-cliente-rapido').addEventListener('click', function() {
@@ -1145,6 +1178,9 @@ function procesarVenta() {
             renderizarCarrito();
             actualizarTotales();
             
+            // Traer el stock que quedó después de la venta
+            sincronizarCatalogo();
+            
             // Mostrar mensaje de éxito
             mostrarAlerta('success', `✓ Venta procesada exitosamente. Folio: ${folio}`);
             
@@ -1298,6 +1334,287 @@ PRODUCTOS:
 }
 
 
+// ================================================================
+// =              CATÁLOGO DE PRODUCTOS (SINCRONIZACIÓN)          =
+// ================================================================
+//
+// Las tarjetas de productos no vienen en el HTML: se descargan de
+// /api/pos/catalogo/ al abrir el POS (por páginas) y después, cada
+// INTERVALO_SINCRONIZACION_CATALOGO y al terminar cada venta, se piden
+// solo los productos que cambiaron desde la última versión.
+// Así el stock que muestra la caja se mantiene al día sin recargar.
+
+/**
+ * Descarga todas las páginas de una consulta al catálogo.
+ *
+ * @param {Object} parametros - Parámetros GET (ej: {desde: version})
+ * @param {Object} headers - Headers de la primera petición (If-None-Match)
+ * @returns {Promise<Object|null>} - {version, productos, etag} o null si no hubo cambios (304)
+ */
+function descargarCatalogo(parametros, headers) {
+    const urlBase = document.getElementById('productos-grid').dataset.urlCatalogo;
+    const productos = [];
+    let version = null;
+    let etag = null;
+
+    function pedirPagina(despuesDe, headersPagina) {
+        const query = new URLSearchParams(parametros);
+        if (despuesDe) {
+            query.set('despues_de', despuesDe);
+        }
+        return fetch(`${urlBase}?${query.toString()}`, { headers: headersPagina, cache: 'no-cache' })
+            .then(response => {
+                if (response.status === 304) {
+                    return null;
+                }
+                if (!response.ok) {
+                    throw new Error(`HTTP error! status: ${response.status}`);
+                }
+                if (!despuesDe) {
+                    etag = response.headers.get('ETag');
+                }
+                return response.json();
+            })
+            .then(data => {
+                if (data === null) {
+                    return null;
+                }
+                // La versión de la primera página: lo que cambie mientras se
+                // descargan las demás llega en la siguiente sincronización
+                if (version === null) {
+                    version = data.version;
+                }
+                productos.push(...data.productos);
+                if (data.siguiente) {
+                    return pedirPagina(data.siguiente, {});
+                }
+                return { version: version, productos: productos, etag: etag };
+            });
+    }
+
+    return pedirPagina(null, headers || {});
+}
+
+/**
+ * Carga completa del catálogo (al abrir el POS).
+ */
+function cargarCatalogo() {
+    descargarCatalogo({}, {})
+        .then(resultado => {
+            catalogoProductos.clear();
+            resultado.productos.forEach(producto => catalogoProductos.set(producto.id, producto));
+            versionCatalogo = resultado.version;
+            etagCambiosCatalogo = null;
+            dibujarCatalogo();
+        })
+        .catch(error => {
+            console.error('Error al cargar el catálogo:', error);
+            mostrarMensajeCatalogo('danger', 'No se pudieron cargar los productos. Recargue la página.');
+        });
+}
+
+/**
+ * Pide solo los productos que cambiaron desde la última versión.
+ */
+function sincronizarCatalogo() {
+    if (versionCatalogo === null) {
+        // Todavía no hay catálogo (o la carga falló): cargar completo
+        cargarCatalogo();
+        return;
+    }
+
+    const headers = {};
+    if (etagCambiosCatalogo) {
+        headers['If-None-Match'] = etagCambiosCatalogo;
+    }
+
+    descargarCatalogo({ desde: versionCatalogo }, headers)
+        .then(resultado => {
+            if (resultado === null) {
+                return;  // 304: nada cambió
+            }
+            resultado.productos.forEach(aplicarCambioProducto);
+            if (resultado.version && resultado.version !== versionCatalogo) {
+                // Nueva versión: la próxima consulta es otra URL (sin ETag previo)
+                versionCatalogo = resultado.version;
+                etagCambiosCatalogo = null;
+            } else {
+                etagCambiosCatalogo = resultado.etag;
+            }
+            actualizarMensajeCatalogoVacio();
+        })
+        .catch(error => {
+            console.error('Error al sincronizar el catálogo:', error);
+            etagCambiosCatalogo = null;
+        });
+}
+
+/**
+ * Aplica un producto modificado: actualiza, agrega o quita su tarjeta.
+ *
+ * @param {Object} producto - Producto del catálogo (con `disponible`)
+ */
+function aplicarCambioProducto(producto) {
+    const tarjetaActual = document.querySelector(`.producto-card[data-producto-id="${producto.id}"]`);
+    if (tarjetaActual) {
+        tarjetaActual.parentElement.remove();
+    }
+
+    // Mantener el stock del carrito al día (el servidor valida igual al vender)
+    carrito.forEach(item => {
+        if (item.producto_id === producto.id) {
+            item.stock = producto.disponible ? producto.stock : 0;
+        }
+    });
+
+    if (!producto.disponible) {
+        catalogoProductos.delete(producto.id);
+        return;
+    }
+
+    catalogoProductos.set(producto.id, producto);
+    insertarTarjetaOrdenada(crearTarjetaProducto(producto), producto.nombre);
+}
+
+/**
+ * Dibuja todas las tarjetas del catálogo (ordenadas por nombre).
+ */
+function dibujarCatalogo() {
+    const grid = document.getElementById('productos-grid');
+    const fragmento = document.createDocumentFragment();
+    Array.from(catalogoProductos.values())
+        .sort((a, b) => a.nombre.localeCompare(b.nombre))
+        .forEach(producto => fragmento.appendChild(crearTarjetaProducto(producto)));
+
+    grid.innerHTML = '';
+    grid.appendChild(fragmento);
+    actualizarMensajeCatalogoVacio();
+
+    const inputBuscar = document.getElementById('input-buscar-producto');
+    if (inputBuscar && inputBuscar.value) {
+        filtrarProductos(inputBuscar.value);
+    }
+}
+
+/**
+ * Inserta una tarjeta respetando el orden alfabético de la grilla.
+ */
+function insertarTarjetaOrdenada(columna, nombre) {
+    const grid = document.getElementById('productos-grid');
+    const siguiente = Array.from(grid.querySelectorAll('.producto-card')).find(
+        card => card.dataset.productoNombre.localeCompare(nombre) > 0
+    );
+    grid.insertBefore(columna, siguiente ? siguiente.parentElement : null);
+
+    // Respetar la búsqueda que esté escrita
+    const inputBuscar = document.getElementById('input-buscar-producto');
+    const busqueda = inputBuscar ? inputBuscar.value.toLowerCase() : '';
+    if (busqueda && !nombre.toLowerCase().includes(busqueda)) {
+        columna.style.display = 'none';
+    }
+}
+
+/**
+ * Crea la tarjeta (columna) de un producto.
+ *
+ * Los data-attributes son los que leen agregarAlCarrito y filtrarProductos.
+ *
+ * @param {Object} producto - Producto del catálogo
+ * @returns {HTMLElement} - Div .col con la tarjeta
+ */
+function crearTarjetaProducto(producto) {
+    const columna = document.createElement('div');
+    columna.className = 'col';
+
+    const card = document.createElement('div');
+    card.className = 'producto-card';
+    card.dataset.productoId = producto.id;
+    card.dataset.productoNombre = producto.nombre;
+    card.dataset.productoPrecio = producto.precio.toFixed(2);
+    card.dataset.productoPrecioOriginal = producto.precio;
+    card.dataset.productoStock = producto.stock;
+    card.dataset.productoUnidadVenta = producto.unidad_venta;
+    card.dataset.productoUnidadStock = producto.unidad_stock;
+
+    // Nombre del producto
+    const nombre = document.createElement('div');
+    nombre.className = 'producto-nombre text-truncate';
+    nombre.title = producto.nombre;
+    nombre.textContent = producto.nombre;
+    card.appendChild(nombre);
+
+    // Marca y tipo (si existen)
+    const marcaTipo = [producto.marca, producto.tipo].filter(Boolean).join(' • ');
+    if (marcaTipo) {
+        const detalle = document.createElement('div');
+        detalle.className = 'text-muted small mb-2';
+        detalle.textContent = marcaTipo;
+        card.appendChild(detalle);
+    }
+
+    // Precio
+    const precio = document.createElement('div');
+    precio.className = 'producto-precio';
+    precio.textContent = `$${producto.precio.toFixed(0)} `;
+    const unidadPrecio = document.createElement('small');
+    unidadPrecio.className = 'text-muted';
+    unidadPrecio.textContent = `/ ${producto.unidad_venta_display}`;
+    precio.appendChild(unidadPrecio);
+    card.appendChild(precio);
+
+    // Stock disponible
+    const decimales = producto.unidad_stock === 'unidad' ? 0 : 3;
+    const stock = document.createElement('div');
+    stock.className = 'producto-stock';
+    stock.innerHTML = '<small class="text-muted"><i class="bi bi-box-seam"></i> Stock: </small>';
+    stock.querySelector('small').append(`${producto.stock.toFixed(decimales)} ${producto.unidad_stock_display}`);
+    card.appendChild(stock);
+
+    // Botón agregar al carrito
+    const boton = document.createElement('button');
+    boton.type = 'button';
+    boton.className = 'btn-agregar-producto';
+    boton.innerHTML = '<i class="bi bi-cart-plus"></i> Agregar';
+    boton.addEventListener('click', () => agregarAlCarrito(producto.id));
+    card.appendChild(boton);
+
+    columna.appendChild(card);
+    return columna;
+}
+
+/**
+ * Muestra el aviso de "sin productos" si el catálogo quedó vacío.
+ */
+function actualizarMensajeCatalogoVacio() {
+    const vacio = document.getElementById('productos-vacio');
+    if (catalogoProductos.size === 0) {
+        if (!vacio) {
+            mostrarMensajeCatalogo('info', 'No hay productos disponibles en este momento.');
+        }
+    } else if (vacio) {
+        vacio.remove();
+    }
+}
+
+function mostrarMensajeCatalogo(tipo, mensaje) {
+    const grid = document.getElementById('productos-grid');
+    const cargando = document.getElementById('productos-cargando');
+    if (cargando) {
+        cargando.remove();
+    }
+    const anterior = document.getElementById('productos-vacio');
+    if (anterior) {
+        anterior.remove();
+    }
+    const aviso = document.createElement('div');
+    aviso.className = 'col-12';
+    aviso.id = 'productos-vacio';
+    aviso.innerHTML = `<div class="alert alert-${tipo} text-center"><i class="bi bi-exclamation-circle"></i> </div>`;
+    aviso.querySelector('.alert').append(mensaje);
+    grid.appendChild(aviso);
+}
+
+
 // ================================================================
 // =              FUNCIÓN: FILTRAR PRODUCTOS                      =
 // ================================================================
@@ -1402,6 +1719,87 @@ function mostrarAlerta(tipo, mensaje) {
 }
 
 
+// ================================================================
+// =              FUNCIÓN: BUSCAR CLIENTES                        =
+// ================================================================
+//
+// Consulta /api/clientes/buscar/ (prefijo del nombre o RUT exacto) y
+// muestra los resultados como opciones del selector de clientes.
+//
+// @param {string} texto - Nombre o RUT escrito por el cajero
+
+// Última búsqueda enviada (para descartar respuestas atrasadas)
+let ultimaBusquedaCliente = '';
+
+function buscarClientes(texto) {
+    const input = document.getElementById('buscar-cliente');
+    ultimaBusquedaCliente = texto;
+    
+    if (texto.trim().length < 2) {
+        mostrarOpcionesCliente([]);
+        return;
+    }
+    
+    fetch(`${input.dataset.urlBuscar}?q=${encodeURIComponent(texto)}`)
+        .then(response => response.json())
+        .then(data => {
+            if (texto !== ultimaBusquedaCliente) {
+                return;  // Llegó tarde: ya se escribió otra cosa
+            }
+            if (!data.success) {
+                throw new Error(data.message || 'Error al buscar clientes');
+            }
+            mostrarOpcionesCliente(data.clientes);
+        })
+        .catch(error => {
+            console.error('Error al buscar clientes:', error);
+            mostrarAlerta('error', 'No se pudieron buscar los clientes');
+        });
+}
+
+/**
+ * Reemplaza las opciones del selector de clientes por los resultados.
+ * Mantiene el cliente ya seleccionado y selecciona el resultado si es único.
+ *
+ * @param {Array} clientes - [{id, nombre, rut}]
+ */
+function mostrarOpcionesCliente(clientes) {
+    const selectCliente = document.getElementById('select-cliente');
+    const seleccionado = selectCliente.selectedOptions[0];
+    const idSeleccionado = selectCliente.value;
+    
+    selectCliente.innerHTML = '<option value="">-- Seleccionar cliente --</option>';
+    if (idSeleccionado && !clientes.some(cliente => String(cliente.id) === idSeleccionado)) {
+        selectCliente.appendChild(seleccionado);
+    }
+    
+    clientes.forEach(cliente => {
+        const option = document.createElement('option');
+        option.value = cliente.id;
+        option.textContent = cliente.rut ? `${cliente.nombre} - ${cliente.rut}` : cliente.nombre;
+        selectCliente.appendChild(option);
+    });
+    
+    if (idSeleccionado) {
+        selectCliente.value = idSeleccionado;
+    } else if (clientes.length === 1) {
+        selectCliente.value = clientes[0].id;
+    }
+}
+
+/**
+ * Deja un cliente como seleccionado en el selector.
+ *
+ * @param {Object} cliente - {id, nombre, rut}
+ */
+function seleccionarCliente(cliente) {
+    const selectCliente = document.getElementById('select-cliente');
+    selectCliente.value = '';
+    mostrarOpcionesCliente([cliente]);
+    selectCliente.value = cliente.id;
+}
+
+
 // ================================================================
 // =              FUNCIÓN: AGREGAR CLIENTE RÁPIDO                 =
 // ================================================================
@@ -1427,19 +1825,21 @@ function agregarClienteRapido() {
             const modal = bootstrap.Modal.getInstance(document.getElementById('modal-cliente-rapido'));
             modal.hide();
             
-            // Agregar el nuevo cliente al select
-            const selectCliente = document.getElementById('select-cliente');
-            const option = document.createElement('option');
-            option.value = data.cliente_id;
-            option.textContent = data.cliente_nombre;
-            option.selected = true;
-            selectCliente.appendChild(option);
+            // Dejar el nuevo cliente seleccionado
+            seleccionarCliente(data.cliente);
             
             // Mostrar mensaje de éxito
             mostrarAlerta('success', 'Cliente agregado correctamente');
             
             // Limpiar el formulario
             form.reset();
+        } else if (data.cliente) {
+            // El RUT ya estaba registrado: usar ese cliente en vez de duplicarlo
+            const modal = bootstrap.Modal.getInstance(document.getElementById('modal-cliente-rapido'));
+            modal.hide();
+            seleccionarCliente(data.cliente);
+            mostrarAlerta('warning', data.mensaje);
+            form.reset();
         } else {
             // Mostrar errores
             mostrarAlerta('error', data.mensaje || 'Error al agregar el cliente');
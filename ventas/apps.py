@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class VentasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ventas'
+
+    def ready(self):
+        """
+        Conecta las señales de la app (ventas/signals.py).
+        """
+        from ventas import signals  # noqa: F401 (conecta los receivers)
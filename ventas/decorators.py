@@ -23,8 +23,6 @@
 from functools import wraps
 from django.shortcuts import redirect
 from django.contrib import messages
-from django.contrib.auth.models import Group
-from ventas.models.usuarios import Usuarios
 from ventas.funciones.permisos import puede_acceder_seccion, obtener_rol_usuario
 
 
@@ -60,17 +58,8 @@ def require_rol(*roles_permitidos):
             if request.user.is_superuser:
                 return view_func(request, *args, **kwargs)
             
-            # Obtener el rol del usuario desde la tabla usuarios
-            try:
-                usuario_perfil = Usuarios.objects.get(user=request.user)
-                rol_usuario = usuario_perfil.roles.nombre if usuario_perfil.roles else None
-            except Usuarios.DoesNotExist:
-                # Si no tiene perfil, verificar grupos de Django
-                grupos = request.user.groups.all()
-                if grupos.exists():
-                    rol_usuario = grupos.first().name
-                else:
-                    rol_usuario = None
+            # Obtener el rol del usuario (memorizado por petición y por usuario)
+            rol_usuario = obtener_rol_usuario(request.user)
             
             # Si no tiene rol, denegar acceso
             if not rol_usuario:
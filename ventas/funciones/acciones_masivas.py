@@ -0,0 +1,406 @@
+# ================================================================
+# =                                                              =
+# =        ACCIONES MASIVAS DEL INVENTARIO (POR BLOQUES)        =
+# =                                                              =
+# ================================================================
+#
+# Crear alertas, mover a merma, activar/desactivar y eliminar productos
+# desde el inventario. Antes cada acción recorría los IDs guardando
+# producto por producto dentro de una sola petición: con miles de
+# productos ("seleccionar todos" sobre un filtro) la petición vencía y
+# no quedaba nada hecho.
+#
+# Ahora todas usan el mismo motor:
+#
+# 1. Cada acción es una función que procesa UN bloque de IDs con
+#    operaciones en conjunto (UPDATE, bulk_create, bulk_update): el
+#    número de consultas por bloque no depende de su tamaño
+# 2. Una selección que cabe en un bloque se ejecuta en la misma petición
+# 3. Una selección mayor se guarda como trabajo (trabajos_accion_masiva)
+#    y un hilo del servidor la procesa por bloques. Cada bloque se
+#    confirma en su propia transacción JUNTO con el avance del trabajo
+#    (procesados, ultimo_id), así un bloque nunca se aplica dos veces
+# 4. La página del inventario consulta el avance. Si el servidor se
+#    reinicia a medias, el trabajo deja de avanzar; al consultarlo (o con
+#    `python manage.py procesar_acciones_masivas`) se retoma desde
+#    ultimo_id
+#
+# Igual que en las exportaciones, la tabla ES la cola: tomar un trabajo
+# es un UPDATE condicional, aunque haya varios procesos.
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from ventas.models import Productos, Alertas, TrabajoAccionMasiva
+from ventas.funciones.merma import mover_a_merma
+import threading
+import logging
+
+logger = logging.getLogger('ventas')
+
+# Productos por bloque (y máximo que se procesa dentro de la petición)
+TAMANO_BLOQUE_ACCIONES = 200
+
+# Un trabajo 'en_proceso' sin avance por más tiempo que esto se retoma
+# (el proceso que lo tenía murió o se reinició)
+TIEMPO_SIN_AVANCE = timedelta(minutes=2)
+
+
+class TrabajoRetomado(Exception):
+    """Otro proceso retomó el trabajo: este deja de procesarlo."""
+
+
+# ================================================================
+# =                 ACCIONES (UN BLOQUE CADA UNA)               =
+# ================================================================
+
+def _bloque_crear_alertas(ids, parametros):
+    """
+    Crea o actualiza la alerta de vencimiento de cada producto del bloque.
+
+    4 consultas: productos, alertas activas, bulk_create y bulk_update.
+    """
+    hoy = timezone.localdate()
+    ahora = timezone.now()
+    productos = list(Productos.objects.filter(id__in=ids, eliminado__isnull=True))
+
+    # Alertas activas de vencimiento por producto (queda la más reciente)
+    existentes = {}
+    for alerta in Alertas.objects.filter(
+        productos_id__in=[p.id for p in productos],
+        categoria='vencimiento',
+        estado='activa',
+    ).order_by('fecha_generada', 'id'):
+        existentes[alerta.productos_id] = alerta
+
+    nuevas = []
+    modificadas = []
+    sin_caducidad = 0
+    for producto in productos:
+        if not producto.caducidad:
+            # Sin caducidad no hay días hasta vencer que informar
+            sin_caducidad += 1
+            continue
+        tipo, mensaje = Alertas.clasificar_vencimiento_producto(producto, hoy)
+        alerta = existentes.get(producto.id)
+        if alerta is None:
+            nuevas.append(Alertas(
+                tipo_alerta=tipo,
+                mensaje=mensaje,
+                productos=producto,
+                categoria='vencimiento',
+                estado='activa',
+            ))
+        else:
+            alerta.tipo_alerta = tipo
+            alerta.mensaje = mensaje
+            alerta.fecha_generada = ahora
+            modificadas.append(alerta)
+
+    Alertas.objects.bulk_create(nuevas)
+    Alertas.objects.bulk_update(modificadas, ['tipo_alerta', 'mensaje', 'fecha_generada'])
+
+    return {
+        'alertas': len(nuevas) + len(modificadas),
+        'sin_caducidad': sin_caducidad,
+    }
+
+
+def _bloque_mover_merma(ids, parametros):
+    """
+    Mueve a merma todos los lotes activos de los productos del bloque.
+    """
+    resultado = mover_a_merma(parametros.get('motivo_merma', ''), ids)
+    return {
+        'productos': resultado['productos'],
+        'lotes': resultado['lotes'],
+        'alertas_resueltas': resultado['alertas_resueltas'],
+    }
+
+
+def _bloque_activar_desactivar(ids, parametros):
+    """
+    Invierte el estado activo/inactivo de los productos del bloque.
+
+    3 consultas: leer los estados y un UPDATE por cada sentido.
+    """
+    ahora = timezone.now()
+    estados = Productos.objects.filter(
+        id__in=ids,
+        eliminado__isnull=True,
+        estado_merma__in=['activo', 'inactivo'],
+    ).values_list('id', 'estado_merma')
+
+    a_desactivar = [pk for pk, estado in estados if estado == 'activo']
+    a_activar = [pk for pk, estado in estados if estado == 'inactivo']
+
+    # update() no toca auto_now: `modificado` se marca a mano (el POS sincroniza por modificado)
+    desactivados = Productos.objects.filter(id__in=a_desactivar, estado_merma='activo').update(
+        estado_merma='inactivo', modificado=ahora
+    ) if a_desactivar else 0
+    activados = Productos.objects.filter(id__in=a_activar, estado_merma='inactivo').update(
+        estado_merma='activo', modificado=ahora
+    ) if a_activar else 0
+
+    return {'activados': activados, 'desactivados': desactivados}
+
+
+def _bloque_eliminar(ids, parametros):
+    """
+    Borrado lógico de los productos del bloque (un solo UPDATE).
+    """
+    ahora = timezone.now()
+    eliminados = Productos.objects.filter(
+        id__in=ids,
+        eliminado__isnull=True,  # Solo productos no eliminados previamente
+    ).update(eliminado=ahora, modificado=ahora)
+    return {'eliminados': eliminados}
+
+
+# Acción -> función que procesa un bloque de IDs y retorna sus contadores
+ACCIONES_MASIVAS = {
+    'crear_alertas': _bloque_crear_alertas,
+    'mover_merma': _bloque_mover_merma,
+    'activar_desactivar': _bloque_activar_desactivar,
+    'eliminar': _bloque_eliminar,
+}
+
+
+def mensaje_resultado(accion, resultado):
+    """
+    Texto para el usuario con el resultado (acumulado) de una acción.
+    """
+    if accion == 'crear_alertas':
+        mensaje = f'Se crearon/actualizaron {resultado.get("alertas", 0)} alerta(s) exitosamente'
+        if resultado.get('sin_caducidad'):
+            mensaje += f' ({resultado["sin_caducidad"]} producto(s) sin fecha de caducidad)'
+        return mensaje
+    if accion == 'mover_merma':
+        mensaje = f'Se movieron {resultado.get("productos", 0)} producto(s) a merma'
+        if resultado.get('alertas_resueltas'):
+            mensaje += f' y se resolvieron {resultado["alertas_resueltas"]} alerta(s) automáticamente'
+        return mensaje
+    if accion == 'activar_desactivar':
+        partes = []
+        if resultado.get('activados'):
+            partes.append(f'{resultado["activados"]} producto(s) activado(s)')
+        if resultado.get('desactivados'):
+            partes.append(f'{resultado["desactivados"]} producto(s) desactivado(s)')
+        return ' y '.join(partes) or 'No hubo productos para activar o desactivar'
+    if accion == 'eliminar':
+        return f'Se eliminaron {resultado.get("eliminados", 0)} producto(s) exitosamente'
+    return ''
+
+
+def _sumar(total, bloque):
+    for clave, valor in bloque.items():
+        total[clave] = total.get(clave, 0) + valor
+    return total
+
+
+def normalizar_ids(ids):
+    """
+    IDs de productos recibidos (texto o número), sin repetir y en orden ascendente.
+
+    Raises:
+        ValueError: Si algún ID no es un número
+    """
+    return sorted({int(pk) for pk in ids})
+
+
+def ejecutar_accion(accion, ids, parametros):
+    """
+    Ejecuta una acción sobre pocos productos dentro de la petición (un solo bloque).
+
+    Args:
+        accion: Clave de ACCIONES_MASIVAS
+        ids: IDs de productos (a lo más TAMANO_BLOQUE_ACCIONES)
+        parametros: dict con los datos de la acción
+
+    Returns:
+        dict: Contadores de la acción
+    """
+    with transaction.atomic():
+        return ACCIONES_MASIVAS[accion](ids, parametros)
+
+
+# ================================================================
+# =                 ENCOLAR Y PROCESAR                           =
+# ================================================================
+
+_ejecutor = None
+_ejecutor_lock = threading.Lock()
+
+
+def _obtener_ejecutor():
+    global _ejecutor
+    with _ejecutor_lock:
+        if _ejecutor is None:
+            # Un solo hilo: dos acciones masivas no compiten por los mismos productos
+            _ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='acciones-masivas')
+        return _ejecutor
+
+
+def despachar_cola():
+    """
+    Pide al hilo de acciones masivas que procese la cola (después del commit).
+    """
+    transaction.on_commit(lambda: _obtener_ejecutor().submit(procesar_cola))
+
+
+def encolar_accion_masiva(usuario, accion, ids, parametros):
+    """
+    Crea un trabajo de acción masiva y lo deja en la cola.
+
+    Args:
+        usuario: User que pide la acción
+        accion: Clave de ACCIONES_MASIVAS
+        ids: IDs de productos (ya normalizados)
+        parametros: dict con los datos de la acción
+
+    Returns:
+        TrabajoAccionMasiva: El trabajo creado (estado 'pendiente')
+
+    Raises:
+        ValueError: Si la acción no existe
+    """
+    if accion not in ACCIONES_MASIVAS:
+        raise ValueError(f'Acción masiva desconocida: {accion}')
+
+    trabajo = TrabajoAccionMasiva.objects.create(
+        usuario=usuario,
+        accion=accion,
+        parametros=parametros,
+        ids=ids,
+        total=len(ids),
+        resultado={},
+    )
+    despachar_cola()
+    logger.info(f'[ACCIONES MASIVAS] Trabajo {trabajo.id} encolado ({accion}, {len(ids)} productos) por {usuario}')
+    return trabajo
+
+
+def trabajos_detenidos():
+    """
+    Trabajos en proceso que dejaron de avanzar (su proceso murió).
+    """
+    return TrabajoAccionMasiva.objects.filter(
+        estado='en_proceso',
+        actualizado__lt=timezone.now() - TIEMPO_SIN_AVANCE,
+    )
+
+
+def _tomar_siguiente_trabajo():
+    """
+    Toma el trabajo pendiente (o detenido) más antiguo con un UPDATE condicional.
+
+    Returns:
+        TrabajoAccionMasiva o None si no hay trabajos por procesar
+    """
+    while True:
+        limite = timezone.now() - TIEMPO_SIN_AVANCE
+        candidato = TrabajoAccionMasiva.objects.filter(
+            Q(estado='pendiente') | Q(estado='en_proceso', actualizado__lt=limite)
+        ).order_by('id').values('id', 'estado', 'actualizado').first()
+        if candidato is None:
+            return None
+
+        ahora = timezone.now()
+        if candidato['estado'] == 'pendiente':
+            tomado = TrabajoAccionMasiva.objects.filter(id=candidato['id'], estado='pendiente').update(
+                estado='en_proceso', iniciado=ahora, actualizado=ahora
+            )
+        else:
+            # Retomar: solo si nadie lo tocó desde que se leyó
+            tomado = TrabajoAccionMasiva.objects.filter(
+                id=candidato['id'], estado='en_proceso', actualizado=candidato['actualizado']
+            ).update(actualizado=ahora)
+            if tomado:
+                logger.warning(f'[ACCIONES MASIVAS] Trabajo {candidato["id"]} retomado (estaba detenido)')
+        if tomado:
+            return TrabajoAccionMasiva.objects.get(id=candidato['id'])
+        # Otro hilo lo tomó primero: intentar con el siguiente
+
+
+def procesar_cola():
+    """
+    Procesa los trabajos pendientes (y retoma los detenidos) hasta vaciar la cola.
+
+    Returns:
+        int: Cantidad de trabajos procesados
+    """
+    procesados = 0
+    try:
+        while True:
+            trabajo = _tomar_siguiente_trabajo()
+            if trabajo is None:
+                break
+            ejecutar_trabajo(trabajo)
+            procesados += 1
+    except Exception as e:
+        logger.error(f'[ACCIONES MASIVAS] Error en la cola de acciones masivas: {e}', exc_info=True)
+    finally:
+        # El hilo no pasa por el ciclo de petición de Django
+        close_old_connections()
+    return procesados
+
+
+def ejecutar_trabajo(trabajo, tamano_bloque=TAMANO_BLOQUE_ACCIONES):
+    """
+    Procesa por bloques un trabajo ya tomado, desde su ultimo_id.
+
+    Args:
+        trabajo: TrabajoAccionMasiva (estado 'en_proceso')
+        tamano_bloque: Productos por bloque
+    """
+    funcion = ACCIONES_MASIVAS[trabajo.accion]
+    ultimo_id = trabajo.ultimo_id
+    procesados = trabajo.procesados
+    resultado = dict(trabajo.resultado or {})
+    pendientes = [pk for pk in trabajo.ids if pk > ultimo_id]
+
+    try:
+        for inicio in range(0, len(pendientes), tamano_bloque):
+            bloque = pendientes[inicio:inicio + tamano_bloque]
+
+            with transaction.atomic():
+                # El avance se guarda PRIMERO (bloquea la fila del trabajo) y
+                # solo si nadie más avanzó: el bloque y su avance se confirman
+                # juntos o no se confirma ninguno
+                nuevo_resultado = dict(resultado)
+                avanzado = TrabajoAccionMasiva.objects.filter(
+                    id=trabajo.id, estado='en_proceso', ultimo_id=ultimo_id,
+                ).update(
+                    ultimo_id=bloque[-1],
+                    procesados=procesados + len(bloque),
+                    actualizado=timezone.now(),
+                )
+                if not avanzado:
+                    raise TrabajoRetomado()
+
+                _sumar(nuevo_resultado, funcion(bloque, trabajo.parametros))
+                TrabajoAccionMasiva.objects.filter(id=trabajo.id).update(resultado=nuevo_resultado)
+
+            ultimo_id = bloque[-1]
+            procesados += len(bloque)
+            resultado = nuevo_resultado
+
+        TrabajoAccionMasiva.objects.filter(id=trabajo.id, ultimo_id=ultimo_id).update(
+            estado='terminado',
+            terminado=timezone.now(),
+        )
+        logger.info(f'[ACCIONES MASIVAS] Trabajo {trabajo.id} terminado: {mensaje_resultado(trabajo.accion, resultado)}')
+
+    except TrabajoRetomado:
+        logger.warning(f'[ACCIONES MASIVAS] Trabajo {trabajo.id} lo continúa otro proceso')
+
+    except Exception as e:
+        # Los bloques ya confirmados quedan aplicados; el resto no se procesa
+        logger.error(f'[ACCIONES MASIVAS] Error en el trabajo {trabajo.id}: {e}', exc_info=True)
+        TrabajoAccionMasiva.objects.filter(id=trabajo.id).update(
+            estado='error',
+            mensaje_error=str(e)[:1000],
+            terminado=timezone.now(),
+        )
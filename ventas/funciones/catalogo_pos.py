@@ -0,0 +1,122 @@
+# ================================================================
+# =                                                              =
+# =        CATÁLOGO DEL POS (SINCRONIZACIÓN POR CAMBIOS)        =
+# =                                                              =
+# ================================================================
+#
+# La página del POS ya no trae los productos dibujados en el HTML: los
+# descarga de /api/pos/catalogo/ y después pide solo lo que cambió.
+#
+# 1. Carga completa: sin `desde`, retorna los productos vendibles
+#    (no eliminados, activos y con stock) en páginas ordenadas por ID
+# 2. Cambios: con `desde` (la `version` de la sincronización anterior),
+#    retorna TODOS los productos modificados desde entonces, vendibles o
+#    no, con `disponible` para que la caja los agregue o los quite
+#
+# La `version` es el mayor `modificado` de la tabla productos. Toda
+# escritura de stock o precio actualiza `modificado` (save() por auto_now
+# y los bulk_update con CAMPOS_GUARDADO_STOCK), así una venta, un ajuste
+# o un cambio de precio aparecen en la siguiente sincronización.
+#
+# Los cambios se piden con MARGEN_SINCRONIZACION hacia atrás: una
+# transacción que tomó su `modificado` antes de la version pero hizo
+# commit después no se pierde (reenviar un producto no tiene efecto).
+
+from datetime import timedelta
+from django.db.models import Max, Count
+from ventas.models import Productos
+import hashlib
+
+# Productos por página (por defecto y máximo)
+TAMANO_PAGINA_CATALOGO = 500
+MAX_TAMANO_PAGINA_CATALOGO = 2000
+
+# Ventana hacia atrás al pedir cambios (ver arriba)
+MARGEN_SINCRONIZACION = timedelta(seconds=30)
+
+CAMPOS_CATALOGO = [
+    'id', 'nombre', 'marca', 'tipo', 'precio_por_unidad_venta', 'cantidad',
+    'unidad_venta', 'unidad_stock', 'estado_merma', 'eliminado',
+]
+
+NOMBRES_UNIDAD = dict(Productos.UNIDAD_CHOICES)
+
+
+def estado_catalogo():
+    """
+    Versión actual del catálogo en UNA consulta.
+
+    Returns:
+        dict: {'version': datetime o None (mayor `modificado`), 'total': int}
+    """
+    return Productos.objects.order_by().aggregate(version=Max('modificado'), total=Count('id'))
+
+
+def etag_catalogo(estado, desde=None, despues_de=None, limite=TAMANO_PAGINA_CATALOGO):
+    """
+    ETag de una página del catálogo.
+
+    Cambia cuando se modifica, agrega o borra cualquier producto; si nada
+    cambió, la caja recibe 304 sin que se lea ningún producto.
+    """
+    version = estado['version'].isoformat() if estado['version'] else ''
+    clave = f"{version}|{estado['total']}|{desde.isoformat() if desde else ''}|{despues_de or 0}|{limite}"
+    return '"' + hashlib.md5(clave.encode('utf-8')).hexdigest() + '"'
+
+
+def _producto_a_dict(fila):
+    """
+    Formato de un producto en el catálogo del POS.
+    """
+    return {
+        'id': fila['id'],
+        'nombre': fila['nombre'],
+        'marca': fila['marca'] or '',
+        'tipo': fila['tipo'] or '',
+        'precio': float(fila['precio_por_unidad_venta'] or 0),
+        'stock': float(fila['cantidad'] or 0),
+        'unidad_venta': fila['unidad_venta'],
+        'unidad_venta_display': NOMBRES_UNIDAD.get(fila['unidad_venta'], fila['unidad_venta']),
+        'unidad_stock': fila['unidad_stock'],
+        'unidad_stock_display': NOMBRES_UNIDAD.get(fila['unidad_stock'], fila['unidad_stock']),
+        'disponible': (
+            fila['eliminado'] is None
+            and fila['estado_merma'] == 'activo'
+            and (fila['cantidad'] or 0) > 0
+        ),
+    }
+
+
+def obtener_pagina_catalogo(desde=None, despues_de=None, limite=TAMANO_PAGINA_CATALOGO):
+    """
+    Obtiene una página del catálogo (completo o solo cambios).
+
+    Args:
+        desde: datetime de la sincronización anterior, o None para la carga completa
+        despues_de: Último ID recibido en la página anterior (paginación por ID)
+        limite: Productos por página
+
+    Returns:
+        dict: {'productos': [...], 'siguiente': ID para la próxima página o None}
+    """
+    if desde is None:
+        productos = Productos.objects.filter(
+            eliminado__isnull=True,
+            estado_merma='activo',
+            cantidad__gt=0,
+        )
+    else:
+        productos = Productos.objects.filter(modificado__gte=desde - MARGEN_SINCRONIZACION)
+
+    if despues_de:
+        productos = productos.filter(id__gt=despues_de)
+
+    # Una fila extra para saber si hay otra página
+    filas = list(productos.order_by('id').values(*CAMPOS_CATALOGO)[:limite + 1])
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+
+    return {
+        'productos': [_producto_a_dict(fila) for fila in filas],
+        'siguiente': filas[-1]['id'] if hay_mas else None,
+    }
@@ -0,0 +1,283 @@
+# ================================================================
+# =                                                              =
+# =        MOTOR DE CHECKOUT DEL POS (VENTA EN BLOQUE)          =
+# =                                                              =
+# ================================================================
+#
+# Este archivo contiene el motor que registra una venta completa
+# desde el POS con un número CONSTANTE de consultas a la base de
+# datos, sin importar cuántas líneas tenga el carrito.
+#
+# ESTRATEGIA:
+# 1. Bloquear (select_for_update) todos los productos del carrito
+#    en UNA sola consulta, ordenados por ID para evitar deadlocks
+# 2. Bloquear todos los lotes activos de esos productos en UNA consulta
+# 3. Validar stock y aplicar FIFO en memoria
+# 4. Escribir lotes, detalles y movimientos con bulk_update/bulk_create
+# 5. Armar el snapshot de la boleta en memoria y guardarlo en el
+#    historial después del commit (no alarga los bloqueos)
+#
+# Antes se hacían ~10 consultas por línea del carrito (un carrito de
+# 15 productos superaba las 100 idas y vueltas a MySQL).
+
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from ventas.models import Productos, Ventas, DetalleVenta, Lote, MovimientosInventario
+from ventas.funciones.stock import aplicar_resumen_lotes, CAMPOS_GUARDADO_STOCK
+from ventas.funciones.resumen_ventas import registrar_venta_en_resumen
+from ventas.funciones.comprobantes import programar_comprobantes
+from ventas.funciones.historial_boletas import construir_datos_boleta, programar_historial_boleta
+import logging
+
+logger = logging.getLogger('ventas')
+
+# Decimales de los montos de ventas y detalle_venta
+CENTAVOS = Decimal('0.01')
+
+
+class ErrorCheckout(Exception):
+    """
+    Error de validación del checkout (stock insuficiente, producto no encontrado, etc.).
+
+    Lleva el mensaje para el usuario y el código HTTP que debe retornar la vista.
+    """
+
+    def __init__(self, mensaje, status=400):
+        super().__init__(mensaje)
+        self.mensaje = mensaje
+        self.status = status
+
+
+def agrupar_carrito(carrito):
+    """
+    Normaliza el carrito y suma las cantidades por producto.
+
+    Un mismo producto puede venir en más de una línea del carrito; para
+    validar stock y aplicar FIFO se necesita la cantidad total por producto.
+
+    Args:
+        carrito: Lista de dicts con producto_id, cantidad, precio_unitario y descuento
+
+    Returns:
+        tuple: (lineas, cantidades_por_producto)
+            - lineas: Lista de dicts normalizados (IDs int, montos Decimal)
+            - cantidades_por_producto: dict {producto_id: Decimal}
+    """
+    lineas = []
+    cantidades = defaultdict(lambda: Decimal('0'))
+
+    for item in carrito:
+        producto_id = item.get('producto_id')
+        try:
+            producto_id = int(producto_id)
+        except (TypeError, ValueError):
+            raise ErrorCheckout(f'Producto con ID {producto_id} no encontrado', status=404)
+
+        linea = {
+            'producto_id': producto_id,
+            'cantidad': Decimal(str(item.get('cantidad', 0))),  # Permite decimales
+            'precio_unitario': Decimal(str(item.get('precio_unitario', 0))),
+            'descuento_pct': Decimal(str(item.get('descuento', 0))),
+        }
+        lineas.append(linea)
+        cantidades[producto_id] += linea['cantidad']
+
+    return lineas, dict(cantidades)
+
+
+def _consumir_lotes_fifo(lotes, cantidad):
+    """
+    Descuenta una cantidad de una lista de lotes ya ordenada por FIFO (en memoria).
+
+    Args:
+        lotes: Lista de Lote activos ordenados por fecha_caducidad, fecha_recepcion
+        cantidad: Decimal con la cantidad a descontar
+
+    Returns:
+        list: Lotes que fueron modificados (para bulk_update)
+    """
+    modificados = []
+    cantidad_restante = cantidad
+
+    for lote in lotes:
+        if cantidad_restante <= Decimal('0'):
+            break
+
+        cantidad_lote = Decimal(str(lote.cantidad))
+        cantidad_a_tomar = min(cantidad_restante, cantidad_lote)
+
+        lote.cantidad = cantidad_lote - cantidad_a_tomar
+        if lote.cantidad <= Decimal('0'):
+            # Lote agotado
+            lote.cantidad = Decimal('0')
+            lote.estado = 'agotado'
+
+        modificados.append(lote)
+        cantidad_restante -= cantidad_a_tomar
+
+    if cantidad_restante > Decimal('0'):
+        # No debería pasar: el stock se validó antes con los mismos lotes bloqueados
+        raise ValueError(
+            f'Error: No se pudo reducir completamente el stock. '
+            f'Quedan {cantidad_restante} unidades sin asignar a lotes.'
+        )
+
+    return modificados
+
+
+def registrar_venta(cliente, carrito, canal_venta, medio_pago, totales, folio, usuario_emisor=None):
+    """
+    Registra una venta completa del POS de forma atómica y en bloque.
+
+    Args:
+        cliente: Objeto Clientes ya validado
+        carrito: Lista de items del carrito (tal como llega desde pos.js)
+        canal_venta: 'presencial' o 'delivery'
+        medio_pago: Medio de pago de la venta
+        totales: dict con total_sin_iva, total_iva, descuento, total_con_iva,
+                 monto_pagado y vuelto (ya calculados por la vista)
+        folio: Folio de la boleta
+        usuario_emisor: Usuario que emite la boleta (para el historial)
+
+    Returns:
+        tuple: (venta, lineas, productos) - la venta creada, las líneas
+               normalizadas del carrito y los productos {id: Productos} bloqueados
+
+    Raises:
+        ErrorCheckout: Si un producto no existe, fue eliminado o no tiene stock
+    """
+    lineas, cantidades = agrupar_carrito(carrito)
+    # Montos con los decimales de sus columnas (ver CENTAVOS)
+    totales = {campo: Decimal(str(monto)).quantize(CENTAVOS) for campo, monto in totales.items()}
+
+    with transaction.atomic():
+        # --- Consulta 1: bloquear todos los productos del carrito ---
+        # Ordenados por ID para que dos cajas bloqueen siempre en el mismo orden
+        productos = {
+            p.id: p for p in Productos.objects.select_for_update().filter(
+                pk__in=list(cantidades.keys())
+            ).order_by('pk')
+        }
+
+        # --- Consulta 2: bloquear todos los lotes activos (orden FIFO) ---
+        lotes_por_producto = defaultdict(list)
+        lotes_activos = Lote.objects.select_for_update().filter(
+            productos_id__in=list(productos.keys()),
+            estado='activo',
+            cantidad__gt=0
+        ).order_by('productos_id', 'fecha_caducidad', 'fecha_recepcion')
+        for lote in lotes_activos:
+            lotes_por_producto[lote.productos_id].append(lote)
+
+        # --- Validación de stock (en memoria) ---
+        for producto_id, cantidad in cantidades.items():
+            producto = productos.get(producto_id)
+            if producto is None:
+                raise ErrorCheckout(f'Producto con ID {producto_id} no encontrado', status=404)
+
+            if producto.eliminado is not None:
+                raise ErrorCheckout(f'El producto "{producto.nombre}" ya no está disponible')
+
+            # Si el producto tiene lotes, el stock real es la suma de sus lotes activos.
+            # Si no tiene lotes (productos antiguos), se usa la cantidad directa.
+            lotes = lotes_por_producto.get(producto_id)
+            if lotes:
+                stock_disponible = sum((Decimal(str(l.cantidad)) for l in lotes), Decimal('0'))
+            else:
+                stock_disponible = Decimal(str(producto.cantidad)) if producto.cantidad else Decimal('0')
+
+            if stock_disponible < cantidad:
+                raise ErrorCheckout(
+                    f'Stock insuficiente para {producto.nombre}. '
+                    f'Disponible: {stock_disponible}, Solicitado: {cantidad}'
+                )
+
+        # --- Consulta 3: crear la venta ---
+        venta = Ventas.objects.create(
+            clientes=cliente,
+            canal_venta=canal_venta,
+            total_sin_iva=totales['total_sin_iva'],
+            total_iva=totales['total_iva'],
+            descuento=totales['descuento'],
+            total_con_iva=totales['total_con_iva'],
+            folio=folio,
+            medio_pago=medio_pago,
+            monto_pagado=totales['monto_pagado'],
+            vuelto=totales['vuelto'],
+        )
+
+        # --- FIFO en memoria ---
+        lotes_modificados = []
+        for producto_id, cantidad in cantidades.items():
+            producto = productos[producto_id]
+            lotes = lotes_por_producto.get(producto_id)
+
+            if lotes:
+                lotes_modificados.extend(_consumir_lotes_fifo(lotes, cantidad))
+
+                # Resumen de stock del producto desde los lotes que siguen activos
+                aplicar_resumen_lotes(producto, [l for l in lotes if l.estado == 'activo' and l.cantidad > 0])
+            else:
+                producto.cantidad = Decimal(str(producto.cantidad)) - cantidad
+                producto.modificado = timezone.now()
+
+            logger.info(f'[VENTA] Producto {producto.nombre}: cantidad actualizada a {producto.cantidad} después de vender {cantidad} unidades')
+
+        # --- Consultas 4-7: escrituras en bloque ---
+        # Montos con los decimales de la columna: el snapshot de la boleta se
+        # arma con estos objetos y debe quedar igual que al leerlos de la BD
+        detalles = [
+            DetalleVenta(
+                ventas=venta,
+                productos=productos[linea['producto_id']],
+                cantidad=linea['cantidad'],
+                precio_unitario=linea['precio_unitario'].quantize(CENTAVOS),
+                descuento_pct=linea['descuento_pct'].quantize(CENTAVOS),
+            )
+            for linea in lineas
+        ]
+        DetalleVenta.objects.bulk_create(detalles)
+
+        if lotes_modificados:
+            Lote.objects.bulk_update(lotes_modificados, ['cantidad', 'estado'])
+
+        Productos.objects.bulk_update(list(productos.values()), CAMPOS_GUARDADO_STOCK)
+
+        # Movimientos de inventario para trazabilidad (una salida por línea del carrito)
+        # Si falla, registrar pero no fallar la venta (savepoint propio)
+        try:
+            with transaction.atomic():
+                MovimientosInventario.objects.bulk_create([
+                    MovimientosInventario(
+                        tipo_movimiento='salida',
+                        cantidad=linea['cantidad'],
+                        productos=productos[linea['producto_id']],
+                        origen='venta',
+                        referencia_id=venta.id,
+                        tipo_referencia='venta'
+                    )
+                    for linea in lineas
+                ])
+        except Exception as e:
+            logger.warning(f'Error al crear movimientos de inventario de la venta {venta.id}: {e}')
+
+        # Snapshot de la boleta armado en memoria (la venta, sus detalles y
+        # los productos ya están cargados: no se vuelven a leer). Se guarda en
+        # el historial y se generan los comprobantes DESPUÉS del commit, fuera
+        # de los bloqueos de productos y lotes
+        datos_boleta = construir_datos_boleta(venta, detalles)
+        programar_historial_boleta(venta, datos_boleta, len(detalles), usuario_emisor=usuario_emisor)
+
+        # Comprobantes (PDF, HTML, texto) en segundo plano: las reimpresiones
+        # los leen ya generados
+        programar_comprobantes(venta.id, datos_boleta)
+
+        # Sumar la venta al resumen diario cuando se confirme la transacción
+        # (fuera de los bloqueos de productos y lotes)
+        transaction.on_commit(lambda: registrar_venta_en_resumen(venta, lineas))
+
+        logger.info(f'[VENTA] Venta {venta.id} registrada: {len(lineas)} línea(s), {len(lotes_modificados)} lote(s) actualizados')
+
+    return venta, lineas, productos
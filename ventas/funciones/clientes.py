@@ -0,0 +1,90 @@
+# ================================================================
+# =                                                              =
+# =        BÚSQUEDA DE CLIENTES (POS)                           =
+# =                                                              =
+# ================================================================
+#
+# El POS ya no carga la tabla completa de clientes en la página: el
+# cajero escribe parte del nombre o el RUT y se consultan a lo más
+# LIMITE_BUSQUEDA_CLIENTES coincidencias.
+#
+# Las búsquedas usan las columnas indexadas nombre_normalizado y
+# rut_normalizado (ver Clientes.save y sql_busqueda_clientes.sql):
+#   - Nombre: coincidencia por prefijo ("jose p" -> "José Pérez")
+#   - RUT: coincidencia exacta sin puntos ni guion ("12.345.678-9" = "123456789")
+#
+# La detección de duplicados al crear un cliente usa la misma columna del RUT.
+
+import re
+from ventas.models import Clientes
+from ventas.funciones.validators import normalizar_texto_busqueda, normalizar_rut
+
+# Resultados por búsqueda (por defecto y máximo)
+LIMITE_BUSQUEDA_CLIENTES = 20
+MAX_LIMITE_BUSQUEDA_CLIENTES = 50
+
+# Letras mínimas para buscar por nombre
+MINIMO_CARACTERES_BUSQUEDA = 2
+
+# Un texto "parece RUT" si tiene 7 a 9 caracteres: dígitos y el verificador (dígito o K)
+PATRON_RUT = re.compile(r'^\d{6,8}[\dK]$')
+
+
+def _cliente_a_dict(cliente):
+    return {
+        'id': cliente['id'],
+        'nombre': cliente['nombre'],
+        'rut': cliente['rut'] or '',
+    }
+
+
+def buscar_clientes(texto, limite=LIMITE_BUSQUEDA_CLIENTES):
+    """
+    Busca clientes por prefijo del nombre o por RUT exacto.
+
+    Args:
+        texto: Lo que escribió el cajero (nombre o RUT, con o sin formato)
+        limite: Máximo de resultados
+
+    Returns:
+        list: [{'id', 'nombre', 'rut'}], primero la coincidencia por RUT
+    """
+    limite = min(max(int(limite), 1), MAX_LIMITE_BUSQUEDA_CLIENTES)
+    resultados = []
+
+    # RUT: coincidencia exacta (índice idx_clientes_rut_norm)
+    rut = normalizar_rut(texto)
+    if PATRON_RUT.match(rut):
+        resultados = [
+            _cliente_a_dict(cliente)
+            for cliente in Clientes.objects.filter(rut_normalizado=rut).order_by('nombre').values(
+                'id', 'nombre', 'rut'
+            )[:limite]
+        ]
+
+    # Nombre: prefijo (índice idx_clientes_nombre_norm, LIKE 'texto%')
+    nombre = normalizar_texto_busqueda(texto)
+    if len(nombre) >= MINIMO_CARACTERES_BUSQUEDA and len(resultados) < limite:
+        encontrados = {cliente['id'] for cliente in resultados}
+        por_nombre = Clientes.objects.filter(
+            nombre_normalizado__istartswith=nombre
+        ).exclude(id__in=encontrados).order_by('nombre_normalizado', 'id').values('id', 'nombre', 'rut')
+        resultados += [_cliente_a_dict(cliente) for cliente in por_nombre[:limite - len(resultados)]]
+
+    return resultados
+
+
+def cliente_por_rut(rut):
+    """
+    Busca un cliente con el mismo RUT (sin importar puntos ni guion).
+
+    Args:
+        rut: RUT con o sin formato
+
+    Returns:
+        Clientes o None si no hay RUT o nadie lo tiene registrado
+    """
+    rut = normalizar_rut(rut)
+    if not rut:
+        return None
+    return Clientes.objects.filter(rut_normalizado=rut).order_by('id').first()
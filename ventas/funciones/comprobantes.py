@@ -0,0 +1,541 @@
+# ================================================================
+# =                                                              =
+# =        COMPROBANTES DE VENTA (GENERACIÓN Y ALMACÉN)         =
+# =                                                              =
+# ================================================================
+#
+# Una venta no cambia después de confirmada, así que su comprobante
+# (PDF, HTML o texto plano) se genera UNA vez y se guarda:
+#
+# 1. El comprobante se genera desde el snapshot de la boleta
+#    (HistorialBoletas.datos_boleta), no desde las tablas de ventas
+# 2. Se guarda en un almacén con la clave:
+#        <venta_id>/<huella>.<formato>
+#    donde la huella es el SHA-256 del snapshot. Si el snapshot cambia,
+#    cambia la clave: nunca se entrega un comprobante desactualizado
+# 3. Después del checkout (transaction.on_commit) se generan los
+#    comprobantes en un hilo aparte, así el POS no espera a ReportLab
+# 4. Las reimpresiones leen el archivo guardado (FileResponse) y usan
+#    la huella como ETag: si el navegador ya lo tiene, responde 304
+#
+# ALMACÉN:
+# Por defecto archivos locales en settings.COMPROBANTES_DIR. Se puede
+# cambiar con settings.COMPROBANTES_BACKEND (ruta a una clase con los
+# métodos abrir, guardar y existe, como AlmacenComprobantesLocal).
+
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from io import BytesIO
+from pathlib import Path
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+from ventas.models import Ventas, DetalleVenta, HistorialBoletas
+from ventas.funciones.historial_boletas import construir_datos_boleta
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import logging
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_CENTER
+    REPORTLAB_AVAILABLE = True
+except ImportError:
+    REPORTLAB_AVAILABLE = False
+
+logger = logging.getLogger('ventas')
+
+# Se incluye en la huella: al cambiar el diseño de los comprobantes, subir
+# este número para que no se reutilicen los archivos generados antes
+VERSION_FORMATO = 1
+
+# Formatos que se guardan: extensión -> content type
+FORMATOS = {
+    'pdf': 'application/pdf',
+    'html': 'text/html; charset=utf-8',
+    'txt': 'text/plain; charset=utf-8',
+}
+
+MEDIOS_PAGO = dict(Ventas.MEDIO_PAGO_CHOICES)
+
+
+# ================================================================
+# =                 ALMACÉN DE COMPROBANTES                      =
+# ================================================================
+
+class AlmacenComprobantesLocal:
+    """
+    Guarda los comprobantes como archivos en settings.COMPROBANTES_DIR.
+
+    Las escrituras son atómicas (archivo temporal + rename), así dos
+    procesos que generan el mismo comprobante no dejan un archivo a medias.
+    """
+
+    def __init__(self, directorio=None):
+        self.directorio = Path(directorio or settings.COMPROBANTES_DIR)
+
+    def _ruta(self, clave):
+        return self.directorio / clave
+
+    def existe(self, clave):
+        return self._ruta(clave).is_file()
+
+    def abrir(self, clave):
+        """
+        Returns:
+            Archivo binario abierto, o None si el comprobante no está guardado
+        """
+        try:
+            return open(self._ruta(clave), 'rb')
+        except FileNotFoundError:
+            return None
+
+    def guardar(self, clave, contenido):
+        ruta = self._ruta(clave)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+
+        descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(descriptor, 'wb') as archivo:
+                archivo.write(contenido)
+            os.replace(temporal, ruta)
+        except Exception:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+
+
+_almacen = None
+
+
+def obtener_almacen():
+    """
+    Retorna el almacén configurado en settings.COMPROBANTES_BACKEND (uno por proceso).
+    """
+    global _almacen
+    if _almacen is None:
+        clase = import_string(getattr(
+            settings, 'COMPROBANTES_BACKEND', 'ventas.funciones.comprobantes.AlmacenComprobantesLocal'
+        ))
+        _almacen = clase()
+    return _almacen
+
+
+# ================================================================
+# =                 SNAPSHOT Y HUELLA                            =
+# ================================================================
+
+def datos_boleta_de_venta(venta_id):
+    """
+    Obtiene el snapshot de la boleta de una venta.
+
+    Usa el último registro del historial de boletas. Las ventas antiguas
+    sin historial se arman desde las tablas de ventas.
+
+    Args:
+        venta_id: ID de la venta
+
+    Returns:
+        dict o None: datos_boleta, o None si la venta no existe
+    """
+    historial = HistorialBoletas.objects.filter(venta_id=venta_id).only(
+        'id', 'datos_boleta'
+    ).order_by('-fecha_emision', '-id').first()
+    if historial is not None:
+        return historial.get_datos_boleta_dict()
+
+    venta = Ventas.objects.select_related('clientes').filter(pk=venta_id).first()
+    if venta is None:
+        return None
+    detalles = DetalleVenta.objects.filter(ventas=venta).select_related('productos')
+    return construir_datos_boleta(venta, detalles)
+
+
+def huella_boleta(datos_boleta):
+    """
+    SHA-256 del snapshot (JSON canónico) y de la versión del formato.
+    """
+    contenido = json.dumps(
+        {'version': VERSION_FORMATO, 'datos': datos_boleta},
+        sort_keys=True, separators=(',', ':'), ensure_ascii=False, cls=DjangoJSONEncoder,
+    )
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def clave_comprobante(venta_id, huella, formato):
+    """
+    Clave del comprobante en el almacén: <venta_id>/<huella>.<formato>
+    """
+    return f'{venta_id}/{huella}.{formato}'
+
+
+def _decimal(valor):
+    try:
+        return Decimal(str(valor)) if valor not in (None, '') else Decimal('0')
+    except InvalidOperation:
+        return Decimal('0')
+
+
+def preparar_comprobante(venta_id, datos_boleta):
+    """
+    Convierte el snapshot (textos JSON) a los valores que muestran los comprobantes.
+
+    Args:
+        venta_id: ID de la venta
+        datos_boleta: dict con 'cabecera' y 'detalles'
+
+    Returns:
+        dict: folio, fecha (hora local), canal, cliente, detalles, totales y pago
+    """
+    cabecera = datos_boleta.get('cabecera', {})
+    totales = cabecera.get('totales', {})
+    pago = cabecera.get('pago', {})
+
+    fecha = parse_datetime(cabecera['fecha']) if cabecera.get('fecha') else None
+    if fecha is not None:
+        fecha = timezone.localtime(fecha) if timezone.is_aware(fecha) else fecha
+
+    medio_pago = pago.get('medio_pago') or 'efectivo'
+
+    return {
+        'venta_id': venta_id,
+        'folio': cabecera.get('folio') or f'VENTA-{venta_id}',
+        'fecha': fecha,
+        'canal_venta': cabecera.get('canal_venta') or '',
+        'cliente': (cabecera.get('cliente') or {}).get('nombre') or 'Cliente Genérico',
+        'detalles': [
+            {
+                'nombre': detalle['producto']['nombre'],
+                'cantidad': detalle['cantidad'],
+                'precio_unitario': _decimal(detalle['precio_unitario']),
+                'subtotal': _decimal(detalle['subtotal']),
+            }
+            for detalle in datos_boleta.get('detalles', [])
+        ],
+        'total_sin_iva': _decimal(totales.get('subtotal_sin_iva')),
+        'total_iva': _decimal(totales.get('total_iva')),
+        'total_con_iva': _decimal(totales.get('total_con_iva')),
+        'medio_pago': medio_pago,
+        'medio_pago_display': MEDIOS_PAGO.get(medio_pago, 'Efectivo'),
+        'monto_pagado': _decimal(pago.get('monto_pagado')) if pago.get('monto_pagado') else None,
+        'vuelto': _decimal(pago.get('vuelto')) if pago.get('vuelto') else None,
+    }
+
+
+# ================================================================
+# =                 GENERACIÓN DE COMPROBANTES                   =
+# ================================================================
+
+def generar_pdf(comprobante):
+    """
+    Genera el comprobante en PDF con ReportLab.
+
+    Args:
+        comprobante: dict retornado por preparar_comprobante()
+
+    Returns:
+        bytes: Contenido del PDF
+    """
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=2*cm,
+        leftMargin=2*cm,
+        topMargin=2*cm,
+        bottomMargin=2*cm
+    )
+
+    # Contenedor para elementos del PDF
+    elements = []
+
+    # Estilos
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        textColor=colors.HexColor('#1a1a1a'),
+        spaceAfter=30,
+        alignment=TA_CENTER
+    )
+
+    # Encabezado del comprobante
+    elements.append(Paragraph("LA FORNERÍA", title_style))
+    elements.append(Paragraph("Comprobante de Venta", styles['Heading2']))
+    elements.append(Spacer(1, 0.3*cm))
+
+    # Información de la venta
+    fecha = comprobante['fecha']
+    elements.append(Paragraph(f"Folio: {comprobante['folio']}", styles['Normal']))
+    elements.append(Paragraph(f"Fecha: {fecha.strftime('%d/%m/%Y') if fecha else ''}", styles['Normal']))
+    elements.append(Paragraph(f"Hora: {fecha.strftime('%H:%M:%S') if fecha else ''}", styles['Normal']))
+    elements.append(Paragraph(f"Tipo: {comprobante['canal_venta'].upper()}", styles['Normal']))
+    elements.append(Spacer(1, 0.3*cm))
+
+    # Cliente
+    elements.append(Paragraph(f"Cliente: {comprobante['cliente']}", styles['Normal']))
+    elements.append(Spacer(1, 0.3*cm))
+
+    # Título de productos
+    elements.append(Paragraph("Productos:", styles['Normal']))
+    elements.append(Spacer(1, 0.2*cm))
+
+    # Detalles de productos (formato tabla)
+    productos_data = [['Producto', 'Cantidad', 'Precio Unit.', 'Subtotal']]
+    for detalle in comprobante['detalles']:
+        productos_data.append([
+            detalle['nombre'],
+            detalle['cantidad'],
+            f"${detalle['precio_unitario']:,.0f}",
+            f"${detalle['subtotal']:,.0f}"
+        ])
+
+    productos_table = Table(productos_data, colWidths=[8*cm, 2*cm, 3*cm, 3*cm])
+    productos_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+        ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
+        ('ALIGN', (3, 0), (-1, -1), 'RIGHT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ]))
+
+    elements.append(productos_table)
+    elements.append(Spacer(1, 0.5*cm))
+
+    # Totales (formato tabla)
+    totales_data = [
+        ['SubTotal (sin IVA):', f"${comprobante['total_sin_iva']:,.0f}"],
+        ['IVA (19%):', f"${comprobante['total_iva']:,.0f}"],
+        ['TOTAL (con IVA):', f"${comprobante['total_con_iva']:,.0f}"]
+    ]
+
+    totales_table = Table(totales_data, colWidths=[10*cm, 6*cm])
+    totales_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, -1), (-1, -1), 12),
+        ('TOPPADDING', (0, -1), (-1, -1), 6),
+        ('BOTTOMPADDING', (0, -1), (-1, -1), 6),
+        ('LINEABOVE', (0, -1), (-1, -1), 1, colors.black),
+    ]))
+
+    elements.append(totales_table)
+    elements.append(Spacer(1, 0.3*cm))
+
+    # Información de pago
+    if comprobante['monto_pagado']:
+        elements.append(Paragraph(f"Medio de pago: {comprobante['medio_pago_display']}", styles['Normal']))
+        elements.append(Paragraph(f"Pago recibido: {comprobante['monto_pagado']:,.0f}", styles['Normal']))
+
+        # Vuelto (solo para efectivo)
+        if comprobante['medio_pago'] == 'efectivo' and comprobante['vuelto']:
+            elements.append(Paragraph(f"Vuelto: {comprobante['vuelto']:,.0f}", styles['Normal']))
+        elements.append(Spacer(1, 0.3*cm))
+
+    # Pie de página
+    elements.append(Spacer(1, 0.5*cm))
+    elements.append(Paragraph(
+        "Gracias por su compra. Síganos en @LaForneria",
+        ParagraphStyle('Footer', parent=styles['Normal'], alignment=TA_CENTER)
+    ))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def generar_texto(comprobante):
+    """
+    Genera el comprobante en texto plano (fallback si no hay ReportLab).
+
+    Args:
+        comprobante: dict retornado por preparar_comprobante()
+
+    Returns:
+        bytes: Texto del comprobante en UTF-8
+    """
+    fecha = comprobante['fecha']
+
+    texto = []
+    texto.append("=" * 50)
+    texto.append("")
+    texto.append("         LA FORNERÍA")
+    texto.append("     Comprobante de Venta")
+    texto.append("")
+    texto.append("=" * 50)
+    texto.append("")
+    texto.append(f"Folio: {comprobante['folio']}")
+    texto.append(f"Fecha: {fecha.strftime('%d/%m/%Y') if fecha else ''}")
+    texto.append(f"Hora: {fecha.strftime('%H:%M:%S') if fecha else ''}")
+    texto.append(f"Tipo: {comprobante['canal_venta'].upper()}")
+    texto.append("")
+    texto.append("-" * 50)
+    texto.append("")
+    texto.append(f"Cliente: {comprobante['cliente']}")
+    texto.append("")
+    texto.append("-" * 50)
+    texto.append("")
+    texto.append("Productos:")
+    texto.append("")
+
+    # Detalles de productos
+    for detalle in comprobante['detalles']:
+        texto.append(f"  {detalle['nombre']}")
+        texto.append(f"  Cantidad: {detalle['cantidad']} x ${detalle['precio_unitario']:,.0f}")
+        texto.append(f"  Subtotal: ${detalle['subtotal']:,.0f}")
+        texto.append("")
+
+    texto.append("-" * 50)
+    texto.append("")
+    texto.append(f"  SubTotal (sin IVA):        ${comprobante['total_sin_iva']:,.0f}")
+    texto.append(f"  IVA (19%):                 ${comprobante['total_iva']:,.0f}")
+    texto.append("")
+    texto.append("-" * 50)
+    texto.append("")
+    texto.append(f"  TOTAL (con IVA):           ${comprobante['total_con_iva']:,.0f}")
+    texto.append("")
+    texto.append("-" * 50)
+    texto.append("")
+
+    # Información de pago
+    if comprobante['monto_pagado']:
+        texto.append(f"  Medio de pago:            {comprobante['medio_pago_display']}")
+        texto.append(f"  Pago recibido:            ${comprobante['monto_pagado']:,.0f}")
+        if comprobante['medio_pago'] == 'efectivo' and comprobante['vuelto']:
+            texto.append(f"  Vuelto:                   ${comprobante['vuelto']:,.0f}")
+        texto.append("")
+
+    texto.append("=" * 50)
+    texto.append("")
+    texto.append("          ¡Gracias por su compra!")
+    texto.append("      Visite nuestras redes sociales")
+    texto.append("             @LaForneria")
+    texto.append("")
+    texto.append("=" * 50)
+
+    return '\n'.join(texto).encode('utf-8')
+
+
+def generar_html(comprobante):
+    """
+    Genera el cuerpo HTML del comprobante (la página lo incluye tal cual).
+
+    Args:
+        comprobante: dict retornado por preparar_comprobante()
+
+    Returns:
+        bytes: Fragmento HTML en UTF-8
+    """
+    return render_to_string('includes/comprobante_cuerpo.html', {'comprobante': comprobante}).encode('utf-8')
+
+
+GENERADORES = {
+    'pdf': generar_pdf,
+    'html': generar_html,
+    'txt': generar_texto,
+}
+
+
+# ================================================================
+# =                 OBTENER Y PRE-GENERAR                        =
+# ================================================================
+
+def obtener_comprobante(venta_id, datos_boleta, formato, huella=None):
+    """
+    Retorna el comprobante guardado; si no existe, lo genera y lo guarda.
+
+    Args:
+        venta_id: ID de la venta
+        datos_boleta: Snapshot de la boleta
+        formato: 'pdf', 'html' o 'txt'
+        huella: huella_boleta(datos_boleta), si ya se calculó
+
+    Returns:
+        Archivo binario abierto (el llamador lo cierra, FileResponse lo hace solo)
+    """
+    huella = huella or huella_boleta(datos_boleta)
+    clave = clave_comprobante(venta_id, huella, formato)
+    almacen = obtener_almacen()
+
+    archivo = almacen.abrir(clave)
+    if archivo is not None:
+        return archivo
+
+    contenido = GENERADORES[formato](preparar_comprobante(venta_id, datos_boleta))
+    try:
+        almacen.guardar(clave, contenido)
+    except Exception as e:
+        # Sin almacén igual se entrega el comprobante
+        logger.warning(f'[COMPROBANTES] No se pudo guardar {clave}: {e}')
+    return BytesIO(contenido)
+
+
+def generar_comprobantes(venta_id, datos_boleta):
+    """
+    Genera y guarda todos los formatos del comprobante de una venta.
+
+    Args:
+        venta_id: ID de la venta
+        datos_boleta: Snapshot de la boleta
+    """
+    huella = huella_boleta(datos_boleta)
+    almacen = obtener_almacen()
+    comprobante = preparar_comprobante(venta_id, datos_boleta)
+
+    for formato, generador in GENERADORES.items():
+        if formato == 'pdf' and not REPORTLAB_AVAILABLE:
+            continue
+        clave = clave_comprobante(venta_id, huella, formato)
+        try:
+            if not almacen.existe(clave):
+                almacen.guardar(clave, generador(comprobante))
+        except Exception as e:
+            logger.error(f'[COMPROBANTES] Error al generar {clave}: {e}', exc_info=True)
+
+
+_ejecutor = None
+_ejecutor_lock = threading.Lock()
+
+
+def _obtener_ejecutor():
+    global _ejecutor
+    with _ejecutor_lock:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='comprobantes')
+        return _ejecutor
+
+
+def programar_comprobantes(venta_id, datos_boleta):
+    """
+    Pre-genera los comprobantes de una venta cuando se confirme la transacción.
+
+    La generación corre en un hilo aparte y no usa la base de datos (solo
+    el snapshot), así la respuesta del checkout no espera a ReportLab. Si
+    algo falla, el comprobante se genera igual en la primera descarga.
+
+    Args:
+        venta_id: ID de la venta
+        datos_boleta: Snapshot de la boleta
+    """
+    transaction.on_commit(
+        lambda: _obtener_ejecutor().submit(generar_comprobantes, venta_id, datos_boleta)
+    )
@@ -0,0 +1,353 @@
+# ================================================================
+# =                                                              =
+# =        EXPORTACIONES EN SEGUNDO PLANO (COLA DE TRABAJOS)    =
+# =                                                              =
+# ================================================================
+#
+# Los reportes grandes no se exportan dentro de la petición web (que
+# puede tardar minutos y ocupa un worker del servidor). En su lugar:
+#
+# 1. La página pide la exportación: se crea una fila en
+#    trabajos_exportacion (estado 'pendiente') y se retorna su ID
+# 2. Un pool de hilos del mismo proceso toma los trabajos pendientes de
+#    la tabla (la tabla ES la cola: no hay broker externo), genera el
+#    archivo en settings.EXPORTACIONES_DIR y guarda el avance
+# 3. La página consulta el estado hasta que el trabajo termina y
+#    descarga el archivo
+# 4. Los archivos vencidos (settings.EXPORTACIONES_HORAS_VIGENCIA) se
+#    borran al terminar cada trabajo y con `python manage.py limpiar_exportaciones`
+#
+# Tomar un trabajo es un UPDATE condicional (pendiente -> en_proceso):
+# aunque haya varios procesos, cada trabajo se genera una sola vez.
+#
+# Si el servidor se reinicia, los trabajos pendientes (o a medias) ya no
+# tienen un hilo que los procese. Igual que en las acciones masivas, la
+# cola se vuelve a despachar cuando la página consulta el estado (o con
+# `python manage.py procesar_exportaciones`): los pendientes se toman y
+# los que dejaron de avanzar se retoman desde el principio.
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from ventas.models import TrabajoExportacion
+from ventas.utils.exportadores import escribir_exportacion
+import os
+import shutil
+import tempfile
+import threading
+import logging
+
+logger = logging.getLogger('ventas')
+
+# Reportes que se pueden exportar en segundo plano: tipo -> función que
+# recibe los parámetros (dict) y retorna filas, contar, titulo,
+# nombre_archivo y encabezados_pdf (ver preparar_exportacion_ventas)
+TIPOS_EXPORTACION = {
+    'ventas': 'ventas.views.view_reportes_ventas.preparar_exportacion_ventas',
+    'inventario': 'ventas.views.view_reportes_inventario.preparar_exportacion_inventario',
+    'top_productos': 'ventas.views.view_top_productos.preparar_exportacion_top_productos',
+}
+
+FORMATOS_EXPORTACION = [formato for formato, _ in TrabajoExportacion.FORMATO_CHOICES]
+
+# Cada cuántas filas se guarda el avance del trabajo
+INTERVALO_AVANCE = 500
+
+# Un trabajo 'en_proceso' sin avance por más tiempo que esto se retoma
+# (el proceso que lo generaba murió o se reinició). Es más largo que en las
+# acciones masivas: guardar un Excel o armar un PDF grande no avanza filas
+TIEMPO_SIN_AVANCE = timedelta(minutes=10)
+
+# Un trabajo que no terminó una hora después de pedirlo ya no se retoma:
+# se marca con error (por ejemplo, hace caer al servidor cada vez)
+TIEMPO_MAXIMO_TRABAJO = timedelta(hours=1)
+
+
+class TrabajoRetomado(Exception):
+    """Otro proceso retomó el trabajo: este deja de generarlo."""
+
+
+def filas_maximas_sincronas():
+    """
+    Sobre esta cantidad de filas, las páginas de reportes exportan en segundo plano.
+    """
+    return settings.EXPORTACION_FILAS_SINCRONA
+
+
+def _directorio():
+    return Path(settings.EXPORTACIONES_DIR)
+
+
+# ================================================================
+# =                 ENCOLAR Y PROCESAR                           =
+# ================================================================
+
+_ejecutor = None
+_ejecutor_lock = threading.Lock()
+
+
+def _obtener_ejecutor():
+    global _ejecutor
+    with _ejecutor_lock:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(
+                max_workers=settings.EXPORTACIONES_WORKERS,
+                thread_name_prefix='exportaciones',
+            )
+        return _ejecutor
+
+
+def despachar_cola():
+    """
+    Pide al pool de exportaciones que procese la cola (después del commit).
+    """
+    # El hilo debe ver el trabajo: despachar después del commit
+    transaction.on_commit(lambda: _obtener_ejecutor().submit(procesar_cola))
+
+
+def encolar_exportacion(usuario, tipo, formato, parametros):
+    """
+    Crea un trabajo de exportación y lo deja en la cola.
+
+    Args:
+        usuario: User que pide la exportación
+        tipo: Clave de TIPOS_EXPORTACION ('ventas', 'inventario', 'top_productos')
+        formato: 'excel', 'pdf' o 'csv'
+        parametros: dict con los filtros del reporte
+
+    Returns:
+        TrabajoExportacion: El trabajo creado (estado 'pendiente')
+
+    Raises:
+        ValueError: Si el tipo o el formato no existen
+    """
+    if tipo not in TIPOS_EXPORTACION:
+        raise ValueError(f'Tipo de exportación desconocido: {tipo}')
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f'Formato de exportación desconocido: {formato}')
+
+    trabajo = TrabajoExportacion.objects.create(
+        usuario=usuario,
+        tipo=tipo,
+        formato=formato,
+        parametros=parametros,
+    )
+
+    despachar_cola()
+    logger.info(f'[EXPORTACIONES] Trabajo {trabajo.id} encolado ({tipo} / {formato}) por {usuario}')
+    return trabajo
+
+
+def _filtro_detenidos(ahora):
+    """
+    Trabajos en proceso que dejaron de avanzar y aún se pueden retomar.
+    """
+    return Q(
+        estado='en_proceso',
+        actualizado__lt=ahora - TIEMPO_SIN_AVANCE,
+        creado__gte=ahora - TIEMPO_MAXIMO_TRABAJO,
+    )
+
+
+def trabajos_detenidos():
+    """
+    Trabajos en proceso que dejaron de avanzar (su proceso murió).
+    """
+    return TrabajoExportacion.objects.filter(_filtro_detenidos(timezone.now()))
+
+
+def _tomar_siguiente_trabajo():
+    """
+    Toma el trabajo pendiente (o detenido) más antiguo con un UPDATE condicional.
+
+    Returns:
+        TrabajoExportacion o None si no hay trabajos por procesar
+    """
+    while True:
+        candidato = TrabajoExportacion.objects.filter(
+            Q(estado='pendiente') | _filtro_detenidos(timezone.now())
+        ).order_by('id').values('id', 'estado', 'actualizado').first()
+        if candidato is None:
+            return None
+
+        ahora = timezone.now()
+        if candidato['estado'] == 'pendiente':
+            tomado = TrabajoExportacion.objects.filter(id=candidato['id'], estado='pendiente').update(
+                estado='en_proceso', iniciado=ahora, actualizado=ahora
+            )
+        else:
+            # Retomar desde el principio: solo si nadie lo tocó desde que se
+            # leyó. El nuevo `iniciado` identifica a quién lo genera ahora
+            tomado = TrabajoExportacion.objects.filter(
+                id=candidato['id'], estado='en_proceso', actualizado=candidato['actualizado']
+            ).update(iniciado=ahora, actualizado=ahora, filas_procesadas=0)
+            if tomado:
+                logger.warning(f'[EXPORTACIONES] Trabajo {candidato["id"]} retomado (estaba detenido)')
+        if tomado:
+            return TrabajoExportacion.objects.get(id=candidato['id'])
+        # Otro hilo lo tomó primero: intentar con el siguiente
+
+
+def procesar_cola():
+    """
+    Genera los trabajos pendientes (y retoma los detenidos) hasta vaciar la cola.
+
+    Se ejecuta en un hilo del pool (ver despachar_cola). Al terminar
+    borra las exportaciones vencidas.
+
+    Returns:
+        int: Cantidad de trabajos procesados
+    """
+    procesados = 0
+    try:
+        while True:
+            trabajo = _tomar_siguiente_trabajo()
+            if trabajo is None:
+                break
+            ejecutar_trabajo(trabajo)
+            procesados += 1
+        limpiar_exportaciones_vencidas()
+    except Exception as e:
+        logger.error(f'[EXPORTACIONES] Error en la cola de exportaciones: {e}', exc_info=True)
+    finally:
+        # El hilo no pasa por el ciclo de petición de Django
+        close_old_connections()
+    return procesados
+
+
+def _del_proceso(trabajo):
+    """
+    QuerySet del trabajo mientras lo siga generando este proceso (mismo `iniciado`).
+    """
+    return TrabajoExportacion.objects.filter(id=trabajo.id, iniciado=trabajo.iniciado)
+
+
+def _con_avance(trabajo, filas):
+    """
+    Recorre las filas guardando cada INTERVALO_AVANCE filas el avance del trabajo.
+
+    Raises:
+        TrabajoRetomado: Si otro proceso retomó el trabajo
+    """
+    procesadas = 0
+    for fila in filas:
+        yield fila
+        procesadas += 1
+        if procesadas % INTERVALO_AVANCE == 0:
+            if not _del_proceso(trabajo).update(filas_procesadas=procesadas, actualizado=timezone.now()):
+                raise TrabajoRetomado()
+    _del_proceso(trabajo).update(filas_procesadas=procesadas, actualizado=timezone.now())
+
+
+def ejecutar_trabajo(trabajo):
+    """
+    Genera el archivo de un trabajo ya tomado (estado 'en_proceso').
+
+    Args:
+        trabajo: TrabajoExportacion
+    """
+    try:
+        exportacion = import_string(TIPOS_EXPORTACION[trabajo.tipo])(trabajo.parametros)
+        _del_proceso(trabajo).update(total_filas=exportacion['contar'](), actualizado=timezone.now())
+
+        directorio = _directorio() / str(trabajo.id)
+        directorio.mkdir(parents=True, exist_ok=True)
+
+        # Escribir a un temporal y renombrar: nunca se descarga un archivo a medias
+        descriptor, temporal = tempfile.mkstemp(dir=directorio, prefix='.tmp-')
+        try:
+            with os.fdopen(descriptor, 'wb') as archivo:
+                extension, content_type = escribir_exportacion(
+                    archivo,
+                    trabajo.formato,
+                    _con_avance(trabajo, exportacion['filas']),
+                    exportacion['titulo'],
+                    exportacion.get('encabezados_pdf'),
+                )
+            nombre_archivo = f"{exportacion['nombre_archivo']}.{extension}"
+            os.replace(temporal, directorio / nombre_archivo)
+        except Exception:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+
+        ahora = timezone.now()
+        horas_vigencia = settings.EXPORTACIONES_HORAS_VIGENCIA
+        _del_proceso(trabajo).update(
+            estado='terminado',
+            archivo=f'{trabajo.id}/{nombre_archivo}',
+            nombre_archivo=nombre_archivo,
+            content_type=content_type,
+            terminado=ahora,
+            expira=ahora + timedelta(hours=horas_vigencia),
+        )
+        logger.info(f'[EXPORTACIONES] Trabajo {trabajo.id} terminado: {nombre_archivo}')
+
+    except TrabajoRetomado:
+        logger.warning(f'[EXPORTACIONES] Trabajo {trabajo.id} lo continúa otro proceso')
+
+    except Exception as e:
+        logger.error(f'[EXPORTACIONES] Error en el trabajo {trabajo.id}: {e}', exc_info=True)
+        ahora = timezone.now()
+        _del_proceso(trabajo).update(
+            estado='error',
+            mensaje_error=str(e)[:1000],
+            terminado=ahora,
+            expira=ahora + timedelta(hours=settings.EXPORTACIONES_HORAS_VIGENCIA),
+        )
+
+
+# ================================================================
+# =                 ARCHIVOS Y LIMPIEZA                          =
+# ================================================================
+
+def ruta_archivo(trabajo):
+    """
+    Ruta en disco del archivo de un trabajo terminado (o None).
+    """
+    if not trabajo.archivo:
+        return None
+    return _directorio() / trabajo.archivo
+
+
+def limpiar_exportaciones_vencidas(dry_run=False):
+    """
+    Borra los trabajos vencidos (y sus archivos) y marca como error los
+    abandonados (en proceso TIEMPO_MAXIMO_TRABAJO después de pedirlos).
+
+    Args:
+        dry_run: Solo contar, sin borrar ni modificar
+
+    Returns:
+        dict: {'vencidos': int, 'abandonados': int}
+    """
+    ahora = timezone.now()
+
+    abandonados = TrabajoExportacion.objects.filter(
+        estado='en_proceso', creado__lt=ahora - TIEMPO_MAXIMO_TRABAJO
+    )
+    vencidos = TrabajoExportacion.objects.filter(expira__lt=ahora)
+
+    if dry_run:
+        return {'vencidos': vencidos.count(), 'abandonados': abandonados.count()}
+
+    num_abandonados = abandonados.update(
+        estado='error',
+        mensaje_error='La exportación no terminó (el servidor se reinició o tardó demasiado)',
+        terminado=ahora,
+        expira=ahora + timedelta(hours=settings.EXPORTACIONES_HORAS_VIGENCIA),
+    )
+
+    ids_vencidos = list(vencidos.values_list('id', flat=True))
+    for trabajo_id in ids_vencidos:
+        shutil.rmtree(_directorio() / str(trabajo_id), ignore_errors=True)
+    if ids_vencidos:
+        TrabajoExportacion.objects.filter(id__in=ids_vencidos).delete()
+        logger.info(f'[EXPORTACIONES] {len(ids_vencidos)} exportación(es) vencida(s) borrada(s)')
+
+    return {'vencidos': len(ids_vencidos), 'abandonados': num_abandonados}
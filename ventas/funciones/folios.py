@@ -0,0 +1,113 @@
+# ================================================================
+# =                                                              =
+# =        FOLIOS DE BOLETA (SECUENCIA POR BLOQUES)             =
+# =                                                              =
+# ================================================================
+#
+# Antes el folio era BOL-<fecha y hora hasta el segundo>: dos cajas que
+# cerraban una venta en el mismo segundo obtenían el mismo folio.
+#
+# Ahora los folios salen de la tabla secuencias_folio:
+#
+# 1. Cada proceso del servidor reserva un bloque de FOLIOS_TAMANO_BLOQUE
+#    números en una transacción corta y propia (bloquea la fila del
+#    contador, le suma el bloque y hace commit)
+# 2. Las ventas toman números de ese bloque en memoria, sin consultar
+#    la base de datos; al agotarse se reserva el siguiente bloque
+#
+# Así las ventas no esperan todas a la misma fila. Si un proceso se
+# reinicia, los números que no usó de su bloque se pierden: la
+# numeración puede tener saltos, pero nunca repetidos (además ventas.folio
+# e historial_boletas.folio son UNIQUE, ver sql_secuencias_folio.sql).
+
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from ventas.models import SecuenciaFolio
+import os
+import threading
+import logging
+
+logger = logging.getLogger('ventas')
+
+SECUENCIA_BOLETA = 'boleta'
+
+# Prefijo y largo del número de cada secuencia (BOL-00000001)
+FORMATO_FOLIO = {
+    SECUENCIA_BOLETA: 'BOL-{:08d}',
+}
+
+# Bloque reservado por este proceso: {secuencia: {'pid', 'siguiente', 'limite'}}
+_bloques = {}
+_bloques_lock = threading.Lock()
+
+
+def reservar_bloque(nombre, tamano):
+    """
+    Reserva `tamano` números de una secuencia en una transacción propia.
+
+    Args:
+        nombre: Nombre de la secuencia (ej: 'boleta')
+        tamano: Cantidad de números a reservar
+
+    Returns:
+        tuple: (primero, limite) - números reservados: primero <= n < limite
+    """
+    # Transacción propia y corta: el bloqueo de la fila dura solo este UPDATE,
+    # no toda la venta (por eso no se puede llamar dentro de otra transacción)
+    if transaction.get_connection().in_atomic_block:
+        raise RuntimeError('reservar_bloque() debe llamarse fuera de una transacción')
+
+    for intento in range(2):
+        try:
+            with transaction.atomic():
+                secuencia = SecuenciaFolio.objects.select_for_update().filter(nombre=nombre).first()
+                if secuencia is None:
+                    # Primera vez: crear la fila (si otro proceso la crea
+                    # al mismo tiempo, IntegrityError y se reintenta)
+                    secuencia = SecuenciaFolio.objects.create(nombre=nombre, siguiente=1)
+                    secuencia = SecuenciaFolio.objects.select_for_update().get(pk=secuencia.pk)
+
+                primero = secuencia.siguiente
+                secuencia.siguiente = primero + tamano
+                secuencia.save(update_fields=['siguiente'])
+        except IntegrityError:
+            if intento:
+                raise
+            continue
+
+        logger.info(f'[FOLIOS] Bloque reservado para {nombre}: {primero} a {primero + tamano - 1} (pid {os.getpid()})')
+        return primero, primero + tamano
+
+
+def siguiente_numero(nombre=SECUENCIA_BOLETA):
+    """
+    Entrega el siguiente número de la secuencia desde el bloque de este proceso.
+
+    Args:
+        nombre: Nombre de la secuencia
+
+    Returns:
+        int: Número no usado antes (puede haber saltos, nunca repetidos)
+    """
+    with _bloques_lock:
+        bloque = _bloques.get(nombre)
+
+        # Un proceso hijo (fork) no puede usar el bloque del proceso padre
+        if bloque is None or bloque['pid'] != os.getpid() or bloque['siguiente'] >= bloque['limite']:
+            primero, limite = reservar_bloque(nombre, max(1, settings.FOLIOS_TAMANO_BLOQUE))
+            bloque = {'pid': os.getpid(), 'siguiente': primero, 'limite': limite}
+            _bloques[nombre] = bloque
+
+        numero = bloque['siguiente']
+        bloque['siguiente'] += 1
+        return numero
+
+
+def siguiente_folio(nombre=SECUENCIA_BOLETA):
+    """
+    Genera el folio de una nueva boleta.
+
+    Returns:
+        str: Folio con formato (ej: 'BOL-00000123')
+    """
+    return FORMATO_FOLIO[nombre].format(siguiente_numero(nombre))
@@ -7,6 +7,8 @@
 from django import forms
 from ventas.models import Productos, Lote
 from ventas.funciones.validators import validador_fecha_no_futuro
+from ventas.funciones.stock import actualizar_resumen_stock
+from django.db import transaction
 from django.utils import timezone
 from datetime import date
 from decimal import Decimal
@@ -132,41 +134,24 @@ class LoteProduccionForm(forms.ModelForm):
         instance.fecha_recepcion = timezone.now()
         
         if commit:
-            instance.save()
-            
-            # Actualizar cantidad del producto (sumar el nuevo lote) - manejar Decimal
-            cantidad_producto = Decimal(str(producto.cantidad)) if producto.cantidad else Decimal('0')
-            cantidad_lote = Decimal(str(instance.cantidad))
-            producto.cantidad = cantidad_producto + cantidad_lote
-            
-            stock_actual = Decimal(str(producto.stock_actual)) if producto.stock_actual is not None else Decimal('0')
-            producto.stock_actual = stock_actual + cantidad_lote
-            
-            # Si el producto estaba en merma y ahora tiene lotes activos, reactivarlo
-            if producto.estado_merma == 'en_merma':
-                from ventas.models import Lote
-                tiene_lotes_activos = Lote.objects.filter(
-                    productos=producto,
-                    estado='activo',
-                    cantidad__gt=0
-                ).exists()
+            with transaction.atomic():
+                instance.save()
                 
-                if tiene_lotes_activos:
-                    # Reactivar el producto automáticamente
+                stock_actual = Decimal(str(producto.stock_actual)) if producto.stock_actual is not None else Decimal('0')
+                producto.stock_actual = stock_actual + Decimal(str(instance.cantidad))
+                
+                # Actualizar cantidad, lotes activos y caducidad del producto desde lotes
+                actualizar_resumen_stock(producto, guardar=False)
+                
+                # Si el producto estaba en merma y ahora tiene lotes activos, reactivarlo
+                if producto.estado_merma == 'en_merma' and producto.lotes_activos > 0:
                     producto.estado_merma = 'activo'
-                    # Actualizar fecha de caducidad con la del lote más antiguo (FIFO)
-                    lote_mas_antiguo = Lote.objects.filter(
-                        productos=producto,
-                        estado='activo',
-                        cantidad__gt=0
-                    ).order_by('fecha_caducidad', 'fecha_recepcion').first()
-                    
-                    if lote_mas_antiguo:
-                        producto.caducidad = lote_mas_antiguo.fecha_caducidad
-                        if lote_mas_antiguo.fecha_elaboracion:
-                            producto.elaboracion = lote_mas_antiguo.fecha_elaboracion
-            
-            producto.save()
+                    # Elaboración del lote más antiguo (FIFO), igual que la caducidad
+                    lote_mas_antiguo = producto.obtener_lote_mas_antiguo()
+                    if lote_mas_antiguo and lote_mas_antiguo.fecha_elaboracion:
+                        producto.elaboracion = lote_mas_antiguo.fecha_elaboracion
+                
+                producto.save()
             
             # Crear movimiento de inventario
             try:
@@ -168,28 +168,26 @@ class ClienteRapidoForm(forms.ModelForm):
 
 class SeleccionarClienteForm(forms.Form):
     """
-    Formulario simple para seleccionar un cliente existente
-    desde un dropdown (lista desplegable).
+    Formulario simple para seleccionar un cliente existente.
+    
+    El cliente se elige con el buscador (/api/clientes/buscar/), que deja
+    su ID en un campo oculto. Así el formulario nunca dibuja la tabla
+    completa de clientes como opciones de un dropdown.
     """
     
     # --- Campo: Cliente ---
-    # Este es un campo que mostrará una lista desplegable con todos los clientes
+    # Valida el ID recibido contra la tabla clientes (una consulta por ID)
     cliente = forms.ModelChoiceField(
-        # Traemos todos los clientes de la base de datos, ordenados alfabéticamente
-        queryset=Clientes.objects.all().order_by('nombre'),
-        
-        # Texto que aparece cuando no hay nada seleccionado
-        empty_label="-- Seleccionar cliente --",
+        queryset=Clientes.objects.all(),
         
-        # Es obligatorio seleccionar uno
+        # No es obligatorio seleccionar uno
         required=False,
         
         # Texto que aparece sobre el campo
         label="Cliente",
         
-        # Cómo se ve el campo (dropdown con estilo Bootstrap)
-        widget=forms.Select(attrs={
-            'class': 'form-select',      # Clase CSS de Bootstrap 5
+        # Campo oculto: lo llena el buscador de clientes con JavaScript
+        widget=forms.HiddenInput(attrs={
             'id': 'id_cliente_select',   # ID único para JavaScript
         })
     )
@@ -7,6 +7,8 @@
 # Este archivo contiene funciones auxiliares para gestionar
 # el historial de boletas emitidas.
 
+from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
 from ventas.models import HistorialBoletas, Ventas, DetalleVenta
 import json
@@ -15,63 +17,88 @@ import logging
 logger = logging.getLogger('ventas')
 
 
-def guardar_historial_boleta(venta, usuario_emisor=None):
+def construir_datos_boleta(venta, detalles):
+    """
+    Construye el diccionario con todos los datos de la boleta (snapshot).
+    
+    Es el mismo formato que se guarda en HistorialBoletas.datos_boleta y
+    el que usan los comprobantes (ver ventas/funciones/comprobantes.py).
+    
+    Args:
+        venta: Objeto Ventas
+        detalles: Iterable de DetalleVenta de la venta (con productos cargados)
+    
+    Returns:
+        dict: {'cabecera': {...}, 'detalles': [...]}
+    """
+    datos_boleta = {
+        'cabecera': {
+            'folio': venta.folio,
+            'fecha': venta.fecha.isoformat() if venta.fecha else None,
+            'canal_venta': venta.canal_venta,
+            'cliente': {
+                'id': venta.clientes.id if venta.clientes else None,
+                'nombre': venta.clientes.nombre if venta.clientes else 'Cliente Genérico',
+                'rut': venta.clientes.rut if venta.clientes and hasattr(venta.clientes, 'rut') else None,
+            },
+            'totales': {
+                'subtotal_sin_iva': str(venta.total_sin_iva),
+                'total_iva': str(venta.total_iva),
+                'descuento': str(venta.descuento),
+                'total_con_iva': str(venta.total_con_iva),
+            },
+            'pago': {
+                'medio_pago': venta.medio_pago if hasattr(venta, 'medio_pago') else 'efectivo',
+                'monto_pagado': str(venta.monto_pagado) if venta.monto_pagado else None,
+                'vuelto': str(venta.vuelto) if venta.vuelto else None,
+            }
+        },
+        'detalles': []
+    }
+    
+    # Agregar cada detalle de producto
+    for detalle in detalles:
+        datos_boleta['detalles'].append({
+            'producto': {
+                'id': detalle.productos.id,
+                'nombre': detalle.productos.nombre,
+                'marca': detalle.productos.marca if hasattr(detalle.productos, 'marca') else None,
+            },
+            'cantidad': str(detalle.cantidad),
+            'precio_unitario': str(detalle.precio_unitario),
+            'descuento_pct': str(detalle.descuento_pct) if hasattr(detalle, 'descuento_pct') else '0.00',
+            'subtotal': str(detalle.calcular_subtotal()) if hasattr(detalle, 'calcular_subtotal') else str(detalle.cantidad * detalle.precio_unitario),
+        })
+    
+    return datos_boleta
+
+
+def guardar_historial_boleta(venta, usuario_emisor=None, datos_boleta=None, num_productos=None):
     """
     Guarda un snapshot de la boleta en el historial.
     
-    Esta función se llama automáticamente después de crear una venta
-    para guardar todos los datos de la boleta en formato JSON.
+    El checkout del POS arma el snapshot en memoria (con las líneas y los
+    productos que ya tiene cargados) y lo guarda con esta función DESPUÉS
+    del commit (ver programar_historial_boleta). Sin snapshot, se arma
+    desde las tablas de la venta (ventas antiguas o reintentos).
     
     Args:
-        venta: Objeto Ventas que se acaba de crear
+        venta: Objeto Ventas (con el cliente cargado)
         usuario_emisor: Usuario que emitió la boleta (opcional)
+        datos_boleta: Snapshot ya construido (opcional)
+        num_productos: Cantidad de líneas del snapshot (opcional)
     
     Returns:
         HistorialBoletas: El objeto de historial creado, o None si hubo error
     """
     try:
-        # Obtener todos los detalles de la venta
-        detalles = DetalleVenta.objects.filter(ventas=venta).select_related('productos')
-        
-        # Construir el diccionario con todos los datos de la boleta
-        datos_boleta = {
-            'cabecera': {
-                'folio': venta.folio,
-                'fecha': venta.fecha.isoformat() if venta.fecha else None,
-                'canal_venta': venta.canal_venta,
-                'cliente': {
-                    'id': venta.clientes.id if venta.clientes else None,
-                    'nombre': venta.clientes.nombre if venta.clientes else 'Cliente Genérico',
-                    'rut': venta.clientes.rut if venta.clientes and hasattr(venta.clientes, 'rut') else None,
-                },
-                'totales': {
-                    'subtotal_sin_iva': str(venta.total_sin_iva),
-                    'total_iva': str(venta.total_iva),
-                    'descuento': str(venta.descuento),
-                    'total_con_iva': str(venta.total_con_iva),
-                },
-                'pago': {
-                    'medio_pago': venta.medio_pago if hasattr(venta, 'medio_pago') else 'efectivo',
-                    'monto_pagado': str(venta.monto_pagado) if venta.monto_pagado else None,
-                    'vuelto': str(venta.vuelto) if venta.vuelto else None,
-                }
-            },
-            'detalles': []
-        }
-        
-        # Agregar cada detalle de producto
-        for detalle in detalles:
-            datos_boleta['detalles'].append({
-                'producto': {
-                    'id': detalle.productos.id,
-                    'nombre': detalle.productos.nombre,
-                    'marca': detalle.productos.marca if hasattr(detalle.productos, 'marca') else None,
-                },
-                'cantidad': str(detalle.cantidad),
-                'precio_unitario': str(detalle.precio_unitario),
-                'descuento_pct': str(detalle.descuento_pct) if hasattr(detalle, 'descuento_pct') else '0.00',
-                'subtotal': str(detalle.calcular_subtotal()) if hasattr(detalle, 'calcular_subtotal') else str(detalle.cantidad * detalle.precio_unitario),
-            })
+        if datos_boleta is None:
+            # Obtener todos los detalles de la venta y construir el snapshot
+            detalles = list(DetalleVenta.objects.filter(ventas=venta).select_related('productos'))
+            datos_boleta = construir_datos_boleta(venta, detalles)
+            num_productos = len(detalles)
+        elif num_productos is None:
+            num_productos = len(datos_boleta.get('detalles', []))
         
         # Crear el registro en el historial
         historial = HistorialBoletas.objects.create(
@@ -80,7 +107,7 @@ def guardar_historial_boleta(venta, usuario_emisor=None):
             fecha_venta=venta.fecha,
             cliente_nombre=venta.clientes.nombre if venta.clientes else 'Cliente Genérico',
             total_con_iva=venta.total_con_iva,
-            num_productos=detalles.count(),
+            num_productos=num_productos,
             canal_venta=venta.canal_venta,
             datos_boleta=datos_boleta,
             usuario_emisor=usuario_emisor or (venta.clientes.nombre if venta.clientes else 'Sistema'),
@@ -92,10 +119,57 @@ def guardar_historial_boleta(venta, usuario_emisor=None):
         
     except Exception as e:
         # Si hay un error, registrar pero no fallar la venta
+        # (python manage.py reintentar_historial_boletas lo completa después)
         logger.error(f'Error al guardar historial de boleta para venta {venta.id}: {str(e)}', exc_info=True)
         return None
 
 
+def programar_historial_boleta(venta, datos_boleta, num_productos, usuario_emisor=None):
+    """
+    Guarda el snapshot de la boleta cuando se confirme la transacción del checkout.
+    
+    Así el INSERT del historial (con su JSON) no alarga la transacción
+    que tiene bloqueados los productos y lotes de la venta, y un error al
+    guardarlo no puede afectar a la venta. Si la venta se revierte, no se
+    guarda nada.
+    
+    Args:
+        venta: Objeto Ventas recién creado
+        datos_boleta: Snapshot construido en memoria (construir_datos_boleta)
+        num_productos: Cantidad de líneas de la venta
+        usuario_emisor: Usuario que emitió la boleta (opcional)
+    """
+    transaction.on_commit(
+        lambda: guardar_historial_boleta(
+            venta,
+            usuario_emisor=usuario_emisor,
+            datos_boleta=datos_boleta,
+            num_productos=num_productos,
+        )
+    )
+
+
+def ventas_sin_historial(desde=None):
+    """
+    Ventas que no tienen su snapshot en el historial de boletas.
+    
+    Son las ventas cuyo guardado después del commit falló (o que se
+    registraron antes de existir el historial).
+    
+    Args:
+        desde: datetime; solo ventas desde esa fecha (opcional)
+    
+    Returns:
+        QuerySet de Ventas ordenado por ID
+    """
+    ventas = Ventas.objects.filter(
+        ~Exists(HistorialBoletas.objects.filter(venta_id=OuterRef('pk')))
+    )
+    if desde is not None:
+        ventas = ventas.filter(fecha__gte=desde)
+    return ventas.order_by('id')
+
+
 def reconstruir_boleta_desde_historial(historial):
     """
     Reconstruye los datos de una boleta desde el historial.
@@ -0,0 +1,565 @@
+# ================================================================
+# =                                                              =
+# =        MERMA DE PRODUCTOS Y LOTES (OPERACIONES EN BLOQUE)   =
+# =                                                              =
+# ================================================================
+#
+# Dos operaciones que antes se hacían producto por producto:
+#
+# 1. MOVER A MERMA (inventario, individual o masivo)
+#    mover_a_merma() recibe los IDs de productos (o lotes específicos
+#    con la cantidad a descartar) y, en UNA transacción, con un número
+#    fijo de consultas sin importar cuántos productos sean:
+#      - bloquea los productos y sus lotes activos (mismo orden que el
+#        checkout del POS)
+#      - retira los lotes completos con un UPDATE y descuenta los
+#        parciales con un bulk_update
+#      - guarda el historial de merma y los movimientos con bulk_create
+#      - recalcula en memoria el resumen de stock de cada producto (ya
+#        tiene sus lotes cargados) y lo guarda con un bulk_update
+#      - resuelve las alertas activas de esos productos
+#
+# 2. BARRIDO DE LOTES VENCIDOS (comando verificar_vencimientos)
+#    Antes el comando solo miraba la caducidad del producto y guardaba
+#    los productos vencidos uno por uno, sin tocar los lotes: los lotes
+#    vencidos seguían activos y el FIFO los vendía.
+#
+#    Aquí el barrido trabaja sobre los lotes, con el índice
+#    (estado, fecha_caducidad) de la tabla lotes (ver
+#    sql_indice_lotes_vencidos.sql):
+#
+#      SELECT id, productos_id FROM lotes
+#      WHERE estado = 'activo' AND fecha_caducidad < hoy AND id > :ultimo
+#      ORDER BY id LIMIT :bloque
+#
+#    Por cada bloque, en UNA transacción y con un número fijo de consultas:
+#      1. Bloquear los productos del bloque (ordenados por ID, igual que
+#         el checkout del POS, para no cruzar bloqueos con las ventas)
+#      2. Bloquear y releer los lotes (una venta pudo tomarlos entretanto)
+#      3. UPDATE de los lotes a estado 'vencido'
+#      4. bulk_create del historial de merma y de los movimientos (salida)
+#      5. Recalcular el resumen de stock de los productos del bloque con
+#         una consulta agrupada y guardarlo con bulk_update
+#
+#    El tiempo depende de la cantidad de lotes vencidos, no del tamaño
+#    del catálogo. Si el proceso se corta, los bloques ya confirmados
+#    quedan hechos y la siguiente ejecución sigue con los lotes que faltan.
+#
+#    Los productos antiguos (que nunca tuvieron lotes) vencidos se tratan
+#    igual, con su propia caducidad y cantidad: historial de merma y
+#    movimiento de salida por producto, y suman a los mismos totales.
+
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, Sum, Q, Exists, OuterRef, F
+from django.utils import timezone
+from ventas.models import Productos, Lote, HistorialMerma, MovimientosInventario, Alertas
+from ventas.funciones.stock import calcular_resumen_lotes, aplicar_resumen_lotes, CAMPOS_GUARDADO_STOCK
+from ventas.funciones.vencimientos import VALOR_LOTE, VALOR_PRODUCTO
+import logging
+
+logger = logging.getLogger('ventas')
+
+# Lotes por transacción del barrido
+TAMANO_BLOQUE_VENCIMIENTOS = 500
+
+# Campos de merma del producto que quedó sin stock
+CAMPOS_MERMA_PRODUCTO = ['estado_merma', 'motivo_merma', 'fecha_merma', 'cantidad_merma', 'elaboracion']
+
+
+# ================================================================
+# =              MOVER PRODUCTOS O LOTES A MERMA                 =
+# ================================================================
+
+def _cantidades_por_lote(lotes):
+    """
+    Normaliza la selección de lotes {lote_id, cantidad} recibida desde el inventario.
+
+    Returns:
+        dict: {lote_id: Decimal} solo con cantidades válidas (mayores a 0)
+    """
+    cantidades = {}
+    for lote_data in lotes:
+        try:
+            lote_id = int(lote_data.get('lote_id'))
+            cantidad = Decimal(str(lote_data.get('cantidad', 0)))
+        except (TypeError, ValueError, ArithmeticError):
+            logger.warning(f'Lote inválido en la selección de merma: {lote_data}')
+            continue
+        if cantidad <= Decimal('0'):
+            logger.warning(f'Cantidad inválida para lote {lote_id}: {cantidad}. Debe ser mayor a 0. Se omite este lote.')
+            continue
+        cantidades[lote_id] = cantidad
+    return cantidades
+
+
+def mover_a_merma(motivo_merma, producto_ids, lotes=None):
+    """
+    Mueve productos (todo su stock) o lotes específicos a merma.
+
+    Debe llamarse dentro de una transacción (transaction.atomic): los
+    productos y lotes se bloquean hasta el commit.
+
+    Args:
+        motivo_merma: Motivo detallado de la merma
+        producto_ids: IDs de los productos
+        lotes: Opcional. Lista de {'lote_id', 'cantidad'} para descartar solo
+               parte de lotes específicos de esos productos. Si no se envía,
+               todos los lotes activos de cada producto pasan a merma.
+
+    Returns:
+        dict: {'productos', 'lotes', 'cantidad', 'productos_con_stock', 'alertas_resueltas'}
+    """
+    ahora = timezone.now()
+    cantidades_lote = _cantidades_por_lote(lotes or [])
+    por_lotes = bool(lotes)
+
+    # --- Consulta 1: bloquear los productos (ordenados por ID, igual que el checkout) ---
+    productos = {
+        p.id: p for p in Productos.objects.select_for_update().filter(
+            pk__in=list(producto_ids),
+            eliminado__isnull=True,
+        ).order_by('pk')
+    }
+
+    # --- Consulta 2: bloquear todos sus lotes activos (orden FIFO) ---
+    lotes_por_producto = defaultdict(list)
+    for lote in Lote.objects.select_for_update().filter(
+        productos_id__in=list(productos.keys()),
+        estado='activo',
+    ).order_by('productos_id', 'fecha_caducidad', 'fecha_recepcion'):
+        lotes_por_producto[lote.productos_id].append(lote)
+
+    # Aplicar la merma en memoria
+    retirados = []      # lotes que pasan completos a merma
+    parciales = []      # lotes a los que se les descuenta una parte
+    movimientos = []
+    mermas = []
+    cantidad_por_producto = {}
+
+    for producto in productos.values():
+        lotes_producto = lotes_por_producto[producto.id]
+        cantidad_original = producto.cantidad or Decimal('0')
+        cantidad_merma = Decimal('0')
+
+        if por_lotes:
+            # Solo los lotes seleccionados de este producto
+            seleccion = [l for l in lotes_producto if l.id in cantidades_lote]
+            for lote in seleccion:
+                cantidad = cantidades_lote[lote.id]
+                if cantidad > lote.cantidad:
+                    logger.warning(f'Cantidad excede lo disponible para lote {lote.id}: solicitado={cantidad}, disponible={lote.cantidad}. Se ajusta al máximo disponible.')
+                    cantidad = lote.cantidad
+                if cantidad < Decimal('1'):
+                    logger.warning(f'Cantidad inválida para lote {lote.id}: {cantidad}. Debe ser al menos 1. Se omite este lote.')
+                    continue
+                if cantidad >= lote.cantidad:
+                    lote.estado = 'en_merma'
+                    retirados.append(lote)
+                else:
+                    parciales.append(lote)
+                lote.cantidad -= cantidad
+                cantidad_merma += cantidad
+                movimientos.append(MovimientosInventario(
+                    tipo_movimiento='salida',
+                    cantidad=cantidad,
+                    productos=producto,
+                    origen='merma',
+                    referencia_id=lote.id,
+                    tipo_referencia='lote',
+                ))
+            if cantidad_merma == 0:
+                # Ningún lote válido de este producto en la selección
+                continue
+        else:
+            # Todo el stock del producto: sus lotes activos pasan completos a merma
+            for lote in lotes_producto:
+                if lote.cantidad > 0:
+                    cantidad_merma += lote.cantidad
+                    movimientos.append(MovimientosInventario(
+                        tipo_movimiento='salida',
+                        cantidad=lote.cantidad,
+                        productos=producto,
+                        origen='merma',
+                        referencia_id=lote.id,
+                        tipo_referencia='lote',
+                    ))
+                lote.cantidad = Decimal('0')
+                lote.estado = 'en_merma'
+                retirados.append(lote)
+            if not lotes_producto:
+                # Producto sin lotes activos: se descarta su cantidad directa
+                cantidad_merma = cantidad_original
+
+        cantidad_por_producto[producto.id] = cantidad_merma
+
+        # Resumen de stock desde los lotes que quedan (ya están en memoria)
+        vigentes = [l for l in lotes_producto if l.estado == 'activo' and l.cantidad > 0]
+        aplicar_resumen_lotes(producto, vigentes)
+        producto.modificado = ahora
+        producto.elaboracion = vigentes[0].fecha_elaboracion if vigentes else None
+
+        producto.estado_merma = 'activo' if producto.cantidad > 0 else 'en_merma'
+        producto.motivo_merma = motivo_merma
+        producto.fecha_merma = ahora
+        producto.cantidad_merma = cantidad_merma
+
+        # HistorialMerma exige cantidad mínima 0.001 (producto ya sin stock)
+        mermas.append(HistorialMerma(
+            producto=producto,
+            cantidad_merma=cantidad_merma if cantidad_merma > 0 else Decimal('0.001'),
+            motivo_merma=motivo_merma,
+            fecha_merma=ahora,
+            activo=True,
+        ))
+
+    procesados = [productos[producto_id] for producto_id in cantidad_por_producto]
+
+    # --- Consultas 3 y 4: lotes retirados (un UPDATE) y parciales (un bulk_update) ---
+    if retirados:
+        Lote.objects.filter(id__in=[l.id for l in retirados]).update(
+            estado='en_merma', cantidad=Decimal('0'), modificado=ahora
+        )
+    if parciales:
+        for lote in parciales:
+            lote.modificado = ahora
+        Lote.objects.bulk_update(parciales, ['cantidad', 'modificado'])
+
+    # --- Consultas 5 y 6: historial de merma y movimientos ---
+    HistorialMerma.objects.bulk_create(mermas)
+    MovimientosInventario.objects.bulk_create(movimientos)
+
+    # --- Consulta 7: productos (resumen de stock y datos de merma) ---
+    if procesados:
+        Productos.objects.bulk_update(procesados, CAMPOS_GUARDADO_STOCK + CAMPOS_MERMA_PRODUCTO)
+
+    # --- Consulta 8: resolver las alertas activas (el producto ya está en merma) ---
+    alertas_resueltas = 0
+    if procesados:
+        alertas_resueltas = Alertas.objects.filter(
+            productos_id__in=[p.id for p in procesados],
+            estado='activa',
+        ).update(estado='resuelta')
+
+    logger.info(
+        f'Merma registrada: {len(procesados)} producto(s), {len(retirados) + len(parciales)} lote(s), '
+        f'cantidad {sum(cantidad_por_producto.values(), Decimal("0"))}'
+    )
+
+    return {
+        'productos': len(procesados),
+        'lotes': len(retirados) + len(parciales),
+        'cantidad': sum(cantidad_por_producto.values(), Decimal('0')),
+        'productos_con_stock': sum(1 for p in procesados if p.cantidad > 0),
+        'alertas_resueltas': alertas_resueltas,
+    }
+
+
+# ================================================================
+# =              BARRIDO DE LOTES VENCIDOS                       =
+# ================================================================
+
+def lotes_vencidos(hoy=None):
+    """
+    Lotes activos cuya fecha de caducidad ya pasó.
+
+    Args:
+        hoy: Fecha de referencia (por defecto, hoy en hora local)
+
+    Returns:
+        QuerySet: Lotes a vencer (sin orden)
+    """
+    hoy = hoy or timezone.localdate()
+    return Lote.objects.filter(estado='activo', fecha_caducidad__lt=hoy).order_by()
+
+
+def motivo_lote_vencido(lote):
+    """Motivo de merma de un lote vencido."""
+    return f'Lote #{lote.id} vencido (caducidad {lote.fecha_caducidad.strftime("%d/%m/%Y")})'
+
+
+def resumen_lotes_vencidos(hoy=None):
+    """
+    Cuenta los lotes vencidos y su valor en UNA consulta (para el modo simulación).
+
+    Returns:
+        dict: {'lotes', 'lotes_con_stock', 'productos', 'cantidad', 'valor'}
+    """
+    datos = lotes_vencidos(hoy).aggregate(
+        total_lotes=Count('id'),
+        total_con_stock=Count('id', filter=Q(cantidad__gt=0)),
+        total_productos=Count('productos_id', distinct=True),
+        total_cantidad=Sum('cantidad'),
+        total_valor=Sum(VALOR_LOTE),
+    )
+    return {
+        'lotes': datos['total_lotes'],
+        'lotes_con_stock': datos['total_con_stock'],
+        'productos': datos['total_productos'],
+        'cantidad': datos['total_cantidad'] or Decimal('0'),
+        'valor': datos['total_valor'] or Decimal('0'),
+    }
+
+
+def _vencer_bloque(lote_ids, producto_ids, hoy, ahora):
+    """
+    Vence un bloque de lotes y actualiza sus productos (dentro de una transacción).
+
+    Returns:
+        dict: Totales del bloque
+    """
+    # --- Consulta 1: bloquear los productos (mismo orden que el checkout) ---
+    productos = {
+        p.id: p for p in Productos.objects.select_for_update().filter(
+            pk__in=producto_ids
+        ).order_by('pk')
+    }
+
+    # --- Consulta 2: bloquear y releer los lotes que siguen activos ---
+    lotes = list(
+        lotes_vencidos(hoy).select_for_update().filter(id__in=lote_ids).order_by('id')
+    )
+    if not lotes:
+        return None
+
+    # --- Consulta 3: un solo UPDATE para todo el bloque ---
+    Lote.objects.filter(id__in=[l.id for l in lotes]).update(estado='vencido', modificado=ahora)
+
+    # --- Consultas 4 y 5: historial de merma y movimientos ---
+    mermas = []
+    movimientos = []
+    cantidad_vencida = defaultdict(Decimal)
+    valor_total = Decimal('0')
+    for lote in lotes:
+        if lote.cantidad <= 0:
+            continue
+        producto = productos[lote.productos_id]
+        cantidad_vencida[producto.id] += lote.cantidad
+        valor_total += lote.cantidad * producto.precio
+        mermas.append(HistorialMerma(
+            producto=producto,
+            cantidad_merma=lote.cantidad,
+            motivo_merma=motivo_lote_vencido(lote),
+            fecha_merma=ahora,
+            activo=True,
+        ))
+        movimientos.append(MovimientosInventario(
+            tipo_movimiento='salida',
+            cantidad=lote.cantidad,
+            productos=producto,
+            origen='merma',
+            referencia_id=lote.id,
+            tipo_referencia='lote',
+        ))
+    HistorialMerma.objects.bulk_create(mermas)
+    MovimientosInventario.objects.bulk_create(movimientos)
+
+    # --- Consulta 6: resumen de stock de todos los productos del bloque ---
+    resumen = calcular_resumen_lotes(list(productos.keys()))
+    sin_stock = []
+    for producto in productos.values():
+        datos = resumen.get(producto.id)
+        producto.cantidad = datos['cantidad']
+        producto.lotes_activos = datos['lotes_activos']
+        producto.caducidad = datos['caducidad']
+        producto.modificado = ahora
+
+        # Sin lotes activos: el producto pasa a merma (igual que al moverlo a mano)
+        if producto.lotes_activos == 0 and producto.estado_merma == 'activo' and cantidad_vencida[producto.id] > 0:
+            producto.estado_merma = 'en_merma'
+            producto.motivo_merma = 'Vencido (todos sus lotes vencieron)'
+            producto.fecha_merma = ahora
+            producto.cantidad_merma = cantidad_vencida[producto.id]
+            producto.elaboracion = None
+            sin_stock.append(producto)
+
+    # --- Consultas 7 a 9: guardar productos y resolver sus alertas ---
+    Productos.objects.bulk_update(list(productos.values()), CAMPOS_GUARDADO_STOCK)
+    if sin_stock:
+        Productos.objects.bulk_update(sin_stock, CAMPOS_MERMA_PRODUCTO)
+        Alertas.objects.filter(
+            productos_id__in=[p.id for p in sin_stock],
+            estado='activa',
+        ).update(estado='resuelta')
+
+    return {
+        'lotes': len(lotes),
+        'lotes_con_stock': len(mermas),
+        'productos': set(productos.keys()),
+        'productos_en_merma': len(sin_stock),
+        'cantidad': sum(cantidad_vencida.values(), Decimal('0')),
+        'valor': valor_total,
+    }
+
+
+def productos_sin_lotes_vencidos(hoy=None):
+    """
+    Productos antiguos (que nunca tuvieron lotes) activos y con la caducidad vencida.
+
+    Returns:
+        QuerySet: Productos a mover a merma
+    """
+    hoy = hoy or timezone.localdate()
+    return Productos.objects.filter(
+        caducidad__lt=hoy,
+        estado_merma='activo',
+        eliminado__isnull=True,
+    ).exclude(
+        Exists(Lote.objects.filter(productos=OuterRef('pk')))
+    )
+
+
+def resumen_productos_sin_lotes_vencidos(hoy=None):
+    """
+    Cuenta los productos antiguos (sin lotes) vencidos y su valor en UNA consulta.
+
+    Returns:
+        dict: {'productos', 'cantidad', 'valor'}
+    """
+    datos = productos_sin_lotes_vencidos(hoy).aggregate(
+        total_productos=Count('id'),
+        total_cantidad=Sum('cantidad', filter=Q(cantidad__gt=0)),
+        total_valor=Sum(VALOR_PRODUCTO, filter=Q(cantidad__gt=0)),
+    )
+    return {
+        'productos': datos['total_productos'],
+        'cantidad': datos['total_cantidad'] or Decimal('0'),
+        'valor': datos['total_valor'] or Decimal('0'),
+    }
+
+
+def vencer_productos_sin_lotes(hoy, ahora):
+    """
+    Mueve a merma los productos antiguos (sin lotes) ya vencidos.
+
+    Igual que un bloque de lotes, en UNA transacción y con un número fijo
+    de consultas: bloquea los productos, guarda el historial de merma y
+    los movimientos de salida con bulk_create, los mueve a merma con un
+    UPDATE y resuelve sus alertas.
+
+    Returns:
+        dict: {'productos', 'cantidad', 'valor'}
+    """
+    with transaction.atomic():
+        # --- Consulta 1: bloquear los productos (mismo orden que el checkout) ---
+        productos = list(
+            productos_sin_lotes_vencidos(hoy).select_for_update().order_by('pk')
+        )
+        if not productos:
+            return {'productos': 0, 'cantidad': Decimal('0'), 'valor': Decimal('0')}
+
+        # --- Consultas 2 y 3: historial de merma y movimientos ---
+        mermas = []
+        movimientos = []
+        cantidad_total = Decimal('0')
+        valor_total = Decimal('0')
+        for producto in productos:
+            cantidad = producto.cantidad or Decimal('0')
+            if cantidad <= 0:
+                continue
+            cantidad_total += cantidad
+            valor_total += cantidad * producto.precio
+            mermas.append(HistorialMerma(
+                producto=producto,
+                cantidad_merma=cantidad,
+                motivo_merma=f'Producto vencido (caducidad {producto.caducidad.strftime("%d/%m/%Y")})',
+                fecha_merma=ahora,
+                activo=True,
+            ))
+            movimientos.append(MovimientosInventario(
+                tipo_movimiento='salida',
+                cantidad=cantidad,
+                productos=producto,
+                origen='merma',
+                referencia_id=producto.id,
+                tipo_referencia='producto',
+            ))
+        HistorialMerma.objects.bulk_create(mermas)
+        MovimientosInventario.objects.bulk_create(movimientos)
+
+        # --- Consultas 4 y 5: mover a merma y resolver sus alertas ---
+        producto_ids = [p.id for p in productos]
+        Productos.objects.filter(id__in=producto_ids).update(
+            estado_merma='en_merma',
+            motivo_merma='Vencido',
+            fecha_merma=ahora,
+            cantidad_merma=F('cantidad'),
+            cantidad=Decimal('0'),
+            caducidad=None,
+            elaboracion=None,
+            modificado=ahora,
+        )
+        Alertas.objects.filter(
+            productos_id__in=producto_ids,
+            estado='activa',
+        ).update(estado='resuelta')
+
+    return {'productos': len(productos), 'cantidad': cantidad_total, 'valor': valor_total}
+
+
+def vencer_lotes(hoy=None, tamano_bloque=TAMANO_BLOQUE_VENCIMIENTOS):
+    """
+    Pasa a 'vencido' todos los lotes activos con caducidad anterior a hoy.
+
+    Cada bloque de lotes se confirma en su propia transacción (ver el
+    encabezado del archivo).
+
+    Args:
+        hoy: Fecha de referencia (por defecto, hoy en hora local)
+        tamano_bloque: Lotes por transacción
+
+    Returns:
+        dict: {'lotes', 'lotes_con_stock', 'productos', 'productos_en_merma',
+               'productos_sin_lotes', 'cantidad', 'valor', 'bloques'}
+    """
+    hoy = hoy or timezone.localdate()
+    tamano_bloque = max(1, int(tamano_bloque))
+    ahora = timezone.now()
+
+    totales = {
+        'lotes': 0,
+        'lotes_con_stock': 0,
+        'productos_en_merma': 0,
+        'cantidad': Decimal('0'),
+        'valor': Decimal('0'),
+        'bloques': 0,
+    }
+    productos_afectados = set()
+    ultimo_id = 0
+
+    while True:
+        filas = list(
+            lotes_vencidos(hoy).filter(id__gt=ultimo_id).order_by('id').values_list('id', 'productos_id')[:tamano_bloque]
+        )
+        if not filas:
+            break
+        ultimo_id = filas[-1][0]
+
+        with transaction.atomic():
+            bloque = _vencer_bloque(
+                [lote_id for lote_id, _ in filas],
+                sorted({producto_id for _, producto_id in filas}),
+                hoy,
+                ahora,
+            )
+        if bloque is None:
+            continue
+
+        totales['bloques'] += 1
+        for campo in ('lotes', 'lotes_con_stock', 'productos_en_merma', 'cantidad', 'valor'):
+            totales[campo] += bloque[campo]
+        productos_afectados |= bloque['productos']
+
+    totales['productos'] = len(productos_afectados)
+
+    sin_lotes = vencer_productos_sin_lotes(hoy, ahora)
+    totales['productos_sin_lotes'] = sin_lotes['productos']
+    totales['cantidad'] += sin_lotes['cantidad']
+    totales['valor'] += sin_lotes['valor']
+
+    logger.info(
+        f"Barrido de vencimientos {hoy}: {totales['lotes']} lote(s) vencidos, "
+        f"{totales['productos']} producto(s), valor ${totales['valor']:,.0f}"
+    )
+    return totales
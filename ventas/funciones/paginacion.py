@@ -0,0 +1,212 @@
+# ================================================================
+# =                                                              =
+# =        PAGINACIÓN POR CURSOR (KEYSET) SOBRE (FECHA, ID)     =
+# =                                                              =
+# ================================================================
+#
+# Los listados grandes (historial de boletas, facturas y pagos a
+# proveedores, movimientos, reporte de ventas) no usan Paginator: su
+# COUNT(*) y su OFFSET recorren todas las filas anteriores, así que la
+# página 500 cuesta 500 veces más que la primera.
+#
+# Aquí cada página se pide "después de" (o "antes de") la última fila
+# vista, con el orden fijo más reciente primero: (fecha DESC, id DESC).
+#
+#   WHERE fecha <= :f AND (fecha < :f OR (fecha = :f AND id < :id))
+#   ORDER BY fecha DESC, id DESC
+#   LIMIT tamaño + 1
+#
+# Con el índice sobre la columna de fecha (ver sql_indices_paginacion.sql)
+# la base de datos salta directo a la posición del cursor: cualquier
+# página cuesta lo mismo que la primera. La fila extra solo indica si
+# hay otra página.
+#
+# El cursor viaja en la URL (?despues=... / ?antes=...) como texto
+# base64 con la fecha y el ID de la fila. Los totales del resumen de
+# cada listado se calculan aparte, con agregados en SQL.
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+import base64
+import binascii
+
+# Filas por página (por defecto y máximo)
+TAMANO_PAGINA = 50
+MAX_TAMANO_PAGINA = 200
+
+
+class PaginaKeyset:
+    """
+    Una página de resultados paginados por cursor.
+
+    Atributos:
+        objetos: Filas de la página (más reciente primero)
+        siguiente: Cursor para la página siguiente (más antigua) o None
+        anterior: Cursor para la página anterior (más reciente) o None
+        tamano: Filas por página
+    """
+
+    def __init__(self, objetos, siguiente, anterior, tamano):
+        self.objetos = objetos
+        self.siguiente = siguiente
+        self.anterior = anterior
+        self.tamano = tamano
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    @property
+    def tiene_siguiente(self):
+        return self.siguiente is not None
+
+    @property
+    def tiene_anterior(self):
+        return self.anterior is not None
+
+    @property
+    def tiene_otras_paginas(self):
+        return self.tiene_siguiente or self.tiene_anterior
+
+
+def codificar_cursor(fecha, pk):
+    """
+    Cursor (texto para la URL) de una fila a partir de su fecha e ID.
+    """
+    texto = f'{fecha.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(texto.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor, campo):
+    """
+    Lee un cursor de la URL.
+
+    Args:
+        cursor: Texto recibido en ?despues= o ?antes=
+        campo: Campo de fecha del modelo (para convertir el valor)
+
+    Returns:
+        tuple (fecha, pk), o None si el cursor está vacío o no es válido
+    """
+    if not cursor:
+        return None
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        texto = base64.urlsafe_b64decode(cursor + relleno).decode('utf-8')
+        fecha, pk = texto.rsplit('|', 1)
+        return campo.to_python(fecha), int(pk)
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError, ValidationError):
+        return None
+
+
+def _cursor_de(objeto, campo_fecha):
+    if isinstance(objeto, dict):
+        return codificar_cursor(objeto[campo_fecha], objeto['id'])
+    return codificar_cursor(getattr(objeto, campo_fecha), objeto.pk)
+
+
+def paginar_keyset(queryset, campo_fecha, despues=None, antes=None, ultima=False, tamano=TAMANO_PAGINA):
+    """
+    Obtiene una página de un queryset ordenado por (campo_fecha DESC, id DESC).
+
+    Solo se lee la página pedida (más una fila), sin COUNT ni OFFSET.
+
+    Args:
+        queryset: QuerySet ya filtrado (su orden se reemplaza)
+        campo_fecha: Nombre del campo de fecha (no nulo) del modelo
+        despues: Cursor: filas más antiguas que esta (página siguiente)
+        antes: Cursor: filas más recientes que esta (página anterior)
+        ultima: True para la página con las filas más antiguas
+        tamano: Filas por página
+
+    Returns:
+        PaginaKeyset
+    """
+    tamano = min(max(int(tamano), 1), MAX_TAMANO_PAGINA)
+    campo = queryset.model._meta.get_field(campo_fecha)
+    desc = (f'-{campo_fecha}', '-id')
+    asc = (campo_fecha, 'id')
+
+    cursor_antes = decodificar_cursor(antes, campo)
+    cursor_despues = None if cursor_antes else decodificar_cursor(despues, campo)
+
+    if cursor_antes or ultima:
+        # Hacia atrás: leer en orden ascendente y dar vuelta la página
+        if cursor_antes:
+            fecha, pk = cursor_antes
+            queryset = queryset.filter(**{f'{campo_fecha}__gte': fecha}).filter(
+                Q(**{f'{campo_fecha}__gt': fecha}) | Q(**{campo_fecha: fecha, 'id__gt': pk})
+            )
+        filas = list(queryset.order_by(*asc)[:tamano + 1])
+        hay_mas = len(filas) > tamano
+        filas = filas[:tamano][::-1]
+        hay_anterior = hay_mas
+        hay_siguiente = bool(cursor_antes) and bool(filas)
+    else:
+        if cursor_despues:
+            fecha, pk = cursor_despues
+            queryset = queryset.filter(**{f'{campo_fecha}__lte': fecha}).filter(
+                Q(**{f'{campo_fecha}__lt': fecha}) | Q(**{campo_fecha: fecha, 'id__lt': pk})
+            )
+        filas = list(queryset.order_by(*desc)[:tamano + 1])
+        hay_mas = len(filas) > tamano
+        filas = filas[:tamano]
+        hay_anterior = bool(cursor_despues) and bool(filas)
+        hay_siguiente = hay_mas
+
+    return PaginaKeyset(
+        filas,
+        siguiente=_cursor_de(filas[-1], campo_fecha) if hay_siguiente else None,
+        anterior=_cursor_de(filas[0], campo_fecha) if hay_anterior else None,
+        tamano=tamano,
+    )
+
+
+def paginar_desde_request(request, queryset, campo_fecha, tamano=TAMANO_PAGINA):
+    """
+    Pagina un queryset con los parámetros de la URL (despues, antes, ultima, tamano).
+    """
+    try:
+        tamano = int(request.GET.get('tamano', tamano))
+    except (TypeError, ValueError):
+        pass
+    return paginar_keyset(
+        queryset,
+        campo_fecha,
+        despues=request.GET.get('despues'),
+        antes=request.GET.get('antes'),
+        ultima=request.GET.get('ultima') == '1',
+        tamano=tamano,
+    )
+
+
+def quiere_json(request):
+    """
+    True si el listado se pidió en JSON (?formato=json o Accept: application/json).
+    """
+    if request.GET.get('formato') == 'json':
+        return True
+    return 'application/json' in request.headers.get('Accept', '')
+
+
+def pagina_a_json(pagina, serializar, resumen=None):
+    """
+    Formato JSON común de los listados paginados.
+
+    Args:
+        pagina: PaginaKeyset
+        serializar: Función fila -> dict
+        resumen: dict con los totales del listado (opcional)
+
+    Returns:
+        dict: {'success', 'resultados', 'siguiente', 'anterior', 'resumen'}
+    """
+    return {
+        'success': True,
+        'resultados': [serializar(fila) for fila in pagina],
+        'siguiente': pagina.siguiente,
+        'anterior': pagina.anterior,
+        'resumen': resumen or {},
+    }
@@ -7,8 +7,9 @@
 # Este archivo centraliza la lógica de permisos basada en roles.
 # Define qué secciones puede acceder cada rol y qué permisos tiene.
 
+from django.conf import settings
+from django.core.cache import cache
 from ventas.models.usuarios import Usuarios
-from django.contrib.auth.models import Group
 
 # Mapeo de roles a secciones permitidas
 # Basado en la matriz de permisos 4.2 del documento de requisitos
@@ -55,37 +56,122 @@ SECCIONES_SOLO_LECTURA = {
     ],
 }
 
-def obtener_rol_usuario(user):
+# ================================================================
+# =        CACHE DE PERMISOS POR USUARIO                         =
+# ================================================================
+#
+# El rol se resuelve con consultas (usuarios + roles, y luego grupos) y
+# se necesita muchas veces por página: RolMiddleware, los decoradores y
+# cada entrada del menú lateral (permisos_tags). Por eso los permisos
+# de un usuario se calculan una sola vez:
+#
+# - Por petición: se guardan en el propio objeto user (request.user es
+#   el mismo objeto en el middleware, las vistas y los templates)
+# - Entre peticiones: en el cache de Django por PERMISOS_CACHE_TTL segundos
+#
+# Las vistas de gestión de usuarios llaman a invalidar_permisos_usuario()
+# al cambiar el rol, los grupos o los datos de un usuario, y las señales de
+# ventas/signals.py lo hacen con cualquier otro cambio (admin de Django,
+# scripts). Con el cache locmem, cada proceso solo borra su propia copia:
+# por eso PERMISOS_CACHE_TTL es corto salvo que el cache sea compartido.
+
+ATRIBUTO_PERMISOS = '_permisos_usuario'
+
+
+def _clave_cache_permisos(user_id):
+    return f'permisos:usuario:{user_id}'
+
+
+def _resolver_rol(user):
     """
-    Obtiene el rol del usuario desde la base de datos.
-    
+    Consulta el rol del usuario en la base de datos (sin cache).
+    """
+    # Intentar obtener desde tabla usuarios
+    rol = Usuarios.objects.filter(user=user).values_list('roles__nombre', flat=True).first()
+    if rol:
+        return rol
+
+    # Intentar obtener desde grupos de Django
+    return user.groups.order_by().values_list('name', flat=True).first()
+
+
+def _calcular_permisos(rol):
+    """
+    Arma el conjunto de permisos de un rol.
+
+    Returns:
+        dict: {'rol', 'secciones' (frozenset), 'escritura' (frozenset)}
+    """
+    if not rol:
+        secciones = frozenset()
+    elif rol == 'Administrador':
+        # Todas las secciones
+        secciones = frozenset(seccion for lista in PERMISOS_POR_ROL.values() for seccion in lista)
+    else:
+        secciones = frozenset(PERMISOS_POR_ROL.get(rol, []))
+
+    escritura = secciones - frozenset(SECCIONES_SOLO_LECTURA.get(rol, []))
+    return {'rol': rol, 'secciones': secciones, 'escritura': escritura}
+
+
+def obtener_permisos_usuario(user):
+    """
+    Obtiene el rol y los permisos del usuario (memorizados, ver arriba).
+
     Args:
         user: Usuario de Django (User)
-        
+
     Returns:
-        str: Nombre del rol o None si no tiene
+        dict: {'rol': str o None, 'secciones': frozenset, 'escritura': frozenset}
     """
     if not user.is_authenticated:
-        return None
-    
-    # Si es superusuario, retornar 'Administrador'
+        return _calcular_permisos(None)
+
+    permisos = getattr(user, ATRIBUTO_PERMISOS, None)
+    if permisos is not None:
+        return permisos
+
     if user.is_superuser:
-        return 'Administrador'
-    
-    # Intentar obtener desde tabla usuarios
+        # Superusuario: 'Administrador' sin consultar la base de datos
+        permisos = _calcular_permisos('Administrador')
+    else:
+        clave = _clave_cache_permisos(user.pk)
+        permisos = cache.get(clave)
+        if permisos is None:
+            permisos = _calcular_permisos(_resolver_rol(user))
+            cache.set(clave, permisos, settings.PERMISOS_CACHE_TTL)
+
+    setattr(user, ATRIBUTO_PERMISOS, permisos)
+    return permisos
+
+
+def invalidar_permisos_usuario(user):
+    """
+    Descarta los permisos memorizados de un usuario.
+
+    Llamar cada vez que cambia su rol, sus grupos o si es superusuario.
+
+    Args:
+        user: Usuario de Django (User) o su ID
+    """
+    cache.delete(_clave_cache_permisos(getattr(user, 'pk', user)))
     try:
-        usuario_perfil = Usuarios.objects.get(user=user)
-        if usuario_perfil.roles:
-            return usuario_perfil.roles.nombre
-    except Usuarios.DoesNotExist:
+        delattr(user, ATRIBUTO_PERMISOS)
+    except AttributeError:
         pass
+
+
+def obtener_rol_usuario(user):
+    """
+    Obtiene el rol del usuario desde la base de datos.
     
-    # Intentar obtener desde grupos de Django
-    grupos = user.groups.all()
-    if grupos.exists():
-        return grupos.first().name
-    
-    return None
+    Args:
+        user: Usuario de Django (User)
+        
+    Returns:
+        str: Nombre del rol o None si no tiene
+    """
+    return obtener_permisos_usuario(user)['rol']
 
 def puede_acceder_seccion(user, seccion):
     """
@@ -98,18 +184,10 @@ def puede_acceder_seccion(user, seccion):
     Returns:
         bool: True si puede acceder, False en caso contrario
     """
-    rol = obtener_rol_usuario(user)
-    
-    if not rol:
-        return False
-    
+    permisos = obtener_permisos_usuario(user)
+
     # Administrador tiene acceso a todo
-    if rol == 'Administrador':
-        return True
-    
-    # Verificar si el rol tiene acceso a la sección
-    secciones_permitidas = PERMISOS_POR_ROL.get(rol, [])
-    return seccion in secciones_permitidas
+    return permisos['rol'] == 'Administrador' or seccion in permisos['secciones']
 
 def tiene_permiso_escritura(user, seccion):
     """
@@ -123,22 +201,10 @@ def tiene_permiso_escritura(user, seccion):
     Returns:
         bool: True si tiene permisos de escritura, False si solo lectura o sin acceso
     """
-    rol = obtener_rol_usuario(user)
-    
-    if not rol:
-        return False
-    
+    permisos = obtener_permisos_usuario(user)
+
     # Administrador tiene permisos de escritura en todo
-    if rol == 'Administrador':
-        return True
-    
-    # Verificar si puede acceder a la sección
-    if not puede_acceder_seccion(user, seccion):
-        return False
-    
-    # Verificar si la sección es solo lectura para este rol
-    secciones_solo_lectura = SECCIONES_SOLO_LECTURA.get(rol, [])
-    return seccion not in secciones_solo_lectura
+    return permisos['rol'] == 'Administrador' or seccion in permisos['escritura']
 
 def obtener_secciones_permitidas(user):
     """
@@ -150,17 +216,4 @@ def obtener_secciones_permitidas(user):
     Returns:
         list: Lista de nombres de secciones permitidas
     """
-    rol = obtener_rol_usuario(user)
-    
-    if not rol:
-        return []
-    
-    if rol == 'Administrador':
-        # Retornar todas las secciones
-        todas_las_secciones = set()
-        for secciones in PERMISOS_POR_ROL.values():
-            todas_las_secciones.update(secciones)
-        return list(todas_las_secciones)
-    
-    return PERMISOS_POR_ROL.get(rol, [])
-
+    return list(obtener_permisos_usuario(user)['secciones'])
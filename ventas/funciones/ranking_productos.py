@@ -0,0 +1,86 @@
+# ================================================================
+# =                                                              =
+# =        RANKING DE PRODUCTOS MÁS VENDIDOS (RF-V5)            =
+# =                                                              =
+# ================================================================
+#
+# Servicio único para el ranking de top productos. Lo usan la página
+# del reporte, sus exportaciones (CSV, Excel, PDF) y el dashboard.
+#
+# Cada ranking es UNA consulta agrupada por producto, ordenada y
+# limitada en la base de datos, sobre el resumen diario de ventas
+# (ver ventas/funciones/resumen_ventas.py): el neto de cada fila ya es
+# la suma de cantidad × precio_unitario de ese producto en el día.
+#
+# Antes se agrupaba detalle_venta y luego, por cada producto del top,
+# se volvían a leer todos sus detalles para sumar el neto en Python
+# (y el ranking por neto ordenaba solo 20 grupos tomados al azar).
+
+from decimal import Decimal
+from django.db.models import Sum
+from ventas.models import ResumenVentasProductoDia
+from ventas.funciones.resumen_ventas import filtrar_por_fechas
+
+# Cantidad de productos del ranking por defecto
+TOP_PRODUCTOS = 20
+
+# Tipos de ranking: campo por el que se ordena (descendente)
+ORDEN_RANKING = {
+    'cantidad': '-total_cantidad',
+    'neto': '-total_neto',
+}
+
+
+def ranking_productos(desde=None, hasta=None, orden='cantidad', limite=TOP_PRODUCTOS):
+    """
+    Ranking de productos más vendidos de un rango de días.
+
+    Args:
+        desde: date inicial (incluida) o None
+        hasta: date final (incluida) o None
+        orden: 'cantidad' (unidades vendidas) o 'neto' (monto neto)
+        limite: Cantidad de productos del ranking
+
+    Returns:
+        list: Dicts con producto_id, nombre, cantidad_vendida, total_neto y precio_promedio
+    """
+    campo_orden = ORDEN_RANKING.get(orden, ORDEN_RANKING['cantidad'])
+
+    filas = filtrar_por_fechas(ResumenVentasProductoDia.objects.all(), desde, hasta).values(
+        'productos_id', 'productos__nombre'
+    ).annotate(
+        total_cantidad=Sum('unidades'),
+        total_neto=Sum('total_neto'),
+    ).order_by(campo_orden, 'productos_id')[:limite]
+
+    return [
+        {
+            'producto_id': fila['productos_id'],
+            'nombre': fila['productos__nombre'],
+            'cantidad_vendida': fila['total_cantidad'],
+            'total_neto': fila['total_neto'],
+            'precio_promedio': fila['total_neto'] / fila['total_cantidad'] if fila['total_cantidad'] > 0 else Decimal('0.00'),
+        }
+        for fila in filas
+    ]
+
+
+def filas_exportacion(ranking):
+    """
+    Convierte un ranking al formato de las exportaciones (CSV, Excel, PDF).
+
+    Args:
+        ranking: Lista retornada por ranking_productos()
+
+    Returns:
+        list: Dicts con las columnas Producto, Cantidad Vendida, Total Neto y Precio Promedio
+    """
+    return [
+        {
+            'Producto': item['nombre'],
+            'Cantidad Vendida': item['cantidad_vendida'],
+            'Total Neto': item['total_neto'],
+            'Precio Promedio': item['precio_promedio'],
+        }
+        for item in ranking
+    ]
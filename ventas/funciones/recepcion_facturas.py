@@ -0,0 +1,340 @@
+# ================================================================
+# =                                                              =
+# =     RECEPCIÓN DE FACTURAS DE PROVEEDOR (EN BLOQUE)          =
+# =                                                              =
+# ================================================================
+#
+# Recibir una factura crea un lote y un movimiento de entrada por cada
+# detalle y suma la mercadería al stock de sus productos. Antes se hacía
+# detalle por detalle (crear lote, crear movimiento, guardar el producto
+# completo): una entrega de harina y lácteos con 80+ líneas eran cientos
+# de consultas dentro de la misma transacción.
+#
+# Aquí la recepción, y su reversión, usan un número fijo de consultas sin
+# importar cuántas líneas tenga la factura:
+#
+#   1. Marcar (o desmarcar) la factura con un UPDATE condicional: dos
+#      clics seguidos no pueden recibirla dos veces
+#   2. Bloquear los productos de los detalles (ordenados por ID, igual
+#      que el checkout del POS)
+#   3. Crear los lotes y los movimientos con bulk_create (recepción), o
+#      retirar los lotes de la factura con un bulk_update (reversión)
+#   4. Recalcular el resumen de stock de los productos con una consulta
+#      agrupada y guardarlo, junto con stock_actual, en un bulk_update
+#
+# Los productos antiguos (que nunca tuvieron lotes) guardan su stock solo
+# en `cantidad`. Como el paso 4 recalcula la cantidad desde los lotes, al
+# recibir uno de ellos por primera vez su stock se pasa antes a un lote
+# inicial (origen 'ajuste_manual'), con su movimiento de entrada.
+#
+# La reversión es simétrica: retira lo que aún queda en los lotes que
+# creó la recepción (lo ya vendido no se puede devolver) y deja un
+# movimiento de salida por cada lote. Si la factura se vuelve a recibir,
+# se crean lotes nuevos.
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from ventas.models import (
+    Productos, Lote, MovimientosInventario, FacturaProveedor, DetalleFacturaProveedor,
+)
+from ventas.funciones.stock import calcular_resumen_lotes, CAMPOS_GUARDADO_STOCK
+import logging
+
+logger = logging.getLogger('ventas')
+
+# Campos del producto que guarda la recepción (resumen de stock + stock_actual)
+CAMPOS_RECEPCION_PRODUCTO = CAMPOS_GUARDADO_STOCK + ['stock_actual']
+
+# Días de caducidad por defecto de un lote sin fecha (desde la fecha de factura)
+DIAS_CADUCIDAD_POR_DEFECTO = 30
+
+
+def _bloquear_productos(producto_ids):
+    """
+    Bloquea los productos (ordenados por ID, igual que el checkout).
+
+    Returns:
+        dict: {producto_id: Productos}
+    """
+    return {
+        p.id: p for p in Productos.objects.select_for_update().filter(
+            pk__in=list(producto_ids)
+        ).order_by('pk')
+    }
+
+
+def _guardar_resumen(productos, ahora):
+    """
+    Recalcula el resumen de stock desde los lotes y guarda los productos en un bulk_update.
+    """
+    resumen = calcular_resumen_lotes(list(productos.keys()))
+    for producto in productos.values():
+        datos = resumen.get(producto.id)
+        if datos is not None:
+            producto.cantidad = datos['cantidad']
+            producto.lotes_activos = datos['lotes_activos']
+            producto.caducidad = datos['caducidad']
+        producto.modificado = ahora
+    Productos.objects.bulk_update(list(productos.values()), CAMPOS_RECEPCION_PRODUCTO)
+
+
+def _abrir_lotes_iniciales(factura, productos, ahora):
+    """
+    Pasa a un lote inicial el stock de los productos antiguos sin lotes.
+
+    Sin esto, el resumen recalculado desde los lotes dejaría su cantidad
+    en lo recibido y se perdería el stock que ya tenían.
+
+    Returns:
+        tuple: (lotes, movimientos) sin guardar
+    """
+    con_lotes = set(Lote.objects.filter(
+        productos_id__in=list(productos.keys()),
+    ).values_list('productos_id', flat=True).distinct())
+
+    lotes = []
+    movimientos = []
+    for producto in productos.values():
+        if producto.id in con_lotes or not producto.cantidad or producto.cantidad <= 0:
+            continue
+        cantidad = Decimal(str(producto.cantidad))
+        lotes.append(Lote(
+            productos=producto,
+            numero_lote=f'INICIAL-{producto.id}',
+            cantidad=cantidad,
+            cantidad_inicial=cantidad,
+            fecha_elaboracion=producto.elaboracion,
+            fecha_caducidad=producto.caducidad or (
+                timezone.localdate(ahora) + timedelta(days=DIAS_CADUCIDAD_POR_DEFECTO)
+            ),
+            fecha_recepcion=ahora,
+            origen='ajuste_manual',
+            estado='activo',
+        ))
+        movimientos.append(MovimientosInventario(
+            tipo_movimiento='entrada',
+            cantidad=producto.cantidad,
+            productos=producto,
+            origen='ajuste_manual',
+            referencia_id=factura.id,
+            tipo_referencia='factura_proveedor',
+        ))
+        logger.info(f'[RECEPCION] Producto {producto.id} sin lotes: stock {cantidad} pasado a un lote inicial')
+    return lotes, movimientos
+
+
+def _fecha_caducidad_lote(detalle, producto, factura):
+    """
+    Caducidad del lote recibido: la del detalle, si no la del producto,
+    si no la fecha de factura + DIAS_CADUCIDAD_POR_DEFECTO.
+    """
+    if detalle.fecha_vencimiento_producto:
+        return detalle.fecha_vencimiento_producto
+    if producto.caducidad:
+        return producto.caducidad
+    return factura.fecha_factura + timedelta(days=DIAS_CADUCIDAD_POR_DEFECTO)
+
+
+def registrar_entrada_detalles(factura, detalles):
+    """
+    Crea los lotes y movimientos de entrada de los detalles y suma su stock.
+
+    Debe llamarse dentro de una transacción (transaction.atomic): los
+    productos quedan bloqueados hasta el commit.
+
+    Args:
+        factura: FacturaProveedor (ya marcada como recibida)
+        detalles: Lista de DetalleFacturaProveedor de esa factura
+
+    Returns:
+        list: Un dict por detalle {'nombre', 'cantidad', 'stock_actual', 'lote_id'}
+    """
+    if not detalles:
+        return []
+
+    ahora = timezone.now()
+    productos = _bloquear_productos({d.productos_id for d in detalles})
+
+    # Productos antiguos sin lotes: su stock actual pasa a un lote inicial
+    lotes, movimientos = _abrir_lotes_iniciales(factura, productos, ahora)
+    for detalle in detalles:
+        producto = productos[detalle.productos_id]
+        cantidad = Decimal(str(detalle.cantidad))
+
+        lotes.append(Lote(
+            productos=producto,
+            detalle_factura_proveedor=detalle,
+            # Número de lote automático: FACT-{factura_id}-{detalle_id}
+            numero_lote=f'FACT-{factura.id}-{detalle.id}',
+            cantidad=cantidad,
+            cantidad_inicial=cantidad,
+            fecha_elaboracion=factura.fecha_factura,
+            fecha_caducidad=_fecha_caducidad_lote(detalle, producto, factura),
+            fecha_recepcion=ahora,
+            origen='compra',
+            estado='activo',
+        ))
+        movimientos.append(MovimientosInventario(
+            tipo_movimiento='entrada',
+            cantidad=detalle.cantidad,
+            productos=producto,
+            origen='compra',
+            referencia_id=factura.id,
+            tipo_referencia='factura_proveedor',
+        ))
+
+        producto.stock_actual = (producto.stock_actual or Decimal('0')) + cantidad
+
+    Lote.objects.bulk_create(lotes)
+    MovimientosInventario.objects.bulk_create(movimientos)
+    _guardar_resumen(productos, ahora)
+
+    # MySQL no retorna los IDs de bulk_create: se leen en una consulta
+    # (ordenados por ID, queda el lote más reciente de cada detalle)
+    lote_por_detalle = dict(Lote.objects.filter(
+        detalle_factura_proveedor_id__in=[d.id for d in detalles],
+    ).order_by('id').values_list('detalle_factura_proveedor_id', 'id'))
+
+    return [
+        {
+            'nombre': productos[d.productos_id].nombre,
+            'cantidad': d.cantidad,
+            'stock_actual': productos[d.productos_id].cantidad,
+            'lote_id': lote_por_detalle.get(d.id),
+        }
+        for d in detalles
+    ]
+
+
+def revertir_entrada_detalles(factura, detalles):
+    """
+    Retira lo que queda de los lotes creados al recibir los detalles.
+
+    Los lotes quedan 'agotado' con cantidad 0 y se registra un movimiento
+    de salida por la cantidad retirada de cada uno. Debe llamarse dentro
+    de una transacción.
+
+    Args:
+        factura: FacturaProveedor
+        detalles: Lista de DetalleFacturaProveedor de esa factura
+
+    Returns:
+        list: Un dict por producto {'nombre', 'cantidad', 'stock_actual'}
+    """
+    if not detalles:
+        return []
+
+    ahora = timezone.now()
+    productos = _bloquear_productos({d.productos_id for d in detalles})
+
+    # Lotes de la recepción que aún tienen stock (después de los productos)
+    lotes = list(Lote.objects.select_for_update().filter(
+        detalle_factura_proveedor_id__in=[d.id for d in detalles],
+        estado='activo',
+        cantidad__gt=0,
+    ).order_by('id'))
+
+    movimientos = []
+    revertido_por_producto = defaultdict(Decimal)
+    for lote in lotes:
+        revertido_por_producto[lote.productos_id] += lote.cantidad
+        movimientos.append(MovimientosInventario(
+            tipo_movimiento='salida',
+            cantidad=lote.cantidad,
+            productos_id=lote.productos_id,
+            origen='devolucion',
+            referencia_id=factura.id,
+            tipo_referencia='factura_proveedor',
+        ))
+        lote.cantidad = Decimal('0')
+        lote.estado = 'agotado'
+
+    for producto_id, cantidad in revertido_por_producto.items():
+        producto = productos[producto_id]
+        if producto.stock_actual is not None:
+            producto.stock_actual = max(Decimal('0'), producto.stock_actual - cantidad)
+
+    Lote.objects.bulk_update(lotes, ['cantidad', 'estado'])
+    MovimientosInventario.objects.bulk_create(movimientos)
+    _guardar_resumen(productos, ahora)
+
+    return [
+        {
+            'nombre': productos[producto_id].nombre,
+            'cantidad': cantidad,
+            'stock_actual': productos[producto_id].cantidad,
+        }
+        for producto_id, cantidad in revertido_por_producto.items()
+    ]
+
+
+def _detalles_factura(factura):
+    return list(DetalleFacturaProveedor.objects.filter(
+        factura_proveedor=factura
+    ).order_by('id'))
+
+
+def recibir_factura(factura, fecha_recepcion=None):
+    """
+    Marca la factura como recibida y suma al stock todos sus detalles.
+
+    Debe llamarse dentro de una transacción (transaction.atomic).
+
+    Args:
+        factura: FacturaProveedor
+        fecha_recepcion: Fecha de recepción (default: hoy)
+
+    Returns:
+        list: Un dict por detalle (ver registrar_entrada_detalles)
+
+    Raises:
+        ValueError: Si la factura ya fue recibida
+        ValidationError: Si la fecha de recepción es anterior a la de la factura
+    """
+    fecha_recepcion = fecha_recepcion or timezone.localdate()
+    if factura.fecha_factura and fecha_recepcion < factura.fecha_factura:
+        raise ValidationError({
+            'fecha_recepcion': 'La fecha de recepción debe ser posterior o igual a la fecha de factura.'
+        })
+
+    # UPDATE condicional: solo una petición puede recibir la factura
+    marcada = FacturaProveedor.objects.filter(
+        pk=factura.pk, fecha_recepcion__isnull=True,
+    ).update(fecha_recepcion=fecha_recepcion, modificado=timezone.now())
+    if not marcada:
+        raise ValueError('Esta factura ya fue recibida anteriormente.')
+    factura.fecha_recepcion = fecha_recepcion
+
+    productos = registrar_entrada_detalles(factura, _detalles_factura(factura))
+    logger.info(f'Factura {factura.id} recibida. {len(productos)} productos actualizados.')
+    return productos
+
+
+def quitar_recepcion(factura):
+    """
+    Quita la recepción de la factura y revierte el stock que sumó.
+
+    Debe llamarse dentro de una transacción (transaction.atomic).
+
+    Args:
+        factura: FacturaProveedor
+
+    Returns:
+        list: Un dict por producto (ver revertir_entrada_detalles)
+
+    Raises:
+        ValueError: Si la factura no está recibida
+    """
+    desmarcada = FacturaProveedor.objects.filter(
+        pk=factura.pk, fecha_recepcion__isnull=False,
+    ).update(fecha_recepcion=None, modificado=timezone.now())
+    if not desmarcada:
+        raise ValueError('Esta factura no tiene fecha de recepción.')
+    factura.fecha_recepcion = None
+
+    productos = revertir_entrada_detalles(factura, _detalles_factura(factura))
+    logger.info(f'Fecha de recepción quitada de factura {factura.id}. {len(productos)} productos revertidos.')
+    return productos
@@ -0,0 +1,344 @@
+# ================================================================
+# =                                                              =
+# =        RESUMEN DIARIO DE VENTAS (ROLLUP)                    =
+# =                                                              =
+# ================================================================
+#
+# Las ventas se guardan también sumadas por día (fecha local) en dos
+# tablas de resumen (ver ventas/models/resumen_ventas.py):
+#
+#   - resumen_ventas_dia:          (fecha, canal, medio de pago)
+#   - resumen_ventas_producto_dia: (fecha, producto, canal, medio de pago)
+#
+# Así un reporte de varios meses lee unos cientos de filas de resumen
+# en vez de cientos de miles de filas de detalle_venta.
+#
+# MANTENCIÓN:
+# - Al confirmarse una venta del POS se suman sus montos al resumen
+#   (transaction.on_commit, fuera de los bloqueos del checkout). Un
+#   deadlock o una espera de bloqueo vencida se reintenta; si aun así
+#   falla, el día queda en resumen_ventas_pendientes
+# - El comando `reconstruir_resumen_ventas` recalcula días completos
+#   desde las ventas, por ejemplo después de cargar datos antiguos, y
+#   con --pendientes los días que quedaron anotados
+#
+# Ambos caminos usan montos_venta(), así un día reconstruido queda
+# idéntico a uno acumulado venta a venta.
+
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction, IntegrityError, OperationalError
+from django.db.models import Sum
+from django.utils import timezone
+from ventas.models import (
+    Ventas, DetalleVenta, ResumenVentasDia, ResumenVentasProductoDia, ResumenVentasPendiente,
+)
+import logging
+
+logger = logging.getLogger('ventas')
+
+# Tasa de IVA en Chile (los precios de venta ya incluyen IVA)
+IVA_RATE = Decimal('0.19')
+
+# Campos sumables de cada tabla de resumen
+CAMPOS_RESUMEN_DIA = ['num_ventas', 'total_sin_iva', 'total_iva', 'descuento', 'total_con_iva']
+CAMPOS_RESUMEN_PRODUCTO = ['unidades', 'total_neto', 'total_iva', 'num_ventas']
+
+CENTAVOS = Decimal('0.01')
+
+# Intentos para sumar una venta al resumen antes de dejar el día pendiente
+INTENTOS_RESUMEN = 4
+
+# Errores de MySQL que se resuelven reintentando la transacción:
+# 1213 = deadlock, 1205 = espera de bloqueo vencida
+ERRORES_REINTENTABLES = (1213, 1205)
+
+
+# ================================================================
+# =                 CÁLCULO DE MONTOS                            =
+# ================================================================
+
+def montos_venta(venta, lineas):
+    """
+    Calcula lo que aporta una venta a cada tabla de resumen.
+
+    Args:
+        venta: dict o Ventas con fecha, canal_venta, medio_pago y totales
+        lineas: Lista de dicts con producto_id, cantidad, precio_unitario
+                y descuento_pct (las líneas de esa venta)
+
+    Returns:
+        tuple: (clave_dia, montos_dia, {clave_producto: montos_producto})
+    """
+    obtener = venta.get if isinstance(venta, dict) else lambda campo: getattr(venta, campo)
+
+    fecha = timezone.localdate(obtener('fecha'))
+    canal_venta = obtener('canal_venta')
+    medio_pago = obtener('medio_pago')
+
+    clave_dia = (fecha, canal_venta, medio_pago)
+    montos_dia = {
+        'num_ventas': 1,
+        'total_sin_iva': obtener('total_sin_iva'),
+        'total_iva': obtener('total_iva'),
+        'descuento': obtener('descuento'),
+        'total_con_iva': obtener('total_con_iva'),
+    }
+
+    # Sumar las líneas por producto (un producto puede venir en varias líneas)
+    por_producto = defaultdict(lambda: {'unidades': Decimal('0'), 'total_neto': Decimal('0'), 'total_iva': Decimal('0')})
+    for linea in lineas:
+        cantidad = Decimal(str(linea['cantidad']))
+        precio_unitario = Decimal(str(linea['precio_unitario']))
+        descuento_pct = Decimal(str(linea['descuento_pct'] or 0))
+
+        # El precio incluye IVA: se desglosa del monto después del descuento por línea
+        monto = cantidad * precio_unitario * (Decimal('1') - descuento_pct / 100)
+
+        datos = por_producto[linea['producto_id']]
+        datos['unidades'] += cantidad
+        datos['total_neto'] += cantidad * precio_unitario
+        datos['total_iva'] += monto - monto / (Decimal('1') + IVA_RATE)
+
+    montos_producto = {}
+    for producto_id, datos in por_producto.items():
+        montos_producto[(fecha, producto_id, canal_venta, medio_pago)] = {
+            'unidades': datos['unidades'],
+            'total_neto': datos['total_neto'].quantize(CENTAVOS, rounding=ROUND_HALF_UP),
+            'total_iva': datos['total_iva'].quantize(CENTAVOS, rounding=ROUND_HALF_UP),
+            'num_ventas': 1,
+        }
+
+    return clave_dia, montos_dia, montos_producto
+
+
+# ================================================================
+# =                 ACTUALIZACIÓN INCREMENTAL                    =
+# ================================================================
+
+def _sumar_venta(fecha, canal_venta, medio_pago, montos_dia, montos_producto):
+    """
+    Suma los montos de una venta a sus filas de resumen en un número fijo de consultas.
+
+    Bloquea las filas existentes, las actualiza con un bulk_update y crea
+    las que faltan con un bulk_create.
+    """
+    claves = {'fecha': fecha, 'canal_venta': canal_venta, 'medio_pago': medio_pago}
+
+    with transaction.atomic():
+        fila_dia = ResumenVentasDia.objects.select_for_update().filter(**claves).first()
+        if fila_dia is None:
+            ResumenVentasDia.objects.create(**claves, **montos_dia)
+        else:
+            for campo, valor in montos_dia.items():
+                setattr(fila_dia, campo, getattr(fila_dia, campo) + valor)
+            fila_dia.save(update_fields=CAMPOS_RESUMEN_DIA)
+
+        # Ordenadas por producto para que dos ventas bloqueen en el mismo orden
+        existentes = {
+            fila.productos_id: fila
+            for fila in ResumenVentasProductoDia.objects.select_for_update().filter(
+                productos_id__in=list(montos_producto), **claves
+            ).order_by('productos_id')
+        }
+        nuevas = []
+        for producto_id, montos in montos_producto.items():
+            fila = existentes.get(producto_id)
+            if fila is None:
+                nuevas.append(ResumenVentasProductoDia(productos_id=producto_id, **claves, **montos))
+                continue
+            for campo, valor in montos.items():
+                setattr(fila, campo, getattr(fila, campo) + valor)
+
+        if existentes:
+            ResumenVentasProductoDia.objects.bulk_update(list(existentes.values()), CAMPOS_RESUMEN_PRODUCTO)
+        if nuevas:
+            ResumenVentasProductoDia.objects.bulk_create(nuevas)
+
+
+def _es_reintentable(error):
+    """
+    Indica si un error al sumar una venta se resuelve repitiendo la transacción.
+
+    - IntegrityError: otra venta creó la misma fila al mismo tiempo (ahora existe)
+    - OperationalError 1213/1205: deadlock o espera de bloqueo vencida
+    """
+    if isinstance(error, IntegrityError):
+        return True
+    return isinstance(error, OperationalError) and bool(error.args) and error.args[0] in ERRORES_REINTENTABLES
+
+
+def marcar_dia_pendiente(fecha):
+    """
+    Anota un día cuyo resumen quedó incompleto, para reconstruirlo después.
+
+    Args:
+        fecha: date (día local)
+    """
+    try:
+        pendiente, creado = ResumenVentasPendiente.objects.get_or_create(fecha=fecha)
+        if not creado:
+            pendiente.save(update_fields=['registrado'])
+    except Exception as e:
+        logger.error(f'[RESUMEN VENTAS] No se pudo anotar el día {fecha} como pendiente: {e}', exc_info=True)
+
+
+def registrar_venta_en_resumen(venta, lineas):
+    """
+    Suma una venta confirmada a las tablas de resumen diario.
+
+    Se llama con transaction.on_commit después del checkout. Los deadlocks,
+    las esperas de bloqueo vencidas y las filas creadas a la vez por otra
+    venta se reintentan hasta INTENTOS_RESUMEN veces. Si aun así falla, la
+    venta ya está guardada: se registra el error y el día queda anotado en
+    resumen_ventas_pendientes, para corregirlo con
+    `python manage.py reconstruir_resumen_ventas --pendientes`.
+
+    Args:
+        venta: Objeto Ventas
+        lineas: Líneas normalizadas del carrito (ver checkout.agrupar_carrito)
+    """
+    fecha = None
+    try:
+        (fecha, canal_venta, medio_pago), montos_dia, montos_producto = montos_venta(venta, lineas)
+        montos_producto = {clave[1]: montos for clave, montos in montos_producto.items()}
+
+        for intento in range(1, INTENTOS_RESUMEN + 1):
+            try:
+                _sumar_venta(fecha, canal_venta, medio_pago, montos_dia, montos_producto)
+                return
+            except (IntegrityError, OperationalError) as e:
+                if intento == INTENTOS_RESUMEN or not _es_reintentable(e):
+                    raise
+                logger.warning(f'[RESUMEN VENTAS] Reintentando la venta {venta.id} (intento {intento}): {e}')
+                time.sleep(0.05 * intento)
+    except Exception as e:
+        logger.error(f'[RESUMEN VENTAS] No se pudo sumar la venta {venta.id} al resumen diario: {e}', exc_info=True)
+        if fecha is not None:
+            marcar_dia_pendiente(fecha)
+
+
+# ================================================================
+# =                 RECONSTRUCCIÓN                               =
+# ================================================================
+
+def calcular_resumen_dia(fecha):
+    """
+    Calcula desde cero el resumen de un día local a partir de las ventas.
+
+    Args:
+        fecha: date (día local)
+
+    Returns:
+        tuple: (filas_dia, filas_producto) - listas de objetos sin guardar
+    """
+    inicio = timezone.make_aware(datetime.combine(fecha, datetime.min.time()))
+    fin = timezone.make_aware(datetime.combine(fecha + timedelta(days=1), datetime.min.time()))
+
+    ventas = {
+        venta['id']: venta
+        for venta in Ventas.objects.filter(fecha__gte=inicio, fecha__lt=fin).order_by().values(
+            'id', 'fecha', 'canal_venta', 'medio_pago',
+            'total_sin_iva', 'total_iva', 'descuento', 'total_con_iva',
+        )
+    }
+
+    lineas_por_venta = defaultdict(list)
+    detalles = DetalleVenta.objects.filter(ventas_id__in=list(ventas)).order_by().values_list(
+        'ventas_id', 'productos_id', 'cantidad', 'precio_unitario', 'descuento_pct'
+    )
+    for venta_id, producto_id, cantidad, precio_unitario, descuento_pct in detalles.iterator(chunk_size=2000):
+        lineas_por_venta[venta_id].append({
+            'producto_id': producto_id,
+            'cantidad': cantidad,
+            'precio_unitario': precio_unitario,
+            'descuento_pct': descuento_pct,
+        })
+
+    totales_dia = defaultdict(lambda: dict.fromkeys(CAMPOS_RESUMEN_DIA, 0))
+    totales_producto = defaultdict(lambda: dict.fromkeys(CAMPOS_RESUMEN_PRODUCTO, 0))
+
+    for venta_id, venta in ventas.items():
+        clave_dia, montos_dia, montos_producto = montos_venta(venta, lineas_por_venta[venta_id])
+        for campo, valor in montos_dia.items():
+            totales_dia[clave_dia][campo] += valor
+        for clave, montos in montos_producto.items():
+            for campo, valor in montos.items():
+                totales_producto[clave][campo] += valor
+
+    filas_dia = [
+        ResumenVentasDia(fecha=fecha, canal_venta=canal_venta, medio_pago=medio_pago, **montos)
+        for (fecha, canal_venta, medio_pago), montos in totales_dia.items()
+    ]
+    filas_producto = [
+        ResumenVentasProductoDia(fecha=fecha, productos_id=producto_id, canal_venta=canal_venta, medio_pago=medio_pago, **montos)
+        for (fecha, producto_id, canal_venta, medio_pago), montos in totales_producto.items()
+    ]
+    return filas_dia, filas_producto
+
+
+def reconstruir_resumen_dia(fecha):
+    """
+    Reemplaza el resumen guardado de un día por uno recalculado desde las ventas.
+
+    Args:
+        fecha: date (día local)
+
+    Returns:
+        tuple: (filas_dia, filas_producto) creadas
+    """
+    with transaction.atomic():
+        filas_dia, filas_producto = calcular_resumen_dia(fecha)
+        ResumenVentasDia.objects.filter(fecha=fecha).delete()
+        ResumenVentasProductoDia.objects.filter(fecha=fecha).delete()
+        ResumenVentasDia.objects.bulk_create(filas_dia, batch_size=500)
+        ResumenVentasProductoDia.objects.bulk_create(filas_producto, batch_size=500)
+        ResumenVentasPendiente.objects.filter(fecha=fecha).delete()
+    return filas_dia, filas_producto
+
+
+# ================================================================
+# =                 LECTURA (REPORTES Y DASHBOARD)               =
+# ================================================================
+
+def filtrar_por_fechas(queryset, desde=None, hasta=None):
+    """
+    Filtra un QuerySet de resumen por rango de fechas locales (ambos incluidos).
+    """
+    if desde:
+        queryset = queryset.filter(fecha__gte=desde)
+    if hasta:
+        queryset = queryset.filter(fecha__lte=hasta)
+    return queryset
+
+
+def totales_ventas(desde=None, hasta=None, canal_venta=None):
+    """
+    Totales de ventas de un rango de días, desde el resumen diario.
+
+    Args:
+        desde: date inicial (incluida) o None
+        hasta: date final (incluida) o None
+        canal_venta: Filtrar por canal ('presencial', 'delivery') o None
+
+    Returns:
+        dict: {'total_neto', 'total_iva', 'total_con_iva', 'cantidad_ventas'}
+    """
+    resumen = filtrar_por_fechas(ResumenVentasDia.objects.all(), desde, hasta)
+    if canal_venta:
+        resumen = resumen.filter(canal_venta=canal_venta)
+
+    totales = resumen.aggregate(
+        total_neto=Sum('total_sin_iva'),
+        total_iva=Sum('total_iva'),
+        total_con_iva=Sum('total_con_iva'),
+        cantidad_ventas=Sum('num_ventas'),
+    )
+    return {
+        'total_neto': totales['total_neto'] or Decimal('0.00'),
+        'total_iva': totales['total_iva'] or Decimal('0.00'),
+        'total_con_iva': totales['total_con_iva'] or Decimal('0.00'),
+        'cantidad_ventas': totales['cantidad_ventas'] or 0,
+    }
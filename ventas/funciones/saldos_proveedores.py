@@ -0,0 +1,209 @@
+# ================================================================
+# =                                                              =
+# =        SALDOS DE FACTURAS Y PROVEEDORES (GUARDADOS)         =
+# =                                                              =
+# ================================================================
+#
+# Cada factura de proveedor guarda su total pagado y su saldo pendiente,
+# y cada proveedor la suma de los saldos de sus facturas:
+#
+#   - factura.total_pagado:     suma de los pagos de la factura
+#   - factura.saldo_pendiente:  total_con_iva - total_pagado
+#                               (0 si la factura está eliminada o cancelada)
+#   - proveedor.saldo_pendiente: suma de factura.saldo_pendiente
+#
+# Antes cada pantalla los calculaba sumando pagos y facturas fila por
+# fila en Python (una consulta por factura en el formulario de pagos y
+# por proveedor en su lista). Ahora se leen de columnas.
+#
+# Se actualizan en la MISMA transacción que los cambia: al registrar o
+# eliminar un pago, al agregar o quitar un detalle y al editar o
+# eliminar la factura (FacturaProveedor.save y PagoProveedor.save/delete
+# llaman a actualizar_saldo_factura). Por cada cambio:
+#
+#   1. Se bloquea la fila de la factura y se lee su saldo guardado
+#   2. Se suman sus pagos con un SUM en la base de datos
+#   3. Se guarda el nuevo saldo con un UPDATE
+#   4. Se suma la DIFERENCIA al saldo del proveedor con un UPDATE
+#      (saldo_pendiente = saldo_pendiente + diferencia), sin recorrer
+#      sus otras facturas
+#
+# El comando `reconciliar_saldos_proveedores` (programado cada noche)
+# recalcula todo con consultas agrupadas y corrige las diferencias.
+
+from decimal import Decimal
+from django.db.models import Sum, F, DecimalField, Value
+from django.db.models.functions import Coalesce
+from ventas.models import Proveedor, FacturaProveedor, PagoProveedor
+
+# Estados de pago de una factura que no tiene saldo pendiente
+ESTADOS_SIN_SALDO = ['cancelado']
+
+CERO = Decimal('0.00')
+
+
+def suma_pagos(pagos):
+    """
+    Suma los montos de un QuerySet de pagos en la base de datos.
+
+    Returns:
+        Decimal: Total (0 si no hay pagos)
+    """
+    return pagos.aggregate(
+        total=Coalesce(Sum('monto'), Value(CERO), output_field=DecimalField())
+    )['total']
+
+
+def calcular_saldo(total_con_iva, total_pagado, estado_pago, eliminado):
+    """
+    Saldo pendiente de una factura.
+
+    Returns:
+        Decimal: total_con_iva - total_pagado, o 0 si la factura está
+                 eliminada o cancelada
+    """
+    if eliminado is not None or estado_pago in ESTADOS_SIN_SALDO:
+        return CERO
+    return (total_con_iva or CERO) - total_pagado
+
+
+def estado_pago_segun_pagos(total_pagado, total_con_iva):
+    """
+    Estado de pago según lo pagado: pendiente, parcial o pagado.
+    """
+    if total_pagado <= CERO:
+        return 'pendiente'
+    if total_pagado >= (total_con_iva or CERO):
+        return 'pagado'
+    return 'parcial'
+
+
+def actualizar_saldo_factura(factura_id, actualizar_estado=False):
+    """
+    Recalcula el total pagado y el saldo de una factura y ajusta el saldo
+    de su proveedor con la diferencia.
+
+    Debe llamarse dentro de una transacción (transaction.atomic): la fila
+    de la factura queda bloqueada hasta el commit, así dos pagos
+    simultáneos no pierden la diferencia del otro.
+
+    Args:
+        factura_id: ID de la factura
+        actualizar_estado: Si es True, también actualiza estado_pago según
+                           los pagos (pendiente, parcial o pagado)
+
+    Returns:
+        dict: {'total_pagado', 'saldo_pendiente', 'estado_pago'} o None si
+              la factura no existe
+    """
+    # --- Consulta 1: bloquear la factura y leer su saldo guardado ---
+    factura = FacturaProveedor.objects.select_for_update().filter(pk=factura_id).values(
+        'proveedor_id', 'total_con_iva', 'saldo_pendiente', 'estado_pago', 'eliminado',
+    ).first()
+    if factura is None:
+        return None
+
+    # --- Consulta 2: total pagado con un SUM ---
+    total_pagado = suma_pagos(PagoProveedor.objects.filter(factura_proveedor_id=factura_id))
+
+    estado_pago = factura['estado_pago']
+    if actualizar_estado:
+        estado_pago = estado_pago_segun_pagos(total_pagado, factura['total_con_iva'])
+
+    saldo = calcular_saldo(factura['total_con_iva'], total_pagado, estado_pago, factura['eliminado'])
+
+    # --- Consulta 3: guardar los saldos de la factura ---
+    FacturaProveedor.objects.filter(pk=factura_id).update(
+        total_pagado=total_pagado,
+        saldo_pendiente=saldo,
+        estado_pago=estado_pago,
+    )
+
+    # --- Consulta 4: sumar la diferencia al saldo del proveedor ---
+    diferencia = saldo - (factura['saldo_pendiente'] or CERO)
+    if diferencia:
+        Proveedor.objects.filter(pk=factura['proveedor_id']).update(
+            saldo_pendiente=F('saldo_pendiente') + diferencia
+        )
+
+    return {
+        'total_pagado': total_pagado,
+        'saldo_pendiente': saldo,
+        'estado_pago': estado_pago,
+    }
+
+
+# ================================================================
+# =              VERIFICACIÓN (COMANDO NOCTURNO)                 =
+# ================================================================
+
+def facturas_descuadradas(factura_ids, bloquear=False):
+    """
+    Compara los saldos guardados de un bloque de facturas con sus pagos.
+
+    2 consultas: las facturas y una suma agrupada de pagos.
+
+    Args:
+        factura_ids: IDs de las facturas a revisar
+        bloquear: Si es True, bloquea las facturas antes de sumar sus pagos
+                  (para corregirlas; requiere transaction.atomic)
+
+    Returns:
+        list: (factura, total_pagado_real, saldo_real) de las que no cuadran
+    """
+    facturas = FacturaProveedor.objects.filter(pk__in=list(factura_ids)).only(
+        'id', 'numero_factura', 'proveedor_id', 'total_con_iva', 'total_pagado',
+        'saldo_pendiente', 'estado_pago', 'eliminado',
+    )
+    if bloquear:
+        # Los pagos bloquean primero la factura: así no se corrige un saldo
+        # con un pago a medio registrar
+        facturas = facturas.select_for_update()
+    facturas = list(facturas.order_by('pk'))
+
+    pagado = dict(
+        PagoProveedor.objects.filter(factura_proveedor_id__in=[f.id for f in facturas])
+        .order_by().values('factura_proveedor_id')
+        .annotate(total=Sum('monto'))
+        .values_list('factura_proveedor_id', 'total')
+    )
+
+    descuadradas = []
+    for factura in facturas:
+        total_pagado = pagado.get(factura.id) or CERO
+        saldo = calcular_saldo(factura.total_con_iva, total_pagado, factura.estado_pago, factura.eliminado)
+        if factura.total_pagado != total_pagado or factura.saldo_pendiente != saldo:
+            descuadradas.append((factura, total_pagado, saldo))
+    return descuadradas
+
+
+def proveedores_descuadrados(bloquear=False):
+    """
+    Compara el saldo guardado de cada proveedor con la suma de sus facturas.
+
+    2 consultas: los proveedores y una suma agrupada de saldos de facturas
+    (revisar antes las facturas con facturas_descuadradas).
+
+    Args:
+        bloquear: Si es True, bloquea los proveedores antes de sumar
+                  (para corregirlos; requiere transaction.atomic)
+
+    Returns:
+        list: (proveedor, saldo_real) de los que no cuadran
+    """
+    proveedores = Proveedor.objects.only('id', 'nombre', 'saldo_pendiente')
+    if bloquear:
+        # Un pago en curso suma su diferencia después de este bloqueo
+        proveedores = proveedores.select_for_update()
+    proveedores = list(proveedores.order_by('pk'))
+
+    saldos = dict(
+        FacturaProveedor.objects.order_by().values('proveedor_id')
+        .annotate(total=Sum('saldo_pendiente'))
+        .values_list('proveedor_id', 'total')
+    )
+    return [
+        (proveedor, saldos.get(proveedor.id) or CERO)
+        for proveedor in proveedores
+        if proveedor.saldo_pendiente != (saldos.get(proveedor.id) or CERO)
+    ]
@@ -0,0 +1,179 @@
+# ================================================================
+# =                                                              =
+# =        RESUMEN DE STOCK POR PRODUCTO (DESDE LOTES)          =
+# =                                                              =
+# ================================================================
+#
+# Cada producto guarda un resumen de sus lotes en columnas propias:
+#
+#   - cantidad:       suma de la cantidad de los lotes activos
+#   - lotes_activos:  cantidad de lotes activos con stock
+#   - caducidad:      fecha de caducidad más próxima entre esos lotes
+#
+# Este resumen se actualiza en la MISMA transacción en que se modifica
+# un lote (venta POS, ajuste de stock, recepción de factura, lote de
+# producción y merma). Así las pantallas de inventario leen columnas
+# del producto en vez de sumar lotes fila por fila.
+#
+# Los productos que nunca tuvieron lotes (productos antiguos) no se
+# tocan: su cantidad sigue siendo la que se ingresó directamente.
+#
+# El comando `reconciliar_stock` compara este resumen con los lotes,
+# corrige cualquier diferencia y reactiva los productos en merma que
+# volvieron a tener lotes activos (antes lo hacía el inventario al cargar).
+
+from decimal import Decimal
+from django.utils import timezone
+from django.db.models import Sum, Count, Min, Q, Exists, OuterRef, Subquery, F
+from django.db.models.functions import Coalesce
+from ventas.models import Productos, Lote, HistorialMerma
+
+# Campos del producto que forman el resumen de stock
+CAMPOS_RESUMEN_STOCK = ['cantidad', 'lotes_activos', 'caducidad']
+
+# Campos a guardar al actualizar el resumen. Incluye `modificado` porque
+# bulk_update no actualiza los campos auto_now, y el generador de alertas
+# usa `modificado` para revisar solo los productos que cambiaron.
+CAMPOS_GUARDADO_STOCK = CAMPOS_RESUMEN_STOCK + ['modificado']
+
+# Filtro de lote "activo con stock" (el mismo que usa el FIFO)
+FILTRO_LOTE_VIGENTE = Q(estado='activo', cantidad__gt=0)
+
+
+def calcular_resumen_lotes(producto_ids):
+    """
+    Calcula el resumen de stock de varios productos en UNA sola consulta agrupada.
+
+    Args:
+        producto_ids: Lista de IDs de productos
+
+    Returns:
+        dict: {producto_id: {'cantidad', 'lotes_activos', 'caducidad'}}
+              Solo incluye productos que tienen al menos un lote (en cualquier estado)
+    """
+    if not producto_ids:
+        return {}
+
+    filas = Lote.objects.filter(
+        productos_id__in=list(producto_ids)
+    ).order_by().values('productos_id').annotate(
+        cantidad_activa=Sum('cantidad', filter=Q(estado='activo')),
+        total_lotes_activos=Count('id', filter=FILTRO_LOTE_VIGENTE),
+        caducidad_proxima=Min('fecha_caducidad', filter=FILTRO_LOTE_VIGENTE),
+    )
+
+    return {
+        fila['productos_id']: {
+            'cantidad': Decimal(str(fila['cantidad_activa'] or 0)),
+            'lotes_activos': fila['total_lotes_activos'],
+            'caducidad': fila['caducidad_proxima'],
+        }
+        for fila in filas
+    }
+
+
+def aplicar_resumen_lotes(producto, lotes_vigentes):
+    """
+    Actualiza en memoria el resumen de un producto a partir de sus lotes vigentes.
+
+    Se usa cuando los lotes ya están cargados (por ejemplo en el checkout),
+    para no repetir la consulta agrupada.
+
+    Args:
+        producto: Objeto Productos
+        lotes_vigentes: Lotes activos con cantidad > 0, ordenados por FIFO
+    """
+    producto.cantidad = sum((Decimal(str(l.cantidad)) for l in lotes_vigentes), Decimal('0'))
+    producto.lotes_activos = len(lotes_vigentes)
+    # La menor caducidad sin contar lotes sin fecha, igual que el Min() de
+    # calcular_resumen_lotes (MySQL ordena los NULL primero en el FIFO)
+    producto.caducidad = min(
+        (l.fecha_caducidad for l in lotes_vigentes if l.fecha_caducidad is not None),
+        default=None,
+    )
+    producto.modificado = timezone.now()
+
+
+def actualizar_resumen_stock(productos, guardar=True):
+    """
+    Recalcula el resumen de stock de los productos desde sus lotes.
+
+    Debe llamarse dentro de la transacción que modificó los lotes.
+
+    Args:
+        productos: Objeto Productos o lista de objetos Productos
+        guardar: Si es True, persiste los cambios con un solo bulk_update.
+                 Si es False, solo actualiza los objetos en memoria (para que
+                 la vista los guarde junto con sus propios campos).
+
+    Returns:
+        list: Productos cuyo resumen fue recalculado (los que tienen lotes)
+    """
+    if isinstance(productos, Productos):
+        productos = [productos]
+
+    resumen = calcular_resumen_lotes([p.id for p in productos])
+
+    actualizados = []
+    for producto in productos:
+        datos = resumen.get(producto.id)
+        if datos is None:
+            # Producto sin lotes: se mantiene su cantidad directa
+            continue
+        producto.cantidad = datos['cantidad']
+        producto.lotes_activos = datos['lotes_activos']
+        producto.caducidad = datos['caducidad']
+        producto.modificado = timezone.now()
+        actualizados.append(producto)
+
+    if guardar and actualizados:
+        Productos.objects.bulk_update(actualizados, CAMPOS_GUARDADO_STOCK)
+
+    return actualizados
+
+
+def productos_para_reactivar():
+    """
+    Productos en merma que volvieron a tener lotes activos y pueden reactivarse.
+
+    Se excluyen los que tienen registros activos en HistorialMerma: esos
+    siguen en merma hasta que el usuario los reactive manualmente.
+
+    Returns:
+        QuerySet: Productos candidatos a reactivación
+    """
+    historial_activo = HistorialMerma.objects.filter(producto=OuterRef('pk'), activo=True)
+    return Productos.objects.filter(
+        estado_merma='en_merma',
+        lotes_activos__gt=0,
+        eliminado__isnull=True,
+    ).exclude(Exists(historial_activo))
+
+
+def reactivar_productos_con_stock(dry_run=False):
+    """
+    Reactiva (en un solo UPDATE) los productos en merma que volvieron a tener lotes activos.
+
+    La caducidad ya está en el resumen de stock; la fecha de elaboración se
+    toma del lote activo más antiguo (FIFO), igual que al cargar un lote.
+
+    Args:
+        dry_run: Si es True, solo cuenta los productos sin modificarlos
+
+    Returns:
+        int: Cantidad de productos reactivados (o que se reactivarían)
+    """
+    candidatos = productos_para_reactivar()
+    if dry_run:
+        return candidatos.count()
+
+    elaboracion_lote_antiguo = Lote.objects.filter(
+        FILTRO_LOTE_VIGENTE,
+        productos=OuterRef('pk'),
+    ).order_by('fecha_caducidad', 'fecha_recepcion').values('fecha_elaboracion')[:1]
+
+    return candidatos.update(
+        estado_merma='activo',
+        elaboracion=Coalesce(Subquery(elaboracion_lote_antiguo), F('elaboracion')),
+        modificado=timezone.now(),
+    )
@@ -0,0 +1,226 @@
+# ================================================================
+# =                                                              =
+# =        TAREAS PROGRAMADAS (BLOQUEO, MARCA DE AGUA)          =
+# =                                                              =
+# ================================================================
+#
+# Este archivo contiene la infraestructura para ejecutar tareas en
+# segundo plano sin depender de una petición web:
+#
+# 1. Bloqueo por tarea (tabla estado_tareas): un UPDATE condicional
+#    toma el bloqueo solo si está libre o vencido, así dos procesos
+#    (cron, servidor, otro worker) nunca ejecutan la misma tarea a la vez
+# 2. Marca de agua: cada ejecución exitosa guarda hasta qué momento
+#    procesó cambios, para que la siguiente revise solo lo nuevo
+# 3. Programador en proceso: un hilo que ejecuta la tarea cada N minutos.
+#    Solo lo inician Forneria/wsgi.py y Forneria/asgi.py (el proceso del
+#    servidor), y solo si ALERTAS_PROGRAMADOR_MINUTOS > 0 en settings
+#
+# TAREA INCLUIDA:
+# - generar_alertas: genera alertas de vencimiento, stock bajo y facturas.
+#   Antes se ejecutaba en cada carga del dashboard.
+
+import atexit
+import threading
+import time
+from datetime import timedelta
+from django.db import IntegrityError, close_old_connections
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from ventas.models import Alertas, EstadoTarea
+import logging
+
+logger = logging.getLogger('ventas')
+
+# Nombre de la tarea de alertas en la tabla estado_tareas
+TAREA_ALERTAS = 'generar_alertas'
+
+# Si un proceso muere con el bloqueo tomado, el bloqueo expira solo
+DURACION_BLOQUEO = timedelta(minutes=10)
+
+# Margen hacia atrás al usar la marca de agua: un cambio puede marcarse con
+# `modificado` antes de que su transacción se confirme. Revisar un producto
+# dos veces no duplica alertas (el generador es idempotente).
+MARGEN_MARCA_AGUA = timedelta(minutes=5)
+
+
+# ================================================================
+# =                 BLOQUEO DE TAREAS                            =
+# ================================================================
+
+def adquirir_bloqueo(nombre, duracion=DURACION_BLOQUEO):
+    """
+    Intenta tomar el bloqueo de una tarea.
+
+    Args:
+        nombre: Nombre de la tarea
+        duracion: timedelta tras el cual el bloqueo expira (por si el proceso muere)
+
+    Returns:
+        EstadoTarea o None: El estado de la tarea si se obtuvo el bloqueo,
+                            None si otra ejecución lo tiene
+    """
+    ahora = timezone.now()
+
+    # Crear la fila de la tarea la primera vez
+    if not EstadoTarea.objects.filter(nombre=nombre).exists():
+        try:
+            EstadoTarea.objects.create(nombre=nombre)
+        except IntegrityError:
+            pass  # Otro proceso la creó al mismo tiempo
+
+    # UPDATE condicional: solo un proceso puede cambiar la fila
+    tomado = EstadoTarea.objects.filter(
+        Q(bloqueado_hasta__isnull=True) | Q(bloqueado_hasta__lt=ahora),
+        nombre=nombre,
+    ).update(bloqueado_hasta=ahora + duracion)
+
+    if not tomado:
+        return None
+    return EstadoTarea.objects.get(nombre=nombre)
+
+
+def liberar_bloqueo(estado, marca_agua=None, resultado=None):
+    """
+    Libera el bloqueo de una tarea y, si terminó bien, guarda su marca de agua.
+
+    Args:
+        estado: EstadoTarea obtenido con adquirir_bloqueo
+        marca_agua: datetime hasta el cual se procesaron cambios (None si falló)
+        resultado: dict con estadísticas de la ejecución
+    """
+    campos = {'bloqueado_hasta': None}
+    if marca_agua is not None:
+        campos.update(
+            marca_agua=marca_agua,
+            ultima_ejecucion=timezone.now(),
+            ultimo_resultado=resultado,
+        )
+    EstadoTarea.objects.filter(pk=estado.pk).update(**campos)
+
+
+# ================================================================
+# =                 TAREA: GENERAR ALERTAS                       =
+# ================================================================
+
+def ejecutar_generacion_alertas(completa=False):
+    """
+    Ejecuta la generación de alertas de forma incremental y con bloqueo.
+
+    - Si ya hay otra ejecución en curso, no hace nada.
+    - Si la última ejecución fue hoy, solo revisa productos y facturas
+      modificados desde entonces.
+    - Si es la primera ejecución del día (o `completa=True`), revisa todo:
+      los días hasta vencer cambian aunque nada se haya modificado.
+
+    Args:
+        completa: Forzar una revisión de todo el catálogo
+
+    Returns:
+        dict o None: Estadísticas de Alertas.generar_alertas_automaticas
+                     (con la clave 'modo'), o None si otra ejecución tenía el bloqueo
+    """
+    estado = adquirir_bloqueo(TAREA_ALERTAS)
+    if estado is None:
+        logger.info('[ALERTAS] Otra ejecución de la generación de alertas está en curso, se omite')
+        return None
+
+    # La marca de agua se toma ANTES de leer: lo que cambie durante la
+    # ejecución quedará para la siguiente
+    inicio = timezone.now()
+
+    desde = None
+    if not completa and estado.marca_agua is not None:
+        if timezone.localdate(estado.marca_agua) == timezone.localdate(inicio):
+            desde = estado.marca_agua - MARGEN_MARCA_AGUA
+
+    try:
+        resultado = Alertas.generar_alertas_automaticas(desde=desde)
+    except Exception:
+        liberar_bloqueo(estado)
+        raise
+
+    resultado['modo'] = 'incremental' if desde else 'completa'
+    liberar_bloqueo(estado, marca_agua=inicio, resultado=resultado)
+    logger.info(f'[ALERTAS] Generación {resultado["modo"]} terminada: {resultado["total"]} alerta(s) nuevas o actualizadas')
+    return resultado
+
+
+# ================================================================
+# =                 PROGRAMADOR EN PROCESO                       =
+# ================================================================
+
+_programador = None
+
+# Marcado mientras el hilo del programador ejecuta la tarea
+_programador_en_ejecucion = threading.Event()
+
+
+def iniciar_programador_alertas(intervalo_minutos):
+    """
+    Inicia un hilo en segundo plano que genera alertas cada N minutos.
+
+    Se puede llamar más de una vez: solo se inicia un hilo por proceso.
+    Si hay varios procesos (varios workers), el bloqueo de la tarea evita
+    ejecuciones duplicadas.
+
+    Args:
+        intervalo_minutos: Minutos entre ejecuciones
+
+    Returns:
+        threading.Thread: El hilo del programador
+    """
+    global _programador
+    if _programador is not None and _programador.is_alive():
+        return _programador
+
+    def ciclo():
+        while True:
+            _programador_en_ejecucion.set()
+            try:
+                ejecutar_generacion_alertas()
+            except Exception as e:
+                logger.error(f'[ALERTAS] Error en el programador de alertas: {e}', exc_info=True)
+            finally:
+                _programador_en_ejecucion.clear()
+                # El hilo no pasa por el ciclo de petición de Django
+                close_old_connections()
+            time.sleep(intervalo_minutos * 60)
+
+    _programador = threading.Thread(target=ciclo, name='programador-alertas', daemon=True)
+    _programador.start()
+    atexit.register(_liberar_bloqueo_al_salir)
+    logger.info(f'[ALERTAS] Programador de alertas iniciado (cada {intervalo_minutos} minutos)')
+    return _programador
+
+
+def _liberar_bloqueo_al_salir():
+    """
+    Al apagar el servidor en medio de una ejecución, el hilo (daemon) se
+    corta sin liberar el bloqueo: se libera aquí para que la siguiente
+    ejecución no espere DURACION_BLOQUEO. La marca de agua no avanza.
+    """
+    if not _programador_en_ejecucion.is_set():
+        return
+    try:
+        EstadoTarea.objects.filter(nombre=TAREA_ALERTAS).update(bloqueado_hasta=None)
+    except Exception as e:
+        logger.warning(f'[ALERTAS] No se pudo liberar el bloqueo al salir: {e}')
+
+
+def iniciar_programador_si_habilitado():
+    """
+    Inicia el programador de alertas si ALERTAS_PROGRAMADOR_MINUTOS > 0.
+
+    Se llama desde Forneria/wsgi.py y Forneria/asgi.py, que solo cargan los
+    servidores (runserver, gunicorn, uvicorn...): los comandos, el shell y
+    los scripts que llaman a django.setup() nunca inician el hilo.
+
+    Returns:
+        threading.Thread o None: El hilo del programador, o None si está desactivado
+    """
+    minutos = getattr(settings, 'ALERTAS_PROGRAMADOR_MINUTOS', 0)
+    if not minutos:
+        return None
+    return iniciar_programador_alertas(minutos)
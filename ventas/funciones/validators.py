@@ -1,4 +1,5 @@
 import re
+import unicodedata
 from django.core.exceptions import ValidationError
 
 # Aquí definimos una función que acepta un parámetro value 
@@ -18,6 +19,30 @@ def sanitizador_texto(value):
     
     return value_sin_espacios
 
+def normalizar_texto_busqueda(value):
+    """
+    Normaliza un texto para buscarlo por prefijo:
+    espacios limpios, minúsculas y sin tildes ("  José  Pérez" -> "jose perez")
+    """
+    value = sanitizador_texto(value)
+    if not value:
+        return ''
+
+    # separar las tildes de cada letra y descartarlas
+    descompuesto = unicodedata.normalize('NFKD', value.lower())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+def normalizar_rut(value):
+    """
+    Normaliza un RUT para compararlo: sin puntos, guion ni espacios,
+    y con la K en mayúscula ("12.345.678-k" -> "12345678K")
+    """
+    value = sanitizador_texto(value)
+    if not value:
+        return ''
+
+    return re.sub(r'[\s.\-]', '', value).upper()
+
 def validador_nombre(value, field_label="Nombre"):
     """
     No puede estar vacío.
@@ -153,6 +178,7 @@ def validador_contrasena_registro(value):
 # Funciones estrictas para productos (precio y textos)
 from decimal import Decimal, InvalidOperation
 import re
+import unicodedata
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import date
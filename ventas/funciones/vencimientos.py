@@ -0,0 +1,233 @@
+# ================================================================
+# =                                                              =
+# =        PRÓXIMOS VENCIMIENTOS Y PÉRDIDA POTENCIAL (LOTES)    =
+# =                                                              =
+# ================================================================
+#
+# Antes había seis APIs casi iguales (productos por vencer y pérdida
+# potencial a 7, 14 y 30 días) y cada una recorría la tabla productos
+# por su cuenta, sumando la pérdida en un ciclo de Python.
+#
+# Ahora todo sale de UNA consulta agrupada sobre los lotes activos (el
+# stock real que consume el FIFO), para cualquier horizonte:
+#
+#   SELECT fecha_caducidad, productos_id, COUNT(*), SUM(cantidad),
+#          SUM(cantidad * precio)
+#   FROM lotes JOIN productos ...
+#   WHERE estado = 'activo' AND cantidad > 0
+#     AND fecha_caducidad BETWEEN hoy AND hoy + horizonte
+#   GROUP BY fecha_caducidad, productos_id
+#
+# Los productos antiguos que nunca tuvieron lotes guardan su stock y su
+# caducidad en la tabla productos: salen de una SEGUNDA consulta (igual
+# que en el barrido de merma, ver ventas/funciones/merma.py) y cada uno
+# cuenta como un lote.
+#
+# Con esas filas (a lo más una por producto y día) se arman en memoria
+# el histograma por tramos de días, los totales y la lista de productos.
+#
+# El resultado se guarda en el cache hasta que cambie algún lote: toda
+# escritura de lotes actualiza el resumen de stock del producto y su
+# `modificado` (ver ventas/funciones/stock.py), así la versión del
+# catálogo (mayor `modificado` y cantidad de productos) cambia con
+# cada venta, recepción, ajuste o merma. La fecha de hoy también es
+# parte de la clave: a medianoche los tramos se recalculan.
+
+from datetime import timedelta
+from decimal import Decimal
+from itertools import chain
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum, F, DecimalField, ExpressionWrapper, Exists, OuterRef
+from django.utils import timezone
+from ventas.models import Lote, Productos
+from ventas.funciones.catalogo_pos import estado_catalogo
+import hashlib
+
+# Horizontes que muestra el dashboard (días)
+HORIZONTES_DASHBOARD = (7, 14, 30)
+
+# Horizonte máximo que se puede pedir (días)
+MAX_HORIZONTE_VENCIMIENTOS = 365
+
+VALOR_LOTE = ExpressionWrapper(
+    F('cantidad') * F('productos__precio'),
+    output_field=DecimalField(max_digits=20, decimal_places=5),
+)
+
+VALOR_PRODUCTO = ExpressionWrapper(
+    F('cantidad') * F('precio'),
+    output_field=DecimalField(max_digits=20, decimal_places=5),
+)
+
+
+def version_vencimientos(hoy=None):
+    """
+    Versión de los datos de vencimientos (cambia con cualquier cambio de lotes o del día).
+
+    Returns:
+        str: Hash corto para usar en la clave del cache y en el ETag
+    """
+    hoy = hoy or timezone.localdate()
+    estado = estado_catalogo()
+    version = estado['version'].isoformat() if estado['version'] else ''
+    clave = f"{hoy.isoformat()}|{version}|{estado['total']}"
+    return hashlib.md5(clave.encode('utf-8')).hexdigest()
+
+
+def calcular_vencimientos(dias, tramo=1, hoy=None):
+    """
+    Lotes activos (y productos sin lotes) que vencen entre hoy y hoy + dias,
+    agrupados por tramos.
+
+    Args:
+        dias: Horizonte en días (1 a MAX_HORIZONTE_VENCIMIENTOS)
+        tramo: Días por tramo del histograma (1 = un tramo por día)
+        hoy: Fecha de referencia (por defecto, hoy en hora local)
+
+    Returns:
+        dict: {
+            'dias', 'tramo', 'desde', 'hasta',
+            'total_lotes', 'total_productos', 'cantidad_total', 'perdida_total',
+            'tramos': [{'desde', 'hasta', 'lotes', 'productos', 'cantidad', 'valor'}],
+            'items': [{'id', 'nombre', 'caducidad', 'cantidad', 'valor'}],
+        }
+        items trae un producto por fila (su lote más próximo a vencer),
+        ordenados por caducidad y nombre.
+    """
+    hoy = hoy or timezone.localdate()
+    limite = hoy + timedelta(days=dias)
+
+    filas = Lote.objects.filter(
+        estado='activo',
+        cantidad__gt=0,
+        fecha_caducidad__range=(hoy, limite),
+        productos__eliminado__isnull=True,
+    ).order_by().values(
+        'fecha_caducidad', 'productos_id', 'productos__nombre'
+    ).annotate(
+        lotes=Count('id'),
+        cantidad_lotes=Sum('cantidad'),
+        valor=Sum(VALOR_LOTE),
+    )
+
+    # Productos antiguos sin lotes: su propia caducidad y cantidad
+    productos_sin_lotes = Productos.objects.filter(
+        cantidad__gt=0,
+        caducidad__range=(hoy, limite),
+        estado_merma='activo',
+        eliminado__isnull=True,
+    ).exclude(
+        Exists(Lote.objects.filter(productos=OuterRef('pk')))
+    ).order_by().values_list('caducidad', 'id', 'nombre', 'cantidad').annotate(valor=VALOR_PRODUCTO)
+
+    # Con las mismas claves que las filas de lotes (cada producto es un lote)
+    filas_sin_lotes = (
+        {
+            'fecha_caducidad': caducidad,
+            'productos_id': producto_id,
+            'productos__nombre': nombre,
+            'lotes': 1,
+            'cantidad_lotes': cantidad,
+            'valor': valor,
+        }
+        for caducidad, producto_id, nombre, cantidad, valor in productos_sin_lotes
+    )
+
+    # Tramos vacíos del histograma: [hoy, hoy + tramo - 1], [hoy + tramo, ...], ...
+    numero_tramos = dias // tramo + 1
+    tramos = []
+    for indice in range(numero_tramos):
+        inicio = hoy + timedelta(days=indice * tramo)
+        tramos.append({
+            'desde': inicio,
+            'hasta': min(inicio + timedelta(days=tramo - 1), limite),
+            'lotes': 0,
+            'productos': set(),
+            'cantidad': Decimal('0'),
+            'valor': Decimal('0'),
+        })
+
+    productos = {}
+    for fila in chain(filas, filas_sin_lotes):
+        cantidad = fila['cantidad_lotes'] or Decimal('0')
+        valor = fila['valor'] or Decimal('0')
+
+        grupo = tramos[(fila['fecha_caducidad'] - hoy).days // tramo]
+        grupo['lotes'] += fila['lotes']
+        grupo['productos'].add(fila['productos_id'])
+        grupo['cantidad'] += cantidad
+        grupo['valor'] += valor
+
+        producto = productos.get(fila['productos_id'])
+        if producto is None:
+            productos[fila['productos_id']] = {
+                'id': fila['productos_id'],
+                'nombre': fila['productos__nombre'],
+                'caducidad': fila['fecha_caducidad'],
+                'cantidad': cantidad,
+                'valor': valor,
+            }
+        else:
+            producto['caducidad'] = min(producto['caducidad'], fila['fecha_caducidad'])
+            producto['cantidad'] += cantidad
+            producto['valor'] += valor
+
+    items = sorted(productos.values(), key=lambda p: (p['caducidad'], p['nombre']))
+
+    return {
+        'dias': dias,
+        'tramo': tramo,
+        'desde': hoy.isoformat(),
+        'hasta': limite.isoformat(),
+        'total_lotes': sum(grupo['lotes'] for grupo in tramos),
+        'total_productos': len(productos),
+        'cantidad_total': float(sum(grupo['cantidad'] for grupo in tramos)),
+        'perdida_total': float(sum(grupo['valor'] for grupo in tramos)),
+        'tramos': [
+            {
+                'desde': grupo['desde'].isoformat(),
+                'hasta': grupo['hasta'].isoformat(),
+                'lotes': grupo['lotes'],
+                'productos': len(grupo['productos']),
+                'cantidad': float(grupo['cantidad']),
+                'valor': float(grupo['valor']),
+            }
+            for grupo in tramos
+        ],
+        'items': [
+            {
+                'id': producto['id'],
+                'nombre': producto['nombre'],
+                'caducidad': producto['caducidad'].isoformat(),
+                'cantidad': float(producto['cantidad']),
+                'valor': float(producto['valor']),
+            }
+            for producto in items
+        ],
+    }
+
+
+def obtener_vencimientos(dias, tramo=1):
+    """
+    Vencimientos desde el cache, calculándolos si algún lote cambió.
+
+    Args:
+        dias: Horizonte en días
+        tramo: Días por tramo del histograma
+
+    Returns:
+        dict: {'datos': resultado de calcular_vencimientos, 'etag': str}
+    """
+    hoy = timezone.localdate()
+    version = version_vencimientos(hoy)
+    clave = f'vencimientos:{version}:{dias}:{tramo}'
+
+    resultado = cache.get(clave)
+    if resultado is None:
+        resultado = {
+            'datos': calcular_vencimientos(dias, tramo, hoy),
+            'etag': f'"{version}-{dias}-{tramo}"',
+        }
+        cache.set(clave, resultado, settings.VENCIMIENTOS_CACHE_TTL)
+    return resultado
@@ -8,16 +8,31 @@
 # para todos los productos según sus fechas de vencimiento.
 #
 # USO:
-#   python manage.py generar_alertas
+#   python manage.py generar_alertas              (incremental)
+#   python manage.py generar_alertas --completa   (revisa todo el catálogo)
+#   python manage.py generar_alertas --cada 15    (modo programador: cada 15 minutos)
 #
 # Este comando se puede ejecutar:
 # - Manualmente cuando lo necesites
-# - Automáticamente con un cron job (cada día a las 6 AM, por ejemplo)
-# - Al iniciar el servidor (agregando al archivo wsgi.py o apps.py)
+# - Automáticamente con un cron job (cada 15 minutos, por ejemplo)
+# - Como proceso permanente con --cada N (forma recomendada)
+# - Dentro del servidor: ALERTAS_PROGRAMADOR_MINUTOS=N en settings (por
+#   defecto 0, desactivado)
+#
+# El dashboard ya NO genera alertas al cargar: solo las lee.
+#
+# INCREMENTAL: solo revisa productos y facturas modificados desde la
+# última ejecución (marca de agua en la tabla estado_tareas). La primera
+# ejecución de cada día revisa todo, porque los días hasta vencer cambian.
+#
+# BLOQUEO: si otra ejecución está en curso, esta se omite (no se crean
+# alertas duplicadas).
 
+import time
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from ventas.models import Alertas
+from ventas.funciones.tareas import ejecutar_generacion_alertas
 
 
 class Command(BaseCommand):
@@ -51,11 +66,51 @@ class Command(BaseCommand):
             action='store_true',
             help='Muestra información detallada sobre cada alerta generada',
         )
+        # Revisar todo el catálogo aunque la última ejecución haya sido hoy
+        parser.add_argument(
+            '--completa',
+            action='store_true',
+            help='Revisa todos los productos y facturas (no solo los modificados)',
+        )
+        # Modo programador: repetir cada N minutos hasta detener con Ctrl+C
+        parser.add_argument(
+            '--cada',
+            type=int,
+            default=0,
+            metavar='MINUTOS',
+            help='Ejecuta la generación cada N minutos (modo programador)',
+        )
     
     def handle(self, *args, **options):
         """
         Método principal que se ejecuta cuando se llama al comando.
         
+        Args:
+            options: Diccionario con los argumentos del comando
+        """
+        intervalo = options.get('cada') or 0
+        
+        if intervalo <= 0:
+            self.generar(options)
+            return
+        
+        # Modo programador
+        self.stdout.write(
+            self.style.SUCCESS(f'⏱️  Modo programador: generando alertas cada {intervalo} minutos (Ctrl+C para detener)')
+        )
+        try:
+            while True:
+                self.generar(options)
+                # Solo la primera vuelta respeta --completa; las siguientes son incrementales
+                options['completa'] = False
+                time.sleep(intervalo * 60)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\n⏹️  Programador detenido'))
+    
+    def generar(self, options):
+        """
+        Ejecuta una generación de alertas y muestra el resumen.
+        
         Args:
             options: Diccionario con los argumentos del comando
         """
@@ -68,23 +123,32 @@ class Command(BaseCommand):
         )
         
         try:
-            # Llamar al método estático del modelo Alertas
-            resultado = Alertas.generar_alertas_automaticas()
+            # Ejecutar la tarea (incremental, con bloqueo)
+            resultado = ejecutar_generacion_alertas(completa=options.get('completa', False))
+            
+            if resultado is None:
+                self.stdout.write(
+                    self.style.WARNING('⏳ Otra generación de alertas está en curso. Se omite esta ejecución.')
+                )
+                return
             
             # Mostrar resumen de resultados
             self.stdout.write(
-                self.style.SUCCESS(f'\n✅ Alertas generadas exitosamente:\n')
+                self.style.SUCCESS(f'\n✅ Alertas generadas exitosamente (revisión {resultado["modo"]}):\n')
             )
             self.stdout.write(f'   🔴 Rojas (0-13 días): {resultado.get("roja", 0)}')
             self.stdout.write(f'   🟡 Amarillas (14-29 días): {resultado.get("amarilla", 0)}')
             self.stdout.write(f'   🟢 Verdes (30+ días): {resultado.get("verde", 0)}')
             self.stdout.write(f'   📦 Stock Bajo: {resultado.get("stock_bajo", 0)}')
+            self.stdout.write(f'   🧾 Facturas: {resultado.get("facturas_vencidas", 0)}')
+            if resultado.get('duplicadas_resueltas'):
+                self.stdout.write(f'   🧹 Duplicadas resueltas: {resultado["duplicadas_resueltas"]}')
             self.stdout.write(
                 self.style.SUCCESS(f'   📊 Total: {resultado["total"]}\n')
             )
             
             # Mostrar fecha y hora de ejecución
-            ahora = timezone.now().strftime('%d/%m/%Y %H:%M:%S')
+            ahora = timezone.localtime().strftime('%d/%m/%Y %H:%M:%S')
             self.stdout.write(f'   🕒 Fecha: {ahora}\n')
             
             # Si está en modo verbose, mostrar alertas activas
@@ -114,4 +178,3 @@ class Command(BaseCommand):
         self.stdout.write(
             self.style.SUCCESS('\n✨ Proceso completado exitosamente\n')
         )
-
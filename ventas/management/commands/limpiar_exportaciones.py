@@ -0,0 +1,73 @@
+# ================================================================
+# =                                                              =
+# =        COMANDO DJANGO: LIMPIAR EXPORTACIONES                =
+# =                                                              =
+# ================================================================
+#
+# Este comando borra las exportaciones de reportes generadas en segundo
+# plano cuya vigencia terminó (archivo en disco + fila en
+# trabajos_exportacion), y marca como error las que siguen sin terminar
+# una hora después de pedirlas (las detenidas se retoman antes con
+# `python manage.py procesar_exportaciones`).
+#
+# La cola también limpia al terminar cada exportación; este comando
+# sirve para los días sin exportaciones.
+#
+# CÓMO EJECUTAR:
+# python manage.py limpiar_exportaciones
+# python manage.py limpiar_exportaciones --dry-run    (solo contar)
+#
+# PARA AUTOMATIZAR:
+# Programar una ejecución diaria con el Programador de tareas o cron,
+# igual que verificar_vencimientos
+
+from django.core.management.base import BaseCommand
+from ventas.funciones.exportaciones import limpiar_exportaciones_vencidas
+
+
+class Command(BaseCommand):
+    """
+    Comando para borrar las exportaciones vencidas.
+    """
+
+    help = 'Borra los archivos y trabajos de exportación vencidos'
+
+    def add_arguments(self, parser):
+        """
+        Argumentos opcionales del comando.
+
+        --dry-run: Solo cuenta las exportaciones, sin borrarlas
+        """
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo cuenta las exportaciones vencidas, sin borrarlas',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Lógica principal del comando.
+        """
+        dry_run = options['dry_run']
+
+        if dry_run:
+            self.stdout.write(
+                self.style.WARNING('🔍 MODO SIMULACIÓN - No se harán cambios reales')
+            )
+
+        self.stdout.write('=' * 60)
+        self.stdout.write('🧹 Limpiando exportaciones vencidas')
+        self.stdout.write('=' * 60)
+
+        resultado = limpiar_exportaciones_vencidas(dry_run=dry_run)
+
+        if dry_run:
+            self.stdout.write(f'🗑️  Exportaciones vencidas que se borrarían: {resultado["vencidos"]}')
+            self.stdout.write(f'⚠️  Exportaciones abandonadas que se marcarían con error: {resultado["abandonados"]}')
+        else:
+            self.stdout.write(f'🗑️  Exportaciones vencidas borradas: {resultado["vencidos"]}')
+            self.stdout.write(f'⚠️  Exportaciones abandonadas marcadas con error: {resultado["abandonados"]}')
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS('✅ Limpieza terminada'))
+        self.stdout.write('=' * 60)
@@ -0,0 +1,116 @@
+# ================================================================
+# =                                                              =
+# =        COMANDO DJANGO: NORMALIZAR CLIENTES                  =
+# =                                                              =
+# ================================================================
+#
+# Este comando completa las columnas de búsqueda de los clientes
+# (nombre_normalizado y rut_normalizado) que usa el buscador del POS.
+#
+# Los clientes nuevos o editados las completan al guardarse (ver
+# Clientes.save); este comando es para los clientes que ya existían al
+# ejecutar sql_busqueda_clientes.sql, o si se cargan clientes por SQL.
+#
+# Al terminar informa los RUT repetidos (el POS ya no permite crear
+# duplicados, pero pueden venir de antes).
+#
+# CÓMO EJECUTAR:
+# python manage.py normalizar_clientes
+# python manage.py normalizar_clientes --dry-run    (solo reportar)
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from ventas.models import Clientes
+from ventas.funciones.validators import normalizar_texto_busqueda, normalizar_rut
+
+
+class Command(BaseCommand):
+    """
+    Comando para completar los campos de búsqueda de los clientes.
+    """
+
+    help = 'Completa nombre_normalizado y rut_normalizado de los clientes (buscador del POS)'
+
+    def add_arguments(self, parser):
+        """
+        Argumentos opcionales del comando.
+
+        --dry-run: Solo cuenta los clientes a actualizar
+        --lote: Cantidad de clientes por consulta
+        """
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo cuenta los clientes a actualizar, sin modificarlos',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Cantidad de clientes por consulta (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Lógica principal del comando.
+        """
+        dry_run = options['dry_run']
+        tamano_lote = max(1, options['lote'])
+
+        if dry_run:
+            self.stdout.write(
+                self.style.WARNING('🔍 MODO SIMULACIÓN - No se harán cambios reales')
+            )
+
+        self.stdout.write('=' * 60)
+        self.stdout.write('👥 Normalizando nombre y RUT de clientes')
+        self.stdout.write('=' * 60)
+
+        revisados = 0
+        actualizados = 0
+        ultimo_id = 0
+
+        # Recorrer por bloques de ID: una consulta y un bulk_update por bloque
+        while True:
+            clientes = list(
+                Clientes.objects.filter(id__gt=ultimo_id).order_by('id').only(
+                    'id', 'nombre', 'rut', 'nombre_normalizado', 'rut_normalizado'
+                )[:tamano_lote]
+            )
+            if not clientes:
+                break
+            ultimo_id = clientes[-1].id
+
+            cambiados = []
+            for cliente in clientes:
+                revisados += 1
+                nombre = normalizar_texto_busqueda(cliente.nombre)
+                rut = normalizar_rut(cliente.rut) or None
+                if cliente.nombre_normalizado == nombre and cliente.rut_normalizado == rut:
+                    continue
+                cliente.nombre_normalizado = nombre
+                cliente.rut_normalizado = rut
+                cambiados.append(cliente)
+
+            actualizados += len(cambiados)
+            if cambiados and not dry_run:
+                Clientes.objects.bulk_update(cambiados, ['nombre_normalizado', 'rut_normalizado'])
+
+        # Resumen final
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'🔎 Clientes revisados: {revisados}')
+        if dry_run:
+            self.stdout.write(f'✏️  Clientes que se actualizarían: {actualizados}')
+        else:
+            self.stdout.write(f'✏️  Clientes actualizados: {actualizados}')
+
+        if not dry_run:
+            repetidos = Clientes.objects.filter(rut_normalizado__isnull=False).values(
+                'rut_normalizado'
+            ).annotate(total=Count('id')).filter(total__gt=1).order_by('rut_normalizado')
+            for fila in repetidos:
+                self.stdout.write(
+                    self.style.WARNING(f"  ⚠️  RUT {fila['rut_normalizado']} repetido en {fila['total']} clientes")
+                )
+
+        self.stdout.write(self.style.SUCCESS('✅ Proceso completado'))
@@ -0,0 +1,75 @@
+# ================================================================
+# =                                                              =
+# =        COMANDO DJANGO: PROCESAR ACCIONES MASIVAS            =
+# =                                                              =
+# ================================================================
+#
+# Este comando procesa las acciones masivas del inventario que quedaron
+# pendientes y retoma las que se detuvieron a medias (por ejemplo, el
+# servidor se reinició mientras eliminaba 3.000 productos).
+#
+# Cada trabajo continúa desde el último bloque confirmado: los productos
+# ya procesados no se vuelven a tocar.
+#
+# El servidor también los retoma cuando la página del inventario
+# consulta el avance; este comando sirve si nadie vuelve a abrirla.
+#
+# CÓMO EJECUTAR:
+# python manage.py procesar_acciones_masivas
+# python manage.py procesar_acciones_masivas --dry-run    (solo contar)
+#
+# PARA AUTOMATIZAR:
+# Programar una ejecución cada pocos minutos con el Programador de
+# tareas o cron, igual que verificar_vencimientos
+
+from django.core.management.base import BaseCommand
+from ventas.models import TrabajoAccionMasiva
+from ventas.funciones.acciones_masivas import procesar_cola, trabajos_detenidos
+
+
+class Command(BaseCommand):
+    """
+    Comando para procesar y retomar las acciones masivas del inventario.
+    """
+
+    help = 'Procesa las acciones masivas pendientes y retoma las detenidas'
+
+    def add_arguments(self, parser):
+        """
+        Argumentos opcionales del comando.
+
+        --dry-run: Solo cuenta los trabajos, sin procesarlos
+        """
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo cuenta los trabajos pendientes y detenidos, sin procesarlos',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Lógica principal del comando.
+        """
+        dry_run = options['dry_run']
+
+        if dry_run:
+            self.stdout.write(
+                self.style.WARNING('🔍 MODO SIMULACIÓN - No se harán cambios reales')
+            )
+
+        self.stdout.write('=' * 60)
+        self.stdout.write('📦 Procesando acciones masivas del inventario')
+        self.stdout.write('=' * 60)
+
+        pendientes = TrabajoAccionMasiva.objects.filter(estado='pendiente').count()
+        detenidos = trabajos_detenidos().count()
+        self.stdout.write(f'⏳ Trabajos pendientes: {pendientes}')
+        self.stdout.write(f'⚠️  Trabajos detenidos: {detenidos}')
+
+        if not dry_run:
+            procesados = procesar_cola()
+            self.stdout.write(f'✅ Trabajos procesados: {procesados}')
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS('✅ Proceso completado'))
+        self.stdout.write('=' * 60)
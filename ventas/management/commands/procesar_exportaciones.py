@@ -0,0 +1,74 @@
+# ================================================================
+# =                                                              =
+# =        COMANDO DJANGO: PROCESAR EXPORTACIONES               =
+# =                                                              =
+# ================================================================
+#
+# Este comando genera las exportaciones de reportes que quedaron
+# pendientes y retoma las que se detuvieron a medias (por ejemplo, el
+# servidor se reinició mientras armaba un Excel de un año de ventas).
+#
+# Una exportación retomada se vuelve a generar desde el principio.
+#
+# El servidor también las despacha cuando la página del reporte
+# consulta el estado; este comando sirve si nadie vuelve a abrirla.
+#
+# CÓMO EJECUTAR:
+# python manage.py procesar_exportaciones
+# python manage.py procesar_exportaciones --dry-run    (solo contar)
+#
+# PARA AUTOMATIZAR:
+# Programar una ejecución cada pocos minutos con el Programador de
+# tareas o cron, igual que procesar_acciones_masivas
+
+from django.core.management.base import BaseCommand
+from ventas.models import TrabajoExportacion
+from ventas.funciones.exportaciones import procesar_cola, trabajos_detenidos
+
+
+class Command(BaseCommand):
+    """
+    Comando para generar y retomar las exportaciones en segundo plano.
+    """
+
+    help = 'Genera las exportaciones pendientes y retoma las detenidas'
+
+    def add_arguments(self, parser):
+        """
+        Argumentos opcionales del comando.
+
+        --dry-run: Solo cuenta los trabajos, sin procesarlos
+        """
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo cuenta las exportaciones pendientes y detenidas, sin procesarlas',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Lógica principal del comando.
+        """
+        dry_run = options['dry_run']
+
+        if dry_run:
+            self.stdout.write(
+                self.style.WARNING('🔍 MODO SIMULACIÓN - No se harán cambios reales')
+            )
+
+        self.stdout.write('=' * 60)
+        self.stdout.write('📤 Procesando exportaciones de reportes')
+        self.stdout.write('=' * 60)
+
+        pendientes = TrabajoExportacion.objects.filter(estado='pendiente').count()
+        detenidos = trabajos_detenidos().count()
+        self.stdout.write(f'⏳ Exportaciones pendientes: {pendientes}')
+        self.stdout.write(f'⚠️  Exportaciones detenidas: {detenidos}')
+
+        if not dry_run:
+            procesados = procesar_cola()
+            self.stdout.write(f'✅ Exportaciones procesadas: {procesados}')
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS('✅ Proceso completado'))
+        self.stdout.write('=' * 60)
@@ -0,0 +1,146 @@
+# ================================================================
+# =                                                              =
+# =     COMANDO DJANGO: RECONCILIAR SALDOS DE PROVEEDORES       =
+# =                                                              =
+# ================================================================
+#
+# Este comando compara los saldos guardados de las facturas de proveedor
+# (total_pagado, saldo_pendiente) con sus pagos, y el saldo guardado de
+# cada proveedor con la suma de sus facturas, y corrige las diferencias.
+#
+# Los saldos se mantienen al registrar pagos y modificar facturas (ver
+# ventas/funciones/saldos_proveedores.py), así que normalmente no
+# debería encontrar diferencias. Si las encuentra, indica que algún
+# proceso modificó pagos o facturas sin pasar por los modelos (por
+# ejemplo, un UPDATE directo en la base de datos).
+#
+# Usa consultas agrupadas (SUM ... GROUP BY), por bloques de facturas.
+#
+# CÓMO EJECUTAR:
+# python manage.py reconciliar_saldos_proveedores
+# python manage.py reconciliar_saldos_proveedores --dry-run    (solo reportar)
+#
+# PARA AUTOMATIZAR:
+# Programar una ejecución cada noche con el Programador de tareas o
+# cron, igual que verificar_vencimientos
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ventas.models import Proveedor, FacturaProveedor
+from ventas.funciones.saldos_proveedores import facturas_descuadradas, proveedores_descuadrados
+
+
+class Command(BaseCommand):
+    """
+    Comando para detectar y corregir diferencias en los saldos guardados
+    de facturas de proveedor y proveedores.
+    """
+
+    help = 'Compara los saldos de facturas y proveedores con sus pagos y corrige diferencias'
+
+    def add_arguments(self, parser):
+        """
+        Argumentos opcionales del comando.
+
+        --dry-run: Solo reporta las diferencias, sin corregirlas
+        --lote: Cantidad de facturas a revisar por consulta
+        """
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo reporta las diferencias, sin corregirlas',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Cantidad de facturas a revisar por consulta (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Lógica principal del comando.
+        """
+        dry_run = options['dry_run']
+        tamano_lote = max(1, options['lote'])
+
+        if dry_run:
+            self.stdout.write(
+                self.style.WARNING('🔍 MODO SIMULACIÓN - No se harán cambios reales')
+            )
+
+        self.stdout.write('=' * 60)
+        self.stdout.write('💰 Reconciliando saldos de facturas y proveedores')
+        self.stdout.write('=' * 60)
+
+        # 1. Facturas: saldos guardados contra la suma de sus pagos
+        factura_ids = list(
+            FacturaProveedor.objects.order_by('id').values_list('id', flat=True)
+        )
+        facturas_corregidas = 0
+
+        for inicio in range(0, len(factura_ids), tamano_lote):
+            ids_bloque = factura_ids[inicio:inicio + tamano_lote]
+
+            with transaction.atomic():
+                descuadradas = facturas_descuadradas(ids_bloque, bloquear=not dry_run)
+
+                for factura, total_pagado, saldo in descuadradas:
+                    self.stdout.write(f'  ⚠️  Factura {factura.numero_factura} (ID {factura.id})')
+                    self.stdout.write(
+                        f'     total_pagado: guardado={factura.total_pagado} / pagos={total_pagado}'
+                    )
+                    self.stdout.write(
+                        f'     saldo_pendiente: guardado={factura.saldo_pendiente} / real={saldo}'
+                    )
+                    factura.total_pagado = total_pagado
+                    factura.saldo_pendiente = saldo
+
+                facturas_corregidas += len(descuadradas)
+                if descuadradas and not dry_run:
+                    FacturaProveedor.objects.bulk_update(
+                        [factura for factura, _, _ in descuadradas],
+                        list(FacturaProveedor.CAMPOS_SALDO),
+                    )
+
+        # 2. Proveedores: saldo guardado contra la suma de sus facturas
+        # (después de corregir las facturas). En simulación la suma usa los
+        # saldos de factura guardados, sin las correcciones anteriores.
+        with transaction.atomic():
+            descuadrados = proveedores_descuadrados(bloquear=not dry_run)
+
+            for proveedor, saldo in descuadrados:
+                self.stdout.write(
+                    f'  ⚠️  Proveedor {proveedor.nombre} (ID {proveedor.id}): '
+                    f'guardado={proveedor.saldo_pendiente} / facturas={saldo}'
+                )
+                proveedor.saldo_pendiente = saldo
+
+            if descuadrados and not dry_run:
+                Proveedor.objects.bulk_update(
+                    [proveedor for proveedor, _ in descuadrados],
+                    ['saldo_pendiente'],
+                )
+
+        # Resumen final
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'🔎 Facturas revisadas: {len(factura_ids)}')
+
+        if facturas_corregidas == 0 and not descuadrados:
+            self.stdout.write(
+                self.style.SUCCESS('✅ Los saldos cuadran con los pagos. Todo está en orden.')
+            )
+        elif dry_run:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'🔍 SIMULACIÓN: {facturas_corregidas} facturas y '
+                    f'{len(descuadrados)} proveedores serían corregidos'
+                )
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'✅ {facturas_corregidas} facturas y {len(descuadrados)} proveedores corregidos'
+                )
+            )
+        self.stdout.write('=' * 60)
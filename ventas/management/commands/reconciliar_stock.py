@@ -0,0 +1,159 @@
+# ================================================================
+# =                                                              =
+# =        COMANDO DJANGO: RECONCILIAR STOCK                    =
+# =                                                              =
+# ================================================================
+#
+# Este comando compara el resumen de stock guardado en cada producto
+# (cantidad, lotes_activos, caducidad) con lo que dicen sus lotes, y
+# corrige las diferencias encontradas.
+#
+# El resumen se mantiene al modificar lotes (ver ventas/funciones/stock.py),
+# así que normalmente no debería encontrar diferencias. Si las encuentra,
+# indica que algún proceso modificó lotes sin actualizar el producto.
+#
+# Además reactiva los productos en merma que volvieron a tener lotes
+# activos (sin historial de merma activo). Antes esto lo hacía la página
+# de inventario en cada carga; ahora el inventario solo lee.
+#
+# CÓMO EJECUTAR:
+# python manage.py reconciliar_stock
+# python manage.py reconciliar_stock --dry-run    (solo reportar)
+#
+# PARA AUTOMATIZAR:
+# Programar una ejecución periódica (por ejemplo cada 15 minutos)
+# con el Programador de tareas o cron, igual que verificar_vencimientos
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from ventas.models import Productos
+from ventas.funciones.stock import (
+    calcular_resumen_lotes, reactivar_productos_con_stock,
+    CAMPOS_RESUMEN_STOCK, CAMPOS_GUARDADO_STOCK,
+)
+
+
+class Command(BaseCommand):
+    """
+    Comando para detectar y corregir diferencias entre el resumen de stock
+    de los productos y sus lotes.
+    """
+
+    help = 'Compara el resumen de stock de los productos con sus lotes y corrige diferencias'
+
+    def add_arguments(self, parser):
+        """
+        Argumentos opcionales del comando.
+
+        --dry-run: Solo reporta las diferencias, sin corregirlas
+        --lote: Cantidad de productos a revisar por consulta
+        """
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo reporta las diferencias, sin corregirlas',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Cantidad de productos a revisar por consulta (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Lógica principal del comando.
+        """
+        dry_run = options['dry_run']
+        tamano_lote = max(1, options['lote'])
+
+        if dry_run:
+            self.stdout.write(
+                self.style.WARNING('🔍 MODO SIMULACIÓN - No se harán cambios reales')
+            )
+
+        self.stdout.write('=' * 60)
+        self.stdout.write('📦 Reconciliando resumen de stock con lotes')
+        self.stdout.write('=' * 60)
+
+        revisados = 0
+        diferencias = 0
+
+        producto_ids = list(
+            Productos.objects.order_by('id').values_list('id', flat=True)
+        )
+
+        # Revisar por bloques: una consulta de productos y una consulta
+        # agrupada de lotes por bloque
+        for inicio in range(0, len(producto_ids), tamano_lote):
+            ids_bloque = producto_ids[inicio:inicio + tamano_lote]
+
+            with transaction.atomic():
+                productos = Productos.objects.filter(id__in=ids_bloque).only('id', 'nombre', *CAMPOS_RESUMEN_STOCK)
+                if not dry_run:
+                    # Bloquear los productos antes de leer sus lotes: las ventas y
+                    # ajustes bloquean primero el producto, así no se corrige un
+                    # resumen con lotes a medio actualizar
+                    productos = productos.select_for_update()
+                productos = list(productos.order_by('id'))
+                resumen = calcular_resumen_lotes(ids_bloque)
+
+                con_diferencia = []
+                for producto in productos:
+                    revisados += 1
+                    datos = resumen.get(producto.id)
+
+                    if datos is None:
+                        # Producto sin lotes: solo el contador de lotes debe ser 0
+                        datos = {
+                            'cantidad': producto.cantidad,
+                            'lotes_activos': 0,
+                            'caducidad': producto.caducidad,
+                        }
+
+                    cambios = [
+                        (campo, getattr(producto, campo), datos[campo])
+                        for campo in CAMPOS_RESUMEN_STOCK
+                        if getattr(producto, campo) != datos[campo]
+                    ]
+                    if not cambios:
+                        continue
+
+                    diferencias += 1
+                    self.stdout.write(f'  ⚠️  {producto.nombre} (ID {producto.id})')
+                    for campo, guardado, real in cambios:
+                        self.stdout.write(f'     {campo}: guardado={guardado} / lotes={real}')
+                        setattr(producto, campo, real)
+                    producto.modificado = timezone.now()
+                    con_diferencia.append(producto)
+
+                if con_diferencia and not dry_run:
+                    Productos.objects.bulk_update(con_diferencia, CAMPOS_GUARDADO_STOCK)
+
+        # Reactivar productos en merma que volvieron a tener lotes activos
+        # (después de reconciliar, para usar el contador de lotes corregido)
+        reactivados = reactivar_productos_con_stock(dry_run=dry_run)
+
+        # Resumen final
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'🔎 Productos revisados: {revisados}')
+        if reactivados:
+            if dry_run:
+                self.stdout.write(f'🔄 Productos en merma que se reactivarían: {reactivados}')
+            else:
+                self.stdout.write(f'🔄 Productos en merma reactivados: {reactivados}')
+
+        if diferencias == 0:
+            self.stdout.write(
+                self.style.SUCCESS('✅ El resumen de stock cuadra con los lotes. Todo está en orden.')
+            )
+        elif dry_run:
+            self.stdout.write(
+                self.style.WARNING(f'🔍 SIMULACIÓN: {diferencias} productos serían corregidos')
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f'✅ {diferencias} productos corregidos')
+            )
+        self.stdout.write('=' * 60)
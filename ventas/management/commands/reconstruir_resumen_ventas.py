@@ -0,0 +1,168 @@
+# ================================================================
+# =                                                              =
+# =        COMANDO DJANGO: RECONSTRUIR RESUMEN DE VENTAS        =
+# =                                                              =
+# ================================================================
+#
+# Este comando recalcula el resumen diario de ventas (tablas
+# resumen_ventas_dia y resumen_ventas_producto_dia) desde las ventas
+# guardadas, día por día.
+#
+# El resumen se actualiza solo al confirmar cada venta del POS (ver
+# ventas/funciones/resumen_ventas.py). Este comando sirve para:
+# - Llenar el resumen la primera vez (ventas anteriores a las tablas)
+# - Corregir los días cuya actualización falló: quedan anotados en la
+#   tabla resumen_ventas_pendientes (y en el log); ver --pendientes
+#
+# Conviene reconstruir días cerrados: si se reconstruye el día de hoy
+# mientras el POS está vendiendo, una venta puede quedar sumada dos veces
+# (basta con volver a ejecutar el comando para ese día).
+#
+# CÓMO EJECUTAR:
+# python manage.py reconstruir_resumen_ventas                       (todas las ventas)
+# python manage.py reconstruir_resumen_ventas --desde 2025-01-01 --hasta 2025-01-31
+# python manage.py reconstruir_resumen_ventas --dias 7              (últimos 7 días)
+# python manage.py reconstruir_resumen_ventas --pendientes          (días con actualizaciones fallidas)
+# python manage.py reconstruir_resumen_ventas --dry-run             (solo comparar)
+
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from ventas.models import Ventas, ResumenVentasDia, ResumenVentasProductoDia, ResumenVentasPendiente
+from ventas.funciones.resumen_ventas import calcular_resumen_dia, reconstruir_resumen_dia
+
+
+class Command(BaseCommand):
+    """
+    Comando para recalcular el resumen diario de ventas desde las ventas.
+    """
+
+    help = 'Recalcula el resumen diario de ventas (para reportes y dashboard) desde las ventas guardadas'
+
+    def add_arguments(self, parser):
+        """
+        Argumentos opcionales del comando.
+
+        --desde / --hasta: Rango de fechas (YYYY-MM-DD, ambos incluidos)
+        --dias: Reconstruir solo los últimos N días (incluye hoy)
+        --pendientes: Reconstruir solo los días anotados como pendientes
+        --dry-run: Solo compara el resumen guardado con el recalculado
+        """
+        parser.add_argument('--desde', type=str, help='Fecha inicial YYYY-MM-DD (default: primera venta)')
+        parser.add_argument('--hasta', type=str, help='Fecha final YYYY-MM-DD (default: hoy)')
+        parser.add_argument('--dias', type=int, help='Reconstruir solo los últimos N días')
+        parser.add_argument(
+            '--pendientes',
+            action='store_true',
+            help='Reconstruir solo los días cuya actualización del resumen falló',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo compara el resumen guardado con el recalculado, sin modificarlo',
+        )
+
+    def _fecha(self, texto):
+        """
+        Convierte un texto YYYY-MM-DD a date.
+        """
+        try:
+            return datetime.strptime(texto, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Fecha inválida: {texto} (formato esperado YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        """
+        Lógica principal del comando.
+        """
+        dry_run = options['dry_run']
+        hoy = timezone.localdate()
+
+        hasta = self._fecha(options['hasta']) if options['hasta'] else hoy
+        if options['dias']:
+            desde = hasta - timedelta(days=max(1, options['dias']) - 1)
+        elif options['desde']:
+            desde = self._fecha(options['desde'])
+        else:
+            primera_venta = Ventas.objects.aggregate(primera=Min('fecha'))['primera']
+            desde = timezone.localdate(primera_venta) if primera_venta else hasta
+
+        if desde > hasta:
+            raise CommandError('La fecha --desde es posterior a --hasta')
+
+        if dry_run:
+            self.stdout.write(
+                self.style.WARNING('🔍 MODO SIMULACIÓN - No se harán cambios reales')
+            )
+
+        self.stdout.write('=' * 60)
+        if options['pendientes']:
+            fechas = list(
+                ResumenVentasPendiente.objects.filter(fecha__gte=desde, fecha__lte=hasta)
+                .order_by('fecha').values_list('fecha', flat=True)
+            )
+            self.stdout.write(f'📊 Reconstruyendo {len(fechas)} día(s) pendiente(s) del resumen de ventas')
+        else:
+            fechas = [desde + timedelta(days=n) for n in range((hasta - desde).days + 1)]
+            self.stdout.write(f'📊 Reconstruyendo resumen de ventas del {desde} al {hasta}')
+        self.stdout.write('=' * 60)
+
+        dias = 0
+        dias_con_diferencia = 0
+        total_filas = 0
+
+        for fecha in fechas:
+            if dry_run:
+                filas_dia, filas_producto = calcular_resumen_dia(fecha)
+                if self._difiere(fecha, filas_dia, filas_producto):
+                    dias_con_diferencia += 1
+                    self.stdout.write(f'  ⚠️  {fecha}: el resumen guardado no cuadra con las ventas')
+            else:
+                filas_dia, filas_producto = reconstruir_resumen_dia(fecha)
+                if filas_dia:
+                    self.stdout.write(
+                        f'  ✅ {fecha}: {sum(f.num_ventas for f in filas_dia)} venta(s), '
+                        f'{len(filas_producto)} fila(s) por producto'
+                    )
+
+            dias += 1
+            total_filas += len(filas_dia) + len(filas_producto)
+
+        # Resumen final
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'📅 Días procesados: {dias}')
+        self.stdout.write(f'🧮 Filas de resumen: {total_filas}')
+        if dry_run:
+            if dias_con_diferencia:
+                self.stdout.write(
+                    self.style.WARNING(f'🔍 SIMULACIÓN: {dias_con_diferencia} día(s) serían corregidos')
+                )
+            else:
+                self.stdout.write(self.style.SUCCESS('✅ El resumen cuadra con las ventas. Todo está en orden.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ Resumen de ventas reconstruido'))
+        self.stdout.write('=' * 60)
+
+    def _difiere(self, fecha, filas_dia, filas_producto):
+        """
+        Compara el resumen guardado de un día con el recalculado.
+        """
+        def claves_y_montos(filas, campos_clave, campos_monto):
+            return {
+                tuple(getattr(f, c) for c in campos_clave): tuple(getattr(f, c) for c in campos_monto)
+                for f in filas
+            }
+
+        campos_dia = ('canal_venta', 'medio_pago')
+        montos_dia = ('num_ventas', 'total_sin_iva', 'total_iva', 'descuento', 'total_con_iva')
+        campos_producto = ('productos_id', 'canal_venta', 'medio_pago')
+        montos_producto = ('unidades', 'total_neto', 'total_iva', 'num_ventas')
+
+        guardado_dia = claves_y_montos(ResumenVentasDia.objects.filter(fecha=fecha), campos_dia, montos_dia)
+        guardado_producto = claves_y_montos(ResumenVentasProductoDia.objects.filter(fecha=fecha), campos_producto, montos_producto)
+
+        return (
+            guardado_dia != claves_y_montos(filas_dia, campos_dia, montos_dia)
+            or guardado_producto != claves_y_montos(filas_producto, campos_producto, montos_producto)
+        )
@@ -0,0 +1,126 @@
+# ================================================================
+# =                                                              =
+# =        COMANDO DJANGO: REINTENTAR HISTORIAL DE BOLETAS      =
+# =                                                              =
+# ================================================================
+#
+# Este comando guarda el snapshot en el historial de boletas de las
+# ventas que no lo tienen.
+#
+# El checkout del POS guarda el historial DESPUÉS de confirmar la venta
+# (ver programar_historial_boleta en ventas/funciones/historial_boletas.py).
+# Si ese guardado falla (queda en el log), la venta ya está registrada
+# pero sin su fila en el historial; este comando la completa desde las
+# tablas de la venta.
+#
+# Se puede ejecutar las veces que se quiera: solo toma las ventas sin
+# historial, y el folio es único en el historial.
+#
+# CÓMO EJECUTAR:
+# python manage.py reintentar_historial_boletas
+# python manage.py reintentar_historial_boletas --dias 7       (últimos 7 días)
+# python manage.py reintentar_historial_boletas --dry-run      (solo contar)
+
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+from django.utils import timezone
+from ventas.models import DetalleVenta
+from ventas.funciones.historial_boletas import (
+    construir_datos_boleta,
+    guardar_historial_boleta,
+    ventas_sin_historial,
+)
+
+
+class Command(BaseCommand):
+    """
+    Comando para completar el historial de boletas de las ventas que no lo tienen.
+    """
+
+    help = 'Guarda el snapshot en el historial de boletas de las ventas que no lo tienen'
+
+    def add_arguments(self, parser):
+        """
+        Argumentos opcionales del comando.
+
+        --dias: Revisar solo las ventas de los últimos N días
+        --dry-run: Solo cuenta las ventas sin historial
+        --lote: Cantidad de ventas por consulta
+        """
+        parser.add_argument('--dias', type=int, help='Revisar solo las ventas de los últimos N días')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo cuenta las ventas sin historial, sin guardar nada',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=200,
+            help='Cantidad de ventas por consulta (default: 200)',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Lógica principal del comando.
+        """
+        dry_run = options['dry_run']
+        tamano_lote = max(1, options['lote'])
+        desde = None
+        if options['dias']:
+            desde = timezone.now() - timedelta(days=options['dias'])
+
+        if dry_run:
+            self.stdout.write(
+                self.style.WARNING('🔍 MODO SIMULACIÓN - No se harán cambios reales')
+            )
+
+        self.stdout.write('=' * 60)
+        self.stdout.write('🧾 Completando historial de boletas')
+        self.stdout.write('=' * 60)
+
+        pendientes = ventas_sin_historial(desde)
+
+        if dry_run:
+            total = pendientes.count()
+            self.stdout.write(f'📋 Ventas sin historial: {total}')
+            for folio in pendientes.values_list('folio', flat=True)[:20]:
+                self.stdout.write(f'  - {folio}')
+            self.stdout.write(self.style.SUCCESS('✅ Proceso completado'))
+            return
+
+        guardadas = 0
+        errores = 0
+        ultimo_id = 0
+
+        # Recorrer por bloques de ID: la venta, su cliente y sus detalles en 3 consultas por bloque
+        while True:
+            ventas = list(
+                pendientes.filter(id__gt=ultimo_id).select_related('clientes').prefetch_related(
+                    Prefetch('detalles', queryset=DetalleVenta.objects.select_related('productos').order_by('id'))
+                )[:tamano_lote]
+            )
+            if not ventas:
+                break
+            ultimo_id = ventas[-1].id
+
+            for venta in ventas:
+                detalles = list(venta.detalles.all())
+                historial = guardar_historial_boleta(
+                    venta,
+                    datos_boleta=construir_datos_boleta(venta, detalles),
+                    num_productos=len(detalles),
+                )
+                if historial is None:
+                    errores += 1
+                    self.stdout.write(self.style.ERROR(f'  ❌ Venta {venta.id} ({venta.folio}): no se pudo guardar (ver log)'))
+                else:
+                    guardadas += 1
+
+        # Resumen final
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'🧾 Historiales guardados: {guardadas}')
+        if errores:
+            self.stdout.write(self.style.WARNING(f'⚠️  Ventas con error: {errores}'))
+        self.stdout.write(self.style.SUCCESS('✅ Proceso completado'))
@@ -4,11 +4,21 @@
 # =                                                              =
 # ================================================================
 #
-# Este comando verifica diariamente qué productos han vencido
-# y los mueve automáticamente a estado de merma.
+# Este comando se ejecuta diariamente y pasa a 'vencido' los lotes
+# activos cuya fecha de caducidad ya pasó.
+#
+# Por cada lote vencido con stock deja un registro en el historial de
+# merma y un movimiento de salida, y recalcula el resumen de stock de
+# sus productos (cantidad, lotes activos y caducidad más próxima). Los
+# productos que se quedan sin lotes activos pasan a merma.
+#
+# Trabaja por bloques de lotes (ver ventas/funciones/merma.py): el
+# tiempo depende de cuántos lotes vencieron, no del tamaño del catálogo.
 #
 # CÓMO EJECUTAR:
 # python manage.py verificar_vencimientos
+# python manage.py verificar_vencimientos --dry-run     (solo contar)
+# python manage.py verificar_vencimientos --lote 1000   (lotes por transacción)
 #
 # PARA AUTOMATIZAR (Windows):
 # 1. Crear archivo .bat:
@@ -22,136 +32,109 @@
 #    - Acción: Iniciar programa
 #    - Programa: ruta\al\archivo.bat
 
+import time
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from datetime import date
-from ventas.models.productos import Productos
+from ventas.funciones.merma import (
+    TAMANO_BLOQUE_VENCIMIENTOS,
+    resumen_lotes_vencidos,
+    resumen_productos_sin_lotes_vencidos,
+    vencer_lotes,
+)
 
 
 class Command(BaseCommand):
     """
-    Comando para verificar productos vencidos y moverlos a merma.
-    
+    Comando para pasar a merma los lotes vencidos.
+
     Este comando se ejecuta diariamente para:
-    1. Buscar productos cuya fecha de caducidad ya pasó
-    2. Cambiar su estado_merma de 'activo' a 'vencido'
-    3. Generar un reporte de los productos procesados
+    1. Buscar los lotes activos cuya fecha de caducidad ya pasó
+    2. Cambiar su estado a 'vencido' y registrar la merma
+    3. Recalcular el stock de los productos afectados
+    4. Generar un reporte con cantidades, valor perdido y tiempo
     """
-    
-    help = 'Verifica productos vencidos y los mueve a estado de merma'
-    
+
+    help = 'Pasa a vencido los lotes con caducidad pasada y registra la merma'
+
     def add_arguments(self, parser):
         """
         Argumentos opcionales del comando.
-        
+
         --dry-run: Simula la ejecución sin hacer cambios reales
+        --lote: Cantidad de lotes por transacción
         """
         parser.add_argument(
             '--dry-run',
             action='store_true',
             help='Simula la ejecución sin hacer cambios en la base de datos',
         )
-    
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_BLOQUE_VENCIMIENTOS,
+            help=f'Cantidad de lotes por transacción (default: {TAMANO_BLOQUE_VENCIMIENTOS})',
+        )
+
     def handle(self, *args, **options):
         """
         Lógica principal del comando.
         """
-        # Obtener la fecha actual
-        hoy = date.today()
-        
-        # Indicar si es simulación
+        hoy = timezone.localdate()
         dry_run = options['dry_run']
-        
+        inicio = time.monotonic()
+
         if dry_run:
             self.stdout.write(
                 self.style.WARNING('🔍 MODO SIMULACIÓN - No se harán cambios reales')
             )
-        
-        # Línea separadora
+
         self.stdout.write('=' * 60)
         self.stdout.write(f'📅 Verificando vencimientos para: {hoy.strftime("%d/%m/%Y")}')
         self.stdout.write('=' * 60)
-        
-        # Buscar productos vencidos que aún están activos
-        productos_vencidos = Productos.objects.filter(
-            caducidad__lt=hoy,          # Fecha de caducidad menor a hoy
-            estado_merma='activo',       # Solo productos activos
-            eliminado__isnull=True       # No eliminados
-        )
-        
-        # Contar productos encontrados
-        total_vencidos = productos_vencidos.count()
-        
-        if total_vencidos == 0:
+
+        if dry_run:
+            resumen = resumen_lotes_vencidos(hoy)
+            sin_lotes = resumen_productos_sin_lotes_vencidos(hoy)
+            resumen['productos_sin_lotes'] = sin_lotes['productos']
+            resumen['cantidad'] += sin_lotes['cantidad']
+            resumen['valor'] += sin_lotes['valor']
+        else:
+            resumen = vencer_lotes(hoy, tamano_bloque=options['lote'])
+
+        segundos = time.monotonic() - inicio
+
+        if resumen['lotes'] == 0 and resumen['productos_sin_lotes'] == 0:
             self.stdout.write(
-                self.style.SUCCESS('✅ No hay productos vencidos. Todo está en orden.')
+                self.style.SUCCESS('✅ No hay lotes vencidos. Todo está en orden.')
             )
+            self.stdout.write(f'⏱️  Tiempo: {segundos:.2f} s')
             return
-        
-        # Mostrar productos encontrados
+
+        # Resumen final
+        prefijo = '🔍 SIMULACIÓN: ' if dry_run else ''
+        self.stdout.write(f'{prefijo}📦 Lotes vencidos: {resumen["lotes"]} ({resumen["lotes_con_stock"]} con stock)')
+        self.stdout.write(f'{prefijo}🏷️  Productos afectados: {resumen["productos"]}')
+        if not dry_run:
+            self.stdout.write(f'🗑️  Productos que quedaron en merma: {resumen["productos_en_merma"]}')
+        if resumen['productos_sin_lotes']:
+            self.stdout.write(f'{prefijo}📋 Productos sin lotes vencidos: {resumen["productos_sin_lotes"]}')
+        self.stdout.write(f'{prefijo}📉 Unidades vencidas: {resumen["cantidad"]:,.3f}')
         self.stdout.write(
-            self.style.WARNING(f'\n⚠️  Se encontraron {total_vencidos} productos vencidos:\n')
+            self.style.ERROR(f'💰 Valor total de merma: ${resumen["valor"]:,.0f}')
         )
-        
-        # Procesar cada producto
-        productos_procesados = 0
-        valor_total_merma = 0
-        
-        for producto in productos_vencidos:
-            # Calcular días vencidos
-            dias_vencido = (hoy - producto.caducidad).days
-            
-            # Calcular valor de la merma
-            stock = producto.cantidad if producto.cantidad > 0 else (producto.stock_actual or 0)
-            valor_merma = float(producto.precio) * stock
-            valor_total_merma += valor_merma
-            
-            # Mostrar información del producto
-            self.stdout.write(
-                f'  📦 {producto.nombre}'
-            )
-            self.stdout.write(
-                f'     Vencido hace: {dias_vencido} días'
-            )
-            self.stdout.write(
-                f'     Stock: {stock} unidades'
-            )
-            self.stdout.write(
-                f'     Valor perdido: ${valor_merma:,.0f}'
-            )
-            self.stdout.write('')  # Línea en blanco
-            
-            # Si no es simulación, hacer el cambio
-            if not dry_run:
-                producto.estado_merma = 'vencido'
-                producto.save()
-                productos_procesados += 1
-        
-        # Resumen final
         self.stdout.write('=' * 60)
-        
+
         if dry_run:
             self.stdout.write(
                 self.style.WARNING(
-                    f'🔍 SIMULACIÓN: {total_vencidos} productos serían movidos a merma'
+                    f'🔍 SIMULACIÓN: {resumen["lotes"]} lotes serían movidos a merma'
                 )
             )
         else:
             self.stdout.write(
                 self.style.SUCCESS(
-                    f'✅ {productos_procesados} productos movidos a merma exitosamente'
+                    f'✅ {resumen["lotes"]} lotes movidos a merma en {resumen["bloques"]} bloque(s)'
                 )
             )
-        
-        self.stdout.write(
-            self.style.ERROR(
-                f'💰 Valor total de merma: ${valor_total_merma:,.0f}'
-            )
-        )
+        self.stdout.write(f'⏱️  Tiempo: {segundos:.2f} s')
         self.stdout.write('=' * 60)
-        
-        # Mensaje final
-        if not dry_run:
-            self.stdout.write(
-                self.style.SUCCESS('\n✨ Proceso completado exitosamente\n')
-            )
@@ -16,7 +16,7 @@
 # - Redirige si no tiene permisos (opcional)
 
 from django.utils.deprecation import MiddlewareMixin
-from ventas.decorators import obtener_rol_usuario
+from ventas.funciones.permisos import obtener_rol_usuario
 
 
 class RolMiddleware(MiddlewareMixin):
@@ -43,7 +43,8 @@ class RolMiddleware(MiddlewareMixin):
         Returns:
             None (modifica request en lugar)
         """
-        # Agregar rol al request
+        # Agregar rol al request (queda memorizado en request.user para
+        # los decoradores y los template tags de la misma petición)
         request.user_rol = obtener_rol_usuario(request.user) if request.user.is_authenticated else None
         
         # Agregar flag de si es administrador
@@ -33,4 +33,18 @@ from .lotes import Lote
 from .historial_merma import HistorialMerma
 
 # --- Modelos de Historial de Boletas (NUEVO) ---
-from .historial_boletas import HistorialBoletas
\ No newline at end of file
+from .historial_boletas import HistorialBoletas
+# --- Modelos de Tareas Programadas (NUEVO) ---
+from .tareas import EstadoTarea
+
+# --- Modelos de Resumen Diario de Ventas (NUEVO) ---
+from .resumen_ventas import ResumenVentasDia, ResumenVentasProductoDia, ResumenVentasPendiente
+
+# --- Modelos de Exportaciones en Segundo Plano (NUEVO) ---
+from .exportaciones import TrabajoExportacion
+
+# --- Modelos de Secuencias de Folios (NUEVO) ---
+from .folios import SecuenciaFolio
+
+# --- Modelos de Acciones Masivas en Segundo Plano (NUEVO) ---
+from .acciones_masivas import TrabajoAccionMasiva
@@ -0,0 +1,124 @@
+# ================================================================
+# =                                                              =
+# =        MODELO: TRABAJOS DE ACCIONES MASIVAS                 =
+# =                                                              =
+# ================================================================
+#
+# Cada fila es una acción masiva del inventario (crear alertas, mover a
+# merma, activar/desactivar o eliminar) sobre muchos productos, que se
+# ejecuta en segundo plano por bloques:
+#
+# - La petición crea el trabajo con los IDs seleccionados (o los de
+#   todo el inventario filtrado) y retorna su ID
+# - Un hilo del servidor procesa los IDs por bloques; cada bloque se
+#   confirma junto con el avance (procesados, ultimo_id)
+# - La página del inventario consulta el avance hasta que termina
+# - Si el servidor se reinicia a medias, el trabajo se retoma desde
+#   ultimo_id (ver ventas/funciones/acciones_masivas.py)
+
+from django.contrib.auth.models import User
+from django.db import models
+
+
+# ================================================================
+# =                MODELO: TRABAJO ACCION MASIVA                 =
+# ================================================================
+
+class TrabajoAccionMasiva(models.Model):
+    """
+    Acción masiva sobre productos del inventario ejecutada por bloques.
+    """
+
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En proceso'),
+        ('terminado', 'Terminado'),
+        ('error', 'Error'),
+    ]
+
+    ACCION_CHOICES = [
+        ('crear_alertas', 'Crear alertas'),
+        ('mover_merma', 'Mover a merma'),
+        ('activar_desactivar', 'Activar/desactivar'),
+        ('eliminar', 'Eliminar'),
+    ]
+
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='trabajos_accion_masiva',
+        help_text='Usuario que pidió la acción (solo él puede consultarla)'
+    )
+
+    accion = models.CharField(
+        max_length=30,
+        choices=ACCION_CHOICES,
+    )
+
+    parametros = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text='Datos de la acción (por ejemplo, motivo_merma)'
+    )
+
+    ids = models.JSONField(
+        default=list,
+        help_text='IDs de los productos a procesar, en orden ascendente'
+    )
+
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADO_CHOICES,
+        default='pendiente',
+        db_index=True,
+    )
+
+    total = models.IntegerField(default=0)
+
+    procesados = models.IntegerField(default=0)
+
+    ultimo_id = models.IntegerField(
+        default=0,
+        help_text='Último ID de producto confirmado (el trabajo se retoma desde aquí)'
+    )
+
+    resultado = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text='Contadores acumulados de la acción'
+    )
+
+    mensaje_error = models.TextField(blank=True, null=True)
+
+    creado = models.DateTimeField(auto_now_add=True)
+
+    iniciado = models.DateTimeField(blank=True, null=True)
+
+    actualizado = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text='Último avance guardado (si no avanza por un tiempo, el trabajo se retoma)'
+    )
+
+    terminado = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f'Acción masiva {self.id} ({self.accion}) - {self.estado}'
+
+    @property
+    def progreso(self):
+        """
+        Porcentaje de avance (0 a 100).
+        """
+        if self.estado == 'terminado':
+            return 100
+        if not self.total:
+            return 0
+        return min(99, self.procesados * 100 // self.total)
+
+    class Meta:
+        managed = False
+        db_table = 'trabajos_accion_masiva'
+        verbose_name = 'Trabajo de Acción Masiva'
+        verbose_name_plural = 'Trabajos de Acciones Masivas'
+        ordering = ['-creado']
@@ -13,7 +13,7 @@
 # - AMARILLA: 14-29 días hasta vencer (precaución)
 # - ROJA: 0-13 días hasta vencer (urgente)
 
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from datetime import timedelta
 from .productos import Productos
@@ -57,6 +57,27 @@ class Alertas(models.Model):
         verbose_name='Tipo de alerta'
     )
     
+    # --- Opciones para la categoría de la alerta ---
+    # Identifica QUÉ vigila la alerta (antes se deducía buscando texto en el mensaje)
+    CATEGORIA_CHOICES = [
+        ('vencimiento', 'Vencimiento de producto'),
+        ('stock_bajo', 'Stock bajo'),
+        ('factura', 'Vencimiento de factura'),
+        ('manual', 'Alerta manual'),
+    ]
+    
+    # --- Campo: Categoría de alerta ---
+    # Junto con el producto (o la factura) forma la clave de la alerta:
+    # hay como máximo una alerta activa por (producto, categoría).
+    # Las alertas creadas por el usuario son 'manual': el generador
+    # automático no las carga ni las sobrescribe
+    categoria = models.CharField(
+        max_length=20,
+        choices=CATEGORIA_CHOICES,
+        default='manual',
+        verbose_name='Categoría'
+    )
+    
     # --- Campo: Mensaje descriptivo ---
     # Texto que describe la alerta (ej: "Pan integral vence en 5 días")
     mensaje = models.CharField(
@@ -205,7 +226,62 @@ class Alertas(models.Model):
     # ============================================================
     
     @staticmethod
-    def generar_alertas_automaticas():
+    def clasificar_vencimiento_producto(producto, hoy):
+        """
+        Calcula el tipo y mensaje de la alerta de vencimiento de un producto.
+        
+        Args:
+            producto: Objeto Productos (con caducidad)
+            hoy: Fecha de referencia
+        
+        Returns:
+            tuple: (tipo_alerta, mensaje)
+        """
+        dias_hasta_vencer = (producto.caducidad - hoy).days
+        
+        if dias_hasta_vencer < 0:
+            # Producto ya vencido (tratamos como roja urgente)
+            return 'roja', f"{producto.nombre} YA VENCIÓ hace {abs(dias_hasta_vencer)} días"
+        elif dias_hasta_vencer <= 13:
+            # Alerta ROJA: 0-13 días
+            return 'roja', f"{producto.nombre} vence en {dias_hasta_vencer} días - URGENTE"
+        elif dias_hasta_vencer <= 29:
+            # Alerta AMARILLA: 14-29 días
+            return 'amarilla', f"{producto.nombre} vence en {dias_hasta_vencer} días - PRECAUCIÓN"
+        else:
+            # Alerta VERDE: 30+ días
+            return 'verde', f"{producto.nombre} vence en {dias_hasta_vencer} días - OK"
+    
+    @staticmethod
+    def clasificar_vencimiento_factura(factura, hoy):
+        """
+        Calcula el tipo y mensaje de la alerta de vencimiento de pago de una factura.
+        
+        Args:
+            factura: Objeto FacturaProveedor (con fecha_vencimiento y proveedor cargado)
+            hoy: Fecha de referencia
+        
+        Returns:
+            tuple: (tipo_alerta, mensaje)
+        """
+        dias_para_vencer = (factura.fecha_vencimiento - hoy).days
+        descripcion = f"Factura {factura.numero_factura} de {factura.proveedor.nombre}"
+        
+        if dias_para_vencer < 0:
+            # Factura ya vencida - ROJA urgente
+            return 'roja', f"{descripcion} VENCIDA hace {abs(dias_para_vencer)} días - ${factura.total_con_iva}"
+        elif dias_para_vencer <= 7:
+            # Factura vence en 7 días o menos - ROJA
+            return 'roja', f"{descripcion} vence en {dias_para_vencer} días - ${factura.total_con_iva}"
+        elif dias_para_vencer <= 30:
+            # Factura vence en 8-30 días - AMARILLA
+            return 'amarilla', f"{descripcion} vence en {dias_para_vencer} días - ${factura.total_con_iva}"
+        else:
+            # Factura vence en más de 30 días - VERDE
+            return 'verde', f"{descripcion} vence en {dias_para_vencer} días - ${factura.total_con_iva}"
+    
+    @staticmethod
+    def generar_alertas_automaticas(desde=None):
         """
         Genera alertas automáticamente para:
         - Productos según sus fechas de caducidad Y niveles de stock
@@ -225,13 +301,34 @@ class Alertas(models.Model):
         
         Lógica de FACTURAS VENCIDAS:
         - Roja: Factura vencida sin pagar
-        - Amarilla: Factura vence en 7 días o menos
-        - Verde: Factura vence en 8-30 días
+        - Amarilla: Factura vence en 8 a 30 días
+        - Verde: Factura vence en más de 30 días
+        - Se resuelve automáticamente cuando la factura se paga
+        
+        FUNCIONAMIENTO (en bloque):
+        Se cargan de una vez los productos, las facturas y TODAS sus alertas
+        activas, indexadas por (producto o factura, categoría). El estado
+        deseado se calcula en memoria y los cambios se aplican con
+        bulk_create / bulk_update, así que el número de consultas no
+        depende del tamaño del catálogo. Si una clave tiene varias alertas
+        activas (duplicados antiguos), queda la más reciente y las demás
+        se resuelven.
+        
+        MODO INCREMENTAL:
+        Si se indica `desde`, solo se revisan los productos y facturas
+        modificados desde ese momento (el stock, los lotes y la caducidad
+        actualizan `modificado` del producto). La tarea programada usa este
+        modo durante el día y hace una pasada completa al cambiar de día,
+        porque los días hasta vencer cambian aunque nada se modifique.
+        
+        Args:
+            desde: datetime opcional. Si es None se revisa todo el catálogo.
         
         Returns:
             dict: Diccionario con estadísticas de alertas generadas
         """
         hoy = timezone.now().date()
+        ahora = timezone.now()
         
         # Contadores para las estadísticas
         alertas_creadas = {
@@ -240,66 +337,79 @@ class Alertas(models.Model):
             'verde': 0,
             'stock_bajo': 0,
             'facturas_vencidas': 0,
+            'duplicadas_resueltas': 0,
             'total': 0
         }
         
-        # Obtener todos los productos activos (no eliminados)
+        alertas_nuevas = []        # Para bulk_create
+        alertas_modificadas = []   # Para bulk_update
+        ids_duplicadas = []        # Alertas activas repetidas de una misma clave
+        
+        def indexar(alertas, clave):
+            """
+            Indexa alertas activas por clave, de la más antigua a la más
+            reciente: queda la más reciente y las anteriores se anotan
+            en ids_duplicadas para resolverlas.
+            """
+            indice = {}
+            for alerta in alertas.order_by('fecha_generada', 'id'):
+                anterior = indice.get(clave(alerta))
+                if anterior is not None:
+                    ids_duplicadas.append(anterior.id)
+                indice[clave(alerta)] = alerta
+            return indice
+        
+        def aplicar(existente, tipo, mensaje, **relacion):
+            """
+            Crea o actualiza (en memoria) la alerta de una clave.
+            
+            Returns:
+                bool: True si hubo cambios (alerta nueva o modificada)
+            """
+            if existente is None:
+                alertas_nuevas.append(Alertas(tipo_alerta=tipo, mensaje=mensaje, estado='activa', **relacion))
+                return True
+            if existente.tipo_alerta != tipo or existente.mensaje != mensaje:
+                existente.tipo_alerta = tipo
+                existente.mensaje = mensaje
+                existente.fecha_generada = ahora
+                alertas_modificadas.append(existente)
+                return True
+            return False
+        
+        # ============================================================
+        # CARGA: productos activos y sus alertas activas (2 consultas)
+        # ============================================================
         productos = Productos.objects.filter(
             eliminado__isnull=True,
             estado_merma='activo'  # Solo productos activos (no en merma)
         )
+        alertas_de_productos = Alertas.objects.filter(
+            estado='activa',
+            categoria__in=['vencimiento', 'stock_bajo'],
+            productos__eliminado__isnull=True,
+            productos__estado_merma='activo',
+        )
+        if desde is not None:
+            productos = productos.filter(modificado__gte=desde)
+            alertas_de_productos = alertas_de_productos.filter(productos__modificado__gte=desde)
+        productos = list(productos)
+        
+        # Alertas activas indexadas por (producto_id, categoría)
+        alertas_producto = indexar(alertas_de_productos, lambda a: (a.productos_id, a.categoria))
+        
+        ids_stock_normal = []  # Productos cuya alerta de stock bajo debe resolverse
         
         for producto in productos:
             # ============================================================
             # PARTE 1: ALERTAS DE VENCIMIENTO
             # ============================================================
             # Solo generar alertas de vencimiento si el producto tiene stock
-            if producto.cantidad > 0:
-                # Calcular días hasta vencer
-                dias_hasta_vencer = (producto.caducidad - hoy).days
-                
-                # Determinar el tipo de alerta según los días
-                if dias_hasta_vencer < 0:
-                    # Producto ya vencido (tratamos como roja urgente)
-                    tipo = 'roja'
-                    mensaje = f"{producto.nombre} YA VENCIÓ hace {abs(dias_hasta_vencer)} días"
-                elif dias_hasta_vencer <= 13:
-                    # Alerta ROJA: 0-13 días
-                    tipo = 'roja'
-                    mensaje = f"{producto.nombre} vence en {dias_hasta_vencer} días - URGENTE"
-                elif dias_hasta_vencer <= 29:
-                    # Alerta AMARILLA: 14-29 días
-                    tipo = 'amarilla'
-                    mensaje = f"{producto.nombre} vence en {dias_hasta_vencer} días - PRECAUCIÓN"
-                else:
-                    # Alerta VERDE: 30+ días (opcional, puedes omitir estas)
-                    tipo = 'verde'
-                    mensaje = f"{producto.nombre} vence en {dias_hasta_vencer} días - OK"
-                
-                # Verificar si ya existe una alerta activa de VENCIMIENTO para este producto
-                alerta_vencimiento = Alertas.objects.filter(
-                    productos=producto,
-                    estado='activa',
-                    mensaje__contains='vence'  # Distinguir alertas de vencimiento
-                ).first()
-                
-                if alerta_vencimiento:
-                    # Si existe, actualizar el tipo y mensaje si cambió
-                    if alerta_vencimiento.tipo_alerta != tipo or alerta_vencimiento.mensaje != mensaje:
-                        alerta_vencimiento.tipo_alerta = tipo
-                        alerta_vencimiento.mensaje = mensaje
-                        alerta_vencimiento.fecha_generada = timezone.now()
-                        alerta_vencimiento.save()
-                        alertas_creadas[tipo] += 1
-                        alertas_creadas['total'] += 1
-                else:
-                    # Si no existe, crear nueva alerta de vencimiento
-                    Alertas.objects.create(
-                        tipo_alerta=tipo,
-                        mensaje=mensaje,
-                        productos=producto,
-                        estado='activa'
-                    )
+            # (y caducidad: un producto sin lotes activos no tiene caducidad)
+            if producto.cantidad > 0 and producto.caducidad:
+                tipo, mensaje = Alertas.clasificar_vencimiento_producto(producto, hoy)
+                existente = alertas_producto.get((producto.id, 'vencimiento'))
+                if aplicar(existente, tipo, mensaje, productos=producto, categoria='vencimiento'):
                     alertas_creadas[tipo] += 1
                     alertas_creadas['total'] += 1
             
@@ -309,118 +419,82 @@ class Alertas(models.Model):
             # Determinar el stock mínimo (usar el definido o 5 por defecto)
             stock_minimo = producto.stock_minimo if producto.stock_minimo is not None else 5
             
-            # Verificar si el stock está bajo
             if producto.cantidad <= stock_minimo:
-                # Stock bajo - generar alerta ROJA
-                tipo_stock = 'roja'
+                # Stock bajo - alerta ROJA
                 mensaje_stock = f"{producto.nombre} - STOCK BAJO: {producto.cantidad} unidades (mínimo: {stock_minimo})"
-                
-                # Verificar si ya existe una alerta activa de STOCK para este producto
-                alerta_stock = Alertas.objects.filter(
-                    productos=producto,
-                    estado='activa',
-                    mensaje__contains='STOCK BAJO'  # Distinguir alertas de stock
-                ).first()
-                
-                if alerta_stock:
-                    # Si existe, actualizar el mensaje si cambió
-                    if alerta_stock.mensaje != mensaje_stock:
-                        alerta_stock.mensaje = mensaje_stock
-                        alerta_stock.fecha_generada = timezone.now()
-                        alerta_stock.save()
-                        alertas_creadas['stock_bajo'] += 1
-                        alertas_creadas['total'] += 1
-                else:
-                    # Si no existe, crear nueva alerta de stock
-                    Alertas.objects.create(
-                        tipo_alerta=tipo_stock,
-                        mensaje=mensaje_stock,
-                        productos=producto,
-                        estado='activa'
-                    )
+                existente = alertas_producto.get((producto.id, 'stock_bajo'))
+                if aplicar(existente, 'roja', mensaje_stock, productos=producto, categoria='stock_bajo'):
                     alertas_creadas['stock_bajo'] += 1
                     alertas_creadas['total'] += 1
-            else:
-                # Stock normal - resolver alertas de stock activas
-                alertas_stock_activas = Alertas.objects.filter(
-                    productos=producto,
-                    estado='activa',
-                    mensaje__contains='STOCK BAJO'
-                )
-                for alerta in alertas_stock_activas:
-                    alerta.marcar_como_resuelta()
+            elif (producto.id, 'stock_bajo') in alertas_producto:
+                # Stock normal - resolver sus alertas de stock activas
+                ids_stock_normal.append(producto.id)
         
         # ============================================================
         # PARTE 3: ALERTAS DE FACTURAS VENCIDAS
         # ============================================================
-        # Obtener facturas pendientes de pago
+        # Facturas pendientes de pago y sus alertas activas (2 consultas)
         facturas_pendientes = FacturaProveedor.objects.filter(
             eliminado__isnull=True,
-            estado_pago__in=['pendiente', 'parcial']  # Solo facturas no pagadas completamente
+            estado_pago__in=['pendiente', 'parcial'],  # Solo facturas no pagadas completamente
+            fecha_vencimiento__isnull=False
+        ).select_related('proveedor')
+        alertas_de_facturas = Alertas.objects.filter(
+            estado='activa',
+            categoria='factura',
+            factura_proveedor__eliminado__isnull=True,
+            factura_proveedor__estado_pago__in=['pendiente', 'parcial'],
         )
+        if desde is not None:
+            facturas_pendientes = facturas_pendientes.filter(modificado__gte=desde)
+            alertas_de_facturas = alertas_de_facturas.filter(factura_proveedor__modificado__gte=desde)
+        facturas_pendientes = list(facturas_pendientes)
+        
+        alertas_factura = indexar(alertas_de_facturas, lambda a: a.factura_proveedor_id)
         
         for factura in facturas_pendientes:
-            if not factura.fecha_vencimiento:
-                continue  # Si no tiene fecha de vencimiento, saltar
-            
-            # Calcular días hasta vencer o días vencida
-            dias_para_vencer = (factura.fecha_vencimiento - hoy).days
-            
-            # Determinar tipo de alerta
-            if dias_para_vencer < 0:
-                # Factura ya vencida - ROJA urgente
-                tipo = 'roja'
-                mensaje = f"Factura {factura.numero_factura} de {factura.proveedor.nombre} VENCIDA hace {abs(dias_para_vencer)} días - ${factura.total_con_iva}"
-            elif dias_para_vencer <= 7:
-                # Factura vence en 7 días o menos - ROJA
-                tipo = 'roja'
-                mensaje = f"Factura {factura.numero_factura} de {factura.proveedor.nombre} vence en {dias_para_vencer} días - ${factura.total_con_iva}"
-            elif dias_para_vencer <= 30:
-                # Factura vence en 8-30 días - AMARILLA
-                tipo = 'amarilla'
-                mensaje = f"Factura {factura.numero_factura} de {factura.proveedor.nombre} vence en {dias_para_vencer} días - ${factura.total_con_iva}"
-            else:
-                # Factura vence en más de 30 días - VERDE (opcional, puedes omitir)
-                tipo = 'verde'
-                mensaje = f"Factura {factura.numero_factura} de {factura.proveedor.nombre} vence en {dias_para_vencer} días - ${factura.total_con_iva}"
-            
-            # Verificar si ya existe una alerta activa para esta factura
-            alerta_factura = Alertas.objects.filter(
-                factura_proveedor=factura,
-                estado='activa'
-            ).first()
-            
-            if alerta_factura:
-                # Si existe, actualizar el tipo y mensaje si cambió
-                if alerta_factura.tipo_alerta != tipo or alerta_factura.mensaje != mensaje:
-                    alerta_factura.tipo_alerta = tipo
-                    alerta_factura.mensaje = mensaje
-                    alerta_factura.fecha_generada = timezone.now()
-                    alerta_factura.save()
-                    alertas_creadas[tipo] += 1
-                    alertas_creadas['facturas_vencidas'] += 1
-                    alertas_creadas['total'] += 1
-            else:
-                # Si no existe, crear nueva alerta de factura
-                Alertas.objects.create(
-                    tipo_alerta=tipo,
-                    mensaje=mensaje,
-                    factura_proveedor=factura,
-                    productos=None,  # No es alerta de producto
-                    estado='activa'
-                )
+            tipo, mensaje = Alertas.clasificar_vencimiento_factura(factura, hoy)
+            existente = alertas_factura.get(factura.id)
+            if aplicar(existente, tipo, mensaje, factura_proveedor=factura, productos=None, categoria='factura'):
                 alertas_creadas[tipo] += 1
                 alertas_creadas['facturas_vencidas'] += 1
                 alertas_creadas['total'] += 1
+        
+        # ============================================================
+        # ESCRITURA EN BLOQUE
+        # ============================================================
+        with transaction.atomic():
+            if alertas_nuevas:
+                Alertas.objects.bulk_create(alertas_nuevas, batch_size=500)
             
-            # Si la factura se pagó completamente, resolver alertas activas
-            if factura.estado_pago == 'pagado':
-                alertas_factura_activas = Alertas.objects.filter(
-                    factura_proveedor=factura,
-                    estado='activa'
+            if alertas_modificadas:
+                Alertas.objects.bulk_update(
+                    alertas_modificadas,
+                    ['tipo_alerta', 'mensaje', 'fecha_generada'],
+                    batch_size=500
                 )
-                for alerta in alertas_factura_activas:
-                    alerta.marcar_como_resuelta()
+            
+            # Resolver los duplicados (queda la alerta más reciente de cada clave)
+            if ids_duplicadas:
+                alertas_creadas['duplicadas_resueltas'] = Alertas.objects.filter(
+                    id__in=ids_duplicadas,
+                    estado='activa'
+                ).update(estado='resuelta')
+            
+            # Resolver alertas de stock bajo de productos con stock normal
+            if ids_stock_normal:
+                Alertas.objects.filter(
+                    productos_id__in=ids_stock_normal,
+                    categoria='stock_bajo',
+                    estado='activa'
+                ).update(estado='resuelta')
+            
+            # Resolver alertas de facturas que ya se pagaron completamente
+            Alertas.objects.filter(
+                categoria='factura',
+                estado='activa',
+                factura_proveedor__estado_pago='pagado'
+            ).update(estado='resuelta')
         
         return alertas_creadas
     
@@ -440,5 +514,6 @@ class Alertas(models.Model):
             models.Index(fields=['tipo_alerta']),
             models.Index(fields=['estado']),
             models.Index(fields=['fecha_generada']),
+            models.Index(fields=['estado', 'categoria']),
         ]
 
@@ -0,0 +1,138 @@
+# ================================================================
+# =                                                              =
+# =        MODELO: TRABAJOS DE EXPORTACIÓN                      =
+# =                                                              =
+# ================================================================
+#
+# Cada fila es una exportación de reporte (Excel, PDF o CSV) que se
+# genera en segundo plano en vez de dentro de la petición web:
+#
+# - La petición crea el trabajo (estado 'pendiente') y retorna su ID
+# - Un hilo del servidor lo toma, genera el archivo en disco y va
+#   guardando el avance (filas procesadas)
+# - La página consulta el estado y, al terminar, descarga el archivo
+# - Pasada la fecha de expiración se borran el archivo y la fila
+#
+# Ver ventas/funciones/exportaciones.py
+
+from django.contrib.auth.models import User
+from django.db import models
+
+
+# ================================================================
+# =                MODELO: TRABAJO EXPORTACION                   =
+# ================================================================
+
+class TrabajoExportacion(models.Model):
+    """
+    Exportación de un reporte generada en segundo plano.
+    """
+
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En proceso'),
+        ('terminado', 'Terminado'),
+        ('error', 'Error'),
+    ]
+
+    FORMATO_CHOICES = [
+        ('excel', 'Excel'),
+        ('pdf', 'PDF'),
+        ('csv', 'CSV'),
+    ]
+
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='trabajos_exportacion',
+        help_text='Usuario que pidió la exportación (solo él puede descargarla)'
+    )
+
+    tipo = models.CharField(
+        max_length=30,
+        help_text='Reporte exportado (ventas, inventario, top_productos)'
+    )
+
+    formato = models.CharField(
+        max_length=10,
+        choices=FORMATO_CHOICES,
+    )
+
+    parametros = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text='Filtros del reporte (los mismos parámetros GET de la página)'
+    )
+
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADO_CHOICES,
+        default='pendiente',
+        db_index=True,
+    )
+
+    total_filas = models.IntegerField(
+        blank=True,
+        null=True,
+        help_text='Filas que tendrá el archivo (se calcula al empezar)'
+    )
+
+    filas_procesadas = models.IntegerField(default=0)
+
+    archivo = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True,
+        help_text='Ruta del archivo generado, relativa a settings.EXPORTACIONES_DIR'
+    )
+
+    nombre_archivo = models.CharField(
+        max_length=150,
+        blank=True,
+        null=True,
+        help_text='Nombre con que se descarga el archivo'
+    )
+
+    content_type = models.CharField(max_length=100, blank=True, null=True)
+
+    mensaje_error = models.TextField(blank=True, null=True)
+
+    creado = models.DateTimeField(auto_now_add=True)
+
+    iniciado = models.DateTimeField(blank=True, null=True)
+
+    actualizado = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text='Último avance guardado (si no avanza por un tiempo, el trabajo se retoma)'
+    )
+
+    terminado = models.DateTimeField(blank=True, null=True)
+
+    expira = models.DateTimeField(
+        blank=True,
+        null=True,
+        db_index=True,
+        help_text='Después de esta fecha se borran el archivo y el trabajo'
+    )
+
+    def __str__(self):
+        return f'Exportación {self.id} ({self.tipo} / {self.formato}) - {self.estado}'
+
+    @property
+    def progreso(self):
+        """
+        Porcentaje de avance (0 a 100).
+        """
+        if self.estado == 'terminado':
+            return 100
+        if not self.total_filas:
+            return 0
+        return min(99, self.filas_procesadas * 100 // self.total_filas)
+
+    class Meta:
+        managed = False
+        db_table = 'trabajos_exportacion'
+        verbose_name = 'Trabajo de Exportación'
+        verbose_name_plural = 'Trabajos de Exportación'
+        ordering = ['-creado']
@@ -0,0 +1,43 @@
+# ================================================================
+# =                                                              =
+# =        MODELO: SECUENCIAS DE FOLIOS                          =
+# =                                                              =
+# ================================================================
+#
+# Contador de folios de boleta. Cada proceso del servidor reserva un
+# bloque de números de una vez (ver ventas/funciones/folios.py), así
+# las ventas no esperan todas a la misma fila.
+#
+# Hay una fila por secuencia (identificada por su nombre).
+
+from django.db import models
+
+
+# ================================================================
+# =                MODELO: SECUENCIA FOLIO                       =
+# ================================================================
+
+class SecuenciaFolio(models.Model):
+    """
+    Siguiente número libre de una secuencia de folios.
+    """
+
+    nombre = models.CharField(
+        max_length=30,
+        unique=True,
+        help_text='Identificador de la secuencia (ej: boleta)'
+    )
+
+    siguiente = models.BigIntegerField(
+        default=1,
+        help_text='Primer número que aún no se reservó'
+    )
+
+    def __str__(self):
+        return f'{self.nombre}: {self.siguiente}'
+
+    class Meta:
+        managed = False
+        db_table = 'secuencias_folio'
+        verbose_name = 'Secuencia de Folio'
+        verbose_name_plural = 'Secuencias de Folios'
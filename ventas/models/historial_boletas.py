@@ -46,8 +46,8 @@ class HistorialBoletas(models.Model):
     # ============================================================
     folio = models.CharField(
         max_length=20,
-        db_index=True,  # Índice para búsquedas rápidas
-        help_text='Folio de la boleta (ej: BOL-20251209123456)'
+        unique=True,  # Índice único: una boleta por folio
+        help_text='Folio de la boleta (ej: BOL-00001234)'
     )
     
     fecha_emision = models.DateTimeField(
@@ -152,7 +152,6 @@ class HistorialBoletas(models.Model):
         verbose_name_plural = 'Historial de Boletas'
         ordering = ['-fecha_emision']
         indexes = [
-            models.Index(fields=['folio']),
             models.Index(fields=['fecha_emision']),
             models.Index(fields=['cliente_nombre']),
         ]
@@ -243,6 +243,7 @@ class Lote(models.Model):
         indexes = [
             models.Index(fields=['productos', 'estado']),
             models.Index(fields=['fecha_caducidad']),
+            models.Index(fields=['estado', 'fecha_caducidad']),
             models.Index(fields=['origen']),
         ]
 
@@ -61,6 +61,10 @@ class Productos(models.Model):
     nombre = models.CharField(max_length=100)
     descripcion = models.CharField(max_length=300, blank=True, null=True)
     marca = models.CharField(max_length=100, blank=True, null=True)
+    # Clave de duplicados: nombre y marca en minúsculas y sin espacios en los
+    # extremos. El inventario la usa para mostrar un solo producto por
+    # (nombre, marca) y se recalcula en save(). Script: sql_clave_duplicado_productos.sql
+    clave_duplicado = models.CharField(max_length=201, default='', editable=False)
     precio = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     
     # ============================================================
@@ -145,7 +149,11 @@ class Productos(models.Model):
         validators=[MinValueValidator(Decimal('0'))],
         help_text='Stock máximo (permite decimales)'
     )
-    
+    lotes_activos = models.PositiveIntegerField(
+        default=0,
+        help_text='Cantidad de lotes activos con stock (resumen mantenido en ventas/funciones/stock.py)'
+    )
+
     # ============================================================
     # ESTADO DE MERMA (NUEVO)
     # ============================================================
@@ -193,6 +201,16 @@ class Productos(models.Model):
     def __str__(self):
         return self.nombre
     
+    def save(self, *args, **kwargs):
+        # Mantener la clave de duplicados al día con el nombre y la marca
+        # (igual que el relleno de sql_clave_duplicado_productos.sql:
+        # LOWER(TRIM(nombre)), CHAR(31), LOWER(TRIM(marca)))
+        self.clave_duplicado = f"{(self.nombre or '').strip(' ').lower()}\x1f{(self.marca or '').strip(' ').lower()}"
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'nombre', 'marca'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'clave_duplicado'}
+        super().save(*args, **kwargs)
+    
     def esta_vencido(self):
         """
         Verifica si el producto está vencido comparando con la fecha actual.
@@ -303,10 +321,15 @@ class Productos(models.Model):
     def calcular_cantidad_desde_lotes(self):
         """
         Calcula la cantidad total del producto desde sus lotes activos.
-        
+
         Si el producto tiene lotes, retorna la suma de lotes activos.
         Si no tiene lotes, retorna la cantidad directa del producto.
-        
+
+        NOTA: Hace consultas a la tabla lotes. Para mostrar stock usar
+        directamente `cantidad`, que se mantiene actualizada al modificar
+        lotes (ver ventas/funciones/stock.py). Este método queda para
+        verificaciones puntuales.
+
         Returns:
             Decimal: Cantidad total calculada desde lotes o cantidad directa (permite decimales)
         """
@@ -359,8 +382,9 @@ class Productos(models.Model):
         Returns:
             date o None: Fecha de caducidad más próxima, o None si no hay lotes
         """
-        lote = self.obtener_lote_mas_antiguo()
-        return lote.fecha_caducidad if lote else self.caducidad
+        # `caducidad` ya guarda la caducidad del lote activo más antiguo
+        # (resumen mantenido al modificar lotes), no hace falta consultar lotes
+        return self.caducidad
     
     def calcular_perdida(self):
         """
@@ -380,4 +404,9 @@ class Productos(models.Model):
         managed = False
         db_table = 'productos'
         verbose_name = 'Producto'
-        verbose_name_plural = 'Productos'
\ No newline at end of file
+        verbose_name_plural = 'Productos'
+        indexes = [
+            models.Index(fields=['modificado']),
+            models.Index(fields=['eliminado', 'estado_merma', 'cantidad']),
+            models.Index(fields=['clave_duplicado', 'id'], name='idx_productos_clave_dup'),
+        ]
\ No newline at end of file
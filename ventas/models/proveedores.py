@@ -129,6 +129,20 @@ class Proveedor(models.Model):
         help_text='Notas adicionales sobre el proveedor'
     )
     
+    # ============================================================
+    # SALDO
+    # ============================================================
+    saldo_pendiente = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        help_text='Suma del saldo pendiente de sus facturas (ver ventas/funciones/saldos_proveedores.py)'
+    )
+    
+    # Campos que solo se actualizan desde saldos_proveedores (no desde save)
+    CAMPOS_SALDO = ('saldo_pendiente',)
+    
     # ============================================================
     # TIMESTAMPS
     # ============================================================
@@ -158,6 +172,25 @@ class Proveedor(models.Model):
     def __str__(self):
         return self.nombre
     
+    def save(self, *args, **kwargs):
+        """
+        Sobrescribir save para no escribir el saldo guardado.
+        
+        saldo_pendiente lo ajustan los pagos y las facturas con UPDATE
+        (ver ventas/funciones/saldos_proveedores.py): el objeto en memoria
+        puede tener un saldo desactualizado, así que al editar o eliminar
+        el proveedor no se escribe.
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = [c for c in update_fields if c not in self.CAMPOS_SALDO]
+        elif not self._state.adding:
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name not in self.CAMPOS_SALDO
+            ]
+        super().save(*args, **kwargs)
+    
     def esta_activo(self):
         """
         Verifica si el proveedor está activo.
@@ -178,13 +211,15 @@ class Proveedor(models.Model):
     
     def obtener_total_pendiente(self):
         """
-        Calcula el total de facturas pendientes de pago.
+        Retorna el saldo pendiente de pago con este proveedor.
+        
+        Es la columna saldo_pendiente, que se mantiene al registrar pagos y
+        modificar facturas: no recorre las facturas del proveedor.
         
         Returns:
-            Decimal: Suma de totales de facturas pendientes
+            Decimal: Suma del saldo pendiente de sus facturas
         """
-        facturas_pendientes = self.obtener_facturas_pendientes()
-        return sum(factura.total for factura in facturas_pendientes)
+        return self.saldo_pendiente
     
     # ============================================================
     # CONFIGURACIÓN DEL MODELO
@@ -275,10 +310,33 @@ class FacturaProveedor(models.Model):
     
     def save(self, *args, **kwargs):
         """
-        Sobrescribir save para ejecutar validaciones.
+        Sobrescribir save para ejecutar validaciones y mantener los saldos.
+        
+        total_pagado y saldo_pendiente no se escriben desde aquí (el objeto
+        en memoria puede estar desactualizado): después de guardar se
+        recalculan en la misma transacción y se ajusta el saldo del
+        proveedor (ver ventas/funciones/saldos_proveedores.py).
         """
+        from django.db import transaction
+        from ventas.funciones.saldos_proveedores import actualizar_saldo_factura
+        
         self.full_clean()
-        super().save(*args, **kwargs)
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = [c for c in update_fields if c not in self.CAMPOS_SALDO]
+        elif not self._state.adding:
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name not in self.CAMPOS_SALDO
+            ]
+        
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            saldos = actualizar_saldo_factura(self.pk)
+        
+        self.total_pagado = saldos['total_pagado']
+        self.saldo_pendiente = saldos['saldo_pendiente']
     
     # ============================================================
     # TOTALES Y MONTOS
@@ -322,6 +380,26 @@ class FacturaProveedor(models.Model):
         db_column='total_con_iva'
     )
     
+    # Saldos guardados: solo los escribe actualizar_saldo_factura
+    # (ver ventas/funciones/saldos_proveedores.py)
+    total_pagado = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        help_text='Suma de los pagos de la factura'
+    )
+    
+    saldo_pendiente = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        help_text='Total con IVA menos lo pagado (0 si está eliminada o cancelada)'
+    )
+    
+    CAMPOS_SALDO = ('total_pagado', 'saldo_pendiente')
+    
     # Propiedades para compatibilidad con código existente
     @property
     def subtotal(self):
@@ -420,9 +498,7 @@ class FacturaProveedor(models.Model):
         Returns:
             Decimal: Total calculado desde los detalles
         """
-        total_detalles = sum(
-            detalle.subtotal for detalle in self.detalles.all()
-        )
+        total_detalles = self.detalles.aggregate(total=models.Sum('subtotal'))['total'] or Decimal('0.00')
         return total_detalles - self.descuento
     
     def actualizar_totales(self):
@@ -433,10 +509,10 @@ class FacturaProveedor(models.Model):
         NOTA: En Chile, el IVA se calcula sobre el subtotal ANTES de descuentos,
         luego se aplica el descuento al total con IVA.
         """
-        # Sumar todos los subtotales de los detalles (solo activos)
-        subtotal_sin_descuento = sum(
-            detalle.subtotal for detalle in self.detalles.all()
-        )
+        # Sumar todos los subtotales de los detalles con un SUM
+        subtotal_sin_descuento = self.detalles.aggregate(
+            total=models.Sum('subtotal')
+        )['total'] or Decimal('0.00')
         
         # Calcular IVA sobre el subtotal sin descuento (19% en Chile)
         # Redondear a 2 decimales
@@ -509,81 +585,77 @@ class FacturaProveedor(models.Model):
         Marca la factura como recibida físicamente.
         Esto permite actualizar el stock de productos.
         
+        Crea los lotes y movimientos de todos los detalles en bloque
+        (ver ventas/funciones/recepcion_facturas.py).
+        
         Args:
             fecha_recepcion: Fecha de recepción (default: hoy)
+        
+        Returns:
+            list: Productos actualizados (un dict por detalle)
         """
-        self.estado_recepcion = 'recibida'
-        self.fecha_recepcion = fecha_recepcion or date.today()
-        self.save()
+        from django.db import transaction
+        from ventas.funciones.recepcion_facturas import recibir_factura
         
-        # Actualizar stock de todos los productos
-        for detalle in self.detalles.all():
-            detalle.actualizar_stock_producto()
+        with transaction.atomic():
+            return recibir_factura(self, fecha_recepcion)
     
     def cancelar_recepcion(self):
         """
         Cancela la recepción de una factura y revierte el stock.
-        Solo funciona si la factura está en estado 'recibida'.
+        Solo funciona si la factura está recibida (tiene fecha_recepcion).
+        
+        Returns:
+            list: Productos revertidos (un dict por producto)
         """
-        if self.estado_recepcion != 'recibida':
+        if not self.fecha_recepcion:
             raise ValueError(
-                "Solo se pueden cancelar facturas que están en estado 'recibida'"
+                "Solo se pueden cancelar facturas que ya fueron recibidas"
             )
         
-        # Revertir stock de todos los productos
-        for detalle in self.detalles.all():
-            detalle.revertir_stock_producto()
+        from django.db import transaction
+        from ventas.funciones.recepcion_facturas import quitar_recepcion
         
-        # Cambiar estado
-        self.estado_recepcion = 'cancelada'
-        self.save()
+        with transaction.atomic():
+            return quitar_recepcion(self)
     
     def calcular_total_pagado(self):
         """
-        Calcula el total pagado de esta factura sumando todos los pagos.
+        Calcula el total pagado de esta factura con un SUM de sus pagos.
+        
+        Para mostrarlo, usar la columna total_pagado (ya calculada).
         
         Returns:
             Decimal: Total pagado
         """
-        try:
-            from .proveedores import PagoProveedor
-            pagos = PagoProveedor.objects.filter(
-                factura_proveedor=self
-            )
-            return sum(pago.monto for pago in pagos)
-        except:
-            # Si no existe el modelo PagoProveedor aún, retornar 0
-            return Decimal('0.00')
+        from ventas.funciones.saldos_proveedores import suma_pagos
+        return suma_pagos(PagoProveedor.objects.filter(factura_proveedor=self))
     
     def calcular_saldo_pendiente(self):
         """
-        Calcula el saldo pendiente de pago.
+        Calcula el saldo pendiente de pago desde los pagos.
+        
+        Para mostrarlo, usar la columna saldo_pendiente (ya calculada).
         
         Returns:
             Decimal: Saldo pendiente (total_con_iva - pagos)
         """
-        total_pagado = self.calcular_total_pagado()
-        return self.total_con_iva - total_pagado
+        return self.total_con_iva - self.calcular_total_pagado()
     
     def actualizar_estado_pago_automatico(self):
         """
-        Actualiza el estado de pago automáticamente según los pagos realizados.
+        Actualiza el estado de pago automáticamente según los pagos realizados,
+        junto con los saldos de la factura y del proveedor.
         """
-        total_pagado = self.calcular_total_pagado()
+        from django.db import transaction
+        from ventas.funciones.saldos_proveedores import actualizar_saldo_factura
         
-        # Usar comparación con tolerancia para decimales
-        from decimal import Decimal
-        if total_pagado <= Decimal('0.00'):
-            nuevo_estado = 'pendiente'
-        elif total_pagado >= self.total_con_iva:
-            nuevo_estado = 'pagado'
-        else:
-            nuevo_estado = 'parcial'
+        with transaction.atomic():
+            saldos = actualizar_saldo_factura(self.pk, actualizar_estado=True)
         
-        # Solo actualizar si el estado cambió
-        if self.estado_pago != nuevo_estado:
-            self.estado_pago = nuevo_estado
-            self.save(update_fields=['estado_pago'])
+        self.total_pagado = saldos['total_pagado']
+        self.saldo_pendiente = saldos['saldo_pendiente']
+        self.estado_pago = saldos['estado_pago']
     
     # ============================================================
     # CONFIGURACIÓN DEL MODELO
@@ -720,69 +792,33 @@ class DetalleFacturaProveedor(models.Model):
         Actualiza el stock del producto cuando se recibe este detalle.
         Debe llamarse cuando se confirma la recepción de la factura.
         
-        IMPORTANTE: Solo actualiza stock si la factura está en estado 'recibida'.
-        También crea un movimiento de inventario para trazabilidad.
+        IMPORTANTE: Solo actualiza stock si la factura está recibida.
+        Crea el lote y el movimiento de inventario por el mismo camino que
+        la recepción completa (ver ventas/funciones/recepcion_facturas.py).
         """
         # Verificar que la factura esté recibida
-        if self.factura_proveedor.estado_recepcion != 'recibida':
+        if not self.factura_proveedor.fecha_recepcion:
             raise ValueError(
-                "No se puede actualizar stock. La factura debe estar en estado 'recibida'"
+                "No se puede actualizar stock. La factura debe estar recibida"
             )
         
-        producto = self.productos
-        
-        # Actualizar cantidad y stock_actual
-        producto.cantidad += self.cantidad
-        if producto.stock_actual is not None:
-            producto.stock_actual += self.cantidad
-        else:
-            producto.stock_actual = self.cantidad
-        
-        producto.save()
-        
-        # Crear movimiento de inventario para trazabilidad
-        try:
-            from .movimientos import MovimientosInventario
-            MovimientosInventario.objects.create(
-                tipo_movimiento='entrada',
-                cantidad=self.cantidad,
-                productos=producto,
-                origen='compra',
-                referencia_id=self.factura_proveedor.id,
-                tipo_referencia='factura_proveedor'
-            )
-        except Exception as e:
-            # Si falla la creación del movimiento, registrar pero no fallar
-            print(f"Error al crear movimiento de inventario: {e}")
+        from django.db import transaction
+        from ventas.funciones.recepcion_facturas import registrar_entrada_detalles
+        
+        with transaction.atomic():
+            registrar_entrada_detalles(self.factura_proveedor, [self])
     
     def revertir_stock_producto(self):
         """
         Revierte el stock del producto cuando se cancela la recepción de la factura.
-        Crea un movimiento de salida para mantener trazabilidad.
-        """
-        producto = self.productos
-        
-        # Revertir cantidad y stock_actual
-        producto.cantidad = max(0, producto.cantidad - self.cantidad)
-        if producto.stock_actual is not None:
-            producto.stock_actual = max(0, producto.stock_actual - self.cantidad)
-        
-        producto.save()
-        
-        # Crear movimiento de inventario de salida para trazabilidad
-        try:
-            from .movimientos import MovimientosInventario
-            MovimientosInventario.objects.create(
-                tipo_movimiento='salida',
-                cantidad=self.cantidad,
-                productos=producto,
-                origen='devolucion',
-                referencia_id=self.factura_proveedor.id,
-                tipo_referencia='factura_proveedor'
-            )
-        except Exception as e:
-            # Si falla la creación del movimiento, registrar pero no fallar
-            print(f"Error al crear movimiento de inventario: {e}")
+        Retira lo que queda del lote de este detalle y crea un movimiento de
+        salida para mantener trazabilidad.
+        """
+        from django.db import transaction
+        from ventas.funciones.recepcion_facturas import revertir_entrada_detalles
+        
+        with transaction.atomic():
+            revertir_entrada_detalles(self.factura_proveedor, [self])
     
     # ============================================================
     # CONFIGURACIÓN DEL MODELO
@@ -880,10 +916,11 @@ class PagoProveedor(models.Model):
         """
         super().clean()
         
-        # Validar que el monto no exceda el saldo pendiente
+        # Validar que el monto no exceda el saldo pendiente (columna guardada)
         if self.factura_proveedor_id:
-            factura = FacturaProveedor.objects.get(id=self.factura_proveedor_id)
-            saldo_pendiente = factura.calcular_saldo_pendiente()
+            saldo_pendiente = FacturaProveedor.objects.values_list(
+                'saldo_pendiente', flat=True
+            ).get(id=self.factura_proveedor_id)
             
             # Si es un pago nuevo (sin ID), verificar saldo
             if not self.id and self.monto > saldo_pendiente:
@@ -894,13 +931,38 @@ class PagoProveedor(models.Model):
     def save(self, *args, **kwargs):
         """
         Sobrescribir save para ejecutar validaciones y actualizar estado de factura.
+        
+        La factura se bloquea antes de validar el saldo: dos pagos
+        simultáneos no pueden pasar ambos la validación.
         """
-        self.full_clean()
-        super().save(*args, **kwargs)
+        from django.db import transaction
         
-        # Actualizar estado de pago de la factura automáticamente
-        if self.factura_proveedor:
+        with transaction.atomic():
+            self._bloquear_factura()
+            self.full_clean()
+            super().save(*args, **kwargs)
+            
+            # Actualizar estado de pago y saldos de la factura automáticamente
+            if self.factura_proveedor:
+                self.factura_proveedor.actualizar_estado_pago_automatico()
+    
+    def delete(self, *args, **kwargs):
+        """
+        Sobrescribir delete para actualizar estado y saldos de la factura.
+        """
+        from django.db import transaction
+        
+        with transaction.atomic():
+            self._bloquear_factura()
+            resultado = super().delete(*args, **kwargs)
             self.factura_proveedor.actualizar_estado_pago_automatico()
+        return resultado
+    
+    def _bloquear_factura(self):
+        if self.factura_proveedor_id:
+            FacturaProveedor.objects.select_for_update().filter(
+                pk=self.factura_proveedor_id
+            ).values_list('pk', flat=True).first()
     
     # ============================================================
     # MÉTODOS AUXILIARES
@@ -0,0 +1,166 @@
+# ================================================================
+# =                                                              =
+# =        MODELOS: RESUMEN DIARIO DE VENTAS                    =
+# =                                                              =
+# ================================================================
+#
+# Estos modelos guardan las ventas ya sumadas por día (fecha local,
+# America/Santiago), para que los reportes y el dashboard no tengan
+# que recorrer todas las filas de ventas y detalle_venta:
+#
+# 1. ResumenVentasDia: totales de las boletas por (fecha, canal, medio de pago)
+# 2. ResumenVentasProductoDia: unidades y montos por (fecha, producto, canal, medio de pago)
+# 3. ResumenVentasPendiente: días cuya actualización falló (hay que reconstruirlos)
+#
+# Hay dos tablas porque los totales de una boleta (descuento global,
+# número de boletas) no se pueden obtener sumando sus productos.
+#
+# Se actualizan al confirmar cada venta del POS y se pueden reconstruir
+# con: python manage.py reconstruir_resumen_ventas
+
+from django.db import models
+from decimal import Decimal
+from .productos import Productos
+from .ventas import Ventas
+
+
+# ================================================================
+# =           MODELO: RESUMEN DE VENTAS POR DÍA                  =
+# ================================================================
+
+class ResumenVentasDia(models.Model):
+    """
+    Totales de las ventas de un día, por canal y medio de pago.
+    """
+
+    fecha = models.DateField(
+        help_text='Día de las ventas (fecha local)'
+    )
+
+    canal_venta = models.CharField(
+        max_length=20,
+        choices=Ventas.CANAL_CHOICES
+    )
+
+    medio_pago = models.CharField(
+        max_length=20,
+        choices=Ventas.MEDIO_PAGO_CHOICES
+    )
+
+    num_ventas = models.PositiveIntegerField(
+        default=0,
+        help_text='Número de boletas'
+    )
+
+    total_sin_iva = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    total_iva = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    descuento = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    total_con_iva = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    def __str__(self):
+        return f'{self.fecha} - {self.canal_venta} - {self.medio_pago}'
+
+    class Meta:
+        managed = False
+        db_table = 'resumen_ventas_dia'
+        verbose_name = 'Resumen de Ventas por Día'
+        verbose_name_plural = 'Resúmenes de Ventas por Día'
+        unique_together = [('fecha', 'canal_venta', 'medio_pago')]
+
+
+# ================================================================
+# =      MODELO: RESUMEN DE VENTAS POR PRODUCTO Y DÍA            =
+# ================================================================
+
+class ResumenVentasProductoDia(models.Model):
+    """
+    Unidades y montos vendidos de un producto en un día, por canal y medio de pago.
+    """
+
+    fecha = models.DateField(
+        help_text='Día de las ventas (fecha local)'
+    )
+
+    productos = models.ForeignKey(
+        Productos,
+        on_delete=models.CASCADE,
+        related_name='resumen_ventas'
+    )
+
+    canal_venta = models.CharField(
+        max_length=20,
+        choices=Ventas.CANAL_CHOICES
+    )
+
+    medio_pago = models.CharField(
+        max_length=20,
+        choices=Ventas.MEDIO_PAGO_CHOICES
+    )
+
+    unidades = models.DecimalField(
+        max_digits=14,
+        decimal_places=3,
+        default=Decimal('0.000'),
+        help_text='Unidades vendidas'
+    )
+
+    total_neto = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text='Suma de cantidad × precio unitario (igual que el ranking de top productos)'
+    )
+
+    total_iva = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text='IVA incluido en las líneas vendidas, después del descuento por línea'
+    )
+
+    num_ventas = models.PositiveIntegerField(
+        default=0,
+        help_text='Número de boletas que incluyen el producto'
+    )
+
+    def __str__(self):
+        return f'{self.fecha} - {self.productos_id} - {self.canal_venta} - {self.medio_pago}'
+
+    class Meta:
+        managed = False
+        db_table = 'resumen_ventas_producto_dia'
+        verbose_name = 'Resumen de Ventas por Producto y Día'
+        verbose_name_plural = 'Resúmenes de Ventas por Producto y Día'
+        unique_together = [('fecha', 'productos', 'canal_venta', 'medio_pago')]
+
+
+# ================================================================
+# =      MODELO: DÍAS CON RESUMEN PENDIENTE                      =
+# ================================================================
+
+class ResumenVentasPendiente(models.Model):
+    """
+    Día cuyo resumen no se pudo actualizar al confirmar una venta.
+
+    Lo marca registrar_venta_en_resumen y lo limpia
+    `python manage.py reconstruir_resumen_ventas --pendientes`.
+    """
+
+    fecha = models.DateField(
+        unique=True,
+        help_text='Día cuyo resumen hay que reconstruir'
+    )
+
+    registrado = models.DateTimeField(
+        auto_now=True,
+        help_text='Última actualización que falló'
+    )
+
+    def __str__(self):
+        return f'{self.fecha} (pendiente)'
+
+    class Meta:
+        managed = False
+        db_table = 'resumen_ventas_pendientes'
+        verbose_name = 'Día de Resumen Pendiente'
+        verbose_name_plural = 'Días de Resumen Pendientes'
@@ -0,0 +1,65 @@
+# ================================================================
+# =                                                              =
+# =        MODELO: ESTADO DE TAREAS PROGRAMADAS                 =
+# =                                                              =
+# ================================================================
+#
+# Este modelo guarda el estado de las tareas que se ejecutan en
+# segundo plano (por ejemplo, la generación de alertas):
+#
+# - marca_agua: hasta qué momento se procesaron los cambios, para que
+#   la siguiente ejecución solo revise lo que cambió después
+# - bloqueado_hasta: bloqueo para que dos ejecuciones no corran a la vez
+#
+# Hay una fila por tarea (identificada por su nombre).
+
+from django.db import models
+
+
+# ================================================================
+# =                MODELO: ESTADO TAREA                          =
+# ================================================================
+
+class EstadoTarea(models.Model):
+    """
+    Estado persistente de una tarea programada (marca de agua y bloqueo).
+    """
+
+    nombre = models.CharField(
+        max_length=50,
+        unique=True,
+        help_text='Identificador de la tarea (ej: generar_alertas)'
+    )
+
+    marca_agua = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text='Momento hasta el cual se procesaron los cambios en la última ejecución exitosa'
+    )
+
+    bloqueado_hasta = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text='Si es una fecha futura, hay una ejecución en curso (el bloqueo expira solo)'
+    )
+
+    ultima_ejecucion = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text='Fecha y hora de término de la última ejecución exitosa'
+    )
+
+    ultimo_resultado = models.JSONField(
+        blank=True,
+        null=True,
+        help_text='Estadísticas de la última ejecución exitosa'
+    )
+
+    def __str__(self):
+        return self.nombre
+
+    class Meta:
+        managed = False
+        db_table = 'estado_tareas'
+        verbose_name = 'Estado de Tarea'
+        verbose_name_plural = 'Estados de Tareas'
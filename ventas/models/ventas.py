@@ -17,6 +17,7 @@ from django.db import models
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 from .productos import Productos
+from ventas.funciones.validators import normalizar_texto_busqueda, normalizar_rut
 
 # ================================================================
 # =                    MODELO: CLIENTES                          =
@@ -52,17 +53,37 @@ class Clientes(models.Model):
         null=True                   # Puede ser NULL
     )
     
+    # --- Campos de búsqueda (normalizados e indexados) ---
+    # Copias del nombre y RUT en minúsculas, sin tildes, puntos ni guion.
+    # Las usa el buscador de clientes del POS (ver ventas/funciones/clientes.py)
+    # y se recalculan en save(). Script: sql_busqueda_clientes.sql
+    nombre_normalizado = models.CharField(max_length=150, blank=True, null=True, editable=False)
+    rut_normalizado = models.CharField(max_length=12, blank=True, null=True, editable=False)
+    
     # --- Método para mostrar el cliente como texto ---
     # Cuando imprimimos un cliente, mostrará su nombre (útil en el admin y formularios)
     def __str__(self):
         return self.nombre
     
+    def save(self, *args, **kwargs):
+        # Mantener los campos de búsqueda al día con el nombre y el RUT
+        self.nombre_normalizado = normalizar_texto_busqueda(self.nombre)
+        self.rut_normalizado = normalizar_rut(self.rut) or None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'nombre_normalizado', 'rut_normalizado'}
+        super().save(*args, **kwargs)
+    
     # --- Configuración del modelo ---
     class Meta:
         managed = False             # Django NO creará/modificará esta tabla (ya existe en MySQL)
         db_table = 'clientes'       # Nombre de la tabla en la base de datos MySQL
         verbose_name = 'Cliente'    # Nombre singular en el admin de Django
         verbose_name_plural = 'Clientes'  # Nombre plural en el admin de Django
+        indexes = [
+            models.Index(fields=['nombre_normalizado'], name='idx_clientes_nombre_norm'),
+            models.Index(fields=['rut_normalizado'], name='idx_clientes_rut_norm'),
+        ]
 
 
 # ================================================================
@@ -128,9 +149,11 @@ class Ventas(models.Model):
     )
     
     # --- Campo: Folio ---
-    # Número único de boleta/factura (como "BOL-0001234")
+    # Número único de boleta/factura (como "BOL-00001234")
+    # Sale de la secuencia de folios (ver ventas/funciones/folios.py)
     folio = models.CharField(
         max_length=20,
+        unique=True,                # Nunca dos ventas con el mismo folio
         blank=True,                 # Puede estar vacío
         null=True                   # Puede ser NULL
     )
@@ -0,0 +1,61 @@
+# ================================================================
+# =                                                              =
+# =        SEÑALES: INVALIDAR PERMISOS CACHEADOS                =
+# =                                                              =
+# ================================================================
+#
+# Los permisos de cada usuario se guardan en el cache por
+# PERMISOS_CACHE_TTL segundos (ver ventas/funciones/permisos.py).
+# Cualquier cambio que pueda alterar su rol los descarta, venga de la
+# gestión de usuarios, del admin de Django o de cualquier otro código:
+#
+# - Guardar o eliminar un registro de Usuarios (rol de la tabla usuarios)
+# - Guardar o eliminar un User (is_superuser, is_active)
+# - Agregar o quitar grupos de un User (en cualquiera de los dos sentidos)
+#
+# Se conectan en VentasConfig.ready (ventas/apps.py).
+
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from ventas.models.usuarios import Usuarios
+from ventas.funciones.permisos import invalidar_permisos_usuario
+
+
+@receiver([post_save, post_delete], sender=Usuarios)
+def invalidar_permisos_por_usuarios(sender, instance, **kwargs):
+    """
+    El rol de la tabla usuarios cambió (o se eliminó el registro).
+    """
+    if instance.user_id:
+        invalidar_permisos_usuario(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidar_permisos_por_user(sender, instance, **kwargs):
+    """
+    Cambió el usuario de Django (por ejemplo is_superuser desde el admin).
+    """
+    invalidar_permisos_usuario(instance)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidar_permisos_por_grupos(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Cambiaron los grupos de uno o más usuarios.
+
+    Desde el User (user.groups.add) la instancia es el usuario; desde el
+    grupo (group.user_set.add) los usuarios vienen en pk_set. Al vaciar
+    un grupo (clear) se descartan antes, mientras aún se conocen sus usuarios.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+
+    if not reverse:
+        invalidar_permisos_usuario(instance)
+    elif action == 'pre_clear':
+        for user_id in instance.user_set.values_list('pk', flat=True):
+            invalidar_permisos_usuario(user_id)
+    else:
+        for user_id in pk_set or ():
+            invalidar_permisos_usuario(user_id)
@@ -8,18 +8,24 @@
 # reportes a diferentes formatos (Excel, PDF, CSV).
 #
 # FUNCIONALIDADES:
-# - Exportación a Excel (XLSX) usando openpyxl
+# - Exportación a Excel (XLSX) usando openpyxl (modo write_only)
+# - Exportación a CSV en streaming (StreamingHttpResponse)
 # - Exportación a PDF usando ReportLab
 # - Funciones reutilizables para todos los reportes
 
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse, FileResponse
+from django.db.models import Q
 from decimal import Decimal
 from datetime import datetime
+from itertools import chain
 import csv
+import io
+import tempfile
 
 # Intentar importar openpyxl para Excel
 try:
     from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
     from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
     from openpyxl.utils import get_column_letter
     OPENPYXL_AVAILABLE = True
@@ -40,31 +46,152 @@ except ImportError:
 
 
 # ================================================================
-# =              EXPORTACIÓN A EXCEL (XLSX)                     =
+# =              EXPORTACIÓN EN STREAMING                       =
 # ================================================================
+#
+# Los reportes grandes (por ejemplo un año de ventas) no se arman
+# completos en memoria:
+# - CSV: StreamingHttpResponse que escribe fila por fila mientras el
+#   QuerySet se lee por bloques con leer_por_bloques()
+# - Excel: workbook de openpyxl en modo write_only (no guarda las celdas
+#   en memoria) escrito a un archivo temporal, que se envía con FileResponse
+#
+# Así la memoria usada no depende de la cantidad de filas.
 
-def exportar_a_excel(datos, nombre_archivo, titulo="Reporte"):
+# Filas que se leen de la base de datos por bloque (leer_por_bloques)
+TAMANO_BLOQUE_EXPORTACION = 2000
+
+# Tamaño hasta el cual el Excel generado se mantiene en memoria;
+# sobre este tamaño el archivo temporal pasa a disco
+MAX_EXCEL_EN_MEMORIA = 5 * 1024 * 1024
+
+CONTENT_TYPE_EXCEL = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def leer_por_bloques(queryset, campo_fecha=None, tamano=TAMANO_BLOQUE_EXPORTACION):
     """
-    Exporta datos a formato Excel (XLSX).
-    
+    Recorre un QuerySet por bloques con paginación por cursor (keyset).
+
+    No usa QuerySet.iterator(): con mysqlclient el driver descarga el
+    resultado completo aunque se lea por bloques. Cada bloque es una
+    consulta con LIMIT que sigue después de la última fila leída:
+
+    - Sin campo_fecha: por ID ascendente (WHERE id > :ultimo)
+    - Con campo_fecha: más reciente primero, (fecha DESC, id DESC), igual
+      que ventas/funciones/paginacion.py
+
     Args:
-        datos: Lista de diccionarios con los datos a exportar
+        queryset: QuerySet ya filtrado (su orden se reemplaza)
+        campo_fecha: Campo de fecha (no nulo) para ordenar, o None
+        tamano: Filas por consulta
+
+    Yields:
+        Cada objeto del QuerySet
+    """
+    if campo_fecha is None:
+        orden = ('pk',)
+    else:
+        orden = (f'-{campo_fecha}', '-pk')
+
+    ultimo = None
+    while True:
+        bloque = queryset
+        if ultimo is not None and campo_fecha is None:
+            bloque = bloque.filter(pk__gt=ultimo.pk)
+        elif ultimo is not None:
+            fecha = getattr(ultimo, campo_fecha)
+            bloque = bloque.filter(**{f'{campo_fecha}__lte': fecha}).filter(
+                Q(**{f'{campo_fecha}__lt': fecha}) | Q(**{campo_fecha: fecha, 'pk__lt': ultimo.pk})
+            )
+        filas = list(bloque.order_by(*orden)[:tamano])
+        yield from filas
+        if len(filas) < tamano:
+            return
+        ultimo = filas[-1]
+
+
+class _Eco:
+    """
+    Objeto con método write() que retorna lo escrito, para que csv.writer
+    genere cada línea como texto sin acumularla en un buffer.
+    """
+
+    def write(self, valor):
+        return valor
+
+
+def _valor_exportable(valor):
+    """
+    Convierte un valor a un tipo que CSV y Excel entienden (Decimal -> float).
+    """
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return valor
+
+
+def _separar_encabezados(datos):
+    """
+    Obtiene los encabezados de una secuencia de diccionarios sin consumirla.
+
+    Args:
+        datos: Lista o generador de diccionarios
+
+    Returns:
+        tuple: (encabezados, filas) - filas es un iterador de listas de valores
+    """
+    iterador = iter(datos)
+    primero = next(iterador, None)
+    if primero is None:
+        return [], iter(())
+
+    encabezados = list(primero.keys())
+
+    def filas():
+        for fila in chain([primero], iterador):
+            yield [fila.get(encabezado, '') for encabezado in encabezados]
+
+    return encabezados, filas()
+
+
+def exportar_a_csv_streaming(encabezados, filas, nombre_archivo):
+    """
+    Exporta filas a CSV escribiendo la respuesta mientras se generan.
+
+    Args:
+        encabezados: Lista de nombres de columnas
+        filas: Iterable de listas de valores (idealmente un generador
+               alimentado por leer_por_bloques())
         nombre_archivo: Nombre del archivo sin extensión
-        titulo: Título del reporte
-        
+
     Returns:
-        HttpResponse: Archivo Excel descargable
+        StreamingHttpResponse: Archivo CSV descargable
     """
-    
-    if not OPENPYXL_AVAILABLE:
-        # Fallback a CSV si openpyxl no está disponible
-        return exportar_a_csv(datos, nombre_archivo)
-    
-    # Crear workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Reporte"
-    
+    writer = csv.writer(_Eco())
+
+    def lineas():
+        if encabezados:
+            yield writer.writerow(encabezados)
+        for fila in filas:
+            yield writer.writerow([_valor_exportable(valor) for valor in fila])
+
+    response = StreamingHttpResponse(lineas(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}.csv"'
+    return response
+
+
+def escribir_excel(archivo, encabezados, filas, titulo="Reporte"):
+    """
+    Escribe un Excel (XLSX) en un archivo binario con un workbook write_only.
+
+    Args:
+        archivo: Archivo binario abierto para escritura
+        encabezados: Lista de nombres de columnas
+        filas: Iterable de listas de valores
+        titulo: Título del reporte
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Reporte")
+
     # Estilos
     header_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
     header_font = Font(bold=True, color="000000", size=12)
@@ -76,61 +203,92 @@ def exportar_a_excel(datos, nombre_archivo, titulo="Reporte"):
         bottom=Side(style='thin')
     )
     center_alignment = Alignment(horizontal='center', vertical='center')
-    
-    # Título
-    ws.merge_cells('A1:D1')
-    ws['A1'] = titulo
-    ws['A1'].font = title_font
-    ws['A1'].alignment = center_alignment
-    
-    # Fecha de generación
-    ws.merge_cells('A2:D2')
-    ws['A2'] = f"Generado el: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}"
-    ws['A2'].alignment = center_alignment
-    ws['A2'].font = Font(size=10, italic=True)
-    
-    # Encabezados (si hay datos)
-    if datos:
-        # Obtener claves del primer diccionario como encabezados
-        encabezados = list(datos[0].keys())
-        
-        # Escribir encabezados
-        for col_idx, encabezado in enumerate(encabezados, start=1):
-            cell = ws.cell(row=4, column=col_idx, value=str(encabezado).replace('_', ' ').title())
+
+    # Ancho de columnas (en modo write_only se define antes de escribir filas)
+    for col_idx in range(1, len(encabezados) + 1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = 20
+
+    # Título y fecha de generación
+    celda_titulo = WriteOnlyCell(ws, value=titulo)
+    celda_titulo.font = title_font
+    ws.append([celda_titulo])
+
+    celda_fecha = WriteOnlyCell(ws, value=f"Generado el: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
+    celda_fecha.font = Font(size=10, italic=True)
+    ws.append([celda_fecha])
+    ws.append([])
+
+    # Encabezados
+    if encabezados:
+        fila_encabezados = []
+        for encabezado in encabezados:
+            cell = WriteOnlyCell(ws, value=str(encabezado).replace('_', ' ').title())
             cell.fill = header_fill
             cell.font = header_font
             cell.border = border
             cell.alignment = center_alignment
-        
-        # Escribir datos
-        for row_idx, fila in enumerate(datos, start=5):
-            for col_idx, encabezado in enumerate(encabezados, start=1):
-                valor = fila.get(encabezado, '')
-                # Convertir Decimal a float para Excel
-                if isinstance(valor, Decimal):
-                    valor = float(valor)
-                cell = ws.cell(row=row_idx, column=col_idx, value=valor)
-                cell.border = border
-                if isinstance(valor, (int, float)):
-                    cell.alignment = Alignment(horizontal='right', vertical='center')
-                else:
-                    cell.alignment = Alignment(horizontal='left', vertical='center')
-        
-        # Ajustar ancho de columnas
-        for col_idx in range(1, len(encabezados) + 1):
-            col_letter = get_column_letter(col_idx)
-            ws.column_dimensions[col_letter].width = 20
-    
-    # Crear respuesta HTTP
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            fila_encabezados.append(cell)
+        ws.append(fila_encabezados)
+
+    # Datos (cada fila se escribe al archivo y se descarta)
+    for fila in filas:
+        celdas = []
+        for valor in fila:
+            cell = WriteOnlyCell(ws, value=_valor_exportable(valor))
+            cell.border = border
+            celdas.append(cell)
+        ws.append(celdas)
+
+    wb.save(archivo)
+
+
+def exportar_a_excel_streaming(encabezados, filas, nombre_archivo, titulo="Reporte"):
+    """
+    Exporta filas a Excel (XLSX) con un workbook write_only y un archivo temporal.
+
+    Args:
+        encabezados: Lista de nombres de columnas
+        filas: Iterable de listas de valores
+        nombre_archivo: Nombre del archivo sin extensión
+        titulo: Título del reporte
+
+    Returns:
+        FileResponse: Archivo Excel descargable
+    """
+    if not OPENPYXL_AVAILABLE:
+        # Fallback a CSV si openpyxl no está disponible
+        return exportar_a_csv_streaming(encabezados, filas, nombre_archivo)
+
+    archivo = tempfile.SpooledTemporaryFile(max_size=MAX_EXCEL_EN_MEMORIA)
+    escribir_excel(archivo, encabezados, filas, titulo)
+    archivo.seek(0)
+
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=f'{nombre_archivo}.xlsx',
+        content_type=CONTENT_TYPE_EXCEL,
     )
-    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}.xlsx"'
-    
-    # Guardar workbook en respuesta
-    wb.save(response)
+
+
+# ================================================================
+# =              EXPORTACIÓN A EXCEL (XLSX)                     =
+# ================================================================
+
+def exportar_a_excel(datos, nombre_archivo, titulo="Reporte"):
+    """
+    Exporta datos a formato Excel (XLSX).
     
-    return response
+    Args:
+        datos: Lista (o generador) de diccionarios con los datos a exportar
+        nombre_archivo: Nombre del archivo sin extensión
+        titulo: Título del reporte
+        
+    Returns:
+        FileResponse: Archivo Excel descargable
+    """
+    encabezados, filas = _separar_encabezados(datos)
+    return exportar_a_excel_streaming(encabezados, filas, nombre_archivo, titulo)
 
 
 def exportar_a_csv(datos, nombre_archivo):
@@ -138,65 +296,35 @@ def exportar_a_csv(datos, nombre_archivo):
     Exporta datos a formato CSV (fallback si Excel no está disponible).
     
     Args:
-        datos: Lista de diccionarios con los datos a exportar
+        datos: Lista (o generador) de diccionarios con los datos a exportar
         nombre_archivo: Nombre del archivo sin extensión
         
     Returns:
-        HttpResponse: Archivo CSV descargable
+        StreamingHttpResponse: Archivo CSV descargable
     """
-    
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}.csv"'
-    
-    writer = csv.writer(response)
-    
-    if datos:
-        # Encabezados
-        encabezados = list(datos[0].keys())
-        writer.writerow([str(h).replace('_', ' ').title() for h in encabezados])
-        
-        # Datos
-        for fila in datos:
-            valores = []
-            for encabezado in encabezados:
-                valor = fila.get(encabezado, '')
-                if isinstance(valor, Decimal):
-                    valor = float(valor)
-                valores.append(valor)
-            writer.writerow(valores)
-    
-    return response
+    encabezados, filas = _separar_encabezados(datos)
+    encabezados_csv = [str(h).replace('_', ' ').title() for h in encabezados]
+    return exportar_a_csv_streaming(encabezados_csv, filas, nombre_archivo)
 
 
 # ================================================================
 # =              EXPORTACIÓN A PDF                              =
 # ================================================================
 
-def exportar_a_pdf(datos, nombre_archivo, titulo="Reporte", encabezados=None):
+def escribir_pdf(archivo, datos, titulo="Reporte", encabezados=None):
     """
-    Exporta datos a formato PDF usando ReportLab.
+    Escribe un PDF con ReportLab en un archivo binario.
     
     Args:
+        archivo: Archivo binario abierto para escritura (o HttpResponse)
         datos: Lista de diccionarios con los datos a exportar
-        nombre_archivo: Nombre del archivo sin extensión
         titulo: Título del reporte
         encabezados: Lista de nombres de columnas (opcional, se infiere de datos si no se proporciona)
-        
-    Returns:
-        HttpResponse: Archivo PDF descargable
     """
     
-    if not REPORTLAB_AVAILABLE:
-        # Fallback a CSV si ReportLab no está disponible
-        return exportar_a_csv(datos, nombre_archivo)
-    
-    # Crear respuesta HTTP
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}.pdf"'
-    
     # Crear documento PDF
     doc = SimpleDocTemplate(
-        response,
+        archivo,
         pagesize=A4,
         rightMargin=2*cm,
         leftMargin=2*cm,
@@ -280,6 +408,88 @@ def exportar_a_pdf(datos, nombre_archivo, titulo="Reporte", encabezados=None):
     
     # Construir PDF
     doc.build(elements)
+
+
+def exportar_a_pdf(datos, nombre_archivo, titulo="Reporte", encabezados=None):
+    """
+    Exporta datos a formato PDF usando ReportLab.
+    
+    Args:
+        datos: Lista de diccionarios con los datos a exportar
+        nombre_archivo: Nombre del archivo sin extensión
+        titulo: Título del reporte
+        encabezados: Lista de nombres de columnas (opcional, se infiere de datos si no se proporciona)
+        
+    Returns:
+        HttpResponse: Archivo PDF descargable
+    """
+    
+    if not REPORTLAB_AVAILABLE:
+        # Fallback a CSV si ReportLab no está disponible
+        return exportar_a_csv(datos, nombre_archivo)
+    
+    # ReportLab arma la tabla completa en memoria
+    datos = list(datos)
+    
+    # Crear respuesta HTTP
+    response = HttpResponse(content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}.pdf"'
+    
+    escribir_pdf(response, datos, titulo, encabezados)
     
     return response
 
+
+# ================================================================
+# =              EXPORTACIÓN A ARCHIVO EN DISCO                 =
+# ================================================================
+#
+# Para las exportaciones en segundo plano (ver
+# ventas/funciones/exportaciones.py): el reporte se escribe en un
+# archivo en vez de en la respuesta HTTP.
+
+# Formato -> (extensión, content type)
+ARCHIVOS_EXPORTACION = {
+    'csv': ('csv', 'text/csv; charset=utf-8'),
+    'excel': ('xlsx', CONTENT_TYPE_EXCEL),
+    'pdf': ('pdf', 'application/pdf'),
+}
+
+
+def escribir_exportacion(archivo, formato, datos, titulo="Reporte", encabezados_pdf=None):
+    """
+    Escribe un reporte en un archivo binario en el formato pedido.
+    
+    Si falta la librería del formato (openpyxl o ReportLab) se escribe CSV,
+    igual que en las exportaciones directas.
+    
+    Args:
+        archivo: Archivo binario abierto para escritura
+        formato: 'csv', 'excel' o 'pdf'
+        datos: Iterable de diccionarios con los datos a exportar
+        titulo: Título del reporte
+        encabezados_pdf: Columnas a incluir en el PDF (opcional)
+        
+    Returns:
+        tuple: (extensión, content_type) del archivo escrito
+    """
+    if formato == 'excel' and OPENPYXL_AVAILABLE:
+        encabezados, filas = _separar_encabezados(datos)
+        escribir_excel(archivo, encabezados, filas, titulo)
+        return ARCHIVOS_EXPORTACION['excel']
+    
+    if formato == 'pdf' and REPORTLAB_AVAILABLE:
+        escribir_pdf(archivo, list(datos), titulo, encabezados_pdf)
+        return ARCHIVOS_EXPORTACION['pdf']
+    
+    # CSV (o fallback)
+    encabezados, filas = _separar_encabezados(datos)
+    texto = io.TextIOWrapper(archivo, encoding='utf-8', newline='')
+    writer = csv.writer(texto)
+    if encabezados:
+        writer.writerow(encabezados)
+    for fila in filas:
+        writer.writerow([_valor_exportable(valor) for valor in fila])
+    texto.flush()
+    texto.detach()
+    return ARCHIVOS_EXPORTACION['csv']
@@ -23,7 +23,7 @@ from .views_productos import (
 )
 
 # --- Vistas del Sistema POS (Punto de Venta) ---
-from .views_pos import pos_view, agregar_cliente_ajax, validar_producto_ajax, procesar_venta_ajax
+from .views_pos import pos_view, catalogo_pos_api, buscar_clientes_api, agregar_cliente_ajax, validar_producto_ajax, procesar_venta_ajax
 
 # --- Vistas del Sistema de Alertas ---
 from .views_alertas import (
@@ -65,6 +65,13 @@ from .view_reportes_inventario import (
     exportar_inventario_pdf
 )
 
+# --- Vistas de Exportaciones en Segundo Plano (NUEVO) ---
+from .view_exportaciones import (
+    crear_exportacion_api,
+    estado_exportacion_api,
+    descargar_exportacion_view
+)
+
 # --- Vistas de Comprobante (RF-V3) ---
 from .view_comprobante import comprobante_pdf_view, comprobante_html_view
 
@@ -72,7 +79,7 @@ from .view_comprobante import comprobante_pdf_view, comprobante_html_view
 from .view_ajustes_stock import ajustes_stock_view, procesar_ajuste_stock_ajax
 
 # --- Vistas de Acciones Masivas (NUEVO) ---
-from .view_acciones_masivas import crear_alertas_masivo, mover_merma_masivo, activar_desactivar_masivo, eliminar_masivo
+from .view_acciones_masivas import crear_alertas_masivo, mover_merma_masivo, activar_desactivar_masivo, eliminar_masivo, estado_accion_masiva_api
 
 # --- Vistas de Métricas del Dashboard (NUEVO) ---
 from .view_dashboard_metrics import (
@@ -81,7 +88,8 @@ from .view_dashboard_metrics import (
     alertas_pendientes_api,
     top_producto_api,
     ventas_del_dia_lista_api,
-    merma_lista_api
+    merma_lista_api,
+    dashboard_snapshot_api
 )
 
 # --- Vistas de Proveedores y Facturas (NUEVO) ---
@@ -24,6 +24,7 @@ from django.http import JsonResponse
 from django.db import transaction
 from django.conf import settings
 from ventas.models import Productos, MovimientosInventario
+from ventas.funciones.stock import actualizar_resumen_stock, CAMPOS_GUARDADO_STOCK
 from ventas.decorators import require_rol
 import json
 import logging
@@ -155,24 +156,13 @@ def procesar_ajuste_stock_ajax(request):
                     estado='activo'
                 )
                 
-                # Actualizar cantidad del producto desde lotes (manejar Decimal)
-                cantidad_producto = Decimal(str(producto.cantidad)) if producto.cantidad else Decimal('0')
-                producto.cantidad = cantidad_producto + cantidad
                 if producto.stock_actual is not None:
                     stock_actual_decimal = Decimal(str(producto.stock_actual)) if producto.stock_actual else Decimal('0')
                     producto.stock_actual = stock_actual_decimal + cantidad
                 
-                # Actualizar fecha de caducidad del producto con la del lote más antiguo
-                lote_mas_antiguo = Lote.objects.filter(
-                    productos=producto,
-                    estado='activo',
-                    cantidad__gt=0
-                ).order_by('fecha_caducidad', 'fecha_recepcion').first()
-                
-                if lote_mas_antiguo and lote_mas_antiguo.fecha_caducidad:
-                    producto.caducidad = lote_mas_antiguo.fecha_caducidad
-                
-                producto.save(update_fields=['cantidad', 'stock_actual', 'caducidad'])
+                # Actualizar cantidad, lotes activos y caducidad del producto desde lotes
+                actualizar_resumen_stock(producto, guardar=False)
+                producto.save(update_fields=['stock_actual'] + CAMPOS_GUARDADO_STOCK)
                 
                 # Crear movimiento en kardex
                 MovimientosInventario.objects.create(
@@ -191,7 +181,8 @@ def procesar_ajuste_stock_ajax(request):
                 cantidad_restante = Decimal(str(cantidad))
                 
                 # Obtener lotes activos ordenados por fecha de caducidad (más antiguos primero)
-                lotes_activos = Lote.objects.filter(
+                # Bloqueados hasta el fin de la transacción (igual que en el checkout)
+                lotes_activos = Lote.objects.select_for_update().filter(
                     productos=producto,
                     estado='activo',
                     cantidad__gt=0
@@ -221,26 +212,13 @@ def procesar_ajuste_stock_ajax(request):
                     lote.save(update_fields=['cantidad', 'estado'])
                     cantidad_restante = cantidad_restante - cantidad_a_tomar
                 
-                # Actualizar cantidad del producto desde lotes (manejar Decimal)
-                cantidad_producto = Decimal(str(producto.cantidad)) if producto.cantidad else Decimal('0')
-                producto.cantidad = max(Decimal('0'), cantidad_producto - cantidad)
                 if producto.stock_actual is not None:
                     stock_actual_decimal = Decimal(str(producto.stock_actual)) if producto.stock_actual else Decimal('0')
                     producto.stock_actual = max(Decimal('0'), stock_actual_decimal - cantidad)
                 
-                # Actualizar fecha de caducidad del producto con la del lote más antiguo activo
-                lote_mas_antiguo = Lote.objects.filter(
-                    productos=producto,
-                    estado='activo',
-                    cantidad__gt=0
-                ).order_by('fecha_caducidad', 'fecha_recepcion').first()
-                
-                if lote_mas_antiguo and lote_mas_antiguo.fecha_caducidad:
-                    producto.caducidad = lote_mas_antiguo.fecha_caducidad
-                elif not lote_mas_antiguo:
-                    producto.caducidad = None
-                
-                producto.save(update_fields=['cantidad', 'stock_actual', 'caducidad'])
+                # Actualizar cantidad, lotes activos y caducidad del producto desde lotes
+                actualizar_resumen_stock(producto, guardar=False)
+                producto.save(update_fields=['stock_actual'] + CAMPOS_GUARDADO_STOCK)
                 
                 # Crear movimiento en kardex
                 MovimientosInventario.objects.create(
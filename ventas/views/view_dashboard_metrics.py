@@ -6,19 +6,411 @@
 #
 # Este archivo contiene las vistas API que proveen datos en tiempo real
 # para las métricas principales del dashboard.
+#
+# Cada métrica se calcula en una función `calcular_*` que retorna un dict.
+# Las APIs individuales (/api/ventas-del-dia/, /api/stock-bajo/, etc.)
+# siguen existiendo, pero el dashboard usa /api/dashboard/snapshot/, que
+# entrega todas las métricas en una sola respuesta:
+#
+# - Se calcula una vez por ventana de DASHBOARD_SNAPSHOT_TTL segundos y se
+#   guarda en el cache de Django (locmem por defecto, ver CACHES en settings)
+# - Lleva un ETag: si el navegador envía If-None-Match con el mismo valor,
+#   se responde 304 sin cuerpo
 
-from django.http import JsonResponse
-from django.db.models import Sum, Count, F
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, HttpResponseNotModified
+from django.db.models import Count, F, Q, Value, DecimalField
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from datetime import datetime, date, timedelta, timezone as dt_timezone
+from django.views.decorators.http import require_GET
+from datetime import datetime, timezone as dt_timezone
 from decimal import Decimal
-from ventas.models.ventas import Ventas, DetalleVenta
+from ventas.models.ventas import Ventas
 from ventas.models.productos import Productos
 from ventas.models.alertas import Alertas
+from ventas.funciones.resumen_ventas import totales_ventas
+from ventas.funciones.ranking_productos import ranking_productos
 import logging
 
 logger = logging.getLogger('ventas')
 
+# Clave del snapshot en el cache
+CLAVE_CACHE_SNAPSHOT = 'dashboard:snapshot'
+
+# Stock mínimo que se usa cuando el producto no tiene uno definido
+STOCK_MINIMO_POR_DEFECTO = Decimal('5')
+
+# Productos con stock bajo por página (y máximo que se puede pedir)
+LIMITE_STOCK_BAJO = 50
+LIMITE_STOCK_BAJO_MAXIMO = 500
+
+# Productos con stock bajo que muestra la tabla del dashboard
+LIMITE_STOCK_BAJO_DASHBOARD = 10
+
+
+# ================================================================
+# =                 CÁLCULO DE LAS MÉTRICAS                      =
+# ================================================================
+
+def rango_dia_local_utc():
+    """
+    Calcula el rango del día local actual (America/Santiago) expresado en UTC.
+
+    Las ventas están guardadas en UTC, así que para filtrar "las ventas de hoy"
+    hay que convertir el día local completo (00:00:00 a 23:59:59.999999) a UTC.
+
+    Returns:
+        tuple: (inicio_dia_utc, fin_dia_utc)
+    """
+    hoy_local = timezone.localdate()
+
+    inicio_dia_local = datetime.combine(hoy_local, datetime.min.time())
+    fin_dia_local = datetime.combine(hoy_local, datetime.max.time())
+
+    # Convertir a zona horaria aware usando la zona horaria configurada
+    inicio_dia_aware = timezone.make_aware(inicio_dia_local)
+    fin_dia_aware = timezone.make_aware(fin_dia_local)
+
+    return (
+        inicio_dia_aware.astimezone(dt_timezone.utc),
+        fin_dia_aware.astimezone(dt_timezone.utc),
+    )
+
+
+def calcular_ventas_del_dia():
+    """
+    Calcula el total vendido y el número de ventas del día.
+
+    Lee el resumen diario de ventas (una fila por canal y medio de pago)
+    en vez de recorrer las ventas del día.
+
+    Returns:
+        dict: {'total_ventas', 'num_transacciones'}
+    """
+    hoy_local = timezone.localdate()
+    totales = totales_ventas(desde=hoy_local, hasta=hoy_local)
+
+    logger.info(f'Ventas del día {hoy_local}: {totales["cantidad_ventas"]} transacciones, total: ${totales["total_con_iva"]}')
+
+    return {
+        'total_ventas': float(totales['total_con_iva']),
+        'num_transacciones': totales['cantidad_ventas'],
+    }
+
+
+def calcular_stock_bajo(limite=LIMITE_STOCK_BAJO, pagina=1):
+    """
+    Calcula los productos activos con stock bajo.
+
+    Un producto tiene stock bajo cuando:
+    - cantidad <= stock_minimo (si stock_minimo está definido)
+    - cantidad <= 5 (si stock_minimo no está definido)
+
+    La comparación se hace en la base de datos y solo se leen las columnas
+    necesarias. Los productos se ordenan de menor a mayor cantidad.
+
+    Args:
+        limite: Cantidad máxima de productos a retornar
+        pagina: Número de página (empieza en 1)
+
+    Returns:
+        dict: {'num_productos', 'productos', 'pagina', 'limite', 'hay_mas'}
+    """
+    # Productos activos (no eliminados, no en merma, no inactivos) bajo su mínimo
+    productos_stock_bajo = Productos.objects.filter(
+        eliminado__isnull=True,
+        estado_merma='activo'
+    ).annotate(
+        minimo=Coalesce(F('stock_minimo'), Value(STOCK_MINIMO_POR_DEFECTO), output_field=DecimalField())
+    ).filter(
+        cantidad__lte=F('minimo')
+    ).order_by('cantidad', 'nombre', 'id').values('id', 'nombre', 'cantidad', 'minimo')
+
+    desplazamiento = (pagina - 1) * limite
+    productos = [
+        {
+            'id': fila['id'],
+            'nombre': fila['nombre'],
+            'cantidad': fila['cantidad'],
+            'stock_minimo': fila['minimo'],
+        }
+        for fila in productos_stock_bajo[desplazamiento:desplazamiento + limite]
+    ]
+
+    # Si la primera página no se llenó, ya se conoce el total sin contar
+    if pagina == 1 and len(productos) < limite:
+        num_productos = len(productos)
+    else:
+        num_productos = productos_stock_bajo.count()
+
+    logger.info(f'Productos con stock bajo: {num_productos}')
+
+    return {
+        'num_productos': num_productos,
+        'productos': productos,
+        'pagina': pagina,
+        'limite': limite,
+        'hay_mas': desplazamiento + len(productos) < num_productos,
+    }
+
+
+def calcular_alertas_pendientes():
+    """
+    Cuenta las alertas activas de productos activos, con desglose por tipo.
+
+    Returns:
+        dict: {'num_alertas', 'por_tipo': {'roja', 'amarilla', 'verde'}}
+    """
+    # Solo alertas de productos activos (excluye inactivos y en_merma).
+    # Total y desglose por tipo en una sola consulta
+    conteo = Alertas.objects.filter(
+        estado='activa',
+        productos__estado_merma='activo'
+    ).aggregate(
+        total=Count('id'),
+        roja=Count('id', filter=Q(tipo_alerta='roja')),
+        amarilla=Count('id', filter=Q(tipo_alerta='amarilla')),
+        verde=Count('id', filter=Q(tipo_alerta='verde')),
+    )
+
+    return {
+        'num_alertas': conteo['total'],
+        'por_tipo': {
+            'roja': conteo['roja'],
+            'amarilla': conteo['amarilla'],
+            'verde': conteo['verde']
+        }
+    }
+
+
+def calcular_top_producto():
+    """
+    Calcula el producto más vendido (en unidades) del día.
+
+    Lee el resumen diario de ventas por producto.
+
+    Returns:
+        dict: {'nombre', 'unidades', 'total_vendido'}
+    """
+    hoy_local = timezone.localdate()
+    ranking = ranking_productos(desde=hoy_local, hasta=hoy_local, orden='cantidad', limite=1)
+
+    if ranking:
+        top_producto = ranking[0]
+        logger.info(f'Top producto del día: {top_producto["nombre"]} - {top_producto["cantidad_vendida"]} unidades')
+        return {
+            'nombre': top_producto['nombre'],
+            'unidades': top_producto['cantidad_vendida'],
+            'total_vendido': float(top_producto['total_neto'] or 0)
+        }
+
+    # Si no hay ventas hoy
+    logger.info('No hay ventas hoy para calcular top producto')
+    return {
+        'nombre': 'Sin ventas',
+        'unidades': 0,
+        'total_vendido': 0
+    }
+
+
+def calcular_ventas_del_dia_lista(rango):
+    """
+    Arma la lista detallada de ventas del día.
+
+    Args:
+        rango: Tupla (inicio_utc, fin_utc) de rango_dia_local_utc()
+
+    Returns:
+        dict: {'ventas', 'total_ventas'}
+    """
+    inicio_dia_utc, fin_dia_utc = rango
+
+    # Contar los productos de cada venta en la misma consulta
+    ventas_hoy = Ventas.objects.filter(
+        fecha__gte=inicio_dia_utc,
+        fecha__lte=fin_dia_utc
+    ).select_related('clientes').annotate(
+        num_detalles=Count('detalles')
+    ).order_by('-fecha')
+
+    # Formatear ventas para el JSON
+    ventas_lista = []
+    for venta in ventas_hoy:
+        fecha_local = timezone.localtime(venta.fecha)
+        ventas_lista.append({
+            'id': venta.id,
+            'folio': venta.folio or f'BOL-{venta.id}',
+            'fecha': fecha_local.strftime('%d/%m/%Y'),
+            'hora': fecha_local.strftime('%H:%M:%S'),
+            'total': float(venta.total_con_iva),
+            'cliente': venta.clientes.nombre if venta.clientes else 'Cliente Genérico',
+            'canal': venta.canal_venta,
+            'num_productos': venta.num_detalles
+        })
+
+    return {
+        'ventas': ventas_lista,
+        'total_ventas': len(ventas_lista)
+    }
+
+
+def calcular_merma_lista():
+    """
+    Arma la lista detallada de productos en merma.
+
+    Returns:
+        dict: {'productos', 'total_productos'}
+    """
+    from ventas.models import HistorialMerma
+
+    # Obtener IDs de productos con registros activos en HistorialMerma
+    productos_con_historial_activo = HistorialMerma.objects.filter(
+        activo=True
+    ).values_list('producto_id', flat=True).distinct()
+
+    # Obtener productos en merma
+    productos_merma = Productos.objects.filter(
+        eliminado__isnull=True
+    ).filter(
+        Q(id__in=productos_con_historial_activo) | Q(estado_merma='en_merma')
+    ).distinct()
+
+    # Formatear productos para el JSON
+    productos_lista = []
+    for producto in productos_merma:
+        cantidad_merma = producto.cantidad_merma if (producto.cantidad_merma and producto.cantidad_merma > 0) else producto.cantidad
+        perdida_producto = float(cantidad_merma * producto.precio) if cantidad_merma > 0 else 0.0
+
+        productos_lista.append({
+            'id': producto.id,
+            'nombre': producto.nombre,
+            'cantidad_merma': float(cantidad_merma),
+            'precio': float(producto.precio),
+            'perdida': perdida_producto,
+            'motivo': producto.motivo_merma or 'No especificado',
+            'fecha_merma': producto.fecha_merma.strftime('%d/%m/%Y %H:%M') if producto.fecha_merma else 'N/A',
+            'unidad': producto.get_unidad_stock_display()
+        })
+
+    return {
+        'productos': productos_lista,
+        'total_productos': len(productos_lista)
+    }
+
+
+# ================================================================
+# =                 SNAPSHOT DEL DASHBOARD                       =
+# ================================================================
+
+def calcular_snapshot_dashboard():
+    """
+    Calcula todas las métricas del dashboard de una vez.
+
+    Los totales y el top producto del día salen del resumen diario de
+    ventas; solo la lista de ventas del día lee la tabla ventas.
+
+    Returns:
+        dict: {'ventas_del_dia', 'stock_bajo', 'alertas_pendientes',
+               'top_producto', 'ventas_del_dia_lista', 'merma_lista'}
+    """
+    return {
+        'ventas_del_dia': calcular_ventas_del_dia(),
+        'stock_bajo': calcular_stock_bajo(limite=LIMITE_STOCK_BAJO_DASHBOARD),
+        'alertas_pendientes': calcular_alertas_pendientes(),
+        'top_producto': calcular_top_producto(),
+        'ventas_del_dia_lista': calcular_ventas_del_dia_lista(rango_dia_local_utc()),
+        'merma_lista': calcular_merma_lista(),
+    }
+
+
+def obtener_snapshot_dashboard():
+    """
+    Retorna el snapshot del dashboard desde el cache, calculándolo si expiró.
+
+    Todos los dashboards abiertos comparten el mismo snapshot durante
+    DASHBOARD_SNAPSHOT_TTL segundos, así las consultas se hacen una vez por
+    ventana y no una vez por navegador.
+
+    Returns:
+        dict: {'datos': métricas, 'etag': hash del contenido}
+    """
+    snapshot = cache.get(CLAVE_CACHE_SNAPSHOT)
+    if snapshot is not None:
+        return snapshot
+
+    datos = calcular_snapshot_dashboard()
+
+    # El ETag depende solo del contenido: si nada cambió entre dos
+    # ventanas, el navegador sigue recibiendo 304
+    contenido = json.dumps(datos, cls=DjangoJSONEncoder, sort_keys=True)
+    snapshot = {
+        'datos': datos,
+        'etag': '"' + hashlib.md5(contenido.encode('utf-8')).hexdigest() + '"',
+    }
+
+    cache.set(CLAVE_CACHE_SNAPSHOT, snapshot, settings.DASHBOARD_SNAPSHOT_TTL)
+    return snapshot
+
+
+@require_GET
+def dashboard_snapshot_api(request):
+    """
+    API que retorna todas las métricas del dashboard en una sola respuesta.
+
+    Reemplaza las llamadas separadas a /api/ventas-del-dia/, /api/stock-bajo/,
+    /api/alertas-pendientes/, /api/top-producto/, /api/merma/lista/ y
+    /api/ventas-del-dia/lista/.
+
+    Returns:
+        JSON con una clave por métrica (mismo formato que cada API individual),
+        o 304 si el navegador ya tiene la versión actual (If-None-Match)
+    """
+    try:
+        snapshot = obtener_snapshot_dashboard()
+    except Exception as e:
+        logger.error(f'Error en dashboard_snapshot_api: {str(e)}', exc_info=True)
+        return JsonResponse({'error': str(e)}, status=500)
+
+    etag = snapshot['etag']
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    etags_cliente = [valor.strip() for valor in if_none_match.split(',')]
+
+    if etag in etags_cliente or '*' in etags_cliente:
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse(snapshot['datos'])
+
+    response['ETag'] = etag
+    # El navegador debe revalidar siempre (con If-None-Match)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# ================================================================
+# =                 APIS INDIVIDUALES                            =
+# ================================================================
+
+def _entero_positivo(valor, defecto):
+    """
+    Convierte un parámetro GET a entero positivo.
+
+    Args:
+        valor: Texto recibido (o None)
+        defecto: Valor a usar si falta o no es un entero positivo
+
+    Returns:
+        int: El entero, o el valor por defecto
+    """
+    try:
+        numero = int(valor)
+    except (TypeError, ValueError):
+        return defecto
+    return numero if numero > 0 else defecto
+
 
 def ventas_del_dia_api(request):
     """
@@ -30,54 +422,7 @@ def ventas_del_dia_api(request):
         - num_transacciones: Número de ventas realizadas
     """
     try:
-        # Obtener fecha de hoy en la zona horaria local (America/Santiago)
-        ahora = timezone.now()
-        ahora_local = timezone.localtime(ahora)  # Convertir a hora local
-        hoy_local = ahora_local.date()  # Obtener solo la fecha local
-        
-        logger.info(f'Fecha/hora actual del sistema (UTC): {ahora}')
-        logger.info(f'Fecha/hora local (America/Santiago): {ahora_local}')
-        logger.info(f'Fecha local calculada: {hoy_local}')
-        
-        # Las ventas están guardadas en UTC
-        # Necesitamos convertir el día local completo a UTC
-        # Inicio del día local (00:00:00 en hora local)
-        inicio_dia_local = datetime.combine(hoy_local, datetime.min.time())
-        # Fin del día local (23:59:59.999999 en hora local)
-        fin_dia_local = datetime.combine(hoy_local, datetime.max.time()) + timedelta(microseconds=999999)
-        
-        # Convertir a zona horaria aware usando la zona horaria configurada
-        inicio_dia_aware = timezone.make_aware(inicio_dia_local)
-        fin_dia_aware = timezone.make_aware(fin_dia_local)
-        
-        # Convertir a UTC para comparar con las fechas guardadas en la BD
-        inicio_dia_utc = inicio_dia_aware.astimezone(dt_timezone.utc)
-        fin_dia_utc = fin_dia_aware.astimezone(dt_timezone.utc)
-        
-        logger.info(f'Buscando ventas del día local {hoy_local}')
-        logger.info(f'Rango local: desde {inicio_dia_aware} hasta {fin_dia_aware}')
-        logger.info(f'Rango UTC: desde {inicio_dia_utc} hasta {fin_dia_utc}')
-        
-        # Obtener todas las ventas de hoy usando rango de fechas en UTC
-        ventas_hoy = Ventas.objects.filter(
-            fecha__gte=inicio_dia_utc,
-            fecha__lte=fin_dia_utc
-        )
-        
-        # Calcular el total vendido
-        total_ventas = ventas_hoy.aggregate(
-            total=Sum('total_con_iva')
-        )['total'] or Decimal('0.00')
-        
-        # Contar número de transacciones
-        num_transacciones = ventas_hoy.count()
-        
-        logger.info(f'Ventas del día encontradas: {num_transacciones} transacciones, total: ${total_ventas}')
-        
-        return JsonResponse({
-            'total_ventas': float(total_ventas),
-            'num_transacciones': num_transacciones
-        })
+        return JsonResponse(calcular_ventas_del_dia())
     except Exception as e:
         logger.error(f'Error en ventas_del_dia_api: {str(e)}', exc_info=True)
         return JsonResponse({
@@ -95,40 +440,21 @@ def stock_bajo_api(request):
     - cantidad <= stock_minimo (si stock_minimo está definido)
     - cantidad <= 5 (si stock_minimo no está definido)
     
+    Parámetros GET opcionales:
+        - limite: Productos por página (default 50, máximo 500)
+        - pagina: Número de página (default 1)
+    
     Returns:
         JSON con:
-        - num_productos: Número de productos con stock bajo
-        - productos: Lista de productos con stock bajo
+        - num_productos: Número total de productos con stock bajo
+        - productos: Lista de productos con stock bajo de la página pedida
+        - pagina, limite, hay_mas: Datos de paginación
     """
     try:
-        # Obtener productos activos (no eliminados, no en merma, no inactivos)
-        productos = Productos.objects.filter(
-            eliminado__isnull=True,
-            estado_merma='activo'  # Solo productos activos (excluye inactivos y en_merma)
-        )
-        
-        logger.info(f'Productos activos encontrados: {productos.count()}')
-        
-        # Filtrar productos con stock bajo
-        productos_stock_bajo = []
-        for producto in productos:
-            stock_minimo = producto.stock_minimo if producto.stock_minimo is not None else 5
-            cantidad_actual = producto.cantidad or 0
-            
-            if cantidad_actual <= stock_minimo:
-                productos_stock_bajo.append({
-                    'id': producto.id,
-                    'nombre': producto.nombre,
-                    'cantidad': cantidad_actual,
-                    'stock_minimo': stock_minimo
-                })
-        
-        logger.info(f'Productos con stock bajo: {len(productos_stock_bajo)}')
-        
-        return JsonResponse({
-            'num_productos': len(productos_stock_bajo),
-            'productos': productos_stock_bajo
-        })
+        limite = _entero_positivo(request.GET.get('limite'), LIMITE_STOCK_BAJO)
+        limite = min(limite, LIMITE_STOCK_BAJO_MAXIMO)
+        pagina = _entero_positivo(request.GET.get('pagina'), 1)
+        return JsonResponse(calcular_stock_bajo(limite=limite, pagina=pagina))
     except Exception as e:
         logger.error(f'Error en stock_bajo_api: {str(e)}', exc_info=True)
         return JsonResponse({
@@ -147,27 +473,7 @@ def alertas_pendientes_api(request):
         - num_alertas: Número total de alertas activas
         - por_tipo: Desglose por tipo (roja, amarilla, verde)
     """
-    # Contar alertas activas (solo de productos activos, no en merma, no inactivos)
-    alertas_activas = Alertas.objects.filter(
-        estado='activa',
-        productos__estado_merma='activo'  # Solo productos activos (excluye inactivos y en_merma)
-    )
-    
-    # Contar por tipo
-    alertas_rojas = alertas_activas.filter(tipo_alerta='roja').count()
-    alertas_amarillas = alertas_activas.filter(tipo_alerta='amarilla').count()
-    alertas_verdes = alertas_activas.filter(tipo_alerta='verde').count()
-    
-    total_alertas = alertas_activas.count()
-    
-    return JsonResponse({
-        'num_alertas': total_alertas,
-        'por_tipo': {
-            'roja': alertas_rojas,
-            'amarilla': alertas_amarillas,
-            'verde': alertas_verdes
-        }
-    })
+    return JsonResponse(calcular_alertas_pendientes())
 
 
 def top_producto_api(request):
@@ -181,65 +487,7 @@ def top_producto_api(request):
         - total_vendido: Monto total generado por ese producto
     """
     try:
-        # Obtener fecha de hoy en la zona horaria local (America/Santiago)
-        ahora = timezone.now()
-        ahora_local = timezone.localtime(ahora)  # Convertir a hora local
-        hoy_local = ahora_local.date()  # Obtener solo la fecha local
-        
-        logger.info(f'Fecha/hora actual del sistema (UTC): {ahora}')
-        logger.info(f'Fecha/hora local (America/Santiago): {ahora_local}')
-        logger.info(f'Fecha local calculada: {hoy_local}')
-        
-        # Las ventas están guardadas en UTC
-        # Necesitamos convertir el día local completo a UTC
-        # Inicio del día local (00:00:00 en hora local)
-        inicio_dia_local = datetime.combine(hoy_local, datetime.min.time())
-        # Fin del día local (23:59:59.999999 en hora local)
-        fin_dia_local = datetime.combine(hoy_local, datetime.max.time()) + timedelta(microseconds=999999)
-        
-        # Convertir a zona horaria aware usando la zona horaria configurada
-        inicio_dia_aware = timezone.make_aware(inicio_dia_local)
-        fin_dia_aware = timezone.make_aware(fin_dia_local)
-        
-        # Convertir a UTC para comparar con las fechas guardadas en la BD
-        inicio_dia_utc = inicio_dia_aware.astimezone(dt_timezone.utc)
-        fin_dia_utc = fin_dia_aware.astimezone(dt_timezone.utc)
-        
-        logger.info(f'Buscando top producto del día local {hoy_local}')
-        logger.info(f'Rango local: desde {inicio_dia_aware} hasta {fin_dia_aware}')
-        logger.info(f'Rango UTC: desde {inicio_dia_utc} hasta {fin_dia_utc}')
-        
-        # Obtener detalles de ventas de hoy y agrupar por producto
-        detalles_hoy = DetalleVenta.objects.filter(
-            ventas__fecha__gte=inicio_dia_utc,
-            ventas__fecha__lte=fin_dia_utc
-        )
-        
-        logger.info(f'Detalles de venta encontrados hoy: {detalles_hoy.count()}')
-        
-        if detalles_hoy.exists():
-            top_producto = detalles_hoy.values(
-                'productos__nombre'
-            ).annotate(
-                total_unidades=Sum('cantidad'),
-                total_vendido=Sum(F('cantidad') * F('precio_unitario'))
-            ).order_by('-total_unidades').first()
-            
-            if top_producto:
-                logger.info(f'Top producto del día: {top_producto["productos__nombre"]} - {top_producto["total_unidades"]} unidades')
-                return JsonResponse({
-                    'nombre': top_producto['productos__nombre'],
-                    'unidades': top_producto['total_unidades'],
-                    'total_vendido': float(top_producto['total_vendido'] or 0)
-                })
-        
-        # Si no hay ventas hoy
-        logger.info('No hay ventas hoy para calcular top producto')
-        return JsonResponse({
-            'nombre': 'Sin ventas',
-            'unidades': 0,
-            'total_vendido': 0
-        })
+        return JsonResponse(calcular_top_producto())
     except Exception as e:
         logger.error(f'Error en top_producto_api: {str(e)}', exc_info=True)
         return JsonResponse({
@@ -259,46 +507,7 @@ def ventas_del_dia_lista_api(request):
         - ventas: Lista de ventas con detalles (folio, fecha, total, cliente, etc.)
     """
     try:
-        # Obtener fecha de hoy en la zona horaria local
-        ahora = timezone.now()
-        ahora_local = timezone.localtime(ahora)
-        hoy_local = ahora_local.date()
-        
-        # Calcular rango del día en UTC
-        inicio_dia_local = datetime.combine(hoy_local, datetime.min.time())
-        fin_dia_local = datetime.combine(hoy_local, datetime.max.time()) + timedelta(microseconds=999999)
-        
-        inicio_dia_aware = timezone.make_aware(inicio_dia_local)
-        fin_dia_aware = timezone.make_aware(fin_dia_local)
-        
-        inicio_dia_utc = inicio_dia_aware.astimezone(dt_timezone.utc)
-        fin_dia_utc = fin_dia_aware.astimezone(dt_timezone.utc)
-        
-        # Obtener todas las ventas de hoy
-        ventas_hoy = Ventas.objects.filter(
-            fecha__gte=inicio_dia_utc,
-            fecha__lte=fin_dia_utc
-        ).select_related('clientes').order_by('-fecha')
-        
-        # Formatear ventas para el JSON
-        ventas_lista = []
-        for venta in ventas_hoy:
-            fecha_local = timezone.localtime(venta.fecha)
-            ventas_lista.append({
-                'id': venta.id,
-                'folio': venta.folio or f'BOL-{venta.id}',
-                'fecha': fecha_local.strftime('%d/%m/%Y'),
-                'hora': fecha_local.strftime('%H:%M:%S'),
-                'total': float(venta.total_con_iva),
-                'cliente': venta.clientes.nombre if venta.clientes else 'Cliente Genérico',
-                'canal': venta.canal_venta,
-                'num_productos': venta.detalles.count()
-            })
-        
-        return JsonResponse({
-            'ventas': ventas_lista,
-            'total_ventas': len(ventas_lista)
-        })
+        return JsonResponse(calcular_ventas_del_dia_lista(rango_dia_local_utc()))
     except Exception as e:
         logger.error(f'Error en ventas_del_dia_lista_api: {str(e)}', exc_info=True)
         return JsonResponse({
@@ -317,42 +526,7 @@ def merma_lista_api(request):
         - productos: Lista de productos en merma con detalles
     """
     try:
-        from ventas.models import HistorialMerma
-        from django.db.models import Q
-        
-        # Obtener IDs de productos con registros activos en HistorialMerma
-        productos_con_historial_activo = HistorialMerma.objects.filter(
-            activo=True
-        ).values_list('producto_id', flat=True).distinct()
-        
-        # Obtener productos en merma
-        productos_merma = Productos.objects.filter(
-            eliminado__isnull=True
-        ).filter(
-            Q(id__in=productos_con_historial_activo) | Q(estado_merma='en_merma')
-        ).distinct()
-        
-        # Formatear productos para el JSON
-        productos_lista = []
-        for producto in productos_merma:
-            cantidad_merma = producto.cantidad_merma if (producto.cantidad_merma and producto.cantidad_merma > 0) else producto.cantidad
-            perdida_producto = float(cantidad_merma * producto.precio) if cantidad_merma > 0 else 0.0
-            
-            productos_lista.append({
-                'id': producto.id,
-                'nombre': producto.nombre,
-                'cantidad_merma': float(cantidad_merma),
-                'precio': float(producto.precio),
-                'perdida': perdida_producto,
-                'motivo': producto.motivo_merma or 'No especificado',
-                'fecha_merma': producto.fecha_merma.strftime('%d/%m/%Y %H:%M') if producto.fecha_merma else 'N/A',
-                'unidad': producto.get_unidad_stock_display()
-            })
-        
-        return JsonResponse({
-            'productos': productos_lista,
-            'total_productos': len(productos_lista)
-        })
+        return JsonResponse(calcular_merma_lista())
     except Exception as e:
         logger.error(f'Error en merma_lista_api: {str(e)}', exc_info=True)
         return JsonResponse({
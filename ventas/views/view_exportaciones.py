@@ -0,0 +1,156 @@
+# ================================================================
+# =                                                              =
+# =        VISTAS: EXPORTACIONES EN SEGUNDO PLANO               =
+# =                                                              =
+# ================================================================
+#
+# Endpoints para exportar reportes grandes sin bloquear la petición:
+#
+# - POST /api/exportaciones/                       -> crea el trabajo
+# - GET  /api/exportaciones/<id>/                  -> estado y avance
+# - GET  /exportaciones/<id>/descargar/            -> archivo generado
+#
+# Las páginas de reportes usan estos endpoints cuando el reporte supera
+# EXPORTACION_FILAS_SINCRONA filas (ver static/js/exportaciones.js).
+# Un usuario solo ve sus propias exportaciones (los superusuarios, todas).
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse, FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_GET, require_POST
+from ventas.models import TrabajoExportacion
+from ventas.funciones.exportaciones import (
+    encolar_exportacion, ruta_archivo, despachar_cola, trabajos_detenidos,
+)
+import json
+import logging
+
+logger = logging.getLogger('ventas')
+
+
+def _obtener_trabajo(request, trabajo_id):
+    """
+    Obtiene un trabajo del usuario actual (404 si es de otro usuario).
+    """
+    trabajos = TrabajoExportacion.objects.all()
+    if not request.user.is_superuser:
+        trabajos = trabajos.filter(usuario=request.user)
+    return get_object_or_404(trabajos, pk=trabajo_id)
+
+
+def _estado_trabajo(trabajo):
+    """
+    Datos del trabajo que consulta la página.
+    """
+    datos = {
+        'trabajo_id': trabajo.id,
+        'tipo': trabajo.tipo,
+        'formato': trabajo.formato,
+        'estado': trabajo.estado,
+        'progreso': trabajo.progreso,
+        'filas_procesadas': trabajo.filas_procesadas,
+        'total_filas': trabajo.total_filas,
+        'url_estado': reverse('estado_exportacion_api', args=[trabajo.id]),
+        'url_descarga': None,
+        'mensaje': trabajo.mensaje_error,
+    }
+    if trabajo.estado == 'terminado':
+        datos['url_descarga'] = reverse('descargar_exportacion', args=[trabajo.id])
+    return datos
+
+
+@login_required
+@require_POST
+def crear_exportacion_api(request):
+    """
+    Crea un trabajo de exportación en segundo plano.
+
+    Args:
+        request: HttpRequest con JSON body:
+                 {'tipo': 'ventas', 'formato': 'excel', 'parametros': {...filtros}}
+
+    Returns:
+        JsonResponse: {'success', 'trabajo_id', 'estado', 'url_estado', ...} (202)
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Error al procesar los datos enviados'
+        }, status=400)
+
+    parametros = data.get('parametros') or {}
+    if not isinstance(parametros, dict):
+        return JsonResponse({
+            'success': False,
+            'message': 'Los parámetros del reporte no son válidos'
+        }, status=400)
+
+    try:
+        trabajo = encolar_exportacion(
+            request.user,
+            data.get('tipo'),
+            data.get('formato'),
+            {str(clave): str(valor) for clave, valor in parametros.items()},
+        )
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+
+    return JsonResponse({'success': True, **_estado_trabajo(trabajo)}, status=202)
+
+
+@login_required
+@require_GET
+def estado_exportacion_api(request, trabajo_id):
+    """
+    Retorna el estado y el avance de una exportación.
+
+    Si el trabajo sigue pendiente o dejó de avanzar (el servidor se
+    reinició), se vuelve a despachar la cola para retomarlo.
+
+    Args:
+        request: HttpRequest
+        trabajo_id: ID del trabajo
+
+    Returns:
+        JsonResponse: estado, progreso (0-100) y url_descarga cuando termina
+    """
+    trabajo = _obtener_trabajo(request, trabajo_id)
+
+    if trabajo.estado == 'pendiente' or trabajos_detenidos().filter(pk=trabajo.pk).exists():
+        despachar_cola()
+
+    return JsonResponse({'success': True, **_estado_trabajo(trabajo)})
+
+
+@login_required
+@require_GET
+def descargar_exportacion_view(request, trabajo_id):
+    """
+    Descarga el archivo de una exportación terminada.
+
+    Args:
+        request: HttpRequest
+        trabajo_id: ID del trabajo
+
+    Returns:
+        FileResponse: Archivo generado
+    """
+    trabajo = _obtener_trabajo(request, trabajo_id)
+    if trabajo.estado != 'terminado':
+        raise Http404('La exportación no está lista')
+
+    try:
+        archivo = open(ruta_archivo(trabajo), 'rb')
+    except (FileNotFoundError, TypeError):
+        logger.warning(f'[EXPORTACIONES] Archivo del trabajo {trabajo.id} no encontrado')
+        raise Http404('El archivo de la exportación ya no existe')
+
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=trabajo.nombre_archivo,
+        content_type=trabajo.content_type,
+    )
@@ -10,16 +10,39 @@
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, HttpResponse
-from django.db.models import Q
-from django.core.paginator import Paginator
+from django.db.models import Q, Sum, Count
+from django.utils import timezone
 from ventas.models import HistorialBoletas, Ventas
+from ventas.funciones.comprobantes import REPORTLAB_AVAILABLE
+from ventas.funciones.paginacion import paginar_desde_request, quiere_json, pagina_a_json
+from datetime import datetime, time as dt_time
 from decimal import Decimal
+import math
 import json
 import logging
 
 logger = logging.getLogger('ventas')
 
 
+BOLETAS_POR_PAGINA = 20
+
+
+def _boleta_a_dict(boleta):
+    """Boleta en el listado JSON por cursor: folio, fechas, cliente, total, canal y emisor."""
+    return {
+        'id': boleta.id,
+        'folio': boleta.folio,
+        'fecha_emision': boleta.fecha_emision.isoformat(),
+        'fecha_venta': boleta.fecha_venta.isoformat() if boleta.fecha_venta else None,
+        'cliente_nombre': boleta.cliente_nombre,
+        'total_con_iva': float(boleta.total_con_iva),
+        'num_productos': boleta.num_productos,
+        'canal_venta': boleta.canal_venta,
+        'usuario_emisor': boleta.usuario_emisor,
+        'venta_id': boleta.venta_id,
+    }
+
+
 @login_required
 def historial_boletas_list_view(request):
     """
@@ -43,10 +66,9 @@ def historial_boletas_list_view(request):
     busqueda = request.GET.get('q', '').strip()
     fecha_desde = request.GET.get('fecha_desde', '')
     fecha_hasta = request.GET.get('fecha_hasta', '')
-    pagina = request.GET.get('page', 1)
     
-    # Obtener todas las boletas del historial
-    boletas = HistorialBoletas.objects.select_related('venta').all()
+    # Obtener todas las boletas del historial (sin el JSON de la boleta: el listado no lo usa)
+    boletas = HistorialBoletas.objects.defer('datos_boleta')
     
     # Aplicar filtros de búsqueda
     if busqueda:
@@ -56,44 +78,50 @@ def historial_boletas_list_view(request):
             Q(usuario_emisor__icontains=busqueda)
         )
     
-    # Aplicar filtros de fecha
+    # Aplicar filtros de fecha (rango sobre la columna: usa el índice de fecha_emision)
     if fecha_desde:
         try:
-            from datetime import datetime
             fecha_desde_obj = datetime.strptime(fecha_desde, '%Y-%m-%d').date()
-            boletas = boletas.filter(fecha_emision__date__gte=fecha_desde_obj)
+            boletas = boletas.filter(
+                fecha_emision__gte=timezone.make_aware(datetime.combine(fecha_desde_obj, dt_time.min))
+            )
         except ValueError:
             pass
     
     if fecha_hasta:
         try:
-            from datetime import datetime
             fecha_hasta_obj = datetime.strptime(fecha_hasta, '%Y-%m-%d').date()
-            boletas = boletas.filter(fecha_emision__date__lte=fecha_hasta_obj)
+            boletas = boletas.filter(
+                fecha_emision__lte=timezone.make_aware(datetime.combine(fecha_hasta_obj, dt_time.max))
+            )
         except ValueError:
             pass
     
-    # Ordenar por fecha más reciente primero
-    boletas = boletas.order_by('-fecha_emision')
+    # Calcular estadísticas en UNA consulta (sin cargar las boletas)
+    estadisticas = boletas.order_by().aggregate(
+        total_boletas=Count('id'),
+        total_ingresos=Sum('total_con_iva'),
+    )
+    total_boletas = estadisticas['total_boletas']
+    total_ingresos = estadisticas['total_ingresos'] or Decimal('0')
     
-    # Paginación
-    paginador = Paginator(boletas, 20)  # 20 boletas por página
-    try:
-        boletas_pagina = paginador.page(pagina)
-    except:
-        boletas_pagina = paginador.page(1)
+    # Paginación por cursor, más recientes primero (ver ventas/funciones/paginacion.py)
+    pagina = paginar_desde_request(request, boletas, 'fecha_emision', tamano=BOLETAS_POR_PAGINA)
     
-    # Calcular estadísticas
-    total_boletas = boletas.count()
-    total_ingresos = sum(b.total_con_iva for b in boletas)
+    if quiere_json(request):
+        return JsonResponse(pagina_a_json(pagina, _boleta_a_dict, {
+            'total_boletas': total_boletas,
+            'total_ingresos': float(total_ingresos),
+        }))
     
     context = {
-        'boletas': boletas_pagina,
+        'boletas': pagina,
         'busqueda': busqueda,
         'fecha_desde': fecha_desde,
         'fecha_hasta': fecha_hasta,
         'total_boletas': total_boletas,
         'total_ingresos': total_ingresos,
+        'total_paginas': max(1, math.ceil(total_boletas / pagina.tamano)),
     }
     
     return render(request, 'historial_boletas_list.html', context)
@@ -137,12 +165,13 @@ def historial_boleta_regenerar_pdf_view(request, historial_id):
         historial_id: ID del registro en HistorialBoletas
     
     Returns:
-        HttpResponse: Archivo PDF descargable
+        FileResponse: Archivo PDF descargable (304 si el navegador ya lo tiene)
     """
     
     historial = get_object_or_404(HistorialBoletas, pk=historial_id)
     
-    # Usar la vista de PDF normal, pero con la venta del historial
-    from ventas.views.view_comprobante import comprobante_pdf_view
-    return comprobante_pdf_view(request, historial.venta.id)
+    # El PDF se guarda por huella de los datos del historial: solo se genera la primera vez
+    from ventas.views.view_comprobante import responder_comprobante
+    formato = 'pdf' if REPORTLAB_AVAILABLE else 'txt'
+    return responder_comprobante(request, historial.venta_id, historial.get_datos_boleta_dict(), formato)
 
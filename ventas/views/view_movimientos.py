@@ -19,7 +19,24 @@
 
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from ventas.models import MovimientosInventario
+from ventas.funciones.paginacion import paginar_desde_request, quiere_json, pagina_a_json
+
+
+def _movimiento_a_dict(mov):
+    """Movimiento en el listado JSON por cursor: fecha, producto, tipo, cantidad, origen y referencia."""
+    return {
+        'id': mov.id,
+        'fecha': mov.fecha.isoformat(),
+        'producto_id': mov.productos_id,
+        'producto': mov.productos.nombre,
+        'tipo_movimiento': mov.tipo_movimiento,
+        'cantidad': float(mov.cantidad),
+        'origen': mov.origen,
+        'tipo_referencia': mov.tipo_referencia,
+        'referencia_id': mov.referencia_id,
+    }
 
 
 # ================================================================
@@ -63,16 +80,26 @@ def movimientos_view(request):
         movimientos = movimientos.filter(tipo_movimiento=tipo_filtro)
     
     # ============================================================
-    # PASO 3: Preparar el contexto para el template
+    # PASO 3: Paginar por cursor (más recientes primero)
+    # ============================================================
+    # Solo se lee la página pedida: la tabla de movimientos crece con
+    # cada venta y no se puede mostrar completa (ver ventas/funciones/paginacion.py)
+    pagina = paginar_desde_request(request, movimientos, 'fecha')
+    
+    if quiere_json(request):
+        return JsonResponse(pagina_a_json(pagina, _movimiento_a_dict))
+    
+    # ============================================================
+    # PASO 4: Preparar el contexto para el template
     # ============================================================
     # El contexto es un diccionario con las variables que usaremos en el HTML
     context = {
-        'movimientos': movimientos,      # Lista de movimientos a mostrar
+        'movimientos': pagina,           # Página de movimientos a mostrar
         'tipo_filtro': tipo_filtro,      # Tipo seleccionado (para mantener el filtro activo)
     }
     
     # ============================================================
-    # PASO 4: Renderizar el template
+    # PASO 5: Renderizar el template
     # ============================================================
     # render() combina el template HTML con el contexto y devuelve la página
     return render(request, 'movimientos.html', context)
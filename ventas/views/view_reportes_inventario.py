@@ -20,12 +20,13 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.db.models import Sum, Count, Q
-from django.http import HttpResponse
 from decimal import Decimal
-import csv
 
 from ventas.models import Productos, Categorias
-from ventas.utils.exportadores import exportar_a_excel, exportar_a_pdf
+from ventas.funciones.exportaciones import filas_maximas_sincronas
+from ventas.utils.exportadores import (
+    exportar_a_excel, exportar_a_pdf, exportar_a_csv_streaming, leer_por_bloques,
+)
 
 
 # ================================================================
@@ -53,6 +54,7 @@ def reporte_inventario_view(request):
     # PASO 1: Inicializar variables
     # ============================================================
     reporte_generado = False
+    exportar_en_segundo_plano = False
     productos = Productos.objects.none()
     resumen_categorias = []
     valorizacion_total = Decimal('0.00')
@@ -130,6 +132,9 @@ def reporte_inventario_view(request):
         # Calcular valorización total
         valorizacion_total = sum(item['valorizacion'] for item in resumen_categorias)
         
+        # Reportes grandes: exportar en segundo plano en vez de dentro de la petición
+        exportar_en_segundo_plano = len(productos_con_valorizacion) > filas_maximas_sincronas()
+        
         # Limitar productos para visualización
         productos_con_valorizacion = productos_con_valorizacion[:100]
     
@@ -148,6 +153,8 @@ def reporte_inventario_view(request):
         'valorizacion_total': valorizacion_total,
         'categorias': categorias,
         'categoria_seleccionada': categoria_id,
+        'exportar_en_segundo_plano': exportar_en_segundo_plano,
+        'parametros_exportacion': request.GET.dict(),
     }
     
     # ============================================================
@@ -160,41 +167,82 @@ def reporte_inventario_view(request):
 # =     VISTA: EXPORTAR REPORTE INVENTARIO A CSV               =
 # ================================================================
 
-def _obtener_productos_inventario(request):
+def _productos_inventario(parametros):
     """
     Función auxiliar para obtener productos de inventario con filtros aplicados.
     
     Args:
-        request: HttpRequest con parámetros de filtro
+        parametros: request.GET (o dict) con los filtros del reporte
         
     Returns:
-        list: Lista de diccionarios con datos de productos
+        QuerySet: Productos activos filtrados
     """
     productos = Productos.objects.filter(
         eliminado__isnull=True,
         estado_merma='activo'
     ).select_related('categorias')
     
-    categoria_id = request.GET.get('categoria_id')
+    categoria_id = parametros.get('categoria_id')
     if categoria_id and categoria_id != '':
         productos = productos.filter(categorias_id=categoria_id)
     
-    # Preparar datos
-    datos = []
-    for producto in productos:
+    return productos
+
+
+def _filas_inventario(productos):
+    """
+    Genera las filas de exportación del inventario, leyendo por bloques
+    (por ID, con un cursor sobre el último leído).
+    
+    Args:
+        productos: QuerySet de productos filtrados
+        
+    Yields:
+        dict: Datos de un producto con las columnas del reporte
+    """
+    for producto in leer_por_bloques(productos):
         cantidad = producto.cantidad if producto.cantidad else 0
         precio = producto.precio if producto.precio else Decimal('0.00')
         valorizacion = cantidad * precio
         
-        datos.append({
+        yield {
             'Producto': producto.nombre,
             'Categoría': producto.categorias.nombre if producto.categorias else 'Sin categoría',
             'Stock Actual': cantidad,
             'Precio': precio,
             'Valorización': valorizacion,
-        })
+        }
+
+
+def preparar_exportacion_inventario(parametros):
+    """
+    Prepara la exportación del reporte de inventario (directa o en segundo plano).
+    
+    Args:
+        parametros: request.GET (o dict) con los filtros del reporte
+        
+    Returns:
+        dict: filas (generador), contar (función), titulo, nombre_archivo
+              y encabezados_pdf
+    """
+    productos = _productos_inventario(parametros)
+    
+    titulo = "Reporte de Inventario"
+    categoria_id = parametros.get('categoria_id')
+    if categoria_id and categoria_id != '':
+        try:
+            categoria = Categorias.objects.get(id=categoria_id)
+            titulo += f" - {categoria.nombre}"
+        except (Categorias.DoesNotExist, ValueError):
+            pass
     
-    return datos
+    return {
+        'filas': _filas_inventario(productos),
+        'contar': productos.count,
+        'titulo': titulo,
+        'nombre_archivo': 'reporte_inventario',
+        'encabezados_pdf': ['Producto', 'Categoría', 'Stock Actual', 'Precio', 'Valorización'],
+    }
 
 
 @login_required
@@ -206,32 +254,14 @@ def exportar_inventario_csv(request):
         request: HttpRequest con parámetros de filtro
         
     Returns:
-        HttpResponse: Archivo CSV descargable
+        StreamingHttpResponse: Archivo CSV descargable
     """
-    datos = _obtener_productos_inventario(request)
-    
-    # Crear respuesta CSV
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = 'attachment; filename="reporte_inventario.csv"'
+    exportacion = preparar_exportacion_inventario(request.GET)
     
-    writer = csv.writer(response)
-    
-    # Encabezados
-    writer.writerow([
-        'Producto', 'Categoría', 'Stock Actual', 'Precio', 'Valorización'
-    ])
-    
-    # Datos
-    for item in datos:
-        writer.writerow([
-            item['Producto'],
-            item['Categoría'],
-            item['Stock Actual'],
-            float(item['Precio']),
-            float(item['Valorización']),
-        ])
+    encabezados = ['Producto', 'Categoría', 'Stock Actual', 'Precio', 'Valorización']
+    filas = (list(item.values()) for item in exportacion['filas'])
     
-    return response
+    return exportar_a_csv_streaming(encabezados, filas, exportacion['nombre_archivo'])
 
 
 @login_required
@@ -243,20 +273,11 @@ def exportar_inventario_excel(request):
         request: HttpRequest con parámetros de filtro
         
     Returns:
-        HttpResponse: Archivo Excel descargable
+        FileResponse: Archivo Excel descargable
     """
-    datos = _obtener_productos_inventario(request)
+    exportacion = preparar_exportacion_inventario(request.GET)
     
-    titulo = "Reporte de Inventario"
-    categoria_id = request.GET.get('categoria_id')
-    if categoria_id and categoria_id != '':
-        try:
-            categoria = Categorias.objects.get(id=categoria_id)
-            titulo += f" - {categoria.nombre}"
-        except Categorias.DoesNotExist:
-            pass
-    
-    return exportar_a_excel(datos, 'reporte_inventario', titulo)
+    return exportar_a_excel(exportacion['filas'], exportacion['nombre_archivo'], exportacion['titulo'])
 
 
 @login_required
@@ -270,18 +291,9 @@ def exportar_inventario_pdf(request):
     Returns:
         HttpResponse: Archivo PDF descargable
     """
-    datos = _obtener_productos_inventario(request)
+    exportacion = preparar_exportacion_inventario(request.GET)
     
-    titulo = "Reporte de Inventario"
-    categoria_id = request.GET.get('categoria_id')
-    if categoria_id and categoria_id != '':
-        try:
-            categoria = Categorias.objects.get(id=categoria_id)
-            titulo += f" - {categoria.nombre}"
-        except Categorias.DoesNotExist:
-            pass
-    
-    encabezados = ['Producto', 'Categoría', 'Stock Actual', 'Precio', 'Valorización']
-    
-    return exportar_a_pdf(datos, 'reporte_inventario', titulo, encabezados)
-
+    return exportar_a_pdf(
+        exportacion['filas'], exportacion['nombre_archivo'],
+        exportacion['titulo'], exportacion['encabezados_pdf'],
+    )
@@ -20,21 +20,42 @@
 
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.utils import timezone
 from django.db.models import Sum, Count, Q
-from django.http import HttpResponse
 from datetime import datetime, time as dt_time
 from decimal import Decimal
-import csv
 
 from ventas.models import Ventas, DetalleVenta, Clientes
-from ventas.utils.exportadores import exportar_a_excel, exportar_a_pdf
+from ventas.utils.exportadores import (
+    exportar_a_excel, exportar_a_pdf, exportar_a_csv_streaming, leer_por_bloques,
+)
+from ventas.funciones.resumen_ventas import totales_ventas
+from ventas.funciones.exportaciones import filas_maximas_sincronas
+from ventas.funciones.paginacion import paginar_desde_request, quiere_json, pagina_a_json
 
 
 # ================================================================
 # =              VISTA: REPORTE DE VENTAS                        =
 # ================================================================
 
+VENTAS_POR_PAGINA = 100
+
+
+def _venta_a_dict(venta):
+    """Venta en el listado JSON por cursor: folio, fecha, cliente, canal y totales con y sin IVA."""
+    return {
+        'id': venta.id,
+        'folio': venta.folio,
+        'fecha': venta.fecha.isoformat(),
+        'cliente': venta.clientes.nombre if venta.clientes else 'Cliente Genérico',
+        'canal_venta': venta.canal_venta,
+        'total_sin_iva': float(venta.total_sin_iva),
+        'total_iva': float(venta.total_iva),
+        'total_con_iva': float(venta.total_con_iva),
+    }
+
+
 @login_required
 def reporte_ventas_view(request):
     """
@@ -57,6 +78,7 @@ def reporte_ventas_view(request):
     # PASO 1: Inicializar variables
     # ============================================================
     reporte_generado = False
+    exportar_en_segundo_plano = False
     ventas = Ventas.objects.none()  # QuerySet vacío inicial
     totales = {
         'total_neto': Decimal('0.00'),
@@ -124,30 +146,43 @@ def reporte_ventas_view(request):
         if canal_venta and canal_venta != '':
             ventas = ventas.filter(canal_venta=canal_venta)
         
-        # Ordenar por fecha descendente
-        ventas = ventas.order_by('-fecha')
-        
         # ============================================================
         # PASO 4: Calcular totales agregados
         # ============================================================
-        cantidad_ventas = ventas.count()
-        
-        if cantidad_ventas > 0:
-            # Calcular totales usando agregación
+        if cliente_id:
+            # El resumen diario no distingue clientes: sumar las ventas filtradas
             totales_calculados = ventas.aggregate(
                 total_neto=Sum('total_sin_iva'),
                 total_iva=Sum('total_iva'),
                 total_con_iva=Sum('total_con_iva'),
+                cantidad_ventas=Count('id'),
             )
-            
+        else:
+            # Sin filtro de cliente: leer el resumen diario (pocas filas por día)
+            totales_calculados = totales_ventas(fecha_desde, fecha_hasta, canal_venta or None)
+        
+        cantidad_ventas = totales_calculados['cantidad_ventas'] or 0
+        if cantidad_ventas > 0:
             totales['total_neto'] = totales_calculados['total_neto'] or Decimal('0.00')
             totales['total_iva'] = totales_calculados['total_iva'] or Decimal('0.00')
             totales['total_con_iva'] = totales_calculados['total_con_iva'] or Decimal('0.00')
             totales['cantidad_ventas'] = cantidad_ventas
-            totales['promedio_venta'] = totales['total_con_iva'] / cantidad_ventas if cantidad_ventas > 0 else Decimal('0.00')
+            totales['promedio_venta'] = totales['total_con_iva'] / cantidad_ventas
         
-        # Limitar resultados para visualización (paginación opcional)
-        ventas = ventas[:100]
+        # Reportes grandes: exportar en segundo plano en vez de dentro de la petición
+        exportar_en_segundo_plano = cantidad_ventas > filas_maximas_sincronas()
+        
+        # Paginación por cursor, más recientes primero (ver ventas/funciones/paginacion.py)
+        ventas = paginar_desde_request(request, ventas, 'fecha', tamano=VENTAS_POR_PAGINA)
+        
+        if quiere_json(request):
+            return JsonResponse(pagina_a_json(ventas, _venta_a_dict, {
+                'total_neto': float(totales['total_neto']),
+                'total_iva': float(totales['total_iva']),
+                'total_con_iva': float(totales['total_con_iva']),
+                'cantidad_ventas': totales['cantidad_ventas'],
+                'promedio_venta': float(totales['promedio_venta']),
+            }))
     
     # ============================================================
     # PASO 5: Obtener lista de clientes para el filtro
@@ -166,6 +201,8 @@ def reporte_ventas_view(request):
         'fecha_hasta': fecha_hasta,
         'cliente_seleccionado': cliente_id,
         'canal_seleccionado': canal_venta,
+        'exportar_en_segundo_plano': exportar_en_segundo_plano,
+        'parametros_exportacion': request.GET.dict(),
         'canales': [
             ('presencial', 'Presencial'),
             ('delivery', 'Delivery'),
@@ -182,12 +219,12 @@ def reporte_ventas_view(request):
 # =        VISTA: EXPORTAR REPORTE DE VENTAS A CSV              =
 # ================================================================
 
-def _obtener_ventas_filtradas(request):
+def _obtener_ventas_filtradas(parametros):
     """
     Función auxiliar para obtener ventas con filtros aplicados.
     
     Args:
-        request: HttpRequest con parámetros de filtro
+        parametros: request.GET (o dict) con los filtros del reporte
         
     Returns:
         QuerySet: Ventas filtradas
@@ -195,10 +232,10 @@ def _obtener_ventas_filtradas(request):
     ventas = Ventas.objects.select_related('clientes').all()
     
     # Filtros desde GET
-    fecha_desde_str = request.GET.get('fecha_desde')
-    fecha_hasta_str = request.GET.get('fecha_hasta')
-    cliente_id = request.GET.get('cliente_id')
-    canal_venta = request.GET.get('canal_venta')
+    fecha_desde_str = parametros.get('fecha_desde')
+    fecha_hasta_str = parametros.get('fecha_hasta')
+    cliente_id = parametros.get('cliente_id')
+    canal_venta = parametros.get('canal_venta')
     
     # Aplicar filtros de fecha
     if fecha_desde_str:
@@ -232,46 +269,81 @@ def _obtener_ventas_filtradas(request):
     return ventas.order_by('-fecha')
 
 
+def _filas_ventas(ventas):
+    """
+    Genera las filas de exportación de las ventas, leyendo por bloques
+    (más reciente primero, por cursor sobre fecha e ID).
+    
+    Args:
+        ventas: QuerySet de ventas filtradas
+        
+    Yields:
+        dict: Datos de una venta con las columnas del reporte
+    """
+    for venta in leer_por_bloques(ventas, campo_fecha='fecha'):
+        yield {
+            'Folio': venta.folio or f'VENTA-{venta.id}',
+            'Fecha': venta.fecha.strftime('%d/%m/%Y %H:%M'),
+            'Cliente': venta.clientes.nombre if venta.clientes else 'Cliente Genérico',
+            'Canal': venta.canal_venta,
+            'Total Neto': venta.total_sin_iva,
+            'IVA': venta.total_iva,
+            'Total con IVA': venta.total_con_iva,
+            'Descuento': venta.descuento,
+        }
+
+
+def preparar_exportacion_ventas(parametros):
+    """
+    Prepara la exportación del reporte de ventas (directa o en segundo plano).
+    
+    Args:
+        parametros: request.GET (o dict) con los filtros del reporte
+        
+    Returns:
+        dict: filas (generador), contar (función), titulo, nombre_archivo
+              y encabezados_pdf (el PDF no incluye el descuento)
+    """
+    ventas = _obtener_ventas_filtradas(parametros)
+    
+    # Generar título con filtros
+    titulo = "Reporte de Ventas"
+    fecha_desde_str = parametros.get('fecha_desde')
+    fecha_hasta_str = parametros.get('fecha_hasta')
+    if fecha_desde_str and fecha_hasta_str:
+        titulo += f" ({fecha_desde_str} a {fecha_hasta_str})"
+    
+    return {
+        'filas': _filas_ventas(ventas),
+        'contar': ventas.count,
+        'titulo': titulo,
+        'nombre_archivo': 'reporte_ventas',
+        'encabezados_pdf': ['Folio', 'Fecha', 'Cliente', 'Canal', 'Total Neto', 'IVA', 'Total con IVA'],
+    }
+
+
 @login_required
 def exportar_ventas_csv(request):
     """
     Exporta el reporte de ventas a formato CSV.
     
+    El archivo se envía mientras se leen las ventas, sin cargarlas todas.
+    
     Args:
         request: HttpRequest con parámetros de filtro
         
     Returns:
-        HttpResponse: Archivo CSV descargable
+        StreamingHttpResponse: Archivo CSV descargable
     """
-    ventas = _obtener_ventas_filtradas(request)
-    
-    # Crear respuesta CSV
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = 'attachment; filename="reporte_ventas.csv"'
-    
-    # Escribir CSV
-    writer = csv.writer(response)
+    exportacion = preparar_exportacion_ventas(request.GET)
     
-    # Encabezados
-    writer.writerow([
+    encabezados = [
         'Folio', 'Fecha', 'Cliente', 'Canal', 
         'Total Neto', 'IVA', 'Total con IVA', 'Descuento'
-    ])
+    ]
+    filas = (list(fila.values()) for fila in exportacion['filas'])
     
-    # Datos
-    for venta in ventas:
-        writer.writerow([
-            venta.folio or f'VENTA-{venta.id}',
-            venta.fecha.strftime('%d/%m/%Y %H:%M'),
-            venta.clientes.nombre if venta.clientes else 'Cliente Genérico',
-            venta.canal_venta,
-            float(venta.total_sin_iva),
-            float(venta.total_iva),
-            float(venta.total_con_iva),
-            float(venta.descuento),
-        ])
-    
-    return response
+    return exportar_a_csv_streaming(encabezados, filas, exportacion['nombre_archivo'])
 
 
 @login_required
@@ -283,32 +355,11 @@ def exportar_ventas_excel(request):
         request: HttpRequest con parámetros de filtro
         
     Returns:
-        HttpResponse: Archivo Excel descargable
+        FileResponse: Archivo Excel descargable
     """
-    ventas = _obtener_ventas_filtradas(request)
-    
-    # Preparar datos
-    datos = []
-    for venta in ventas:
-        datos.append({
-            'Folio': venta.folio or f'VENTA-{venta.id}',
-            'Fecha': venta.fecha.strftime('%d/%m/%Y %H:%M'),
-            'Cliente': venta.clientes.nombre if venta.clientes else 'Cliente Genérico',
-            'Canal': venta.canal_venta,
-            'Total Neto': venta.total_sin_iva,
-            'IVA': venta.total_iva,
-            'Total con IVA': venta.total_con_iva,
-            'Descuento': venta.descuento,
-        })
-    
-    # Generar título con filtros
-    titulo = "Reporte de Ventas"
-    fecha_desde_str = request.GET.get('fecha_desde')
-    fecha_hasta_str = request.GET.get('fecha_hasta')
-    if fecha_desde_str and fecha_hasta_str:
-        titulo += f" ({fecha_desde_str} a {fecha_hasta_str})"
+    exportacion = preparar_exportacion_ventas(request.GET)
     
-    return exportar_a_excel(datos, 'reporte_ventas', titulo)
+    return exportar_a_excel(exportacion['filas'], exportacion['nombre_archivo'], exportacion['titulo'])
 
 
 @login_required
@@ -322,29 +373,9 @@ def exportar_ventas_pdf(request):
     Returns:
         HttpResponse: Archivo PDF descargable
     """
-    ventas = _obtener_ventas_filtradas(request)
+    exportacion = preparar_exportacion_ventas(request.GET)
     
-    # Preparar datos
-    datos = []
-    for venta in ventas:
-        datos.append({
-            'Folio': venta.folio or f'VENTA-{venta.id}',
-            'Fecha': venta.fecha.strftime('%d/%m/%Y %H:%M'),
-            'Cliente': venta.clientes.nombre if venta.clientes else 'Cliente Genérico',
-            'Canal': venta.canal_venta,
-            'Total Neto': venta.total_sin_iva,
-            'IVA': venta.total_iva,
-            'Total con IVA': venta.total_con_iva,
-        })
-    
-    # Generar título con filtros
-    titulo = "Reporte de Ventas"
-    fecha_desde_str = request.GET.get('fecha_desde')
-    fecha_hasta_str = request.GET.get('fecha_hasta')
-    if fecha_desde_str and fecha_hasta_str:
-        titulo += f" ({fecha_desde_str} a {fecha_hasta_str})"
-    
-    encabezados = ['Folio', 'Fecha', 'Cliente', 'Canal', 'Total Neto', 'IVA', 'Total con IVA']
-    
-    return exportar_a_pdf(datos, 'reporte_ventas', titulo, encabezados)
-
+    return exportar_a_pdf(
+        exportacion['filas'], exportacion['nombre_archivo'],
+        exportacion['titulo'], exportacion['encabezados_pdf'],
+    )
@@ -20,14 +20,12 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.db.models import Sum, Count, Q
 from django.http import HttpResponse
-from datetime import datetime, time as dt_time
-from decimal import Decimal
+from datetime import datetime
 import csv
 
-from ventas.models import Productos, DetalleVenta, Ventas
 from ventas.utils.exportadores import exportar_a_excel, exportar_a_pdf
+from ventas.funciones.ranking_productos import ranking_productos, filas_exportacion, TOP_PRODUCTOS
 
 
 # ================================================================
@@ -87,98 +85,15 @@ def top_productos_view(request):
             fecha_hasta = hoy
         
         # ============================================================
-        # PASO 3: Obtener ventas en el rango de fechas
+        # PASO 3: Calcular rankings desde el resumen diario de ventas
         # ============================================================
-        ventas_query = Ventas.objects.all()
-        
-        if fecha_desde:
-            # Incluir desde el inicio del día (00:00:00)
-            fecha_desde_datetime = timezone.make_aware(
-                datetime.combine(fecha_desde, dt_time.min)
-            )
-            ventas_query = ventas_query.filter(fecha__gte=fecha_desde_datetime)
-        if fecha_hasta:
-            # Incluir hasta el final del día (23:59:59.999999)
-            fecha_hasta_datetime = timezone.make_aware(
-                datetime.combine(fecha_hasta, dt_time.max)
-            )
-            ventas_query = ventas_query.filter(fecha__lte=fecha_hasta_datetime)
-        
-        ventas_ids = ventas_query.values_list('id', flat=True)
-        
-        # ============================================================
-        # PASO 4: Calcular ranking por cantidad
-        # ============================================================
-        ranking_cantidad_query = DetalleVenta.objects.filter(
-            ventas_id__in=ventas_ids
-        ).values(
-            'productos_id',
-            'productos__nombre',
-            'productos__precio'
-        ).annotate(
-            total_cantidad=Sum('cantidad'),
-            total_neto=Sum('precio_unitario') * Sum('cantidad')
-        ).order_by('-total_cantidad')[:20]  # Top 20
-        
-        ranking_cantidad = []
-        for item in ranking_cantidad_query:
-            # Calcular total neto correctamente
-            detalles = DetalleVenta.objects.filter(
-                ventas_id__in=ventas_ids,
-                productos_id=item['productos_id']
-            )
-            total_neto = sum(
-                detalle.cantidad * detalle.precio_unitario 
-                for detalle in detalles
-            )
-            
-            ranking_cantidad.append({
-                'producto_id': item['productos_id'],
-                'nombre': item['productos__nombre'],
-                'cantidad_vendida': item['total_cantidad'],
-                'total_neto': total_neto,
-                'precio_promedio': total_neto / item['total_cantidad'] if item['total_cantidad'] > 0 else Decimal('0.00'),
-            })
-        
-        # ============================================================
-        # PASO 5: Calcular ranking por monto neto
-        # ============================================================
-        ranking_neto_query = DetalleVenta.objects.filter(
-            ventas_id__in=ventas_ids
-        ).values(
-            'productos_id',
-            'productos__nombre'
-        ).annotate(
-            total_cantidad=Sum('cantidad')
-        ).order_by()[:20]
-        
-        ranking_neto = []
-        for item in ranking_neto_query:
-            # Calcular total neto sumando todos los detalles
-            detalles = DetalleVenta.objects.filter(
-                ventas_id__in=ventas_ids,
-                productos_id=item['productos_id']
-            )
-            
-            total_neto = sum(
-                detalle.cantidad * detalle.precio_unitario 
-                for detalle in detalles
-            )
-            
-            ranking_neto.append({
-                'producto_id': item['productos_id'],
-                'nombre': item['productos__nombre'],
-                'cantidad_vendida': item['total_cantidad'],
-                'total_neto': total_neto,
-                'precio_promedio': total_neto / item['total_cantidad'] if item['total_cantidad'] > 0 else Decimal('0.00'),
-            })
-        
-        # Ordenar por total_neto descendente
-        ranking_neto.sort(key=lambda x: x['total_neto'], reverse=True)
-        ranking_neto = ranking_neto[:20]  # Top 20
+        # El resumen ya tiene las unidades y el neto por producto y día,
+        # así un rango de meses lee pocas filas en vez de todo el detalle
+        ranking_cantidad = ranking_productos(fecha_desde, fecha_hasta, orden='cantidad', limite=TOP_PRODUCTOS)
+        ranking_neto = ranking_productos(fecha_desde, fecha_hasta, orden='neto', limite=TOP_PRODUCTOS)
     
     # ============================================================
-    # PASO 6: Preparar contexto
+    # PASO 4: Preparar contexto
     # ============================================================
     context = {
         'reporte_generado': reporte_generado,
@@ -190,7 +105,7 @@ def top_productos_view(request):
     }
     
     # ============================================================
-    # PASO 7: Renderizar template
+    # PASO 5: Renderizar template
     # ============================================================
     return render(request, 'top_productos.html', context)
 
@@ -199,105 +114,65 @@ def top_productos_view(request):
 # =        VISTA: EXPORTAR TOP PRODUCTOS A CSV                  =
 # ================================================================
 
-def _obtener_ranking_productos(request, tipo='cantidad'):
+def _obtener_ranking_productos(parametros, tipo='cantidad'):
     """
     Función auxiliar para obtener ranking de productos con filtros aplicados.
     
     Args:
-        request: HttpRequest con parámetros de filtro
+        parametros: request.GET (o dict) con los filtros del reporte
         tipo: 'cantidad' o 'neto'
         
     Returns:
         list: Lista de diccionarios con datos del ranking
     """
-    fecha_desde_str = request.GET.get('fecha_desde')
-    fecha_hasta_str = request.GET.get('fecha_hasta')
-    
-    ventas_query = Ventas.objects.all()
-    
-    if fecha_desde_str:
-        try:
-            fecha_desde = datetime.strptime(fecha_desde_str, '%Y-%m-%d').date()
-            # Incluir desde el inicio del día (00:00:00)
-            fecha_desde_datetime = timezone.make_aware(
-                datetime.combine(fecha_desde, dt_time.min)
-            )
-            ventas_query = ventas_query.filter(fecha__gte=fecha_desde_datetime)
-        except ValueError:
-            pass
+    fecha_desde = None
+    fecha_hasta = None
     
-    if fecha_hasta_str:
-        try:
-            fecha_hasta = datetime.strptime(fecha_hasta_str, '%Y-%m-%d').date()
-            # Incluir hasta el final del día (23:59:59.999999)
-            fecha_hasta_datetime = timezone.make_aware(
-                datetime.combine(fecha_hasta, dt_time.max)
-            )
-            ventas_query = ventas_query.filter(fecha__lte=fecha_hasta_datetime)
-        except ValueError:
-            pass
+    try:
+        if parametros.get('fecha_desde'):
+            fecha_desde = datetime.strptime(parametros['fecha_desde'], '%Y-%m-%d').date()
+    except ValueError:
+        pass
     
-    ventas_ids = ventas_query.values_list('id', flat=True)
+    try:
+        if parametros.get('fecha_hasta'):
+            fecha_hasta = datetime.strptime(parametros['fecha_hasta'], '%Y-%m-%d').date()
+    except ValueError:
+        pass
     
-    # Preparar datos
-    datos = []
+    ranking = ranking_productos(fecha_desde, fecha_hasta, orden=tipo, limite=TOP_PRODUCTOS)
+    return filas_exportacion(ranking)
+
+
+def preparar_exportacion_top_productos(parametros):
+    """
+    Prepara la exportación del ranking de productos (directa o en segundo plano).
     
-    if tipo == 'cantidad':
-        ranking_query = DetalleVenta.objects.filter(
-            ventas_id__in=ventas_ids
-        ).values(
-            'productos_id',
-            'productos__nombre'
-        ).annotate(
-            total_cantidad=Sum('cantidad')
-        ).order_by('-total_cantidad')[:20]
-        
-        for item in ranking_query:
-            detalles = DetalleVenta.objects.filter(
-                ventas_id__in=ventas_ids,
-                productos_id=item['productos_id']
-            )
-            total_neto = sum(d.cantidad * d.precio_unitario for d in detalles)
-            precio_promedio = total_neto / item['total_cantidad'] if item['total_cantidad'] > 0 else Decimal('0.00')
-            
-            datos.append({
-                'Producto': item['productos__nombre'],
-                'Cantidad Vendida': item['total_cantidad'],
-                'Total Neto': total_neto,
-                'Precio Promedio': precio_promedio,
-            })
-    else:
-        # Por neto
-        productos_data = {}
-        detalles = DetalleVenta.objects.filter(ventas_id__in=ventas_ids)
-        
-        for detalle in detalles:
-            producto_id = detalle.productos_id
-            if producto_id not in productos_data:
-                productos_data[producto_id] = {
-                    'nombre': detalle.productos.nombre,
-                    'cantidad': 0,
-                    'neto': Decimal('0.00'),
-                }
-            productos_data[producto_id]['cantidad'] += detalle.cantidad
-            productos_data[producto_id]['neto'] += detalle.cantidad * detalle.precio_unitario
-        
-        ranking = sorted(
-            productos_data.items(),
-            key=lambda x: x[1]['neto'],
-            reverse=True
-        )[:20]
+    Args:
+        parametros: request.GET (o dict) con los filtros; 'tipo' es
+                    'cantidad' (default) o 'neto'
         
-        for producto_id, data in ranking:
-            precio_promedio = data['neto'] / data['cantidad'] if data['cantidad'] > 0 else Decimal('0.00')
-            datos.append({
-                'Producto': data['nombre'],
-                'Cantidad Vendida': data['cantidad'],
-                'Total Neto': data['neto'],
-                'Precio Promedio': precio_promedio,
-            })
+    Returns:
+        dict: filas (lista), contar (función), titulo, nombre_archivo
+              y encabezados_pdf
+    """
+    tipo = parametros.get('tipo') or 'cantidad'
+    datos = _obtener_ranking_productos(parametros, tipo)
     
-    return datos
+    # Generar título
+    titulo = f"Top Productos - {'Por Cantidad' if tipo == 'cantidad' else 'Por Monto Neto'}"
+    fecha_desde_str = parametros.get('fecha_desde')
+    fecha_hasta_str = parametros.get('fecha_hasta')
+    if fecha_desde_str and fecha_hasta_str:
+        titulo += f" ({fecha_desde_str} a {fecha_hasta_str})"
+    
+    return {
+        'filas': datos,
+        'contar': lambda: len(datos),
+        'titulo': titulo,
+        'nombre_archivo': f'top_productos_{tipo}',
+        'encabezados_pdf': ['Producto', 'Cantidad Vendida', 'Total Neto', 'Precio Promedio'],
+    }
 
 
 @login_required
@@ -312,7 +187,7 @@ def exportar_top_productos_csv(request, tipo='cantidad'):
     Returns:
         HttpResponse: Archivo CSV descargable
     """
-    datos = _obtener_ranking_productos(request, tipo)
+    datos = _obtener_ranking_productos(request.GET, tipo)
     
     # Crear respuesta CSV
     response = HttpResponse(content_type='text/csv; charset=utf-8')
@@ -343,18 +218,11 @@ def exportar_top_productos_excel(request, tipo='cantidad'):
         tipo: 'cantidad' o 'neto'
         
     Returns:
-        HttpResponse: Archivo Excel descargable
+        FileResponse: Archivo Excel descargable
     """
-    datos = _obtener_ranking_productos(request, tipo)
-    
-    # Generar título
-    titulo = f"Top Productos - {'Por Cantidad' if tipo == 'cantidad' else 'Por Monto Neto'}"
-    fecha_desde_str = request.GET.get('fecha_desde')
-    fecha_hasta_str = request.GET.get('fecha_hasta')
-    if fecha_desde_str and fecha_hasta_str:
-        titulo += f" ({fecha_desde_str} a {fecha_hasta_str})"
+    exportacion = preparar_exportacion_top_productos({**request.GET.dict(), 'tipo': tipo})
     
-    return exportar_a_excel(datos, f'top_productos_{tipo}', titulo)
+    return exportar_a_excel(exportacion['filas'], exportacion['nombre_archivo'], exportacion['titulo'])
 
 
 @login_required
@@ -369,16 +237,9 @@ def exportar_top_productos_pdf(request, tipo='cantidad'):
     Returns:
         HttpResponse: Archivo PDF descargable
     """
-    datos = _obtener_ranking_productos(request, tipo)
+    exportacion = preparar_exportacion_top_productos({**request.GET.dict(), 'tipo': tipo})
     
-    # Generar título
-    titulo = f"Top Productos - {'Por Cantidad' if tipo == 'cantidad' else 'Por Monto Neto'}"
-    fecha_desde_str = request.GET.get('fecha_desde')
-    fecha_hasta_str = request.GET.get('fecha_hasta')
-    if fecha_desde_str and fecha_hasta_str:
-        titulo += f" ({fecha_desde_str} a {fecha_hasta_str})"
-    
-    encabezados = ['Producto', 'Cantidad Vendida', 'Total Neto', 'Precio Promedio']
-    
-    return exportar_a_pdf(datos, f'top_productos_{tipo}', titulo, encabezados)
-
+    return exportar_a_pdf(
+        exportacion['filas'], exportacion['nombre_archivo'],
+        exportacion['titulo'], exportacion['encabezados_pdf'],
+    )
@@ -20,12 +20,14 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Case, When, Value, IntegerField
+from django.core.paginator import Paginator
 from django.utils import timezone
 from datetime import timedelta
 
 # Importar modelos y formularios
 from ventas.models import Alertas, Productos
+from ventas.funciones.tareas import ejecutar_generacion_alertas
 from ventas.funciones.formularios_alertas import (
     AlertaForm, 
     AlertaFiltroForm,
@@ -37,6 +39,10 @@ from ventas.funciones.formularios_alertas import (
 # =          VISTA: LISTAR ALERTAS CON FILTROS                   =
 # ================================================================
 
+# Alertas por página en el historial
+ALERTAS_POR_PAGINA = 50
+
+
 @login_required
 def alertas_list_view(request):
     """
@@ -46,6 +52,7 @@ def alertas_list_view(request):
     - Lista todas las alertas ordenadas por fecha (más recientes primero)
     - Permite filtrar por tipo, estado, producto y fecha
     - Muestra estadísticas (cantidad por tipo y estado)
+    - Pagina el historial (la tabla de alertas crece con cada generación)
     - Incluye barra de búsqueda similar al inventario
     
     Args:
@@ -100,44 +107,58 @@ def alertas_list_view(request):
         # Agregar un día para incluir todo el día seleccionado
         alertas = alertas.filter(fecha_generada__lte=fecha_hasta + ' 23:59:59')
     
-    # --- Paso 3: Ordenar las alertas ---
-    # Primero por tipo (rojas primero), luego por fecha (más recientes primero)
-    orden_tipo = {
-        'roja': 1,
-        'amarilla': 2,
-        'verde': 3,
-    }
-    
-    # Ordenar en Python (Django no puede ordenar por CASE directamente sin SQL raw)
-    alertas_list = list(alertas)
-    alertas_list.sort(
-        key=lambda x: (orden_tipo.get(x.tipo_alerta, 4), -x.fecha_generada.timestamp())
+    # --- Paso 3: Calcular estadísticas ---
+    # Todas las cantidades por tipo y estado en UNA consulta (agregación condicional)
+    estadisticas = alertas.order_by().aggregate(
+        total=Count('id'),
+        roja=Count('id', filter=Q(tipo_alerta='roja', estado='activa')),
+        amarilla=Count('id', filter=Q(tipo_alerta='amarilla', estado='activa')),
+        verde=Count('id', filter=Q(tipo_alerta='verde', estado='activa')),
+        activa=Count('id', filter=Q(estado='activa')),
+        resuelta=Count('id', filter=Q(estado='resuelta')),
+        ignorada=Count('id', filter=Q(estado='ignorada')),
     )
     
-    # --- Paso 4: Calcular estadísticas ---
-    # Contar alertas por tipo y estado para mostrar en cards
     stats_tipo = {
-        'roja': alertas.filter(tipo_alerta='roja', estado='activa').count(),
-        'amarilla': alertas.filter(tipo_alerta='amarilla', estado='activa').count(),
-        'verde': alertas.filter(tipo_alerta='verde', estado='activa').count(),
+        'roja': estadisticas['roja'],
+        'amarilla': estadisticas['amarilla'],
+        'verde': estadisticas['verde'],
     }
     
     stats_estado = {
-        'activa': alertas.filter(estado='activa').count(),
-        'resuelta': alertas.filter(estado='resuelta').count(),
-        'ignorada': alertas.filter(estado='ignorada').count(),
+        'activa': estadisticas['activa'],
+        'resuelta': estadisticas['resuelta'],
+        'ignorada': estadisticas['ignorada'],
     }
     
+    # --- Paso 4: Ordenar y paginar las alertas ---
+    # Primero por tipo (rojas primero), luego por fecha (más recientes primero).
+    # El orden por color se calcula en SQL: solo se leen las alertas de la página
+    alertas = alertas.annotate(
+        orden_tipo=Case(
+            When(tipo_alerta='roja', then=Value(1)),
+            When(tipo_alerta='amarilla', then=Value(2)),
+            When(tipo_alerta='verde', then=Value(3)),
+            default=Value(4),
+            output_field=IntegerField(),
+        )
+    ).order_by('orden_tipo', '-fecha_generada', '-id')
+    
+    paginador = Paginator(alertas, ALERTAS_POR_PAGINA)
+    # El total ya viene en las estadísticas: evita el COUNT(*) del paginador
+    paginador.count = estadisticas['total']
+    alertas_pagina = paginador.get_page(request.GET.get('page'))
+    
     # --- Paso 5: Crear el formulario de filtros ---
     form_filtro = AlertaFiltroForm(request.GET or None)
     
     # --- Paso 6: Preparar el contexto para el template ---
     contexto = {
-        'alertas': alertas_list,
+        'alertas': alertas_pagina,
         'form_filtro': form_filtro,
         'stats_tipo': stats_tipo,
         'stats_estado': stats_estado,
-        'total_alertas': len(alertas_list),
+        'total_alertas': estadisticas['total'],
         # Mantener los valores de los filtros para la URL
         'tipo_actual': tipo_filtro,
         'estado_actual': estado_filtro,
@@ -174,8 +195,10 @@ def alerta_crear_view(request):
         form = AlertaForm(request.POST)
         
         if form.is_valid():
-            # Guardar la nueva alerta
-            alerta = form.save()
+            # Guardar la nueva alerta (manual: el generador automático no la toca)
+            alerta = form.save(commit=False)
+            alerta.categoria = 'manual'
+            alerta.save()
             
             messages.success(
                 request,
@@ -381,8 +404,15 @@ def generar_alertas_automaticas_view(request):
     """
     
     try:
-        # Llamar al método estático del modelo
-        resultado = Alertas.generar_alertas_automaticas()
+        # Ejecutar la misma tarea que el comando programado (con bloqueo),
+        # revisando todo el catálogo
+        resultado = ejecutar_generacion_alertas(completa=True)
+        
+        if resultado is None:
+            return JsonResponse({
+                'success': False,
+                'mensaje': 'Ya hay una generación de alertas en curso. Intenta nuevamente en unos minutos.'
+            }, status=409)
         
         # Preparar mensaje informativo
         stock_bajo = resultado.get('stock_bajo', 0)
@@ -438,7 +468,9 @@ def generar_alerta_desde_producto(request, producto_id):
         form = AlertaForm(request.POST)
         
         if form.is_valid():
-            form.save()
+            alerta = form.save(commit=False)
+            alerta.categoria = 'manual'
+            alerta.save()
             
             messages.success(
                 request,
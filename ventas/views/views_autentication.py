@@ -14,6 +14,7 @@ from ..funciones.formularios import (
     PasswordResetRequestForm, PasswordResetConfirmForm
 )
 from ..models.usuarios import Usuarios, Roles
+from ..funciones.permisos import invalidar_permisos_usuario
 
 # ================================================================
 # =                    VISTA: LANDING PAGE                       =
@@ -107,22 +108,10 @@ def dashboard_view(request):
     """
     Vista del dashboard principal.
     
-    Genera alertas automáticamente al cargar el dashboard para:
-    - Productos por vencer
-    - Stock bajo
-    - Facturas vencidas o por vencer
+    Solo lee: las alertas (productos por vencer, stock bajo, facturas
+    vencidas o por vencer) las genera la tarea programada
+    `python manage.py generar_alertas` (ver ventas/funciones/tareas.py).
     """
-    from ventas.models import Alertas
-    
-    # Generar alertas automáticamente al cargar el dashboard
-    try:
-        Alertas.generar_alertas_automaticas()
-    except Exception as e:
-        # Si falla la generación de alertas, no bloquear la carga del dashboard
-        import logging
-        logger = logging.getLogger('ventas')
-        logger.error(f'Error al generar alertas automáticas en dashboard: {str(e)}', exc_info=True)
-    
     return render(request, 'dashboard.html')
 
 def proximamente_view(request, feature=None):
@@ -335,6 +324,9 @@ def usuario_editar_view(request, user_id):
                 # Si no existe perfil, crearlo
                 Usuarios.objects.create(user=usuario, run='', roles=rol, direccion=None)
             
+            # El rol (o si es superusuario) pudo cambiar: recalcular sus permisos
+            invalidar_permisos_usuario(usuario)
+            
             messages.success(request, "Usuario actualizado correctamente.")
             return redirect('usuarios_list')
     else:
@@ -353,6 +345,7 @@ def usuario_eliminar_view(request, user_id):
         messages.error(request, "No puedes eliminar tu propio usuario mientras estás conectado.")
         return redirect('usuarios_list')
     if request.method == 'POST':
+        invalidar_permisos_usuario(usuario.pk)
         usuario.delete()
         messages.success(request, "Usuario eliminado.")
         return redirect('usuarios_list')
@@ -12,12 +12,10 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.db import transaction
-from django.utils import timezone
-from datetime import timedelta
 from decimal import Decimal
 from ventas.models.proveedores import FacturaProveedor, DetalleFacturaProveedor
 from ventas.models.productos import Productos
-from ventas.models.movimientos import MovimientosInventario
+from ventas.funciones.recepcion_facturas import recibir_factura, quitar_recepcion
 from ventas.decorators import require_seccion
 import logging
 
@@ -149,8 +147,11 @@ def recibir_factura_ajax(request, factura_id):
     
     Cuando se recibe una factura:
     1. Se marca como recibida
-    2. Se actualiza el stock de todos los productos en los detalles
+    2. Se crea un lote por cada detalle y se actualiza el stock de los productos
     3. Se crean movimientos de inventario
+    
+    Todo en bloque, con un número fijo de consultas sin importar cuántas
+    líneas tenga la factura (ver ventas/funciones/recepcion_facturas.py).
     """
     try:
         factura = get_object_or_404(
@@ -166,92 +167,12 @@ def recibir_factura_ajax(request, factura_id):
                 'mensaje': 'Esta factura ya fue recibida anteriormente.'
             }, status=400)
         
-        with transaction.atomic():
-            # Marcar como recibida (establecer fecha_recepcion)
-            from datetime import date
-            factura.fecha_recepcion = date.today()
-            factura.save()
-            
-            # Obtener todos los detalles
-            detalles = DetalleFacturaProveedor.objects.filter(
-                factura_proveedor=factura
-            ).select_related('productos')
-            
-            productos_actualizados = []
-            
-            # Actualizar stock de cada producto y crear lotes
-            from ventas.models.lotes import Lote
-            from datetime import date as date_class
-            
-            for detalle in detalles:
-                producto = detalle.productos
-                
-                # Crear lote para este producto
-                # Obtener fecha de caducidad del detalle si existe, sino usar fecha por defecto
-                fecha_caducidad_lote = None
-                if hasattr(detalle, 'fecha_vencimiento_producto') and detalle.fecha_vencimiento_producto:
-                    fecha_caducidad_lote = detalle.fecha_vencimiento_producto
-                elif producto.caducidad:
-                    # Si el producto tiene fecha de caducidad, usarla
-                    fecha_caducidad_lote = producto.caducidad
-                else:
-                    # Si no hay fecha de caducidad, usar fecha de factura + 30 días como default
-                    fecha_caducidad_lote = factura.fecha_factura + timedelta(days=30)
-                
-                # Generar número de lote si no existe
-                numero_lote = None
-                if hasattr(detalle, 'numero_lote') and detalle.numero_lote:
-                    numero_lote = detalle.numero_lote
-                else:
-                    # Generar número de lote automático: FACT-{factura_id}-{detalle_id}
-                    numero_lote = f"FACT-{factura.id}-{detalle.id}"
-                
-                # Crear lote
-                lote = Lote.objects.create(
-                    productos=producto,
-                    detalle_factura_proveedor=detalle,
-                    numero_lote=numero_lote,
-                    cantidad=Decimal(str(detalle.cantidad)),
-                    cantidad_inicial=Decimal(str(detalle.cantidad)),
-                    fecha_elaboracion=factura.fecha_factura,
-                    fecha_caducidad=fecha_caducidad_lote,
-                    fecha_recepcion=timezone.now(),
-                    origen='compra',
-                    estado='activo'
-                )
-                
-                # Actualizar cantidad del producto desde lotes
-                producto.cantidad += detalle.cantidad
-                if producto.stock_actual is not None:
-                    producto.stock_actual += detalle.cantidad
-                else:
-                    producto.stock_actual = detalle.cantidad
-                
-                # Actualizar fecha de caducidad del producto si no tiene o si el lote tiene una más antigua
-                if fecha_caducidad_lote:
-                    if not producto.caducidad or fecha_caducidad_lote < producto.caducidad:
-                        producto.caducidad = fecha_caducidad_lote
-                
-                producto.save()
-                
-                # Crear movimiento de inventario
-                MovimientosInventario.objects.create(
-                    tipo_movimiento='entrada',
-                    cantidad=detalle.cantidad,
-                    productos=producto,
-                    origen='compra',
-                    referencia_id=factura.id,
-                    tipo_referencia='factura_proveedor'
-                )
-                
-                productos_actualizados.append({
-                    'nombre': producto.nombre,
-                    'cantidad': detalle.cantidad,
-                    'stock_actual': producto.cantidad,
-                    'lote_id': lote.id
-                })
-            
-            logger.info(f'Factura {factura.id} recibida. {len(productos_actualizados)} productos actualizados.')
+        try:
+            with transaction.atomic():
+                productos_actualizados = recibir_factura(factura)
+        except ValueError as e:
+            # Otra petición la recibió entretanto
+            return JsonResponse({'success': False, 'mensaje': str(e)}, status=400)
         
         return JsonResponse({
             'success': True,
@@ -275,8 +196,9 @@ def quitar_recepcion_factura_ajax(request, factura_id):
     API AJAX para quitar la fecha de recepción de una factura.
     Esto permite agregar más productos a la factura.
     
-    ⚠️ IMPORTANTE: Esto NO revierte el stock. Si ya se actualizó el stock,
-    deberías usar cancelar_recepcion() en su lugar.
+    Revierte el stock que sumó la recepción: lo que aún queda en los lotes
+    creados al recibirla se retira (lo ya vendido no se puede devolver) y
+    se registra un movimiento de salida por cada lote.
     """
     try:
         factura = get_object_or_404(
@@ -291,47 +213,12 @@ def quitar_recepcion_factura_ajax(request, factura_id):
                 'mensaje': 'Esta factura no tiene fecha de recepción.'
             }, status=400)
         
-        with transaction.atomic():
-            # Revertir stock de todos los productos antes de quitar la recepción
-            productos_revertidos = []
-            for detalle in factura.detalles.all():
-                try:
-                    producto = detalle.productos
-                    cantidad_revertida = detalle.cantidad
-                    
-                    # Revertir cantidad y stock_actual
-                    producto.cantidad = max(Decimal('0.00'), producto.cantidad - cantidad_revertida)
-                    if producto.stock_actual is not None:
-                        producto.stock_actual = max(Decimal('0.00'), producto.stock_actual - cantidad_revertida)
-                    producto.save()
-                    
-                    # Crear movimiento de salida para trazabilidad
-                    try:
-                        MovimientosInventario.objects.create(
-                            tipo_movimiento='salida',
-                            cantidad=cantidad_revertida,
-                            productos=producto,
-                            origen='devolucion',
-                            referencia_id=factura.id,
-                            tipo_referencia='factura_proveedor',
-                            observaciones=f'Reversión por quitar recepción de factura {factura.numero_factura}'
-                        )
-                    except Exception as e:
-                        logger.warning(f'Error al crear movimiento de inventario para producto {producto.id}: {str(e)}')
-                    
-                    productos_revertidos.append({
-                        'nombre': producto.nombre,
-                        'cantidad': cantidad_revertida,
-                        'stock_actual': producto.cantidad
-                    })
-                except Exception as e:
-                    logger.error(f'Error al revertir stock de producto en detalle {detalle.id}: {str(e)}')
-            
-            # Quitar fecha de recepción
-            factura.fecha_recepcion = None
-            factura.save()
-            
-            logger.info(f'Fecha de recepción quitada de factura {factura.id}. {len(productos_revertidos)} productos revertidos.')
+        try:
+            with transaction.atomic():
+                productos_revertidos = quitar_recepcion(factura)
+        except ValueError as e:
+            # Otra petición la quitó entretanto
+            return JsonResponse({'success': False, 'mensaje': str(e)}, status=400)
         
         return JsonResponse({
             'success': True,
@@ -345,4 +232,3 @@ def quitar_recepcion_factura_ajax(request, factura_id):
             'success': False,
             'mensaje': f'Error al quitar recepción: {str(e)}'
         }, status=500)
-
@@ -11,7 +11,7 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import transaction
-from django.db.models import Q, Sum
+from django.db.models import Q, Sum, Count
 from django.http import JsonResponse
 from django.utils import timezone
 from decimal import Decimal, ROUND_HALF_UP
@@ -20,6 +20,7 @@ from ventas.models.proveedores import Proveedor, FacturaProveedor, DetalleFactur
 from ventas.models.productos import Productos
 from ventas.models.movimientos import MovimientosInventario
 from ventas.decorators import require_seccion
+from ventas.funciones.paginacion import paginar_desde_request, quiere_json, pagina_a_json
 import logging
 
 logger = logging.getLogger('ventas')
@@ -29,6 +30,22 @@ logger = logging.getLogger('ventas')
 # =                VISTAS DE FACTURAS DE PROVEEDORES            =
 # ================================================================
 
+def _factura_a_dict(factura):
+    """Factura en el listado JSON por cursor: número, proveedor, fechas, montos y estado de pago."""
+    return {
+        'id': factura.id,
+        'numero_factura': factura.numero_factura,
+        'proveedor': factura.proveedor.nombre,
+        'fecha_factura': factura.fecha_factura.isoformat(),
+        'fecha_vencimiento': factura.fecha_vencimiento.isoformat() if factura.fecha_vencimiento else None,
+        'fecha_recepcion': factura.fecha_recepcion.isoformat() if factura.fecha_recepcion else None,
+        'subtotal_sin_iva': float(factura.subtotal_sin_iva or 0),
+        'total_iva': float(factura.total_iva or 0),
+        'total_con_iva': float(factura.total_con_iva or 0),
+        'estado_pago': factura.estado_pago,
+    }
+
+
 @login_required
 @require_seccion('facturas_proveedores')
 def facturas_proveedores_list_view(request):
@@ -82,17 +99,31 @@ def facturas_proveedores_list_view(request):
         except ValueError:
             pass
     
-    # Ordenar por fecha descendente (más recientes primero)
-    facturas = facturas.order_by('-fecha_factura', '-id')
+    # Calcular totales en UNA consulta (agregación condicional)
+    totales = facturas.order_by().aggregate(
+        total_facturas=Count('id'),
+        total_monto=Sum('total_con_iva'),
+        facturas_pendientes=Count('id', filter=Q(estado_pago='pendiente')),
+        monto_pendiente=Sum('total_con_iva', filter=Q(estado_pago='pendiente')),
+    )
+    total_facturas = totales['total_facturas']
+    total_monto = totales['total_monto'] or Decimal('0.00')
+    facturas_pendientes = totales['facturas_pendientes']
+    monto_pendiente = totales['monto_pendiente'] or Decimal('0.00')
+    
+    # Paginación por cursor, más recientes primero (ver ventas/funciones/paginacion.py)
+    pagina = paginar_desde_request(request, facturas, 'fecha_factura')
     
-    # Calcular totales
-    total_facturas = facturas.count()
-    total_monto = facturas.aggregate(Sum('total_con_iva'))['total_con_iva__sum'] or Decimal('0.00')
-    facturas_pendientes = facturas.filter(estado_pago='pendiente').count()
-    monto_pendiente = facturas.filter(estado_pago='pendiente').aggregate(Sum('total_con_iva'))['total_con_iva__sum'] or Decimal('0.00')
+    if quiere_json(request):
+        return JsonResponse(pagina_a_json(pagina, _factura_a_dict, {
+            'total_facturas': total_facturas,
+            'total_monto': float(total_monto),
+            'facturas_pendientes': facturas_pendientes,
+            'monto_pendiente': float(monto_pendiente),
+        }))
     
     contexto = {
-        'facturas': facturas,
+        'facturas': pagina,
         'q': q,
         'estado_pago_filter': estado_pago_filter,
         'estado_recepcion_filter': estado_recepcion_filter,
@@ -263,17 +294,14 @@ def factura_proveedor_detalle_view(request, factura_id):
         factura_proveedor=factura
     ).order_by('-fecha_pago', '-id')
     
-    # Calcular totales de pagos
-    total_pagado = sum(pago.monto for pago in pagos)
-    saldo_pendiente = factura.total_con_iva - total_pagado
-    
+    # Totales de pagos: columnas guardadas de la factura
     contexto = {
         'factura': factura,
         'detalles': detalles,
         'productos': productos,
         'pagos': pagos,
-        'total_pagado': total_pagado,
-        'saldo_pendiente': saldo_pendiente,
+        'total_pagado': factura.total_pagado,
+        'saldo_pendiente': factura.saldo_pendiente,
     }
     
     return render(request, 'factura_proveedor_detalle.html', contexto)
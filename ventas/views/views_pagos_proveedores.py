@@ -10,17 +10,46 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
-from django.db.models import Q, Sum
+from django.db.models import Q, Sum, Count
 from django.utils import timezone
 from decimal import Decimal
 from datetime import date, datetime
 from ventas.models.proveedores import FacturaProveedor, PagoProveedor, Proveedor
 from ventas.decorators import require_seccion
+from ventas.funciones.paginacion import paginar_desde_request, quiere_json, pagina_a_json
 import logging
 
 logger = logging.getLogger('ventas')
 
 
+def _facturas_con_saldo(facturas):
+    """
+    Facturas con saldo pendiente para el selector del formulario de pago.
+    
+    Usa la columna saldo_pendiente de la factura: una sola consulta, sin
+    sumar los pagos de cada factura.
+    """
+    return [
+        {'factura': f, 'saldo_pendiente': f.saldo_pendiente}
+        for f in facturas.filter(saldo_pendiente__gt=0)
+    ]
+
+
+def _pago_a_dict(pago):
+    """Pago en el listado JSON por cursor: fecha, factura, proveedor, monto, método y comprobante."""
+    return {
+        'id': pago.id,
+        'fecha_pago': pago.fecha_pago.isoformat(),
+        'factura_id': pago.factura_proveedor_id,
+        'numero_factura': pago.factura_proveedor.numero_factura,
+        'proveedor': pago.factura_proveedor.proveedor.nombre,
+        'monto': float(pago.monto),
+        'metodo_pago': pago.metodo_pago,
+        'numero_comprobante': pago.numero_comprobante,
+        'observaciones': pago.observaciones,
+    }
+
+
 @login_required
 @require_seccion('pagos_proveedores')
 def pagos_proveedores_list_view(request):
@@ -61,15 +90,22 @@ def pagos_proveedores_list_view(request):
         except ValueError:
             pass
     
-    # Ordenar por fecha descendente
-    pagos = pagos.order_by('-fecha_pago', '-id')
+    # Calcular totales en UNA consulta
+    totales = pagos.order_by().aggregate(total_pagos=Count('id'), monto_total=Sum('monto'))
+    total_pagos = totales['total_pagos']
+    monto_total = totales['monto_total'] or Decimal('0.00')
+    
+    # Paginación por cursor, más recientes primero (ver ventas/funciones/paginacion.py)
+    pagina = paginar_desde_request(request, pagos, 'fecha_pago')
     
-    # Calcular totales
-    total_pagos = pagos.count()
-    monto_total = pagos.aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00')
+    if quiere_json(request):
+        return JsonResponse(pagina_a_json(pagina, _pago_a_dict, {
+            'total_pagos': total_pagos,
+            'monto_total': float(monto_total),
+        }))
     
     contexto = {
-        'pagos': pagos,
+        'pagos': pagina,
         'q': q,
         'factura_id': factura_id,
         'fecha_desde': fecha_desde,
@@ -113,7 +149,7 @@ def pago_proveedor_crear_view(request, factura_id=None):
             
             if monto <= 0:
                 messages.error(request, 'El monto debe ser mayor a cero.')
-                facturas_con_saldo = [{'factura': f, 'saldo_pendiente': f.calcular_saldo_pendiente()} for f in facturas]
+                facturas_con_saldo = _facturas_con_saldo(facturas)
                 return render(request, 'pago_proveedor_form.html', {
                     'modo': 'crear',
                     'facturas_con_saldo': facturas_con_saldo,
@@ -123,7 +159,7 @@ def pago_proveedor_crear_view(request, factura_id=None):
             
             if not fecha_pago_str:
                 messages.error(request, 'La fecha de pago es obligatoria.')
-                facturas_con_saldo = [{'factura': f, 'saldo_pendiente': f.calcular_saldo_pendiente()} for f in facturas]
+                facturas_con_saldo = _facturas_con_saldo(facturas)
                 return render(request, 'pago_proveedor_form.html', {
                     'modo': 'crear',
                     'facturas_con_saldo': facturas_con_saldo,
@@ -138,10 +174,10 @@ def pago_proveedor_crear_view(request, factura_id=None):
             factura = get_object_or_404(FacturaProveedor, pk=factura_id_post, eliminado__isnull=True)
             
             # Verificar que el monto no exceda el saldo pendiente
-            saldo_pendiente = factura.calcular_saldo_pendiente()
+            saldo_pendiente = factura.saldo_pendiente
             if monto > saldo_pendiente:
                 messages.error(request, f'El monto excede el saldo pendiente (${saldo_pendiente:,.0f}).')
-                facturas_con_saldo = [{'factura': f, 'saldo_pendiente': f.calcular_saldo_pendiente()} for f in facturas]
+                facturas_con_saldo = _facturas_con_saldo(facturas)
                 return render(request, 'pago_proveedor_form.html', {
                     'modo': 'crear',
                     'facturas_con_saldo': facturas_con_saldo,
@@ -149,7 +185,8 @@ def pago_proveedor_crear_view(request, factura_id=None):
                     'saldo_pendiente': saldo_pendiente
                 })
             
-            # Crear el pago
+            # Crear el pago (PagoProveedor.save actualiza el estado de pago
+            # y los saldos de la factura y del proveedor)
             pago = PagoProveedor.objects.create(
                 factura_proveedor=factura,
                 monto=monto,
@@ -159,9 +196,6 @@ def pago_proveedor_crear_view(request, factura_id=None):
                 observaciones=observaciones
             )
             
-            # Actualizar estado de pago de la factura
-            factura.actualizar_estado_pago_automatico()
-            
             messages.success(request, f'Pago de ${monto:,.0f} registrado exitosamente.')
             logger.info(f'Pago creado: {pago.id} - Factura {factura.numero_factura} - ${monto}')
             return redirect('factura_proveedor_detalle', factura_id=factura.id)
@@ -169,7 +203,7 @@ def pago_proveedor_crear_view(request, factura_id=None):
         except ValueError as e:
             logger.error(f'Error de validación al crear pago: {str(e)}', exc_info=True)
             messages.error(request, f'Error en los datos: {str(e)}')
-            facturas_con_saldo = [{'factura': f, 'saldo_pendiente': f.calcular_saldo_pendiente()} for f in facturas]
+            facturas_con_saldo = _facturas_con_saldo(facturas)
             return render(request, 'pago_proveedor_form.html', {
                 'modo': 'crear',
                 'facturas_con_saldo': facturas_con_saldo,
@@ -179,7 +213,7 @@ def pago_proveedor_crear_view(request, factura_id=None):
         except Exception as e:
             logger.error(f'Error al crear pago: {str(e)}', exc_info=True)
             messages.error(request, f'Error al crear el pago: {str(e)}')
-            facturas_con_saldo = [{'factura': f, 'saldo_pendiente': f.calcular_saldo_pendiente()} for f in facturas]
+            facturas_con_saldo = _facturas_con_saldo(facturas)
             return render(request, 'pago_proveedor_form.html', {
                 'modo': 'crear',
                 'facturas_con_saldo': facturas_con_saldo,
@@ -193,19 +227,12 @@ def pago_proveedor_crear_view(request, factura_id=None):
     if factura_id:
         try:
             factura_seleccionada = FacturaProveedor.objects.get(pk=factura_id, eliminado__isnull=True)
-            saldo_pendiente = factura_seleccionada.calcular_saldo_pendiente()
+            saldo_pendiente = factura_seleccionada.saldo_pendiente
         except FacturaProveedor.DoesNotExist:
             pass
     
-    # Calcular saldo pendiente para cada factura y filtrar solo las que tienen saldo > 0
-    facturas_con_saldo = []
-    for factura in facturas:
-        saldo = factura.calcular_saldo_pendiente()
-        if saldo > 0:  # Solo incluir facturas con saldo pendiente
-            facturas_con_saldo.append({
-                'factura': factura,
-                'saldo_pendiente': saldo
-            })
+    # Solo las facturas con saldo pendiente
+    facturas_con_saldo = _facturas_con_saldo(facturas)
     
     return render(request, 'pago_proveedor_form.html', {
         'modo': 'crear',
@@ -229,12 +256,10 @@ def pago_proveedor_eliminar_view(request, pago_id):
             # Guardar ID antes de eliminar para el log
             pago_id_log = pago.id
             
-            # Eliminación física (no hay campo eliminado en la BD)
+            # Eliminación física (no hay campo eliminado en la BD).
+            # PagoProveedor.delete actualiza el estado de pago y los saldos
             pago.delete()
             
-            # Actualizar estado de pago de la factura
-            factura.actualizar_estado_pago_automatico()
-            
             messages.success(request, 'Pago eliminado exitosamente.')
             logger.info(f'Pago eliminado: {pago_id_log}')
             return redirect('factura_proveedor_detalle', factura_id=factura.id)
@@ -23,18 +23,26 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
-from django.db import transaction
+from django.http import JsonResponse, HttpResponseNotModified
+from django.views.decorators.http import require_http_methods, require_GET
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags
 from django.conf import settings
 from decimal import Decimal
 import json
 import logging
 
 # Importamos los modelos que necesitamos
-from ventas.models import Productos, Clientes, Ventas, DetalleVenta
+from ventas.models import Productos, Clientes
 from ventas.funciones.formularios_ventas import ClienteRapidoForm, FinalizarVentaForm
+from ventas.funciones.checkout import registrar_venta, ErrorCheckout
+from ventas.funciones.folios import siguiente_folio
+from ventas.funciones.clientes import buscar_clientes, cliente_por_rut, LIMITE_BUSQUEDA_CLIENTES
+from ventas.funciones.catalogo_pos import (
+    TAMANO_PAGINA_CATALOGO, MAX_TAMANO_PAGINA_CATALOGO,
+    estado_catalogo, etag_catalogo, obtener_pagina_catalogo,
+)
 
 
 # ================================================================
@@ -51,10 +59,14 @@ def pos_view(request):
     Vista principal del Punto de Venta (POS).
     
     Muestra:
-    - Lista de productos disponibles
-    - Formulario para agregar cliente
+    - Grilla de productos (se llena desde /api/pos/catalogo/ con JavaScript)
+    - Buscador de clientes y formulario para agregar cliente
     - Carrito de compras (manejado con JavaScript en el navegador)
     
+    Los productos NO se dibujan en el HTML: así la página carga igual de
+    rápido con 50 o con 5.000 productos, y la caja mantiene el stock al
+    día pidiendo solo los cambios (ver catalogo_pos_api).
+    
     Args:
         request: Objeto con la información de la petición HTTP
         
@@ -62,41 +74,130 @@ def pos_view(request):
         Una página HTML con la interfaz del POS
     """
     
-    # --- Paso 1: Obtener todos los productos activos (no eliminados) ---
-    # Filtramos solo los productos que:
-    # - No han sido eliminados (eliminado__isnull=True)
-    # - Están en estado activo (no en merma, no inactivos) (estado_merma='activo')
-    # - Tienen stock disponible (cantidad > 0)
-    # - Están ordenados alfabéticamente por nombre
-    # IMPORTANTE: Productos en merma o inactivos NO se muestran en POS
-    productos_disponibles = Productos.objects.filter(
-        eliminado__isnull=True,    # Solo productos no eliminados
-        estado_merma='activo',     # Solo productos activos (excluye inactivos y en_merma)
-        cantidad__gt=0             # Solo con stock disponible
-    ).select_related('categorias').order_by('nombre')
-    
-    # --- Paso 2: Obtener todos los clientes para el selector ---
-    # Los ordenamos alfabéticamente por nombre
-    clientes = Clientes.objects.all().order_by('nombre')
-    
-    # --- Paso 3: Crear el formulario para agregar nuevos clientes ---
+    # --- Paso 1: Crear el formulario para agregar nuevos clientes ---
+    # Los clientes tampoco se cargan en la página: el selector los busca
+    # en /api/clientes/buscar/ mientras el cajero escribe
     form_cliente = ClienteRapidoForm()
     
-    # --- Paso 4: Preparar el contexto (datos que enviamos al template) ---
+    # --- Paso 2: Preparar el contexto (datos que enviamos al template) ---
     # El "contexto" es un diccionario con todas las variables que
     # el template HTML necesita para mostrar la información
     contexto = {
-        'productos': productos_disponibles,  # Lista de productos
-        'clientes': clientes,                # Lista de clientes
         'form_cliente': form_cliente,        # Formulario de cliente
         'IVA_RATE': 0.19,                   # Tasa de IVA en Chile (19%)
     }
     
-    # --- Paso 5: Renderizar (generar) la página HTML ---
+    # --- Paso 3: Renderizar (generar) la página HTML ---
     # Django toma el template 'pos.html' y lo llena con los datos del contexto
     return render(request, 'pos.html', contexto)
 
 
+# ================================================================
+# =        VISTA API: CATÁLOGO DEL POS (JSON)                    =
+# ================================================================
+# 
+# La caja descarga el catálogo completo una vez y después pide solo
+# los productos que cambiaron (stock, precio, estado) desde la última
+# sincronización. Ver ventas/funciones/catalogo_pos.py
+
+@login_required
+@require_GET
+def catalogo_pos_api(request):
+    """
+    API con los productos del POS, paginada y sincronizable por cambios.
+    
+    Parámetros GET:
+        desde: `version` de la sincronización anterior (ISO 8601). Sin él,
+               se retorna el catálogo completo de productos vendibles
+        despues_de: Último ID recibido (para pedir la página siguiente)
+        limite: Productos por página (máximo MAX_TAMANO_PAGINA_CATALOGO)
+    
+    Args:
+        request: Petición HTTP
+        
+    Returns:
+        JsonResponse: {'success', 'version', 'completo', 'productos', 'siguiente'}
+        o 304 si la caja ya tiene esta página (If-None-Match)
+    """
+    desde = None
+    if request.GET.get('desde'):
+        desde = parse_datetime(request.GET['desde'])
+        if desde is None:
+            return JsonResponse({
+                'success': False,
+                'message': 'El parámetro desde no es una fecha válida'
+            }, status=400)
+        if timezone.is_naive(desde):
+            desde = timezone.make_aware(desde)
+    
+    try:
+        despues_de = int(request.GET.get('despues_de') or 0)
+        limite = int(request.GET.get('limite') or TAMANO_PAGINA_CATALOGO)
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Los parámetros de paginación no son válidos'
+        }, status=400)
+    limite = min(max(limite, 1), MAX_TAMANO_PAGINA_CATALOGO)
+    
+    # Consulta 1: versión del catálogo. Si la caja ya tiene esta página, 304
+    estado = estado_catalogo()
+    etag = etag_catalogo(estado, desde, despues_de, limite)
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    else:
+        # Consulta 2: la página de productos
+        pagina = obtener_pagina_catalogo(desde, despues_de, limite)
+        response = JsonResponse({
+            'success': True,
+            'version': estado['version'].isoformat() if estado['version'] else None,
+            'completo': desde is None,
+            'productos': pagina['productos'],
+            'siguiente': pagina['siguiente'],
+        })
+    
+    response['ETag'] = etag
+    # La caja debe revalidar siempre (con If-None-Match)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# ================================================================
+# =        VISTA API: BUSCAR CLIENTES (JSON)                     =
+# ================================================================
+# 
+# Buscador del selector de clientes del POS (por nombre o RUT).
+
+@login_required
+@require_GET
+def buscar_clientes_api(request):
+    """
+    API para buscar clientes mientras el cajero escribe.
+    
+    Parámetros GET:
+        q: Inicio del nombre, o el RUT (con o sin puntos y guion)
+        limite: Máximo de resultados (por defecto LIMITE_BUSQUEDA_CLIENTES)
+    
+    Args:
+        request: Petición HTTP
+        
+    Returns:
+        JsonResponse: {'success': True, 'clientes': [{'id', 'nombre', 'rut'}]}
+    """
+    try:
+        limite = int(request.GET.get('limite') or LIMITE_BUSQUEDA_CLIENTES)
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'message': 'El parámetro limite no es válido'
+        }, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'clientes': buscar_clientes(request.GET.get('q', ''), limite),
+    })
+
+
 # ================================================================
 # =        VISTA API: AGREGAR CLIENTE RÁPIDO (JSON)              =
 # ================================================================
@@ -144,6 +245,19 @@ def agregar_cliente_ajax(request):
         
         # --- Paso 3: Validar el formulario ---
         if form.is_valid():
+            # Si ya hay un cliente con ese RUT (con o sin puntos y guion), no duplicarlo
+            existente = cliente_por_rut(form.cleaned_data.get('rut'))
+            if existente:
+                return JsonResponse({
+                    'success': False,
+                    'mensaje': f'Ya existe un cliente con ese RUT: {existente.nombre}',
+                    'cliente': {
+                        'id': existente.id,
+                        'nombre': existente.nombre,
+                        'rut': existente.rut or '',
+                    }
+                }, status=409)  # Código HTTP 409 = Conflict
+            
             # Si el formulario es válido, guardamos el cliente en la BD
             cliente = form.save()  # Django automáticamente crea el registro
             
@@ -306,12 +420,11 @@ def procesar_venta_ajax(request):
     - Descuento (opcional)
     
     Realiza:
-    1. Valida que todos los productos tengan stock
-    2. Calcula los totales (subtotal, IVA, total)
-    3. Crea el registro de la Venta
-    4. Crea los registros de DetalleVenta
-    5. Actualiza el stock de cada producto
-    6. Retorna el resultado
+    1. Calcula los totales (subtotal, IVA, total)
+    2. Delega en el motor de checkout (ventas/funciones/checkout.py), que
+       bloquea productos y lotes, valida stock, aplica FIFO y crea la Venta,
+       los DetalleVenta y los movimientos con un número constante de consultas
+    3. Retorna el resultado
     
     Args:
         request: Petición HTTP con los datos de la venta en JSON
@@ -354,36 +467,7 @@ def procesar_venta_ajax(request):
                 'mensaje': 'Cliente no encontrado'
             }, status=404)
         
-        # --- Paso 3: Validar stock de todos los productos ---
-        # Antes de procesar, verificamos que TODOS los productos tengan stock
-        for item in carrito:
-            producto_id = item.get('producto_id')
-            cantidad_solicitada = Decimal(str(item.get('cantidad', 0)))
-            
-            try:
-                producto = Productos.objects.get(pk=producto_id)
-                
-                # Verificar que no esté eliminado
-                if producto.eliminado is not None:
-                    return JsonResponse({
-                        'success': False,
-                        'mensaje': f'El producto "{producto.nombre}" ya no está disponible'
-                    }, status=400)
-                
-                # Verificar stock (permite decimales)
-                if producto.cantidad < cantidad_solicitada:
-                    return JsonResponse({
-                        'success': False,
-                        'mensaje': f'Stock insuficiente para "{producto.nombre}". Disponible: {producto.cantidad}'
-                    }, status=400)
-                    
-            except Productos.DoesNotExist:
-                return JsonResponse({
-                    'success': False,
-                    'mensaje': f'Producto con ID {producto_id} no encontrado'
-                }, status=404)
-        
-        # --- Paso 4: Calcular totales ---
+        # --- Paso 3: Calcular totales ---
         # IMPORTANTE: El precio del producto YA INCLUYE IVA (precio final al consumidor)
         # Por lo tanto, debemos calcular:
         # 1. Total con IVA incluido (precio mostrado × cantidad)
@@ -395,7 +479,6 @@ def procesar_venta_ajax(request):
         
         # Sumamos el precio de cada producto del carrito (precio ya incluye IVA)
         for item in carrito:
-            producto_id = item.get('producto_id')
             cantidad = Decimal(str(item.get('cantidad', 0)))  # Permite decimales
             precio_unitario = Decimal(str(item.get('precio_unitario', 0)))  # Precio con IVA incluido
             descuento_item = Decimal(str(item.get('descuento', 0)))
@@ -439,191 +522,54 @@ def procesar_venta_ajax(request):
                 'mensaje': f'Monto insuficiente. Total: ${total_con_iva:.2f}, Pagado: ${monto_pagado:.2f}'
             }, status=400)
         
-        # --- Paso 4.5: VALIDAR STOCK ANTES DE PROCESAR VENTA ---
-        # Verificar que todos los productos tengan stock suficiente
-        for item in carrito:
-            producto_id = item.get('producto_id')
-            cantidad = Decimal(str(item.get('cantidad', 0)))  # Permite decimales
-            
-            try:
-                producto = Productos.objects.get(pk=producto_id, eliminado__isnull=True)
-                stock_disponible = producto.cantidad if producto.cantidad else Decimal('0')
-                
-                if stock_disponible < cantidad:
-                    return JsonResponse({
-                        'success': False,
-                        'mensaje': f'Stock insuficiente para {producto.nombre}. Disponible: {stock_disponible}, Solicitado: {cantidad}'
-                    }, status=400)
-            except Productos.DoesNotExist:
-                return JsonResponse({
-                    'success': False,
-                    'mensaje': f'Producto con ID {producto_id} no encontrado'
-                }, status=404)
+        # --- Paso 4: Registrar la venta con el motor de checkout ---
+        # El motor bloquea todos los productos y lotes del carrito en dos consultas,
+        # valida el stock, aplica FIFO en memoria y escribe todo en bloque
+        # dentro de una TRANSACCIÓN (o se guarda todo, o no se guarda nada).
+        
+        # Folio único desde la secuencia de folios (bloque reservado por este
+        # proceso, ver ventas/funciones/folios.py). Se pide ANTES de la
+        # transacción del checkout: reservar un bloque usa una transacción propia
+        folio = siguiente_folio()
+        
+        # Calcular vuelto (solo para pagos en efectivo)
+        # Para otros métodos de pago, el vuelto es 0
+        vuelto_calculado = Decimal('0.00')
+        if medio_pago == 'efectivo':
+            vuelto_calculado = vuelto
+        else:
+            # Para otros métodos, el monto pagado debe ser exactamente el total
+            if monto_pagado != total_con_iva:
+                # Si hay diferencia, ajustar monto_pagado al total
+                monto_pagado = total_con_iva
         
-        # --- Paso 5: Crear la venta en la base de datos ---
-        # Usamos una TRANSACCIÓN para asegurar que todo se guarde correctamente
-        # o NADA se guarde si hay un error (atomicidad)
-        with transaction.atomic():
-            
-            # Generar folio único (puedes mejorarlo con un sistema más robusto)
-            folio = f"BOL-{timezone.now().strftime('%Y%m%d%H%M%S')}"
-            
-            # Calcular vuelto (solo para pagos en efectivo)
-            # Para otros métodos de pago, el vuelto es 0
-            vuelto_calculado = Decimal('0.00')
-            if medio_pago == 'efectivo':
-                vuelto_calculado = vuelto
-            else:
-                # Para otros métodos, el monto pagado debe ser exactamente el total
-                if monto_pagado != total_con_iva:
-                    # Si hay diferencia, ajustar monto_pagado al total
-                    monto_pagado = total_con_iva
-            
-            # Crear el registro de Venta
-            venta = Ventas.objects.create(
-                clientes=cliente,
+        usuario_emisor = request.user.username if request.user.is_authenticated else None
+        
+        try:
+            venta, _, _ = registrar_venta(
+                cliente=cliente,
+                carrito=carrito,
                 canal_venta=canal_venta,
-                total_sin_iva=total_sin_iva,
-                total_iva=total_iva,
-                descuento=descuento_global,
-                total_con_iva=total_con_iva,
-                folio=folio,
                 medio_pago=medio_pago,
-                monto_pagado=monto_pagado,
-                vuelto=vuelto_calculado,
+                totales={
+                    'total_sin_iva': total_sin_iva,
+                    'total_iva': total_iva,
+                    'descuento': descuento_global,
+                    'total_con_iva': total_con_iva,
+                    'monto_pagado': monto_pagado,
+                    'vuelto': vuelto_calculado,
+                },
+                folio=folio,
+                usuario_emisor=usuario_emisor,
             )
-            
-            # --- Paso 6: Crear los detalles de venta y actualizar stock ---
-            for item in carrito:
-                producto_id = item.get('producto_id')
-                cantidad = Decimal(str(item.get('cantidad', 0)))  # Permite decimales
-                precio_unitario = Decimal(str(item.get('precio_unitario', 0)))
-                descuento_pct = Decimal(str(item.get('descuento', 0)))
-                
-                # Obtener el producto
-                producto = Productos.objects.get(pk=producto_id)
-                
-                # Crear el detalle de venta
-                DetalleVenta.objects.create(
-                    ventas=venta,
-                    productos=producto,
-                    cantidad=cantidad,
-                    precio_unitario=precio_unitario,
-                    descuento_pct=descuento_pct,
-                )
-                
-                # Validar stock disponible antes de actualizar
-                stock_disponible = producto.calcular_cantidad_desde_lotes() if hasattr(producto, 'calcular_cantidad_desde_lotes') else producto.cantidad
-                if stock_disponible < cantidad:
-                    raise ValueError(
-                        f'Stock insuficiente para {producto.nombre}. '
-                        f'Disponible: {stock_disponible}, Solicitado: {cantidad}'
-                    )
-                
-                # Reducir cantidad de lotes usando FIFO (First In First Out)
-                # Vender primero los lotes más antiguos (los que vencen primero)
-                from ventas.models import Lote
-                cantidad_restante = Decimal(str(cantidad))  # Asegurar que sea Decimal
-                
-                # Obtener lotes activos ordenados por fecha de caducidad (más antiguos primero)
-                lotes_activos = Lote.objects.filter(
-                    productos=producto,
-                    estado='activo',
-                    cantidad__gt=0
-                ).order_by('fecha_caducidad', 'fecha_recepcion')
-                
-                for lote in lotes_activos:
-                    if cantidad_restante <= Decimal('0'):
-                        break
-                    
-                    # Asegurar que lote.cantidad sea Decimal
-                    cantidad_lote = Decimal(str(lote.cantidad))
-                    
-                    # Calcular cuánto tomar de este lote
-                    cantidad_a_tomar = min(cantidad_restante, cantidad_lote)
-                    
-                    logger.info(f'[VENTA FIFO] Lote {lote.id}: cantidad antes={cantidad_lote}, tomando={cantidad_a_tomar}')
-                    
-                    # Reducir la cantidad del lote
-                    nueva_cantidad_lote = cantidad_lote - cantidad_a_tomar
-                    lote.cantidad = nueva_cantidad_lote
-                    
-                    # Si el lote se agotó, marcarlo como agotado
-                    if nueva_cantidad_lote <= Decimal('0'):
-                        lote.estado = 'agotado'
-                        lote.cantidad = Decimal('0')
-                        logger.info(f'[VENTA FIFO] Lote {lote.id} agotado')
-                    
-                    lote.save(update_fields=['cantidad', 'estado'])
-                    logger.info(f'[VENTA FIFO] Lote {lote.id}: cantidad después={lote.cantidad}, estado={lote.estado}')
-                    cantidad_restante = cantidad_restante - cantidad_a_tomar
-                
-                # Si aún queda cantidad por vender (no debería pasar si la validación fue correcta)
-                if cantidad_restante > Decimal('0'):
-                    raise ValueError(
-                        f'Error: No se pudo reducir completamente el stock. '
-                        f'Quedan {cantidad_restante} unidades sin asignar a lotes.'
-                    )
-                
-                # Refrescar el producto desde la BD para obtener datos actualizados
-                producto.refresh_from_db()
-                
-                # Actualizar la cantidad total del producto desde lotes
-                # Siempre recalcular desde lotes si el producto tiene lotes
-                if hasattr(producto, 'calcular_cantidad_desde_lotes'):
-                    nueva_cantidad_producto = producto.calcular_cantidad_desde_lotes()
-                    logger.info(f'[VENTA] Recalculando cantidad desde lotes: {nueva_cantidad_producto}')
-                else:
-                    nueva_cantidad_producto = producto.cantidad - cantidad
-                    logger.info(f'[VENTA] Reduciendo cantidad directamente: {nueva_cantidad_producto}')
-                
-                producto.cantidad = nueva_cantidad_producto
-                logger.info(f'[VENTA] Cantidad del producto actualizada a: {producto.cantidad}')
-                
-                # Actualizar fecha de caducidad del producto con la del lote más antiguo activo
-                lote_mas_antiguo = Lote.objects.filter(
-                    productos=producto,
-                    estado='activo',
-                    cantidad__gt=0
-                ).order_by('fecha_caducidad', 'fecha_recepcion').first()
-                
-                if lote_mas_antiguo and lote_mas_antiguo.fecha_caducidad:
-                    producto.caducidad = lote_mas_antiguo.fecha_caducidad
-                elif not lote_mas_antiguo:
-                    # Si no hay lotes activos, limpiar fecha de caducidad
-                    producto.caducidad = None
-                
-                # Guardar cambios en el producto
-                producto.save(update_fields=['cantidad', 'caducidad'])
-                
-                # Log para debugging
-                logger.info(f'[VENTA] Producto {producto.nombre}: cantidad actualizada a {producto.cantidad} después de vender {cantidad} unidades')
-                
-                # Crear movimiento de inventario para trazabilidad
-                try:
-                    from ventas.models import MovimientosInventario
-                    MovimientosInventario.objects.create(
-                        tipo_movimiento='salida',
-                        cantidad=cantidad,
-                        productos=producto,
-                        origen='venta',
-                        referencia_id=venta.id,
-                        tipo_referencia='venta'
-                    )
-                except Exception as e:
-                    # Si falla la creación del movimiento, registrar pero no fallar la venta
-                    logger.warning(f'Error al crear movimiento de inventario: {e}')
-            
-            # --- Paso 6.5: Guardar historial de boleta (sin afectar la transacción principal) ---
-            try:
-                from ventas.funciones.historial_boletas import guardar_historial_boleta
-                usuario_emisor = request.user.username if request.user.is_authenticated else None
-                guardar_historial_boleta(venta, usuario_emisor=usuario_emisor)
-            except Exception as e:
-                # Si falla el guardado del historial, registrar pero no fallar la venta
-                logger.warning(f'Error al guardar historial de boleta: {e}')
-        
-        # --- Paso 7: Retornar respuesta exitosa ---
+        except ErrorCheckout as e:
+            # Producto no encontrado, eliminado o sin stock suficiente
+            return JsonResponse({
+                'success': False,
+                'mensaje': e.mensaje
+            }, status=e.status)
+        
+        # --- Paso 5: Retornar respuesta exitosa ---
         return JsonResponse({
             'success': True,
             'mensaje': 'Venta procesada correctamente',
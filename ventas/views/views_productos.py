@@ -1,24 +1,38 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, Sum
+from django.db.models import Q, Sum, Exists, OuterRef
+from django.core.paginator import Paginator
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 import json
 from ventas.funciones.formularios_productos import ProductoForm, NutricionalForm
+from ventas.funciones.stock import actualizar_resumen_stock
 from ventas.models.productos import Productos, Nutricional
 from ventas.models.movimientos import MovimientosInventario
 from ventas.models.ventas import DetalleVenta
 from ventas.models.alertas import Alertas
 from django.utils import timezone
 
-def inventario_view(request):
-    q = (request.GET.get('q') or '').strip()
-    # Filtro para mostrar inactivos
-    mostrar_inactivos = request.GET.get('mostrar_inactivos', 'false').lower() == 'true'
-    
-    qs = Productos.objects.select_related('categorias').filter(eliminado__isnull=True)
+# Productos por página en el inventario
+PRODUCTOS_POR_PAGINA = 50
+
+def productos_inventario(q='', mostrar_inactivos=False):
+    """
+    Productos que muestra el inventario con su búsqueda y filtro de inactivos.
+
+    También la usan las acciones masivas al seleccionar todos los productos
+    del filtro (ver view_acciones_masivas.py).
+
+    Args:
+        q: Texto de búsqueda (nombre, marca, tipo, formato o categoría)
+        mostrar_inactivos: Si es True, incluye los productos inactivos
+
+    Returns:
+        QuerySet: Productos sin duplicados por (nombre, marca), sin orden
+    """
+    qs = Productos.objects.filter(eliminado__isnull=True)
     
     # Por defecto, mostrar productos activos Y productos en merma (para que se vean en inventario)
     # Si mostrar_inactivos=True, mostrar activos, inactivos y en_merma
@@ -27,6 +41,7 @@ def inventario_view(request):
     else:
         # Mostrar productos activos Y productos en merma (estos deben permanecer visibles)
         qs = qs.filter(estado_merma__in=['activo', 'en_merma'])
+    
     if q:
         qs = qs.filter(
             Q(nombre__icontains=q) |
@@ -36,66 +51,50 @@ def inventario_view(request):
             Q(categorias__nombre__icontains=q)
         )
 
-    # Deduplicar: clave por (nombre, marca)
-    productos = []
-    seen = set()
-    for p in qs.order_by('nombre', 'marca'):
-        key = (p.nombre.strip().lower(), (p.marca or '').strip().lower())
-        if key in seen:
-            continue
-        seen.add(key)
-        
-        # Calcular cantidad desde lotes si existen
-        p.cantidad_desde_lotes = p.calcular_cantidad_desde_lotes()
-        
-        # Contar lotes activos
-        try:
-            from ventas.models import Lote
-            lotes_activos = Lote.objects.filter(
-                productos=p,
-                estado='activo',
-                cantidad__gt=0
-            )
-            p.numero_lotes_activos = lotes_activos.count()
-            
-            # Si el producto está en merma pero tiene lotes activos (no inactivos), reactivarlo automáticamente
-            # PERO solo si NO tiene registros activos en HistorialMerma
-            if p.estado_merma == 'en_merma' and p.numero_lotes_activos > 0:
-                try:
-                    from ventas.models import HistorialMerma
-                    tiene_historial_activo = HistorialMerma.objects.filter(
-                        producto=p,
-                        activo=True
-                    ).exists()
-                    
-                    # Solo reactivar si NO tiene historial activo (es decir, fue reactivado manualmente)
-                    if not tiene_historial_activo:
-                        p.estado_merma = 'activo'
-                        # Actualizar fecha de caducidad con la del lote más antiguo (FIFO)
-                        lote_mas_antiguo = lotes_activos.order_by('fecha_caducidad', 'fecha_recepcion').first()
-                        if lote_mas_antiguo:
-                            p.caducidad = lote_mas_antiguo.fecha_caducidad
-                            if lote_mas_antiguo.fecha_elaboracion:
-                                p.elaboracion = lote_mas_antiguo.fecha_elaboracion
-                        p.save(update_fields=['estado_merma', 'caducidad', 'elaboracion'])
-                except Exception:
-                    # Si HistorialMerma no existe, usar el comportamiento anterior
-                    p.estado_merma = 'activo'
-                    lote_mas_antiguo = lotes_activos.order_by('fecha_caducidad', 'fecha_recepcion').first()
-                    if lote_mas_antiguo:
-                        p.caducidad = lote_mas_antiguo.fecha_caducidad
-                        if lote_mas_antiguo.fecha_elaboracion:
-                            p.elaboracion = lote_mas_antiguo.fecha_elaboracion
-                    p.save(update_fields=['estado_merma', 'caducidad', 'elaboracion'])
-        except Exception:
-            p.numero_lotes_activos = 0
-        
-        productos.append(p)
+    # Deduplicar: clave por (nombre, marca). Se conserva el producto de menor ID
+    # de cada clave, excluyendo los que tienen un "gemelo" anterior en el mismo filtro.
+    # La clave es una columna guardada con índice (clave_duplicado, id): la
+    # subconsulta busca en el índice en vez de normalizar cada fila.
+    duplicado_anterior = qs.filter(
+        clave_duplicado=OuterRef('clave_duplicado'),
+        id__lt=OuterRef('id'),
+    )
+    return qs.exclude(Exists(duplicado_anterior))
+
+
+def inventario_view(request):
+    """
+    Lista de inventario, paginada en el servidor.
+
+    Se arma con UNA consulta por página: la cantidad, los lotes activos y la
+    caducidad vienen del resumen de stock del producto (ver ventas/funciones/stock.py)
+    y la deduplicación por (nombre, marca) se resuelve en SQL.
+
+    Esta vista solo lee: la reactivación automática de productos en merma que
+    vuelven a tener lotes la hace el comando `reconciliar_stock`.
+    """
+    q = (request.GET.get('q') or '').strip()
+    # Filtro para mostrar inactivos
+    mostrar_inactivos = request.GET.get('mostrar_inactivos', 'false').lower() == 'true'
+    
+    qs = productos_inventario(q, mostrar_inactivos).select_related('categorias').order_by('nombre', 'marca', 'id')
+
+    # Paginación
+    paginador = Paginator(qs, PRODUCTOS_POR_PAGINA)
+    productos = paginador.get_page(request.GET.get('page'))
+    
+    for p in productos:
+        # Cantidad y lotes activos desde el resumen de stock del producto
+        # (se mantiene al modificar lotes, ver ventas/funciones/stock.py)
+        p.cantidad_desde_lotes = p.cantidad
+        p.numero_lotes_activos = p.lotes_activos
 
     return render(request, 'inventario.html', {
         'productos': productos, 
         'q': q,
-        'mostrar_inactivos': mostrar_inactivos
+        'mostrar_inactivos': mostrar_inactivos,
+        # Filtro actual para "seleccionar todos" en las acciones masivas
+        'filtro_acciones': {'q': q, 'mostrar_inactivos': 'true' if mostrar_inactivos else 'false'},
     })
 
 def editar_producto_view(request, producto_id):
@@ -215,20 +214,8 @@ def editar_producto_view(request, producto_id):
                             estado='activo'
                         )
                         
-                        # Actualizar cantidad del producto desde lotes
-                        producto_guardado.cantidad = producto_guardado.calcular_cantidad_desde_lotes() if hasattr(producto_guardado, 'calcular_cantidad_desde_lotes') else producto_guardado.cantidad
-                        
-                        # Actualizar fecha de caducidad del producto con la del lote más antiguo
-                        lote_mas_antiguo = Lote.objects.filter(
-                            productos=producto_guardado,
-                            estado='activo',
-                            cantidad__gt=0
-                        ).order_by('fecha_caducidad', 'fecha_recepcion').first()
-                        
-                        if lote_mas_antiguo and lote_mas_antiguo.fecha_caducidad:
-                            producto_guardado.caducidad = lote_mas_antiguo.fecha_caducidad
-                        
-                        producto_guardado.save(update_fields=['cantidad', 'caducidad'])
+                        # Actualizar cantidad, lotes activos y caducidad del producto desde lotes
+                        actualizar_resumen_stock(producto_guardado)
                         
                         # Crear movimiento de inventario
                         movimiento = MovimientosInventario.objects.create(
@@ -285,7 +272,7 @@ def eliminar_producto_view(request, producto_id):
     if request.method == 'POST':
         # Desactivar producto cambiando estado_merma a 'inactivo'
         producto.estado_merma = 'inactivo'
-        producto.save(update_fields=['estado_merma'])
+        producto.save(update_fields=['estado_merma', 'modificado'])
         messages.success(request, f'Producto "{producto.nombre}" desactivado correctamente. Puede reactivarlo desde el inventario.')
         return redirect('inventario')
     return render(request, 'confirmar_eliminar.html', {'producto': producto})
@@ -300,7 +287,7 @@ def reactivar_producto_view(request, producto_id):
     if request.method == 'POST':
         if producto.estado_merma == 'inactivo':
             producto.estado_merma = 'activo'
-            producto.save(update_fields=['estado_merma'])
+            producto.save(update_fields=['estado_merma', 'modificado'])
             messages.success(request, f'Producto "{producto.nombre}" reactivado correctamente.')
         else:
             messages.info(request, f'El producto "{producto.nombre}" no está inactivo.')
@@ -514,7 +501,7 @@ def eliminar_registro_merma_view(request, producto_id):
                     producto.estado_merma = 'activo'
                     # NO restaurar cantidad - debe permanecer en 0
                     # El producto quedará activo pero con cantidad 0, listo para reabastecer
-                    producto.save(update_fields=['estado_merma'])
+                    producto.save(update_fields=['estado_merma', 'modificado'])
                 
                 messages.success(
                     request, 
@@ -527,7 +514,7 @@ def eliminar_registro_merma_view(request, producto_id):
                 # Mantener los campos históricos (motivo_merma, fecha_merma, cantidad_merma)
                 if producto.estado_merma == 'en_merma':
                     producto.estado_merma = 'activo'
-                    producto.save(update_fields=['estado_merma'])
+                    producto.save(update_fields=['estado_merma', 'modificado'])
                     messages.success(
                         request, 
                         f'Producto reactivado para "{producto.nombre}". '
@@ -543,7 +530,7 @@ def eliminar_registro_merma_view(request, producto_id):
             # Solo cambiar estado del producto (mantener campos históricos)
             if producto.estado_merma == 'en_merma':
                 producto.estado_merma = 'activo'
-                producto.save(update_fields=['estado_merma'])
+                producto.save(update_fields=['estado_merma', 'modificado'])
                 messages.success(
                     request, 
                     f'Producto reactivado para "{producto.nombre}". '
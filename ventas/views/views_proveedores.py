@@ -54,17 +54,16 @@ def proveedores_list_view(request):
     if estado_filter:
         proveedores = proveedores.filter(estado=estado_filter)
     
-    # Ordenar por nombre
-    proveedores = proveedores.order_by('nombre')
-    
     # Agregar información adicional (total facturas, facturas pendientes)
-    for proveedor in proveedores:
-        proveedor.total_facturas = proveedor.facturas.filter(eliminado__isnull=True).count()
-        proveedor.facturas_pendientes = proveedor.facturas.filter(
-            eliminado__isnull=True,
-            estado_pago='pendiente'
-        ).count()
-        proveedor.total_pendiente = proveedor.obtener_total_pendiente()
+    # en la misma consulta. El saldo pendiente es una columna del proveedor
+    # (ver ventas/funciones/saldos_proveedores.py): no se suman sus facturas.
+    proveedores = proveedores.annotate(
+        total_facturas=Count('facturas', filter=Q(facturas__eliminado__isnull=True)),
+        facturas_pendientes=Count('facturas', filter=Q(
+            facturas__eliminado__isnull=True,
+            facturas__estado_pago='pendiente',
+        )),
+    ).order_by('nombre')
     
     contexto = {
         'proveedores': proveedores,
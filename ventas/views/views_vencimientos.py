@@ -1,49 +1,83 @@
-from django.http import JsonResponse
-from django.utils import timezone
-from datetime import timedelta
-from ventas.models.productos import Productos
+# ================================================================
+# =                                                              =
+# =        APIS DE PRÓXIMOS VENCIMIENTOS                        =
+# =                                                              =
+# ================================================================
+#
+# /api/vencimientos/?dias=N&tramo=M retorna, desde los lotes activos (y
+# los productos antiguos sin lotes), los productos por vencer, el
+# histograma por tramos de días y la pérdida potencial (ver
+# ventas/funciones/vencimientos.py).
+#
+# Las URLs anteriores (/api/proximos-vencimientos/, -14/ y -30/) se
+# mantienen con su formato de respuesta y leen el mismo resultado.
+
+from django.http import JsonResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_GET
+from ventas.funciones.vencimientos import obtener_vencimientos, MAX_HORIZONTE_VENCIMIENTOS
+
+
+@require_GET
+def vencimientos_api(request):
+    """
+    API de vencimientos para cualquier horizonte.
+
+    Parámetros GET:
+        dias: Horizonte en días (default 7, máximo MAX_HORIZONTE_VENCIMIENTOS)
+        tramo: Días por tramo del histograma (default 1)
+
+    Returns:
+        JsonResponse: {'success', 'dias', 'tramo', 'desde', 'hasta', 'total_lotes',
+        'total_productos', 'cantidad_total', 'perdida_total', 'tramos', 'items'}
+        o 304 si el navegador ya tiene la versión actual (If-None-Match)
+    """
+    try:
+        dias = int(request.GET.get('dias') or 7)
+        tramo = int(request.GET.get('tramo') or 1)
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Los parámetros dias y tramo deben ser números enteros'
+        }, status=400)
+
+    if not 0 <= dias <= MAX_HORIZONTE_VENCIMIENTOS or not 1 <= tramo <= max(dias, 1):
+        return JsonResponse({
+            'success': False,
+            'message': f'dias debe estar entre 0 y {MAX_HORIZONTE_VENCIMIENTOS} y tramo entre 1 y dias'
+        }, status=400)
+
+    vencimientos = obtener_vencimientos(dias, tramo)
+    if vencimientos['etag'] in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse({'success': True, **vencimientos['datos']})
+    response['ETag'] = vencimientos['etag']
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _productos_por_vencer(dias):
+    """
+    Formato de las APIs anteriores: {'count', 'items': [{'id', 'nombre', 'caducidad'}]}.
+    """
+    items = [
+        {'id': item['id'], 'nombre': item['nombre'], 'caducidad': item['caducidad']}
+        for item in obtener_vencimientos(dias)['datos']['items']
+    ]
+    return JsonResponse({"count": len(items), "items": items})
 
 
 def productos_por_vencer_api(request):
     """API que retorna productos que vencen en los próximos 7 días"""
-    hoy = timezone.localdate()
-    limite = hoy + timedelta(days=7)
-    qs = (Productos.objects
-          .filter(eliminado__isnull=True, caducidad__range=(hoy, limite))
-          .order_by('caducidad', 'nombre'))
-    items = [{
-        "id": p.id,
-        "nombre": p.nombre, 
-        "caducidad": p.caducidad.isoformat()
-    } for p in qs]
-    return JsonResponse({"count": len(items), "items": items})
+    return _productos_por_vencer(7)
 
 
 def productos_por_vencer_14_dias_api(request):
     """API que retorna productos que vencen en los próximos 14 días"""
-    hoy = timezone.localdate()
-    limite = hoy + timedelta(days=14)
-    qs = (Productos.objects
-          .filter(eliminado__isnull=True, caducidad__range=(hoy, limite))
-          .order_by('caducidad', 'nombre'))
-    items = [{
-        "id": p.id,
-        "nombre": p.nombre, 
-        "caducidad": p.caducidad.isoformat()
-    } for p in qs]
-    return JsonResponse({"count": len(items), "items": items})
+    return _productos_por_vencer(14)
 
 
 def productos_por_vencer_30_dias_api(request):
     """API que retorna productos que vencen en los próximos 30 días"""
-    hoy = timezone.localdate()
-    limite = hoy + timedelta(days=30)
-    qs = (Productos.objects
-          .filter(eliminado__isnull=True, caducidad__range=(hoy, limite))
-          .order_by('caducidad', 'nombre'))
-    items = [{
-        "id": p.id,
-        "nombre": p.nombre, 
-        "caducidad": p.caducidad.isoformat()
-    } for p in qs]
-    return JsonResponse({"count": len(items), "items": items})
\ No newline at end of file
+    return _productos_por_vencer(30)